@@ -1,5 +1,5 @@
 from fastapi import APIRouter
-from app.api.v1.endpoints import auth, users, doctors, patients, appointments, prescriptions
+from app.api.v1.endpoints import auth, users, doctors, patients, appointments, prescriptions, dashboard
 
 api_router = APIRouter()
 
@@ -8,4 +8,5 @@ api_router.include_router(users.router, prefix="/users", tags=["Users"])
 api_router.include_router(doctors.router, prefix="/doctors", tags=["Doctors"])
 api_router.include_router(patients.router, prefix="/patients", tags=["Patients"])
 api_router.include_router(appointments.router, prefix="/appointments", tags=["Appointments"])
-api_router.include_router(prescriptions.router, prefix="/prescriptions", tags=["Prescriptions"])
\ No newline at end of file
+api_router.include_router(prescriptions.router, prefix="/prescriptions", tags=["Prescriptions"])
+api_router.include_router(dashboard.router, prefix="/dashboard", tags=["Dashboard"])
\ No newline at end of file
@@ -1,17 +1,32 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from fastapi.security import OAuth2PasswordBearer
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Header
+from fastapi.responses import StreamingResponse
 from typing import Optional, List
 from datetime import date, datetime
-from pydantic import BaseModel, Field, validator
-from app.core.security import decode_token
-from app.services.appointment_service import appointment_service
+from pydantic import BaseModel, Field, field_validator
+from app.api.v1.endpoints.deps import get_current_user, parse_id_list, field_selection
+from app.services.appointment_service import appointment_service, APPOINTMENT_LIST_FIELDS
 from app.services.doctor_service import doctor_service
+from app.services.appointment_feed import appointment_feed
+from app.services.summary_service import SUMMARY_ROLES
+from app.domain.field_selection import FieldSelection
 from app.domain.entities.appointment import AppointmentStatus, AppointmentType, TimeSlot
-from app.core.exceptions import NotFoundException, ValidationException, ConflictException
+from app.core.exceptions import DomeCareException, NotFoundException, ValidationException, ConflictException
+from app.core.timezones import clinic_timezone_name, local_today
 from datetime import datetime
 
 router = APIRouter()
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login")
+
+# Maximum appointments per bulk status request
+MAX_BULK_ITEMS = 500
+
+# Maximum appointments per batch lookup
+MAX_BATCH_IDS = 100
+
+# Longest date range for a slots query (two months)
+MAX_SLOT_RANGE_DAYS = 62
+
+# ?fields= / ?expand= of appointment lists (the other party is expanded by default)
+appointment_list_selection = field_selection(APPOINTMENT_LIST_FIELDS, SUMMARY_ROLES)
 
 # Request/Response Models
 class CreateAppointmentRequest(BaseModel):
@@ -24,6 +39,27 @@ class CreateAppointmentRequest(BaseModel):
 class UpdateAppointmentStatusRequest(BaseModel):
     status: AppointmentStatus
 
+class BulkStatusItem(BaseModel):
+    appointment_id: str
+    status: AppointmentStatus
+
+class BulkStatusFilter(BaseModel):
+    appointment_date: date
+    current_status: Optional[List[AppointmentStatus]] = None
+    before_time: Optional[str] = Field(None, description="Only slots starting before this time (HH:MM)")
+    
+    @field_validator('before_time')
+    @classmethod
+    def validate_before_time(cls, v):
+        if v is not None:
+            datetime.strptime(v, "%H:%M")
+        return v
+
+class BulkUpdateStatusRequest(BaseModel):
+    items: Optional[List[BulkStatusItem]] = None
+    filter: Optional[BulkStatusFilter] = None
+    status: Optional[AppointmentStatus] = Field(None, description="Target status when using a filter")
+
 class CancelAppointmentRequest(BaseModel):
     reason: str = Field(..., max_length=500)
 
@@ -43,20 +79,6 @@ class AppointmentResponse(BaseModel):
     doctor: Optional[dict] = None
     patient: Optional[dict] = None
 
-# Dependency to get current user
-async def get_current_user(token: str = Depends(oauth2_scheme)):
-    """Get current user from JWT token"""
-    payload = decode_token(token)
-    if not payload:
-        raise HTTPException(status_code=401, detail="Invalid token")
-    
-    from app.services.auth_service import auth_service
-    user = await auth_service.get_user_by_id(payload.get("sub"))
-    if not user:
-        raise HTTPException(status_code=401, detail="User not found")
-    
-    return user
-
 @router.post("/", response_model=dict)
 async def create_appointment(
     request: CreateAppointmentRequest,
@@ -71,7 +93,7 @@ async def create_appointment(
             "doctor_id": request.doctor_id,
             "patient_id": str(current_user["_id"]),
             "appointment_date": request.appointment_date,
-            "time_slot": request.time_slot.dict(),
+            "time_slot": request.time_slot.model_dump(),
             "appointment_type": request.appointment_type,
             "reason": request.reason
         }
@@ -87,7 +109,9 @@ async def create_appointment(
             }
         }
         
-    except (ConflictException, ValidationException) as e:
+    except ConflictException as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except ValidationException as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail="Failed to create appointment")
@@ -96,17 +120,18 @@ async def create_appointment(
 async def get_my_appointments(
     start_date: Optional[date] = Query(None),
     end_date: Optional[date] = Query(None),
+    selection: FieldSelection = Depends(appointment_list_selection),
     current_user: dict = Depends(get_current_user)
 ):
     """Get appointments for current user"""
     try:
         if current_user["role"] == "doctor":
             appointments = await appointment_service.get_appointments_by_doctor(
-                str(current_user["_id"]), start_date, end_date
+                str(current_user["_id"]), start_date, end_date, clinic_timezone_name(current_user), selection
             )
         elif current_user["role"] == "patient":
             appointments = await appointment_service.get_appointments_by_patient(
-                str(current_user["_id"]), start_date, end_date
+                str(current_user["_id"]), start_date, end_date, selection=selection
             )
         else:
             raise HTTPException(status_code=403, detail="Invalid user role")
@@ -119,6 +144,93 @@ async def get_my_appointments(
     except Exception as e:
         raise HTTPException(status_code=500, detail="Failed to fetch appointments")
 
+# Fixed paths go before the /{id} route below, which would otherwise match them
+@router.get("/stream")
+async def stream_appointments(
+    last_event_id: Optional[str] = Header(None),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Live booking and status-change deltas for the current doctor (Server-Sent Events)
+    
+    Reconnecting clients send Last-Event-ID to receive what they missed; a
+    `resync` event means the gap is unknown and lists should be refetched.
+    """
+    if current_user["role"] != "doctor":
+        raise HTTPException(status_code=403, detail="Only doctors can subscribe to appointment updates")
+    
+    try:
+        appointment_feed.check_capacity()
+    except DomeCareException as e:
+        raise HTTPException(status_code=e.status_code, detail=e.message,
+                            headers={"Retry-After": str(getattr(e, "retry_after", 1))})
+    
+    # Subscribes when the body is first iterated, so nothing leaks if it never is
+    return StreamingResponse(
+        appointment_feed.stream(str(current_user["_id"]), last_event_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.get("/today", response_model=dict)
+async def get_today_appointments(
+    selection: FieldSelection = Depends(appointment_list_selection),
+    current_user: dict = Depends(get_current_user)
+):
+    """Get today's appointments for current user"""
+    try:
+        if current_user["role"] == "doctor":
+            tz_name = clinic_timezone_name(current_user)
+            today = local_today(tz_name)
+            appointments = await appointment_service.get_appointments_by_doctor(
+                str(current_user["_id"]), today, today, tz_name, selection
+            )
+        elif current_user["role"] == "patient":
+            today = local_today()
+            appointments = await appointment_service.get_appointments_by_patient(
+                str(current_user["_id"]), today, today, selection=selection
+            )
+        else:
+            raise HTTPException(status_code=403, detail="Invalid user role")
+        
+        return {
+            "success": True,
+            "data": appointments
+        }
+        
+    except Exception as e:
+        raise HTTPException(status_code=500, detail="Failed to fetch today's appointments")
+
+@router.get("/batch", response_model=dict)
+async def get_appointments_batch(
+    ids: str = Query(..., description=f"Comma-separated appointment ids (at most {MAX_BATCH_IDS})"),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Many of the current user's appointments in one request
+    
+    Appointments come back in the order asked for; ids that are invalid,
+    unknown or belong to someone else are listed in `missing`.
+    """
+    if current_user["role"] not in ("doctor", "patient"):
+        raise HTTPException(status_code=403, detail="Invalid user role")
+    
+    appointment_ids = parse_id_list(ids, MAX_BATCH_IDS)
+    
+    try:
+        appointments, missing = await appointment_service.get_appointments_by_ids(
+            appointment_ids, str(current_user["_id"]), current_user["role"]
+        )
+        
+        return {
+            "success": True,
+            "data": appointments,
+            "missing": missing
+        }
+        
+    except Exception as e:
+        raise HTTPException(status_code=500, detail="Failed to fetch appointments")
+
 @router.get("/{appointment_id}", response_model=dict)
 async def get_appointment(
     appointment_id: str,
@@ -133,7 +245,7 @@ async def get_appointment(
         
         # Check if user has access to this appointment
         user_id = str(current_user["_id"])
-        if appointment["doctor_id"] != user_id and appointment["patient_id"] != user_id:
+        if appointment.doctor_id != user_id and appointment.patient_id != user_id:
             raise HTTPException(status_code=403, detail="Access denied")
         
         return {
@@ -157,30 +269,70 @@ async def update_appointment_status(
         raise HTTPException(status_code=403, detail="Only doctors can update appointment status")
     
     try:
-        # Verify the appointment belongs to this doctor
-        appointment = await appointment_service.get_appointment_by_id(appointment_id)
-        if not appointment:
-            raise HTTPException(status_code=404, detail="Appointment not found")
-        
-        if appointment["doctor_id"] != str(current_user["_id"]):
-            raise HTTPException(status_code=403, detail="Access denied")
-        
-        success = await appointment_service.update_appointment_status(
+        # Ownership and allowed-from status are checked in the same update
+        appointment = await appointment_service.update_appointment_status(
             appointment_id, request.status, str(current_user["_id"])
         )
         
-        if not success:
-            raise HTTPException(status_code=400, detail="Failed to update appointment status")
+        return {
+            "success": True,
+            "message": f"Appointment status updated to {request.status}",
+            "data": appointment
+        }
+        
+    except DomeCareException as e:
+        raise HTTPException(status_code=e.status_code, detail=e.message)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail="Failed to update appointment status")
+
+@router.post("/bulk/status", response_model=dict)
+async def bulk_update_appointment_status(
+    request: BulkUpdateStatusRequest,
+    current_user: dict = Depends(get_current_user)
+):
+    """Update many appointment statuses at once (doctors only)"""
+    if current_user["role"] != "doctor":
+        raise HTTPException(status_code=403, detail="Only doctors can update appointment status")
+    
+    if (request.items is None) == (request.filter is None):
+        raise HTTPException(status_code=400, detail="Provide either items or filter")
+    if request.filter is not None and request.status is None:
+        raise HTTPException(status_code=400, detail="Target status is required with a filter")
+    
+    try:
+        doctor_id = str(current_user["_id"])
+        
+        if request.items is not None:
+            items = [(item.appointment_id, item.status) for item in request.items]
+        else:
+            appointment_ids = await appointment_service.find_appointment_ids_for_bulk(
+                doctor_id,
+                request.filter.appointment_date,
+                request.status,
+                request.filter.current_status,
+                request.filter.before_time,
+                clinic_timezone_name(current_user)
+            )
+            items = [(appointment_id, request.status) for appointment_id in appointment_ids]
+        
+        if len(items) > MAX_BULK_ITEMS:
+            raise HTTPException(status_code=400, detail=f"At most {MAX_BULK_ITEMS} appointments per request")
+        
+        results = await appointment_service.bulk_update_status(doctor_id, items)
         
         return {
             "success": True,
-            "message": f"Appointment status updated to {request.status}"
+            "data": {
+                "results": results,
+                "updated": sum(1 for result in results if result["result"] == "updated"),
+                "total": len(results)
+            }
         }
         
     except HTTPException:
         raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail="Failed to update appointment status")
+        raise HTTPException(status_code=500, detail="Failed to update appointment statuses")
 
 @router.post("/{appointment_id}/cancel", response_model=dict)
 async def cancel_appointment(
@@ -190,33 +342,19 @@ async def cancel_appointment(
 ):
     """Cancel an appointment"""
     try:
-        # Verify the appointment belongs to this user
-        appointment = await appointment_service.get_appointment_by_id(appointment_id)
-        if not appointment:
-            raise HTTPException(status_code=404, detail="Appointment not found")
-        
-        user_id = str(current_user["_id"])
-        if appointment["doctor_id"] != user_id and appointment["patient_id"] != user_id:
-            raise HTTPException(status_code=403, detail="Access denied")
-        
-        # Check if appointment can be cancelled
-        if appointment["status"] in [AppointmentStatus.CANCELLED, AppointmentStatus.COMPLETED]:
-            raise HTTPException(status_code=400, detail="Cannot cancel this appointment")
-        
-        success = await appointment_service.cancel_appointment(
-            appointment_id, user_id, request.reason
+        # Ownership and cancellable status are checked in the same update
+        appointment = await appointment_service.cancel_appointment(
+            appointment_id, str(current_user["_id"]), request.reason
         )
         
-        if not success:
-            raise HTTPException(status_code=400, detail="Failed to cancel appointment")
-        
         return {
             "success": True,
-            "message": "Appointment cancelled successfully"
+            "message": "Appointment cancelled successfully",
+            "data": appointment
         }
         
-    except HTTPException:
-        raise
+    except DomeCareException as e:
+        raise HTTPException(status_code=e.status_code, detail=e.message)
     except Exception as e:
         raise HTTPException(status_code=500, detail="Failed to cancel appointment")
 
@@ -246,7 +384,7 @@ async def get_doctor_available_slots(
             "data": {
                 "date": date,
                 "doctor_id": doctor_id,
-                "available_slots": [slot.dict() for slot in slots]
+                "available_slots": [slot.model_dump() for slot in slots]
             }
         }
         
@@ -255,29 +393,38 @@ async def get_doctor_available_slots(
     except Exception as e:
         raise HTTPException(status_code=500, detail="Failed to fetch available slots")
 
-@router.get("/today", response_model=dict)
-async def get_today_appointments(
+@router.get("/doctors/{doctor_id}/slots/range", response_model=dict)
+async def get_doctor_available_slots_range(
+    doctor_id: str,
+    start_date: date = Query(..., description="First day (YYYY-MM-DD)"),
+    end_date: date = Query(..., description="Last day, inclusive (YYYY-MM-DD)"),
     current_user: dict = Depends(get_current_user)
 ):
-    """Get today's appointments for current user"""
+    """Get available time slots for a doctor over a date range (e.g. a month)"""
+    if end_date < start_date:
+        raise HTTPException(status_code=400, detail="end_date must not be before start_date")
+    if (end_date - start_date).days >= MAX_SLOT_RANGE_DAYS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_SLOT_RANGE_DAYS} days per request")
+    
     try:
-        today = date.today()
-        
-        if current_user["role"] == "doctor":
-            appointments = await appointment_service.get_appointments_by_doctor(
-                str(current_user["_id"]), today, today
-            )
-        elif current_user["role"] == "patient":
-            appointments = await appointment_service.get_appointments_by_patient(
-                str(current_user["_id"]), today, today
-            )
-        else:
-            raise HTTPException(status_code=403, detail="Invalid user role")
+        slots = await appointment_service.get_doctor_available_slots_range(doctor_id, start_date, end_date)
+        if slots is None:
+            raise HTTPException(status_code=404, detail="Doctor not found")
         
         return {
             "success": True,
-            "data": appointments
+            "data": {
+                "doctor_id": doctor_id,
+                "start_date": start_date,
+                "end_date": end_date,
+                "days": {
+                    day.isoformat(): [slot.model_dump() for slot in day_slots]
+                    for day, day_slots in slots.items()
+                }
+            }
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail="Failed to fetch today's appointments")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail="Failed to fetch available slots")
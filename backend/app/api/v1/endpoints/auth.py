@@ -1,9 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Body
+from fastapi import APIRouter, Depends, HTTPException, status, Body, Request, BackgroundTasks
+from starlette.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Tuple
 from datetime import datetime, timedelta
-from pydantic import BaseModel, EmailStr, Field, validator  # Added validator
+from pydantic import BaseModel, EmailStr, Field, validator, field_validator  # Added validator
 from app.core.config import settings
+from app.core.compression import no_compression
 from app.core.security import (
     verify_password, 
     get_password_hash, 
@@ -13,9 +15,13 @@ from app.core.security import (
     is_strong_password,
     decode_token  # Added decode_token
 )
-from app.core.exceptions import AuthenticationException, ValidationException, ConflictException
+from app.core.exceptions import DomeCareException, AuthenticationException, ValidationException, ConflictException
+from app.core.rate_limit import enforce_auth_rate_limit, enforce_password_reset_rate_limit
 from app.services.auth_service import auth_service
-from app.services.mock_services import MockVerificationService
+from app.services.token_service import refresh_token_service
+from app.services.activity_service import activity_recorder
+from app.api.v1.endpoints.deps import get_current_user, is_token_current
+from app.services.mock_services import MockVerificationService, MockEmailService
 from app.domain.entities.user import UserRole, AuthMethod
 
 router = APIRouter()
@@ -24,13 +30,14 @@ oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login")
 # Initialize services
 # auth_service = AuthService()
 verification_service = MockVerificationService()
+email_service = MockEmailService()
 
 # Request/Response Models
 class RegisterRequest(BaseModel):
     full_name: str = Field(..., min_length=2, max_length=100)
     email: Optional[EmailStr] = None
     phone_number: Optional[str] = None
-    country_code: str = "+963"
+    country_code: str = settings.DEFAULT_COUNTRY_CODE
     password: str = Field(..., min_length=8)
     role: UserRole
     auth_method: Optional[AuthMethod] = None
@@ -61,6 +68,20 @@ class LoginRequest(BaseModel):
     identifier: str  # Email or phone number
     password: str
 
+class ForgotPasswordRequest(BaseModel):
+    identifier: str  # Email or phone number
+
+class ResetPasswordRequest(BaseModel):
+    token: str = Field(..., min_length=16, max_length=128)
+    password: str = Field(..., min_length=8)
+    
+    @field_validator('password')
+    @classmethod
+    def validate_password_strength(cls, v):
+        if not is_strong_password(v):
+            raise ValueError("Password must contain uppercase, lowercase, and numbers")
+        return v
+
 class TokenResponse(BaseModel):
     access_token: str
     refresh_token: str
@@ -73,8 +94,21 @@ class MessageResponse(BaseModel):
     message: str
     data: Optional[Dict[str, Any]] = None
 
+async def issue_token_pair(user: Dict[str, Any], family_id: Optional[str] = None) -> Tuple[str, str]:
+    """Create an access/refresh token pair bound to the user's token version"""
+    token_data = {
+        "sub": str(user["_id"]),
+        "role": user["role"],
+        "ver": user.get("token_version", 0)
+    }
+    jti, family_id = await refresh_token_service.issue(str(user["_id"]), family_id)
+    
+    access_token = create_access_token(token_data)
+    refresh_token = create_refresh_token({**token_data, "jti": jti, "fam": family_id})
+    return access_token, refresh_token
+
 @router.post("/register", response_model=MessageResponse)
-async def register(request: RegisterRequest):
+async def register(request: RegisterRequest, http_request: Request, background_tasks: BackgroundTasks):
     """
     Register a new user
     
@@ -83,22 +117,17 @@ async def register(request: RegisterRequest):
     - OTP is automatically set to "123456"
     - Phone verification structure is ready but disabled
     """
+    await enforce_auth_rate_limit("register", http_request)
+    
     try:
-        # Check if user already exists
-        existing_user = await auth_service.find_user_by_identifier(
-            request.email if request.auth_method == AuthMethod.EMAIL else request.phone_number
-        )
-        
-        if existing_user:
-            raise ConflictException("User already exists with this email/phone")
-        
-        # Create user
+        # Create user (duplicates are rejected by unique indexes, no lookup first)
         user_data = {
             "full_name": request.full_name,
             "email": request.email,
             "phone_number": request.phone_number,
             "country_code": request.country_code,
-            "password_hash": get_password_hash(request.password),
+            # bcrypt is CPU-bound; keep it off the event loop
+            "password_hash": await run_in_threadpool(get_password_hash, request.password),
             "role": request.role,
             "auth_method": request.auth_method,
             "status": "pending"
@@ -109,20 +138,16 @@ async def register(request: RegisterRequest):
             user_data["is_email_verified"] = True
             user_data["status"] = "active"
         
-        user = await auth_service.create_user(user_data)
+        # User and OTP are written together
+        otp = generate_otp()
+        user = await auth_service.register_user(user_data, otp)
         
-        # Send verification code
+        # Send verification code after the response has gone out
         if request.auth_method == AuthMethod.EMAIL and not settings.USE_MOCK_SERVICES:
-            identifier = request.email
+            identifier = user["email"]
         else:
-            identifier = f"{request.country_code}{request.phone_number}"
-        
-        # Generate and send OTP
-        otp = generate_otp()
-        await verification_service.send_otp(identifier, request.auth_method)
-        
-        # Store OTP for verification
-        await auth_service.store_otp(str(user["_id"]), otp)
+            identifier = f"{user['country_code']}{user['phone_number']}"
+        background_tasks.add_task(verification_service.send_otp, identifier, request.auth_method)
         
         return MessageResponse(
             success=True,
@@ -134,11 +159,13 @@ async def register(request: RegisterRequest):
             }
         )
         
+    except DomeCareException as e:
+        raise HTTPException(status_code=e.status_code, detail=e.message)
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 @router.post("/verify", response_model=MessageResponse)
-async def verify_otp(request: VerifyOTPRequest):
+async def verify_otp(request: VerifyOTPRequest, http_request: Request):
     """
     Verify OTP code
     
@@ -146,6 +173,8 @@ async def verify_otp(request: VerifyOTPRequest):
     - Accepts "123456" as valid OTP
     - Auto-approves any 6-digit code
     """
+    await enforce_auth_rate_limit("verify", http_request, request.identifier)
+    
     try:
         # In mock mode, always verify successfully
         if settings.USE_MOCK_SERVICES:
@@ -178,7 +207,8 @@ async def verify_otp(request: VerifyOTPRequest):
         raise HTTPException(status_code=400, detail=str(e))
 
 @router.post("/login", response_model=TokenResponse)
-async def login(request: LoginRequest):
+@no_compression  # Token responses: no compression side channel (BREACH)
+async def login(request: LoginRequest, http_request: Request):
     """
     Login with email/phone and password
     
@@ -186,6 +216,9 @@ async def login(request: LoginRequest):
     - Email login is primary
     - Phone login structure ready but can be disabled
     """
+    # Throttle before the user lookup and bcrypt check
+    await enforce_auth_rate_limit("login", http_request, request.identifier)
+    
     try:
         # Find user by email or phone
         user = await auth_service.find_user_by_identifier(request.identifier)
@@ -193,8 +226,8 @@ async def login(request: LoginRequest):
         if not user:
             raise AuthenticationException("Invalid credentials")
         
-        # Verify password
-        if not verify_password(request.password, user["password_hash"]):
+        # Verify password (bcrypt is CPU-bound; keep it off the event loop)
+        if not await run_in_threadpool(verify_password, request.password, user["password_hash"]):
             raise AuthenticationException("Invalid credentials")
         
         # Check if user can login
@@ -207,13 +240,11 @@ async def login(request: LoginRequest):
         elif user["auth_method"] == AuthMethod.PHONE and not user.get("is_phone_verified"):
             raise AuthenticationException("Phone not verified")
         
-        # Update last login
-        await auth_service.update_user(str(user["_id"]), {"last_login": datetime.utcnow()})
+        # Update last login (buffered, written in the background)
+        activity_recorder.record(user["_id"], "last_login")
         
-        # Create tokens
-        token_data = {"sub": str(user["_id"]), "role": user["role"]}
-        access_token = create_access_token(token_data)
-        refresh_token = create_refresh_token(token_data)
+        # Create tokens (starts a new refresh token family)
+        access_token, refresh_token = await issue_token_pair(user)
         
         # Prepare user response (remove sensitive data)
         user_response = {
@@ -236,25 +267,31 @@ async def login(request: LoginRequest):
         raise HTTPException(status_code=401, detail=str(e))
 
 @router.post("/refresh", response_model=TokenResponse)
-async def refresh_token(refresh_token: str = Body(...)):
-    """Refresh access token using refresh token"""
+@no_compression  # Token responses: no compression side channel (BREACH)
+async def refresh_token(refresh_token: str = Body(..., embed=True)):
+    """Refresh access token using refresh token (rotates the refresh token)"""
     try:
         # Decode refresh token
         payload = decode_token(refresh_token)
-        if not payload or payload.get("type") != "refresh":
+        if not payload or payload.get("type") != "refresh" or not payload.get("jti"):
             raise AuthenticationException("Invalid refresh token")
         
+        # Redeem it; replaying an already-rotated token revokes its family
+        token = await refresh_token_service.rotate(payload["jti"])
+        if not token:
+            raise AuthenticationException("Refresh token has been revoked")
+        
         # Get user
-        user_id = payload.get("sub")
-        user = await auth_service.get_user_by_id(user_id)
+        user = await auth_service.get_user_by_id(str(token["user_id"]))
         
         if not user:
             raise AuthenticationException("User not found")
         
-        # Create new tokens
-        token_data = {"sub": str(user["_id"]), "role": user["role"]}
-        access_token = create_access_token(token_data)
-        new_refresh_token = create_refresh_token(token_data)
+        if not is_token_current(payload, user):
+            raise AuthenticationException("Refresh token has been revoked")
+        
+        # Create new tokens in the same family
+        access_token, new_refresh_token = await issue_token_pair(user, token["family_id"])
         
         # Prepare user response
         user_response = {
@@ -276,6 +313,22 @@ async def refresh_token(refresh_token: str = Body(...)):
     except Exception as e:
         raise HTTPException(status_code=401, detail=str(e))
 
+@router.post("/logout", response_model=MessageResponse)
+async def logout(refresh_token: str = Body(..., embed=True)):
+    """Revoke the refresh token family of this session"""
+    payload = decode_token(refresh_token)
+    if payload and payload.get("type") == "refresh" and payload.get("fam"):
+        await refresh_token_service.revoke_family(payload["fam"])
+    
+    return MessageResponse(success=True, message="Logged out successfully")
+
+@router.post("/logout-all", response_model=MessageResponse)
+async def logout_all(current_user: dict = Depends(get_current_user)):
+    """Revoke every access and refresh token of the current user"""
+    await refresh_token_service.revoke_all(str(current_user["_id"]))
+    
+    return MessageResponse(success=True, message="Logged out from all sessions")
+
 @router.get("/method", response_model=MessageResponse)
 async def get_auth_methods():
     """Get available authentication methods based on feature flags"""
@@ -303,14 +356,15 @@ async def get_auth_methods():
     )
 
 @router.post("/resend-otp", response_model=MessageResponse)
-async def resend_otp(identifier: str = Body(...)):
+async def resend_otp(http_request: Request, identifier: str = Body(...)):
     """
     Resend OTP code
     
     In development mode:
     - Always sends "123456"
-    - No rate limiting
     """
+    await enforce_auth_rate_limit("resend-otp", http_request, identifier)
+    
     try:
         # Find user
         user = await auth_service.find_user_by_identifier(identifier)
@@ -333,4 +387,63 @@ async def resend_otp(identifier: str = Body(...)):
         )
         
     except Exception as e:
-        raise HTTPException(status_code=400, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.post("/forgot-password", response_model=MessageResponse)
+async def forgot_password(request: ForgotPasswordRequest, http_request: Request, background_tasks: BackgroundTasks):
+    """
+    Email a password reset link
+    
+    The response is the same whether or not the account exists. The email
+    is sent after the response has gone out.
+    """
+    await enforce_password_reset_rate_limit(http_request, request.identifier)
+    
+    try:
+        user = await auth_service.find_user_by_identifier(
+            request.identifier, {"email": 1, "full_name": 1, "status": 1}
+        )
+        
+        reset_token = None
+        if user and user.get("email") and user.get("status") not in ("blocked", "deactivated"):
+            reset_token = await auth_service.create_password_reset_token(str(user["_id"]))
+            background_tasks.add_task(
+                email_service.send_password_reset,
+                user["email"],
+                user.get("full_name", ""),
+                f"{settings.PASSWORD_RESET_URL}?token={reset_token}"
+            )
+        
+        return MessageResponse(
+            success=True,
+            message="If an account exists for this email/phone, a password reset link has been sent",
+            data={"reset_token": reset_token} if settings.USE_MOCK_SERVICES and reset_token else None
+        )
+        
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.post("/reset-password", response_model=MessageResponse)
+async def reset_password(request: ResetPasswordRequest, http_request: Request):
+    """Set a new password with a reset token; signs out every session"""
+    await enforce_auth_rate_limit("reset-password", http_request)
+    
+    try:
+        # Consume first so invalid tokens never pay for bcrypt
+        user_id = await auth_service.consume_password_reset_token(request.token)
+        if not user_id:
+            raise ValidationException("Invalid or expired reset token")
+        
+        password_hash = await run_in_threadpool(get_password_hash, request.password)
+        if not await auth_service.reset_password(user_id, password_hash):
+            raise ValidationException("Invalid or expired reset token")
+        
+        return MessageResponse(
+            success=True,
+            message="Password has been reset. Please log in with your new password"
+        )
+        
+    except DomeCareException as e:
+        raise HTTPException(status_code=e.status_code, detail=e.message)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
@@ -0,0 +1,38 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from typing import Optional
+from app.api.v1.endpoints.deps import get_current_user
+from app.services.dashboard_service import dashboard_service, DOCTOR_DASHBOARD_SECTIONS
+from app.core.exceptions import DomeCareException
+
+router = APIRouter()
+
+@router.get("/doctor", response_model=dict)
+async def get_doctor_dashboard(
+    fields: Optional[str] = Query(
+        None, description=f"Comma-separated sections to include ({', '.join(DOCTOR_DASHBOARD_SECTIONS)}); all by default"
+    ),
+    current_user: dict = Depends(get_current_user)
+):
+    """Profile, stats, today's agenda and recent prescriptions of the current doctor in one response"""
+    if current_user["role"] != "doctor":
+        raise HTTPException(status_code=403, detail="Only doctors can view the doctor dashboard")
+    
+    sections = set(DOCTOR_DASHBOARD_SECTIONS)
+    if fields:
+        sections = {field.strip() for field in fields.split(",") if field.strip()}
+        unknown = sections - set(DOCTOR_DASHBOARD_SECTIONS)
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown dashboard fields: {', '.join(sorted(unknown))}")
+    
+    try:
+        dashboard = await dashboard_service.get_doctor_dashboard(current_user, sections)
+        
+        return {
+            "success": True,
+            "data": dashboard
+        }
+        
+    except DomeCareException as e:
+        raise HTTPException(status_code=e.status_code, detail=e.message)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail="Failed to fetch dashboard")
@@ -0,0 +1,99 @@
+from fastapi import Depends, HTTPException, Query
+from fastapi.security import OAuth2PasswordBearer
+from typing import Callable, Iterable, List, Optional
+from app.core.security import decode_token, is_token_current
+from app.domain.field_selection import FieldSelection
+from app.services.auth_service import auth_service
+
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login")
+oauth2_scheme_optional = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login", auto_error=False)
+
+def parse_id_list(ids: str, limit: int) -> List[str]:
+    """Comma-separated ids of a batch request, de-duplicated in order; at most `limit`"""
+    parsed = list(dict.fromkeys(value.strip() for value in ids.split(",") if value.strip()))
+    if not parsed:
+        raise HTTPException(status_code=400, detail="No ids given")
+    if len(parsed) > limit:
+        raise HTTPException(status_code=400, detail=f"At most {limit} ids per request")
+    return parsed
+
+def _split_names(value: str) -> frozenset:
+    return frozenset(name.strip() for name in value.split(",") if name.strip())
+
+def _is_nested_path(field: str, allowed_fields: frozenset) -> bool:
+    parts = field.split(".")
+    return len(parts) > 1 and parts[0] in allowed_fields and all(part.isidentifier() for part in parts)
+
+def field_selection(allowed_fields: Iterable[str], expansions: Iterable[str] = (),
+                    default_expand: Optional[Iterable[str]] = None,
+                    nested: bool = False) -> Callable[..., FieldSelection]:
+    """
+    Dependency reading `fields` and `expand` into a FieldSelection
+
+    With `nested`, dotted paths into embedded documents of allowed fields
+    (e.g. clinic_info.city) may be selected too. `default_expand` applies
+    when neither parameter is given; otherwise the read decides.
+    """
+    allowed_fields = frozenset(allowed_fields)
+    expansions = tuple(expansions)
+    
+    def dependency(
+        fields: Optional[str] = Query(None, description="Comma-separated fields to return (_id is always included); all by default"),
+        expand: Optional[str] = Query(
+            None, description=f"Comma-separated related data to include ({', '.join(expansions) or 'none'}); empty for none"
+        )
+    ) -> FieldSelection:
+        selected = _split_names(fields) if fields and fields.strip() else None
+        if selected is not None:
+            unknown = {
+                field for field in selected
+                if field not in allowed_fields and not (nested and _is_nested_path(field, allowed_fields))
+            }
+            if unknown:
+                raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown))}")
+        
+        expanded = _split_names(expand) if expand is not None else None
+        if expanded:
+            unknown = expanded - set(expansions)
+            if unknown:
+                raise HTTPException(status_code=400, detail=f"Unknown expand: {', '.join(sorted(unknown))}")
+        elif expanded is None and selected is None and default_expand is not None:
+            expanded = frozenset(default_expand)
+        
+        return FieldSelection(fields=selected, expand=expanded)
+    
+    return dependency
+
+# Dependency to get current user
+async def get_current_user(token: str = Depends(oauth2_scheme)):
+    """Get current user from JWT token"""
+    payload = decode_token(token)
+    if not payload or payload.get("type") != "access":
+        raise HTTPException(status_code=401, detail="Invalid token")
+
+    user = await auth_service.get_user_by_id(payload.get("sub"))
+    if not user:
+        raise HTTPException(status_code=401, detail="User not found")
+
+    if not is_token_current(payload, user):
+        raise HTTPException(status_code=401, detail="Token has been revoked")
+
+    return user
+
+# Optional authentication (for public endpoints)
+async def get_current_user_optional(token: Optional[str] = Depends(oauth2_scheme_optional)):
+    """Get current user from JWT token (optional)"""
+    if not token:
+        return None
+
+    try:
+        payload = decode_token(token)
+        if not payload or payload.get("type") != "access":
+            return None
+
+        user = await auth_service.get_user_by_id(payload.get("sub"))
+        if not user or not is_token_current(payload, user):
+            return None
+        return user
+    except:
+        return None
@@ -1,14 +1,25 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from fastapi.security import OAuth2PasswordBearer
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from typing import Optional, List
-from pydantic import BaseModel, Field
-from app.core.security import decode_token
-from app.services.doctor_service import doctor_service
+from pydantic import BaseModel, Field, field_validator
+from app.api.v1.endpoints.deps import get_current_user, get_current_user_optional, parse_id_list, field_selection
+from app.services.doctor_service import doctor_service, DOCTOR_FIELDS, DOCTOR_SEARCH_FIELDS, DOCTOR_EXPANSIONS
 from app.services.appointment_service import appointment_service
-from datetime import datetime
+from app.services.schedule_service import schedule_service
+from app.domain.entities.schedule_exception import ScheduleExceptionType
+from app.domain.field_selection import FieldSelection
+from app.core.exceptions import DomeCareException
+from app.core.timezones import clinic_timezone_name, day_bounds_utc, to_utc
+from datetime import datetime, date
 
 router = APIRouter()
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login")
+
+# Cache headers for public responses (also lets the compression layer cache them).
+# Only for routes that read no credentials; a shared cache keys on the URL alone
+FACETS_CACHE_CONTROL = "public, max-age=300"
+PROFILE_CACHE_CONTROL = "public, max-age=60"
+
+# Maximum doctors per batch lookup
+MAX_BATCH_IDS = 100
 
 # Request/Response Models
 class DoctorSearchResponse(BaseModel):
@@ -31,36 +42,21 @@ class UpdateDoctorProfileRequest(BaseModel):
 class UpdateScheduleRequest(BaseModel):
     schedule: dict = Field(..., description="Weekly schedule configuration")
 
-# Dependency to get current user
-async def get_current_user(token: str = Depends(oauth2_scheme)):
-    """Get current user from JWT token"""
-    payload = decode_token(token)
-    if not payload:
-        raise HTTPException(status_code=401, detail="Invalid token")
+class CreateScheduleExceptionRequest(BaseModel):
+    kind: ScheduleExceptionType = ScheduleExceptionType.BLOCKED
+    start_date: date
+    end_date: date
+    start_time: Optional[str] = Field(None, description="Omit both times to block whole days (HH:MM)")
+    end_time: Optional[str] = None
+    reason: Optional[str] = Field(None, max_length=500)
+    cancel_appointments: bool = Field(False, description="Cancel bookings in the range and notify patients")
     
-    from app.services.auth_service import auth_service
-    user = await auth_service.get_user_by_id(payload.get("sub"))
-    if not user:
-        raise HTTPException(status_code=401, detail="User not found")
-    
-    return user
-
-# Optional authentication (for public endpoints)
-async def get_current_user_optional(token: Optional[str] = Depends(oauth2_scheme)):
-    """Get current user from JWT token (optional)"""
-    if not token:
-        return None
-    
-    try:
-        payload = decode_token(token)
-        if not payload:
-            return None
-        
-        from app.services.auth_service import auth_service
-        user = await auth_service.get_user_by_id(payload.get("sub"))
-        return user
-    except:
-        return None
+    @field_validator('start_time', 'end_time')
+    @classmethod
+    def validate_time_format(cls, v):
+        if v is not None:
+            datetime.strptime(v, "%H:%M")
+        return v
 
 @router.get("/search", response_model=dict)
 async def search_doctors(
@@ -69,11 +65,14 @@ async def search_doctors(
     name: Optional[str] = Query(None, description="Doctor name"),
     min_rating: Optional[float] = Query(None, ge=0, le=5, description="Minimum rating"),
     max_fee: Optional[float] = Query(None, ge=0, description="Maximum consultation fee"),
+    available_on: Optional[date] = Query(None, description="Has a free slot on this day (YYYY-MM-DD)"),
+    available_before: Optional[datetime] = Query(None, description="Has a free slot starting before this time (clinic time unless an offset is given)"),
     page: int = Query(1, ge=1, description="Page number"),
     limit: int = Query(20, ge=1, le=100, description="Items per page"),
+    selection: FieldSelection = Depends(field_selection(DOCTOR_SEARCH_FIELDS, DOCTOR_EXPANSIONS, nested=True)),
     current_user: Optional[dict] = Depends(get_current_user_optional)
 ):
-    """Search for doctors with filters"""
+    """Search for doctors with filters (?fields= and ?expand=stats shape the results)"""
     try:
         result = await doctor_service.search_doctors(
             specialty=specialty,
@@ -81,8 +80,11 @@ async def search_doctors(
             name=name,
             min_rating=min_rating,
             max_fee=max_fee,
+            available_on=available_on,
+            available_before=to_utc(available_before) if available_before else None,
             page=page,
-            limit=limit
+            limit=limit,
+            selection=selection
         )
         
         return {
@@ -94,11 +96,14 @@ async def search_doctors(
         raise HTTPException(status_code=500, detail="Failed to search doctors")
 
 @router.get("/specialties", response_model=dict)
-async def get_specialties():
+async def get_specialties(response: Response):
     """Get list of available doctor specialties"""
     try:
         specialties = await doctor_service.get_doctor_specialties()
         
+        # Public facet list, safe for shared caches
+        response.headers["Cache-Control"] = FACETS_CACHE_CONTROL
+        
         return {
             "success": True,
             "data": specialties
@@ -108,11 +113,14 @@ async def get_specialties():
         raise HTTPException(status_code=500, detail="Failed to fetch specialties")
 
 @router.get("/cities", response_model=dict)
-async def get_cities():
+async def get_cities(response: Response):
     """Get list of cities with available doctors"""
     try:
         cities = await doctor_service.get_cities_with_doctors()
         
+        # Public facet list, safe for shared caches
+        response.headers["Cache-Control"] = FACETS_CACHE_CONTROL
+        
         return {
             "success": True,
             "data": cities
@@ -121,21 +129,108 @@ async def get_cities():
     except Exception as e:
         raise HTTPException(status_code=500, detail="Failed to fetch cities")
 
+# Fixed paths go before the /{id} route below, which would otherwise match them
+@router.get("/profile/stats", response_model=dict)
+async def get_doctor_stats(
+    current_user: dict = Depends(get_current_user)
+):
+    """Get doctor statistics (doctors only)"""
+    if current_user["role"] != "doctor":
+        raise HTTPException(status_code=403, detail="Only doctors can view their stats")
+    
+    try:
+        stats = await doctor_service.get_doctor_stats(str(current_user["_id"]), clinic_timezone_name(current_user))
+        
+        return {
+            "success": True,
+            "data": stats
+        }
+        
+    except Exception as e:
+        raise HTTPException(status_code=500, detail="Failed to fetch doctor stats")
+
+@router.get("/me", response_model=dict)
+async def get_my_doctor_profile(
+    current_user: dict = Depends(get_current_user)
+):
+    """Get current doctor's profile"""
+    if current_user["role"] != "doctor":
+        raise HTTPException(status_code=403, detail="Only doctors can access this endpoint")
+    
+    try:
+        doctor = await doctor_service.get_doctor_by_id(str(current_user["_id"]))
+        
+        if not doctor:
+            raise HTTPException(status_code=404, detail="Doctor profile not found")
+        
+        # Add stats
+        stats = await doctor_service.get_doctor_stats(str(current_user["_id"]), clinic_timezone_name(current_user))
+        doctor["stats"] = stats
+        
+        return {
+            "success": True,
+            "data": doctor
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail="Failed to fetch profile")
+
+@router.get("/batch", response_model=dict)
+async def get_doctors_batch(
+    response: Response,
+    ids: str = Query(..., description=f"Comma-separated doctor ids (at most {MAX_BATCH_IDS})"),
+    include_stats: bool = Query(False, description="Add each doctor's stats")
+):
+    """
+    List views of many doctors in one request (favourites, care team)
+    
+    Doctors come back in the order asked for; ids that are invalid or not
+    an active doctor are listed in `missing` rather than failing the request.
+    """
+    doctor_ids = parse_id_list(ids, MAX_BATCH_IDS)
+    
+    try:
+        doctors, missing = await doctor_service.get_doctors_by_ids(doctor_ids)
+        
+        if include_stats:
+            stats = await doctor_service.get_doctors_stats(doctors)
+            for doctor in doctors:
+                doctor["stats"] = stats[doctor["_id"]]
+        
+        # Public profiles, safe for shared caches
+        response.headers["Cache-Control"] = PROFILE_CACHE_CONTROL
+        
+        return {
+            "success": True,
+            "data": doctors,
+            "missing": missing
+        }
+        
+    except Exception as e:
+        raise HTTPException(status_code=500, detail="Failed to fetch doctors")
+
 @router.get("/{doctor_id}", response_model=dict)
 async def get_doctor_details(
     doctor_id: str,
-    current_user: Optional[dict] = Depends(get_current_user_optional)
+    response: Response,
+    selection: FieldSelection = Depends(field_selection(DOCTOR_FIELDS, DOCTOR_EXPANSIONS, default_expand=("stats",), nested=True))
 ):
-    """Get doctor details by ID"""
+    """
+    Get doctor details by ID, with stats unless ?fields= or ?expand= say otherwise
+    
+    Takes no credentials: the response is the same for every caller, which
+    is what makes it safe to mark public.
+    """
     try:
-        doctor = await doctor_service.get_doctor_by_id(doctor_id)
+        doctor = await doctor_service.get_doctor_by_id(doctor_id, selection)
         
         if not doctor:
             raise HTTPException(status_code=404, detail="Doctor not found")
         
-        # Get doctor stats for enhanced profile
-        stats = await doctor_service.get_doctor_stats(doctor_id)
-        doctor["stats"] = stats
+        # Public profile, safe for shared caches
+        response.headers["Cache-Control"] = PROFILE_CACHE_CONTROL
         
         return {
             "success": True,
@@ -249,49 +344,97 @@ async def update_doctor_schedule(
     except Exception as e:
         raise HTTPException(status_code=500, detail="Failed to update schedule")
 
-@router.get("/profile/stats", response_model=dict)
-async def get_doctor_stats(
+@router.get("/schedule/exceptions", response_model=dict)
+async def list_schedule_exceptions(
+    start_date: Optional[date] = Query(None),
+    end_date: Optional[date] = Query(None),
     current_user: dict = Depends(get_current_user)
 ):
-    """Get doctor statistics (doctors only)"""
+    """List schedule exceptions; upcoming ones unless a date range is given (doctors only)"""
     if current_user["role"] != "doctor":
-        raise HTTPException(status_code=403, detail="Only doctors can view their stats")
+        raise HTTPException(status_code=403, detail="Only doctors can view schedule exceptions")
     
     try:
-        stats = await doctor_service.get_doctor_stats(str(current_user["_id"]))
+        range_start = range_end = None
+        if start_date and end_date:
+            range_start, range_end = day_bounds_utc(start_date, end_date, clinic_timezone_name(current_user))
+        
+        exceptions = await schedule_service.list_exceptions(
+            str(current_user["_id"]), range_start, range_end
+        )
         
         return {
             "success": True,
-            "data": stats
+            "data": exceptions
         }
         
     except Exception as e:
-        raise HTTPException(status_code=500, detail="Failed to fetch doctor stats")
+        raise HTTPException(status_code=500, detail="Failed to fetch schedule exceptions")
 
-@router.get("/me", response_model=dict)
-async def get_my_doctor_profile(
+@router.post("/schedule/exceptions", response_model=dict)
+async def create_schedule_exception(
+    request: CreateScheduleExceptionRequest,
     current_user: dict = Depends(get_current_user)
 ):
-    """Get current doctor's profile"""
+    """Block a holiday, vacation or time range, optionally cancelling its bookings (doctors only)"""
     if current_user["role"] != "doctor":
-        raise HTTPException(status_code=403, detail="Only doctors can access this endpoint")
+        raise HTTPException(status_code=403, detail="Only doctors can update their schedule")
     
     try:
-        doctor = await doctor_service.get_doctor_by_id(str(current_user["_id"]))
+        exception = await schedule_service.create_exception(
+            current_user,
+            request.kind,
+            request.start_date,
+            request.end_date,
+            request.start_time,
+            request.end_time,
+            request.reason
+        )
         
-        if not doctor:
-            raise HTTPException(status_code=404, detail="Doctor profile not found")
+        cancelled = 0
+        if request.cancel_appointments:
+            cancelled = await appointment_service.cancel_appointments_in_range(
+                current_user,
+                exception["starts_at"],
+                exception["ends_at"],
+                request.reason or "Doctor unavailable"
+            )
         
-        # Add stats
-        stats = await doctor_service.get_doctor_stats(str(current_user["_id"]))
-        doctor["stats"] = stats
+        return {
+            "success": True,
+            "message": "Schedule exception created successfully",
+            "data": {
+                "exception": exception,
+                "cancelled_appointments": cancelled
+            }
+        }
+        
+    except DomeCareException as e:
+        raise HTTPException(status_code=e.status_code, detail=e.message)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail="Failed to create schedule exception")
+
+@router.delete("/schedule/exceptions/{exception_id}", response_model=dict)
+async def delete_schedule_exception(
+    exception_id: str,
+    current_user: dict = Depends(get_current_user)
+):
+    """Remove a schedule exception (doctors only)"""
+    if current_user["role"] != "doctor":
+        raise HTTPException(status_code=403, detail="Only doctors can update their schedule")
+    
+    try:
+        deleted = await schedule_service.delete_exception(str(current_user["_id"]), exception_id)
+        
+        if not deleted:
+            raise HTTPException(status_code=404, detail="Schedule exception not found")
         
         return {
             "success": True,
-            "data": doctor
+            "message": "Schedule exception removed successfully"
         }
         
     except HTTPException:
         raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail="Failed to fetch profile")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail="Failed to remove schedule exception")
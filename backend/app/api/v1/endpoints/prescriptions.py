@@ -1,14 +1,17 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
-from fastapi.security import OAuth2PasswordBearer
 from typing import Optional, List
 from datetime import date
 from pydantic import BaseModel, Field
-from app.core.security import decode_token
-from app.services.prescription_service import prescription_service
+from app.api.v1.endpoints.deps import get_current_user, field_selection
+from app.services.prescription_service import prescription_service, PRESCRIPTION_LIST_FIELDS
+from app.services.summary_service import SUMMARY_ROLES
 from app.domain.entities.prescription import MedicineItem
+from app.domain.field_selection import FieldSelection
 
 router = APIRouter()
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login")
+
+# ?fields= / ?expand= of prescription lists (the other party is expanded by default)
+prescription_list_selection = field_selection(PRESCRIPTION_LIST_FIELDS, SUMMARY_ROLES)
 
 # Request/Response Models
 class CreatePrescriptionRequest(BaseModel):
@@ -29,20 +32,6 @@ class UpdatePrescriptionRequest(BaseModel):
     general_instructions_ar: Optional[str] = Field(None, max_length=1000)
     valid_until: Optional[date] = None
 
-# Dependency to get current user
-async def get_current_user(token: str = Depends(oauth2_scheme)):
-    """Get current user from JWT token"""
-    payload = decode_token(token)
-    if not payload:
-        raise HTTPException(status_code=401, detail="Invalid token")
-    
-    from app.services.auth_service import auth_service
-    user = await auth_service.get_user_by_id(payload.get("sub"))
-    if not user:
-        raise HTTPException(status_code=401, detail="User not found")
-    
-    return user
-
 @router.post("/", response_model=dict)
 async def create_prescription(
     request: CreatePrescriptionRequest,
@@ -58,7 +47,7 @@ async def create_prescription(
             "patient_id": request.patient_id,
             "diagnosis": request.diagnosis,
             "diagnosis_ar": request.diagnosis_ar,
-            "medicines": [medicine.dict() for medicine in request.medicines],
+            "medicines": [medicine.model_dump() for medicine in request.medicines],
             "general_instructions": request.general_instructions,
             "general_instructions_ar": request.general_instructions_ar,
             "valid_until": request.valid_until
@@ -85,17 +74,18 @@ async def create_prescription(
 async def get_my_prescriptions(
     page: int = Query(1, ge=1, description="Page number"),
     limit: int = Query(20, ge=1, le=100, description="Items per page"),
+    selection: FieldSelection = Depends(prescription_list_selection),
     current_user: dict = Depends(get_current_user)
 ):
     """Get prescriptions for current user"""
     try:
         if current_user["role"] == "doctor":
             result = await prescription_service.get_prescriptions_by_doctor(
-                str(current_user["_id"]), page, limit
+                str(current_user["_id"]), page, limit, selection
             )
         elif current_user["role"] == "patient":
             result = await prescription_service.get_prescriptions_by_patient(
-                str(current_user["_id"]), page, limit
+                str(current_user["_id"]), page, limit, selection
             )
         else:
             raise HTTPException(status_code=403, detail="Invalid user role")
@@ -124,7 +114,7 @@ async def get_prescription(
         
         # Check if user has access to this prescription
         user_id = str(current_user["_id"])
-        if prescription["doctor_id"] != user_id and prescription["patient_id"] != user_id:
+        if prescription.doctor_id != user_id and prescription.patient_id != user_id:
             raise HTTPException(status_code=403, detail="Access denied")
         
         return {
@@ -153,7 +143,7 @@ async def update_prescription(
         if not prescription:
             raise HTTPException(status_code=404, detail="Prescription not found")
         
-        if prescription["doctor_id"] != str(current_user["_id"]):
+        if prescription.doctor_id != str(current_user["_id"]):
             raise HTTPException(status_code=403, detail="Access denied")
         
         # Prepare update data
@@ -163,7 +153,7 @@ async def update_prescription(
         if request.diagnosis_ar is not None:
             update_data["diagnosis_ar"] = request.diagnosis_ar
         if request.medicines is not None:
-            update_data["medicines"] = [medicine.dict() for medicine in request.medicines]
+            update_data["medicines"] = [medicine.model_dump() for medicine in request.medicines]
         if request.general_instructions is not None:
             update_data["general_instructions"] = request.general_instructions
         if request.general_instructions_ar is not None:
@@ -245,7 +235,7 @@ async def get_patient_prescriptions(
         doctor_id = str(current_user["_id"])
         filtered_prescriptions = [
             p for p in result["prescriptions"] 
-            if p["doctor_id"] == doctor_id
+            if p.doctor_id == doctor_id
         ]
         
         return {
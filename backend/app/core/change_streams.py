@@ -0,0 +1,244 @@
+import asyncio
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from pymongo.errors import OperationFailure, PyMongoError
+from app.core.config import settings
+from app.core.database import db
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Collections whose writes invalidate per-worker derived data
+WATCHED_COLLECTIONS = ("users", "appointments", "prescriptions", "medicines")
+
+# Server cannot open change streams at all (standalone mongod, or no
+# $changeStream stage); the consumer polls instead
+CHANGE_STREAMS_UNSUPPORTED_CODES = {40573, 40324}
+# Stored resume token is no longer in the oplog
+RESUME_FAILED_CODES = {280, 286}
+
+@dataclass(frozen=True, slots=True)
+class Change:
+    """A write seen on a watched collection"""
+    collection: str
+    operation: str
+    # None when the whole collection may have changed (drop, rename, resume lost)
+    document_id: Any = None
+    # Top-level and dotted paths set or removed by an update; None when unknown
+    fields: Optional[Tuple[str, ...]] = None
+
+ChangeHandler = Callable[[Change], None]
+
+class ChangeStreamConsumer:
+    """
+    Dispatches writes on WATCHED_COLLECTIONS to local invalidation handlers
+
+    Every worker runs its own consumer, so caches held in one worker see
+    writes made by any other. One database-level change stream covers all
+    watched collections; the server strips update payloads down to the
+    changed field names. The resume token is kept across reconnects and
+    checkpointed to `change_stream_state` every
+    CHANGE_STREAM_CHECKPOINT_SECONDS, so a restarted consumer continues from
+    there. If the token has fallen off the oplog every handler is told to
+    drop everything.
+
+    Where change streams are unavailable (standalone mongod in development)
+    it polls each watched collection on `updated_at` every
+    CHANGE_POLL_INTERVAL_SECONDS. Polling cannot see deletes or documents
+    without `updated_at`; cache TTLs cover those.
+
+    Handlers run inline on the consumer task and must be cheap and
+    non-blocking (dropping cache entries, marking work dirty).
+    """
+
+    def __init__(self):
+        self._handlers: Dict[str, List[ChangeHandler]] = {}
+        self._task: Optional[asyncio.Task] = None
+        self.state_collection = None
+        self.resume_token: Optional[Dict[str, Any]] = None
+        self._checkpointed_at = 0.0
+        self.metrics: Dict[str, Any] = {
+            "mode": None,
+            "changes": 0,
+            "handler_errors": 0,
+            "reconnects": 0,
+            "resume_lost": 0,
+            "last_change_at": None,
+            "last_lag_ms": None,
+            "max_lag_ms": None
+        }
+
+    async def init(self):
+        """Initialize collections"""
+        self.state_collection = db.get_collection("change_stream_state")
+
+    def subscribe(self, collection: str, handler: ChangeHandler) -> ChangeHandler:
+        """Register a handler for writes on a watched collection; idempotent"""
+        if collection not in WATCHED_COLLECTIONS:
+            raise ValueError(f"Collection {collection} is not watched")
+        handlers = self._handlers.setdefault(collection, [])
+        if handler not in handlers:
+            handlers.append(handler)
+        return handler
+
+    def start(self):
+        """Start consuming (only if something subscribed)"""
+        if settings.CHANGE_STREAMS_ENABLED and self._handlers and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop consuming and checkpoint the resume token"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        try:
+            await self._checkpoint(force=True)
+        except Exception as e:
+            logger.warning(f"Failed to checkpoint change stream: {e}")
+
+    @property
+    def _state_id(self) -> str:
+        return f"change_stream:{settings.CHANGE_STREAM_CONSUMER}"
+
+    async def _run(self):
+        state = await self.state_collection.find_one({"_id": self._state_id})
+        self.resume_token = state.get("resume_token") if state else None
+
+        while True:
+            try:
+                self.metrics["mode"] = "change_stream"
+                await self._watch()
+            except asyncio.CancelledError:
+                raise
+            except OperationFailure as e:
+                if e.code in CHANGE_STREAMS_UNSUPPORTED_CODES:
+                    logger.info(f"Change streams unavailable ({e.code}), polling on updated_at instead")
+                    self.metrics["mode"] = "polling"
+                    await self._poll()
+                    return
+                if e.code in RESUME_FAILED_CODES:
+                    # Writes since the token are unknown: drop everything
+                    logger.warning("Change stream resume token expired, invalidating all local caches")
+                    self.metrics["resume_lost"] += 1
+                    self.resume_token = None
+                    for collection in self._handlers:
+                        self._dispatch(Change(collection, "resume_lost"))
+                    continue
+                logger.error(f"Change stream failed: {e}")
+            except PyMongoError as e:
+                logger.error(f"Change stream failed: {e}")
+
+            self.metrics["reconnects"] += 1
+            await asyncio.sleep(settings.CHANGE_STREAM_RETRY_SECONDS)
+
+    async def _watch(self):
+        pipeline = [
+            {"$match": {
+                "ns.coll": {"$in": list(self._handlers)},
+                "operationType": {"$in": ["insert", "update", "replace", "delete", "drop", "rename"]}
+            }},
+            # Field names only: updates of documents with embedded snapshots are large
+            {"$project": {
+                "ns.coll": 1,
+                "operationType": 1,
+                "documentKey": 1,
+                "wallTime": 1,
+                "changed_fields": {"$concatArrays": [
+                    {"$map": {
+                        "input": {"$objectToArray": {"$ifNull": ["$updateDescription.updatedFields", {}]}},
+                        "in": "$$this.k"
+                    }},
+                    {"$ifNull": ["$updateDescription.removedFields", []]}
+                ]}
+            }}
+        ]
+        async with db.database.watch(
+            pipeline,
+            resume_after=self.resume_token,
+            max_await_time_ms=int(settings.CHANGE_STREAM_CHECKPOINT_SECONDS * 1000)
+        ) as stream:
+            while stream.alive:
+                change = await stream.try_next()
+                if change is not None:
+                    operation = change["operationType"]
+                    self._dispatch(
+                        Change(
+                            collection=change["ns"]["coll"],
+                            operation=operation,
+                            document_id=(change.get("documentKey") or {}).get("_id"),
+                            fields=tuple(change["changed_fields"]) if operation == "update" else None
+                        ),
+                        change.get("wallTime")
+                    )
+                # Advances even while idle (post-batch token)
+                self.resume_token = stream.resume_token
+                await self._checkpoint()
+
+    async def _poll(self):
+        # Window overlaps the previous one so writes committed late are not
+        # missed; documents already seen at the same updated_at are skipped
+        overlap = timedelta(seconds=settings.CHANGE_POLL_INTERVAL_SECONDS)
+        since = datetime.utcnow()
+        seen: Dict[str, Dict[Any, datetime]] = {}
+
+        while True:
+            await asyncio.sleep(settings.CHANGE_POLL_INTERVAL_SECONDS)
+            polled_at = datetime.utcnow()
+            for collection in list(self._handlers):
+                try:
+                    documents = await db.get_collection(collection).find(
+                        {"updated_at": {"$gte": since - overlap}}, {"updated_at": 1}
+                    ).to_list(None)
+                except PyMongoError as e:
+                    logger.error(f"Change polling failed for {collection}: {e}")
+                    continue
+
+                previous = seen.get(collection, {})
+                current = {}
+                for document in documents:
+                    current[document["_id"]] = document["updated_at"]
+                    if previous.get(document["_id"]) != document["updated_at"]:
+                        self._dispatch(
+                            Change(collection, "update", document["_id"]),
+                            document["updated_at"]
+                        )
+                seen[collection] = current
+            since = polled_at
+
+    def _dispatch(self, change: Change, changed_at: Optional[datetime] = None) -> None:
+        for handler in self._handlers.get(change.collection, ()):
+            try:
+                handler(change)
+            except Exception as e:
+                self.metrics["handler_errors"] += 1
+                logger.error(f"Change handler {getattr(handler, '__qualname__', handler)} failed: {e}")
+
+        now = datetime.utcnow()
+        self.metrics["changes"] += 1
+        self.metrics["last_change_at"] = now
+        if changed_at is not None:
+            # Write time to invalidation; includes clock skew between hosts
+            lag_ms = round(max((now - changed_at).total_seconds(), 0.0) * 1000, 1)
+            self.metrics["last_lag_ms"] = lag_ms
+            self.metrics["max_lag_ms"] = max(self.metrics["max_lag_ms"] or 0, lag_ms)
+
+    async def _checkpoint(self, force: bool = False) -> None:
+        if self.resume_token is None or self.state_collection is None:
+            return
+        if not force and time.monotonic() - self._checkpointed_at < settings.CHANGE_STREAM_CHECKPOINT_SECONDS:
+            return
+        await self.state_collection.update_one(
+            {"_id": self._state_id},
+            {"$set": {"resume_token": self.resume_token, "updated_at": datetime.utcnow()}},
+            upsert=True
+        )
+        self._checkpointed_at = time.monotonic()
+
+# Global consumer instance
+change_consumer = ChangeStreamConsumer()
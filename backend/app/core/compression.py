@@ -0,0 +1,250 @@
+import gzip
+import hashlib
+import logging
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+
+try:
+    import brotli
+except ImportError:  # Optional dependency
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # Optional dependency
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+# Compression levels for per-request (dynamic) bodies and for cacheable bodies,
+# which are compressed once and then served from the cache
+DYNAMIC_LEVELS = {"br": 4, "zstd": 3, "gzip": 6}
+CACHEABLE_LEVELS = {"br": 9, "zstd": 10, "gzip": 9}
+
+COMPRESSIBLE_TYPES = (
+    "application/json",
+    "application/javascript",
+    "application/xml",
+    "text/",
+)
+
+def _compress_gzip(body: bytes, level: int) -> bytes:
+    return gzip.compress(body, compresslevel=level, mtime=0)
+
+def _compress_br(body: bytes, level: int) -> bytes:
+    return brotli.compress(body, quality=level)
+
+def _compress_zstd(body: bytes, level: int) -> bytes:
+    return zstandard.ZstdCompressor(level=level).compress(body)
+
+def available_encoders() -> Dict[str, Callable[[bytes, int], bytes]]:
+    """Get encoders whose backing library is installed"""
+    encoders = {"gzip": _compress_gzip}
+    if brotli is not None:
+        encoders["br"] = _compress_br
+    if zstandard is not None:
+        encoders["zstd"] = _compress_zstd
+    return encoders
+
+def no_compression(endpoint: Callable) -> Callable:
+    """Mark a route endpoint so its responses are never compressed"""
+    endpoint._skip_compression = True
+    return endpoint
+
+def negotiate_encoding(accept_encoding: str, preferred: List[str]) -> Optional[str]:
+    """Pick the first server-preferred encoding the client accepts"""
+    accepted: Dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        token, _, params = part.strip().partition(";")
+        token = token.strip().lower()
+        if not token:
+            continue
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[token] = quality
+
+    wildcard = accepted.get("*", 0.0)
+    for encoding in preferred:
+        if accepted.get(encoding, wildcard) > 0:
+            return encoding
+    return None
+
+class CompressedBodyCache:
+    """Bounded LRU of compressed bodies keyed by encoding and body digest"""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, bytes], bytes]" = OrderedDict()
+
+    def get(self, encoding: str, digest: bytes) -> Optional[bytes]:
+        key = (encoding, digest)
+        compressed = self._entries.get(key)
+        if compressed is not None:
+            self._entries.move_to_end(key)
+        return compressed
+
+    def put(self, encoding: str, digest: bytes, compressed: bytes) -> None:
+        if self.max_entries <= 0:
+            return
+        self._entries[(encoding, digest)] = compressed
+        self._entries.move_to_end((encoding, digest))
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+class CompressionMiddleware:
+    """
+    Negotiated gzip/brotli/zstd response compression
+
+    - Bodies smaller than `minimum_size` are sent as-is
+    - Streaming responses (more than one body chunk) are passed through
+    - Endpoints decorated with `no_compression` are skipped
+    - Responses with `Cache-Control: public` are compressed once and cached
+    - Bodies larger than `threadpool_min_size` are compressed off the event loop
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = 1024,
+        threadpool_min_size: int = 65536,
+        encodings: Optional[List[str]] = None,
+        cache_max_entries: int = 256,
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.threadpool_min_size = threadpool_min_size
+        self.encoders = available_encoders()
+        self.preferred = [e for e in (encodings or ["br", "zstd", "gzip"]) if e in self.encoders]
+        self.cache = CompressedBodyCache(cache_max_entries)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        # Even responses that stay uncompressed go through the responder,
+        # which marks negotiable ones with Vary for shared caches
+        encoding = negotiate_encoding(
+            Headers(scope=scope).get("accept-encoding", ""), self.preferred
+        )
+        responder = _CompressionResponder(self, scope, send, encoding)
+        await self.app(scope, receive, responder)
+
+    async def compress(self, body: bytes, encoding: str, cacheable: bool) -> bytes:
+        """Compress a body, using the cache for cacheable responses"""
+        digest = None
+        if cacheable:
+            digest = hashlib.sha256(body).digest()
+            cached = self.cache.get(encoding, digest)
+            if cached is not None:
+                return cached
+
+        levels = CACHEABLE_LEVELS if cacheable else DYNAMIC_LEVELS
+        encoder = self.encoders[encoding]
+        if len(body) >= self.threadpool_min_size:
+            compressed = await run_in_threadpool(encoder, body, levels[encoding])
+        else:
+            compressed = encoder(body, levels[encoding])
+
+        if digest is not None:
+            self.cache.put(encoding, digest, compressed)
+        return compressed
+
+class _CompressionResponder:
+    """Send wrapper that buffers the first body chunk and compresses it"""
+
+    def __init__(self, middleware: CompressionMiddleware, scope: Scope, send: Send, encoding: Optional[str]):
+        self.middleware = middleware
+        self.scope = scope
+        self.send = send
+        self.encoding = encoding
+        self.start_message: Optional[Message] = None
+        self.passthrough = False
+
+    async def __call__(self, message: Message) -> None:
+        if self.passthrough:
+            await self.send(message)
+            return
+
+        if message["type"] == "http.response.start":
+            self.start_message = message
+            return
+
+        if message["type"] != "http.response.body":
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        headers = MutableHeaders(raw=self.start_message["headers"])
+        negotiable = self._is_negotiable(headers)
+        if negotiable:
+            # The representation depends on Accept-Encoding whether or not
+            # this particular response ends up compressed
+            headers.add_vary_header("Accept-Encoding")
+
+        if (
+            self.encoding is None
+            or not negotiable
+            or message.get("more_body", False)
+            or len(body) < self.middleware.minimum_size
+        ):
+            self.passthrough = True
+            await self.send(self.start_message)
+            await self.send(message)
+            return
+
+        cache_control = headers.get("cache-control", "").lower()
+        cacheable = "public" in cache_control and "no-store" not in cache_control
+        compressed = await self.middleware.compress(body, self.encoding, cacheable)
+
+        headers["Content-Encoding"] = self.encoding
+        headers["Content-Length"] = str(len(compressed))
+
+        self.passthrough = True
+        await self.send(self.start_message)
+        await self.send({"type": "http.response.body", "body": compressed})
+
+    def _is_negotiable(self, headers: MutableHeaders) -> bool:
+        """Check content type, existing encoding and per-route opt-out"""
+        if "content-encoding" in headers:
+            return False
+
+        content_type = headers.get("content-type", "")
+        if content_type.startswith("text/event-stream"):
+            return False
+        if not content_type.startswith(COMPRESSIBLE_TYPES):
+            return False
+
+        endpoint = self.scope.get("endpoint")
+        if endpoint is not None and getattr(endpoint, "_skip_compression", False):
+            return False
+
+        return True
+
+def setup_compression(app) -> None:
+    """Register the compression middleware from settings"""
+    if not settings.COMPRESSION_ENABLED:
+        return
+
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=settings.COMPRESSION_MINIMUM_SIZE,
+        threadpool_min_size=settings.COMPRESSION_THREADPOOL_MIN_SIZE,
+        encodings=settings.COMPRESSION_ENCODINGS,
+        cache_max_entries=settings.COMPRESSION_CACHE_MAX_ENTRIES,
+    )
+    logger.info(f"Response compression enabled (minimum size: {settings.COMPRESSION_MINIMUM_SIZE} bytes)")
@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from typing import List, Optional
+from typing import Dict, List, Optional
 from functools import lru_cache
 
 class Settings(BaseSettings):
@@ -26,6 +26,14 @@ class Settings(BaseSettings):
     JWT_ALGORITHM: str# = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int# = 30
     REFRESH_TOKEN_EXPIRE_DAYS: int# = 30
+    JWT_BACKEND: str = "jose"  # "jose" or "pyjwt" (faster, requires PyJWT)
+    JWT_KEYS: Dict[str, str] = {}  # kid -> secret, for rotating signing keys
+    JWT_ACTIVE_KID: Optional[str] = None  # Signs new tokens; falls back to JWT_SECRET_KEY
+    JWT_CACHE_MAX_ENTRIES: int = 10000  # Verified-token LRU size, 0 disables
+    
+    # Keys the stored hashes of OTPs and reset tokens; independent of the JWT
+    # keys so rotating those does not invalidate live verification tokens
+    VERIFICATION_TOKEN_KEY: str
     
     # CORS
     CORS_ORIGINS: List[str]# = ["http://localhost:3000"]
@@ -48,11 +56,106 @@ class Settings(BaseSettings):
     DOCS_URL: str# = "/docs"
     REDOC_URL: str# = "/redoc"
     
+    # Phone numbers given without a "+<country code>" prefix belong to this country
+    DEFAULT_COUNTRY_CODE: str = "+963"
+    
     # OTP Settings
     OTP_LENGTH: int = 6
     OTP_EXPIRY_MINUTES: int = 10
     MAX_OTP_ATTEMPTS: int = 3
     
+    # Password Reset
+    PASSWORD_RESET_EXPIRY_MINUTES: int = 30
+    PASSWORD_RESET_URL: str = "http://localhost:3000/reset-password"  # Token is appended as ?token=
+    
+    # Scheduling
+    CLINIC_TIMEZONE: str = "Asia/Damascus"  # Default for doctors without clinic_info.timezone
+    
+    # Response Compression
+    COMPRESSION_ENABLED: bool = True
+    COMPRESSION_MINIMUM_SIZE: int = 1024  # Bytes
+    COMPRESSION_THREADPOOL_MIN_SIZE: int = 65536  # Larger bodies are compressed off the event loop
+    COMPRESSION_ENCODINGS: List[str] = ["br", "zstd", "gzip"]  # Server preference order
+    COMPRESSION_CACHE_MAX_ENTRIES: int = 256
+    
+    # Idempotency-Key support (POST /appointments, POST /prescriptions)
+    IDEMPOTENCY_ENABLED: bool = True
+    IDEMPOTENCY_TTL_SECONDS: int = 86400  # How long completed responses are replayed
+    IDEMPOTENCY_LEASE_SECONDS: int = 60  # In-flight requests older than this are taken over
+    IDEMPOTENCY_WAIT_SECONDS: float = 10.0  # How long a duplicate waits for the first request
+    IDEMPOTENCY_MAX_BODY_BYTES: int = 1048576  # Larger keyed requests get 413; larger responses are not stored
+    
+    # Rate Limiting (requests per minute, per auth endpoint)
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_AUTH_PER_IP: int = 20
+    RATE_LIMIT_AUTH_PER_IDENTIFIER: int = 5
+    RATE_LIMIT_PASSWORD_RESET_PER_HOUR: int = 3  # Reset emails per identifier
+    
+    # Doctor/patient snapshots embedded in appointments and prescriptions
+    USER_SUMMARIES_ENABLED: bool = True
+    SUMMARY_PROPAGATION_BATCH_SIZE: int = 500  # Documents per update_many
+    SUMMARY_PROPAGATION_MAX_PENDING: int = 10000  # Queued users; beyond this changes wait for the backfill
+    
+    # Domain events (in-process bus, optional outbox for at-least-once delivery)
+    EVENT_WORKERS: int = 4
+    EVENT_QUEUE_SIZE: int = 10000
+    EVENT_HANDLER_TIMEOUT_SECONDS: float = 10.0
+    EVENT_DRAIN_SECONDS: float = 5.0  # Shutdown wait for queued events
+    EVENT_OUTBOX_ENABLED: bool = False
+    EVENT_OUTBOX_RETRY_SECONDS: int = 30
+    EVENT_OUTBOX_MAX_ATTEMPTS: int = 10
+    
+    # Change streams (cross-worker invalidation of local caches)
+    CHANGE_STREAMS_ENABLED: bool = True
+    CHANGE_STREAM_CONSUMER: str = "api"  # Resume token is stored under this name
+    CHANGE_STREAM_CHECKPOINT_SECONDS: float = 5.0
+    CHANGE_STREAM_RETRY_SECONDS: float = 2.0
+    CHANGE_POLL_INTERVAL_SECONDS: float = 2.0  # Fallback without a replica set
+    FACETS_CACHE_TTL_SECONDS: int = 300
+    MEDICINE_SEARCH_CACHE_MAX_ENTRIES: int = 1000
+    MEDICINE_SEARCH_CACHE_TTL_SECONDS: int = 600
+    
+    # Live appointment feed (Server-Sent Events)
+    SSE_MAX_CONNECTIONS: int = 2000  # Per worker
+    SSE_HEARTBEAT_SECONDS: float = 15.0
+    SSE_RETRY_MS: int = 3000  # Client reconnect delay
+    SSE_SUBSCRIBER_QUEUE_SIZE: int = 100  # A client this far behind is disconnected
+    SSE_HISTORY_SIZE: int = 50  # Messages kept per doctor for Last-Event-ID resume
+    SSE_HISTORY_DOCTORS: int = 10000
+    
+    # Activity timestamps (write-behind, e.g. last_login)
+    ACTIVITY_FLUSH_INTERVAL_SECONDS: float = 5.0
+    ACTIVITY_BUFFER_MAX_USERS: int = 5000  # Early flush threshold; updates beyond twice this are dropped
+    
+    # Appointment Sweeper (no-show / expiry of stale appointments)
+    SWEEPER_ENABLED: bool = True
+    SWEEPER_INTERVAL_SECONDS: int = 300
+    SWEEPER_JITTER_SECONDS: int = 30
+    SWEEPER_BATCH_SIZE: int = 500
+    SWEEPER_TIME_BUDGET_SECONDS: float = 20.0
+    # Appointments are swept once their clinic-local day has been over this long,
+    # so doctors can still mark the day's visits completed after hours
+    SWEEPER_GRACE_MINUTES: int = 60
+    
+    # Appointment Reminders
+    REMINDERS_ENABLED: bool = True
+    REMINDER_OFFSETS_MINUTES: List[int] = [1440, 120]  # T-24h and T-2h
+    REMINDER_CHANNELS: List[str] = ["email", "sms"]  # email, sms, whatsapp
+    REMINDER_POLL_SECONDS: int = 30
+    REMINDER_BATCH_SIZE: int = 200
+    REMINDER_SEND_CONCURRENCY: int = 20
+    REMINDER_LEASE_SECONDS: int = 300
+    REMINDER_MAX_ATTEMPTS: int = 3
+    REMINDER_RETRY_BASE_SECONDS: int = 60  # failed sends wait base * 2^attempts
+    
+    # Availability Index (precomputed free slots for cross-doctor search)
+    AVAILABILITY_INDEX_ENABLED: bool = True
+    AVAILABILITY_HORIZON_DAYS: int = 14
+    AVAILABILITY_REBUILD_INTERVAL_SECONDS: int = 900  # Rolls the horizon forward, repairs missed refreshes
+    AVAILABILITY_REFRESH_CONCURRENCY: int = 10
+    AVAILABILITY_MAX_PENDING: int = 10000  # Doctors queued for refresh
+    AVAILABILITY_UPCOMING_SLOTS: int = 16  # Next free slot starts kept on the doctor for "available before"
+    
     class Config:
         env_file = ".env"
         case_sensitive = True
@@ -1,10 +1,13 @@
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo.errors import OperationFailure
 from typing import Optional
 import logging
 from app.core.config import settings
 
 logger = logging.getLogger(__name__)
 
+INDEX_NOT_FOUND = 27  # Server error code
+
 class MongoDB:
     """MongoDB connection manager"""
     
@@ -49,25 +52,101 @@ class MongoDB:
         """Create database indexes"""
         # Users collection indexes
         users_collection = self.database.users
-        await users_collection.create_index("email", unique=True, sparse=True)
+        await self._create_unique_user_indexes(users_collection)
         await users_collection.create_index("phone_number", sparse=True)
-        await users_collection.create_index([("phone_number", 1), ("country_code", 1)], sparse=True)
+        await users_collection.create_index("availability.days", sparse=True)
+        await users_collection.create_index("availability.upcoming", sparse=True)
         
         # Verification tokens collection with TTL
         tokens_collection = self.database.verification_tokens
         await tokens_collection.create_index("expires_at", expireAfterSeconds=0)
-        await tokens_collection.create_index("user_id")
-        await tokens_collection.create_index("token")
+        await tokens_collection.create_index([("user_id", 1), ("type", 1), ("token", 1)])
+        # Reset tokens are looked up by hash alone
+        await tokens_collection.create_index(
+            "token", unique=True,
+            partialFilterExpression={"type": "password_reset"}
+        )
+        
+        # Refresh token families (expired tokens are removed by TTL)
+        refresh_tokens_collection = self.database.refresh_tokens
+        await refresh_tokens_collection.create_index("expires_at", expireAfterSeconds=0)
+        await refresh_tokens_collection.create_index("family_id")
         
         # Appointments collection indexes
         appointments_collection = self.database.appointments
-        await appointments_collection.create_index("doctor_id")
-        await appointments_collection.create_index("patient_id")
-        await appointments_collection.create_index("appointment_date")
+        await appointments_collection.create_index([("doctor_id", 1), ("starts_at", 1)])
+        await appointments_collection.create_index([("patient_id", 1), ("starts_at", 1)])
         await appointments_collection.create_index("status")
+        await appointments_collection.create_index([("status", 1), ("ends_at", 1)])
+        
+        # Domain event outbox (delivered events kept for a week)
+        outbox_collection = self.database.event_outbox
+        await outbox_collection.create_index([("status", 1), ("next_attempt_at", 1)])
+        await outbox_collection.create_index("delivered_at", expireAfterSeconds=7 * 24 * 3600)
+        
+        # Prescriptions collection indexes (lists are newest first)
+        prescriptions_collection = self.database.prescriptions
+        await prescriptions_collection.create_index([("doctor_id", 1), ("created_at", -1)])
+        await prescriptions_collection.create_index([("patient_id", 1), ("created_at", -1)])
+        
+        # Schedule exceptions (doctor time off), looked up by overlap with a range
+        exceptions_collection = self.database.schedule_exceptions
+        await exceptions_collection.create_index([("doctor_id", 1), ("ends_at", 1), ("starts_at", 1)])
+        
+        # Doctor availability bitmaps (one per doctor and day, dropped once the day is over)
+        availability_collection = self.database.doctor_availability
+        await availability_collection.create_index([("doctor_id", 1), ("date", 1)], unique=True)
+        await availability_collection.create_index("expires_at", expireAfterSeconds=0)
+        
+        # Idempotency-Key records (replayed responses)
+        idempotency_collection = self.database.idempotency_keys
+        await idempotency_collection.create_index("expires_at", expireAfterSeconds=0)
+        
+        # Appointment reminders (sent reminders are kept for a week)
+        reminders_collection = self.database.reminders_due
+        await reminders_collection.create_index([("appointment_id", 1), ("kind", 1)], unique=True)
+        await reminders_collection.create_index([("status", 1), ("due_at", 1)])
+        await reminders_collection.create_index("claim_id", sparse=True)
+        await reminders_collection.create_index("sent_at", expireAfterSeconds=7 * 24 * 3600)
         
         logger.info("Database indexes created successfully")
     
+    async def _create_unique_user_indexes(self, users_collection):
+        """
+        Unique normalized email and (country_code, phone_number)
+        
+        Partial on the field being a string: users registered without an
+        email or phone store null there, and nulls must not collide. The
+        legacy non-partial email_1 is only dropped once its replacement is
+        built, so a failed build (existing duplicates) keeps it in place.
+        """
+        existing = await users_collection.index_information()
+        legacy = existing.get("email_1")
+        replaced = legacy is not None and "partialFilterExpression" not in legacy
+        
+        try:
+            if legacy is None or replaced:
+                # Own name: the same key can carry a second index with a filter
+                await users_collection.create_index(
+                    "email", unique=True, name="email_unique",
+                    partialFilterExpression={"email": {"$type": "string"}}
+                )
+            if replaced:
+                await users_collection.drop_index("email_1")
+        except OperationFailure as e:
+            if e.code != INDEX_NOT_FOUND:
+                # Existing duplicates; see app.migrations.normalize_user_contacts
+                logger.error(f"Failed to create unique email index: {e}")
+            # Otherwise another worker starting up dropped email_1 first
+        
+        try:
+            await users_collection.create_index(
+                [("country_code", 1), ("phone_number", 1)], unique=True,
+                partialFilterExpression={"phone_number": {"$type": "string"}}
+            )
+        except OperationFailure as e:
+            logger.error(f"Failed to create unique phone index: {e}")
+    
     def get_collection(self, name: str):
         """Get a collection from the database"""
         if self.database is None:
@@ -0,0 +1,257 @@
+import asyncio
+import inspect
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Type, Union
+from bson import ObjectId
+from pymongo import ReturnDocument
+from app.core.config import settings
+from app.core.database import db
+from app.domain.events import DomainEvent, event_to_document, event_from_document, ordering_key
+import logging
+
+logger = logging.getLogger(__name__)
+
+Handler = Callable[[Any], Union[None, Awaitable[None]]]
+
+class EventBus:
+    """
+    In-process async event bus for derived views (availability, snapshots, caches)
+
+    Services publish typed events after their writes; subscribers run on a
+    fixed pool of EVENT_WORKERS tasks, so a burst of writes never spawns
+    unbounded work and publishing never waits on a subscriber. Each worker
+    has its own queue (EVENT_QUEUE_SIZE split between them) and events go
+    to the queue picked by their ordering key (the doctor or user), so the
+    events of one party are handled one at a time, in publish order, while
+    other parties proceed in parallel. A burst for one party fills only its
+    queue. Handlers must be idempotent.
+
+    With EVENT_OUTBOX_ENABLED every event is also written to the
+    `event_outbox` collection before it is queued and marked delivered once
+    all its handlers succeeded. Events left pending (worker crashed, handler
+    failed, queue full) are claimed and re-dispatched by any worker after
+    EVENT_OUTBOX_RETRY_SECONDS, giving at-least-once delivery across
+    restarts. The outbox write follows the domain write rather than sharing
+    a transaction with it (that needs a replica set), so a crash between
+    the two can still lose an event; derived views have periodic rebuilds
+    for that case.
+    """
+
+    def __init__(self):
+        self._handlers: Dict[Type[DomainEvent], List[Handler]] = defaultdict(list)
+        self._queues: List[asyncio.Queue] = []
+        self._workers: List[asyncio.Task] = []
+        self._relay_task: Optional[asyncio.Task] = None
+        self.outbox_collection = None
+        self.metrics: Dict[str, Any] = {
+            "published": 0,
+            "delivered": 0,
+            "handler_errors": 0,
+            "dropped": 0,
+            "queue_depth": 0,
+            "redelivered": 0,
+            "outbox_failed": 0
+        }
+
+    async def init(self):
+        """Initialize collections"""
+        self.outbox_collection = db.get_collection("event_outbox")
+
+    def subscribe(self, event_type: Type[DomainEvent], handler: Optional[Handler] = None):
+        """
+        Register a handler (sync or async) for an event type; usable as a decorator
+
+        Registering the same handler twice is a no-op, so services can
+        subscribe from init().
+        """
+        if handler is None:
+            return lambda func: self.subscribe(event_type, func)
+
+        if handler not in self._handlers[event_type]:
+            self._handlers[event_type].append(handler)
+        return handler
+
+    def start(self):
+        """Start the subscriber workers and, with the outbox, the redelivery loop"""
+        if self._queues:
+            return
+
+        shard_size = max(1, settings.EVENT_QUEUE_SIZE // settings.EVENT_WORKERS)
+        self._queues = [asyncio.Queue(maxsize=shard_size) for _ in range(settings.EVENT_WORKERS)]
+        self._workers = [asyncio.create_task(self._work(queue)) for queue in self._queues]
+        if settings.EVENT_OUTBOX_ENABLED:
+            self._relay_task = asyncio.create_task(self._relay())
+
+    async def stop(self):
+        """Let queued events drain (bounded), then stop the workers"""
+        if not self._queues:
+            return
+
+        try:
+            await asyncio.wait_for(
+                asyncio.gather(*(queue.join() for queue in self._queues)),
+                timeout=settings.EVENT_DRAIN_SECONDS
+            )
+        except asyncio.TimeoutError:
+            logger.warning(f"Stopping event bus with {self._queue_depth()} events undelivered")
+
+        for task in [*self._workers, self._relay_task]:
+            if task:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._workers = []
+        self._relay_task = None
+        self._queues = []
+
+    async def publish(self, event: DomainEvent) -> None:
+        """
+        Queue an event for its subscribers
+
+        Returns as soon as the event is queued (and, with the outbox, stored).
+        Events without subscribers are not queued or stored.
+        """
+        if not self._handlers.get(type(event)):
+            return
+        self.metrics["published"] += 1
+
+        outbox_id = None
+        if settings.EVENT_OUTBOX_ENABLED and self.outbox_collection is not None:
+            outbox_id = await self._store(event)
+
+        self._enqueue(event, outbox_id)
+
+    def _enqueue(self, event: DomainEvent, outbox_id: Optional[ObjectId]) -> bool:
+        if not self._queues:
+            # Not started (scripts, shutdown); the outbox copy is redelivered later
+            return False
+        queue = self._queues[hash(ordering_key(event)) % len(self._queues)]
+        try:
+            queue.put_nowait((event, outbox_id))
+        except asyncio.QueueFull:
+            self.metrics["dropped"] += 1
+            logger.warning(f"Event queue full, dropped {type(event).__name__}")
+            return False
+        self.metrics["queue_depth"] = self._queue_depth()
+        return True
+
+    def _queue_depth(self) -> int:
+        return sum(queue.qsize() for queue in self._queues)
+
+    async def _work(self, queue: asyncio.Queue):
+        while True:
+            event, outbox_id = await queue.get()
+            try:
+                delivered = await self._dispatch(event)
+                if outbox_id is not None:
+                    await self._settle(outbox_id, delivered)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Event delivery failed for {type(event).__name__}: {e}")
+            finally:
+                queue.task_done()
+                self.metrics["queue_depth"] = self._queue_depth()
+
+    async def _dispatch(self, event: DomainEvent) -> bool:
+        """Run every handler of the event; returns whether all succeeded"""
+        delivered = True
+        for handler in self._handlers.get(type(event), ()):
+            try:
+                result = handler(event)
+                if inspect.isawaitable(result):
+                    await asyncio.wait_for(result, timeout=settings.EVENT_HANDLER_TIMEOUT_SECONDS)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                delivered = False
+                self.metrics["handler_errors"] += 1
+                logger.error(f"Handler {getattr(handler, '__qualname__', handler)} failed for {type(event).__name__}: {e}")
+
+        if delivered:
+            self.metrics["delivered"] += 1
+        return delivered
+
+    async def _store(self, event: DomainEvent) -> Optional[ObjectId]:
+        now = datetime.utcnow()
+        document = {
+            **event_to_document(event),
+            "status": "pending",
+            "attempts": 1,
+            "created_at": now,
+            # Left to the live dispatch until then
+            "next_attempt_at": now + timedelta(seconds=settings.EVENT_OUTBOX_RETRY_SECONDS)
+        }
+        try:
+            result = await self.outbox_collection.insert_one(document)
+            return result.inserted_id
+        except Exception as e:
+            # Still delivered in-process, just without the durable copy
+            self.metrics["outbox_failed"] += 1
+            logger.error(f"Failed to store {type(event).__name__} in the outbox: {e}")
+            return None
+
+    async def _settle(self, outbox_id: ObjectId, delivered: bool) -> None:
+        if delivered:
+            await self.outbox_collection.update_one(
+                {"_id": outbox_id},
+                {"$set": {"status": "delivered", "delivered_at": datetime.utcnow()}}
+            )
+        # Otherwise it stays pending and is retried once next_attempt_at passes
+
+    async def _relay(self):
+        """Redeliver outbox events whose live delivery did not complete"""
+        while True:
+            try:
+                await self.redeliver_pending()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Outbox redelivery failed: {e}")
+            await asyncio.sleep(settings.EVENT_OUTBOX_RETRY_SECONDS)
+
+    async def redeliver_pending(self) -> int:
+        """Claim due pending events (one worker per event) and queue them; returns how many"""
+        queued = 0
+        # Events claimed by this pass are due again after the cutoff, not within it
+        cutoff = datetime.utcnow()
+        # Until every queue is full; an event whose queue is full stays
+        # pending and is claimed again after EVENT_OUTBOX_RETRY_SECONDS
+        while self._queues and not all(queue.full() for queue in self._queues):
+            document = await self.outbox_collection.find_one_and_update(
+                {"status": "pending", "next_attempt_at": {"$lt": cutoff}},
+                {
+                    "$set": {"next_attempt_at": datetime.utcnow() + timedelta(seconds=settings.EVENT_OUTBOX_RETRY_SECONDS)},
+                    "$inc": {"attempts": 1}
+                },
+                return_document=ReturnDocument.AFTER
+            )
+            if document is None:
+                break
+
+            if document["attempts"] > settings.EVENT_OUTBOX_MAX_ATTEMPTS:
+                await self.outbox_collection.update_one(
+                    {"_id": document["_id"]}, {"$set": {"status": "failed"}}
+                )
+                logger.error(f"Giving up on outbox event {document['_id']} ({document['type']})")
+                continue
+
+            try:
+                event = event_from_document(document)
+            except Exception as e:
+                logger.error(f"Unreadable outbox event {document['_id']}: {e}")
+                await self.outbox_collection.update_one(
+                    {"_id": document["_id"]}, {"$set": {"status": "failed"}}
+                )
+                continue
+
+            if self._enqueue(event, document["_id"]):
+                queued += 1
+                self.metrics["redelivered"] += 1
+        return queued
+
+# Global event bus instance
+event_bus = EventBus()
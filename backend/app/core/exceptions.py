@@ -38,19 +38,35 @@ class ConflictException(DomeCareException):
     def __init__(self, message: str = "Resource conflict"):
         super().__init__(message, status_code=409)
 
+class RateLimitException(DomeCareException):
+    """Too many requests"""
+    def __init__(self, message: str = "Too many requests", retry_after: int = 1):
+        self.retry_after = retry_after
+        super().__init__(message, status_code=429)
+
+class ServiceUnavailableException(DomeCareException):
+    """Temporarily out of capacity"""
+    def __init__(self, message: str = "Service temporarily unavailable", retry_after: int = 1):
+        self.retry_after = retry_after
+        super().__init__(message, status_code=503)
+
 def setup_exception_handlers(app: FastAPI):
     """Setup global exception handlers"""
     
     @app.exception_handler(DomeCareException)
     async def domecare_exception_handler(request: Request, exc: DomeCareException):
         logger.error(f"DomeCare exception: {exc.message}")
+        headers = None
+        if isinstance(exc, (RateLimitException, ServiceUnavailableException)):
+            headers = {"Retry-After": str(exc.retry_after)}
         return JSONResponse(
             status_code=exc.status_code,
             content={
                 "success": False,
                 "message": exc.message,
                 "error_type": exc.__class__.__name__
-            }
+            },
+            headers=headers
         )
     
     @app.exception_handler(RequestValidationError)
@@ -0,0 +1,373 @@
+import asyncio
+import base64
+import hashlib
+import json
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from bson import Binary, ObjectId
+from bson.errors import InvalidId
+from pymongo.errors import DuplicateKeyError
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+from app.core.database import db
+from app.core.security import decode_token, is_token_current
+
+logger = logging.getLogger(__name__)
+
+# (method, path without trailing slash) of requests that honour Idempotency-Key
+IDEMPOTENT_ROUTES = {
+    ("POST", "/api/v1/appointments"),
+    ("POST", "/api/v1/prescriptions"),
+}
+
+MAX_KEY_LENGTH = 255
+
+# Response headers kept for replay
+REPLAYED_HEADERS = ("content-type",)
+
+# Client errors replayed for a retried key besides 2xx: request validation,
+# which fails the same way every time. Conflicts (e.g. a slot taken), auth
+# failures and rate limits may go differently on retry, so those run again.
+REPLAYED_CLIENT_ERRORS = frozenset({400, 422})
+
+def is_replayable(status: int) -> bool:
+    """Whether a response is stored and replayed for retries of its key"""
+    return 200 <= status < 300 or status in REPLAYED_CLIENT_ERRORS
+
+class RequestTooLarge(Exception):
+    """Keyed request body over IDEMPOTENCY_MAX_BODY_BYTES"""
+
+class StoredResponse(NamedTuple):
+    status: int
+    headers: List[Tuple[str, str]]
+    body: bytes
+
+class BeginResult(NamedTuple):
+    """Outcome of claiming a key: "new", "in_progress", "completed" or "mismatch" """
+    state: str
+    response: Optional[StoredResponse] = None
+
+class MongoIdempotencyStore:
+    """Records in the `idempotency_keys` collection, expired by a TTL index"""
+
+    @property
+    def collection(self):
+        return db.get_collection("idempotency_keys")
+
+    async def begin(self, key: str, fingerprint: str) -> BeginResult:
+        now = datetime.utcnow()
+        lease_until = now + timedelta(seconds=settings.IDEMPOTENCY_LEASE_SECONDS)
+        try:
+            await self.collection.insert_one({
+                "_id": key,
+                "fingerprint": fingerprint,
+                "status": "in_progress",
+                "lease_until": lease_until,
+                "expires_at": now + timedelta(seconds=settings.IDEMPOTENCY_TTL_SECONDS)
+            })
+            return BeginResult("new")
+        except DuplicateKeyError:
+            pass
+
+        record = await self.collection.find_one({"_id": key})
+        if record is None:
+            # Expired between the insert and the read
+            return await self.begin(key, fingerprint)
+        if record["fingerprint"] != fingerprint:
+            return BeginResult("mismatch")
+        if record["status"] == "completed":
+            return BeginResult("completed", StoredResponse(
+                record["response_status"],
+                [tuple(header) for header in record["response_headers"]],
+                bytes(record["response_body"])
+            ))
+
+        # Take over executions abandoned by a crashed worker
+        taken = await self.collection.find_one_and_update(
+            {"_id": key, "status": "in_progress", "lease_until": {"$lt": now}},
+            {"$set": {"lease_until": lease_until}}
+        )
+        return BeginResult("new" if taken else "in_progress")
+
+    async def complete(self, key: str, fingerprint: str, response: StoredResponse) -> None:
+        await self.collection.update_one(
+            {"_id": key},
+            {"$set": {
+                "status": "completed",
+                "response_status": response.status,
+                "response_headers": [list(header) for header in response.headers],
+                "response_body": Binary(response.body),
+                "completed_at": datetime.utcnow()
+            }}
+        )
+
+    async def release(self, key: str) -> None:
+        await self.collection.delete_one({"_id": key, "status": "in_progress"})
+
+class RedisIdempotencyStore:
+    """Records as JSON strings; in-flight records expire after the lease"""
+
+    def __init__(self, client):
+        self.client = client
+
+    def _key(self, key: str) -> str:
+        return f"idempotency:{key}"
+
+    async def begin(self, key: str, fingerprint: str) -> BeginResult:
+        record = json.dumps({"fingerprint": fingerprint, "status": "in_progress"})
+        if await self.client.set(self._key(key), record, nx=True, ex=settings.IDEMPOTENCY_LEASE_SECONDS):
+            return BeginResult("new")
+
+        raw = await self.client.get(self._key(key))
+        if raw is None:
+            return await self.begin(key, fingerprint)
+
+        existing = json.loads(raw)
+        if existing["fingerprint"] != fingerprint:
+            return BeginResult("mismatch")
+        if existing["status"] == "completed":
+            return BeginResult("completed", StoredResponse(
+                existing["response_status"],
+                [tuple(header) for header in existing["response_headers"]],
+                base64.b64decode(existing["response_body"])
+            ))
+        return BeginResult("in_progress")
+
+    async def complete(self, key: str, fingerprint: str, response: StoredResponse) -> None:
+        await self.client.set(self._key(key), json.dumps({
+            "fingerprint": fingerprint,
+            "status": "completed",
+            "response_status": response.status,
+            "response_headers": response.headers,
+            "response_body": base64.b64encode(response.body).decode()
+        }), ex=settings.IDEMPOTENCY_TTL_SECONDS)
+
+    async def release(self, key: str) -> None:
+        await self.client.delete(self._key(key))
+
+class IdempotencyStore:
+    """Idempotency records with a swappable Mongo or Redis backend"""
+
+    def __init__(self):
+        self.backend = MongoIdempotencyStore()
+        # In-process completion signals, so same-worker duplicates need not poll
+        self._local: Dict[str, asyncio.Event] = {}
+
+    def configure(self, redis=None):
+        """Use Redis when available, otherwise MongoDB"""
+        if redis is not None:
+            self.backend = RedisIdempotencyStore(redis)
+            logger.info("Idempotency store using Redis backend")
+        else:
+            self.backend = MongoIdempotencyStore()
+            logger.info("Idempotency store using MongoDB backend")
+
+    async def begin(self, key: str, fingerprint: str) -> BeginResult:
+        result = await self.backend.begin(key, fingerprint)
+        if result.state == "new":
+            self._local[key] = asyncio.Event()
+        return result
+
+    async def finish(self, key: str, fingerprint: str, response: Optional[StoredResponse]) -> None:
+        """Store the response, or release the key so a retry runs again"""
+        try:
+            if response is not None:
+                await self.backend.complete(key, fingerprint, response)
+            else:
+                await self.backend.release(key)
+        finally:
+            event = self._local.pop(key, None)
+            if event:
+                event.set()
+
+    async def wait(self, key: str, fingerprint: str) -> BeginResult:
+        """Wait for an in-flight execution of the same request to finish"""
+        deadline = time.monotonic() + settings.IDEMPOTENCY_WAIT_SECONDS
+        delay = 0.05
+        while True:
+            event = self._local.get(key)
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return BeginResult("in_progress")
+
+            if event is not None:
+                try:
+                    await asyncio.wait_for(event.wait(), timeout=remaining)
+                except asyncio.TimeoutError:
+                    return BeginResult("in_progress")
+            else:
+                # Running on another worker: poll with backoff
+                await asyncio.sleep(min(delay, remaining))
+                delay = min(delay * 2, 0.5)
+
+            result = await self.begin(key, fingerprint)
+            if result.state != "in_progress":
+                return result
+
+async def _principal(authorization: Optional[str]) -> Optional[str]:
+    """
+    User id of a current bearer token (keys are scoped per user)
+
+    Applies the same revocation check as get_current_user, so a token
+    revoked by "log out everywhere" cannot replay stored responses.
+    """
+    if not authorization or not authorization.lower().startswith("bearer "):
+        return None
+    payload = decode_token(authorization[7:])
+    if not payload or payload.get("type") != "access":
+        return None
+    try:
+        user_id = ObjectId(payload.get("sub"))
+    except (InvalidId, TypeError):
+        return None
+    user = await db.get_collection("users").find_one({"_id": user_id}, {"token_version": 1})
+    if not user or not is_token_current(payload, user):
+        return None
+    return str(user_id)
+
+class IdempotencyMiddleware:
+    """
+    Idempotency-Key handling for the routes in IDEMPOTENT_ROUTES
+
+    The first request with a key runs normally and its response is stored;
+    retries with the same key and body get the stored response replayed
+    without reaching the endpoint. A retry arriving while the first is still
+    running waits for it. Only 2xx and validation errors are stored (see
+    REPLAYED_CLIENT_ERRORS); retries of anything else run again. Requests
+    without a key, or without a current access token, pass through.
+    """
+
+    def __init__(self, app: ASGIApp, store: "IdempotencyStore"):
+        self.app = app
+        self.store = store
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or (scope["method"], scope["path"].rstrip("/")) not in IDEMPOTENT_ROUTES:
+            await self.app(scope, receive, send)
+            return
+
+        headers = Headers(scope=scope)
+        idempotency_key = headers.get("idempotency-key")
+        principal = await _principal(headers.get("authorization")) if idempotency_key else None
+        if principal is None:
+            await self.app(scope, receive, send)
+            return
+
+        if len(idempotency_key) > MAX_KEY_LENGTH:
+            await self._send_error(send, 400, f"Idempotency-Key must be at most {MAX_KEY_LENGTH} characters")
+            return
+
+        try:
+            body = await self._read_body(headers, receive)
+        except RequestTooLarge:
+            await self._send_error(send, 413, "Request body too large")
+            return
+        key = hashlib.sha256(f"{principal}:{idempotency_key}".encode()).hexdigest()
+        fingerprint = hashlib.sha256(
+            scope["method"].encode() + b" " + scope["path"].rstrip("/").encode() + b"\n" + body
+        ).hexdigest()
+
+        try:
+            result = await self.store.begin(key, fingerprint)
+            if result.state == "in_progress":
+                result = await self.store.wait(key, fingerprint)
+        except Exception as e:
+            # Fail open: run the request as if no key was sent
+            logger.error(f"Idempotency store error: {e}")
+            await self.app(scope, self._replay_receive(body), send)
+            return
+
+        if result.state == "mismatch":
+            await self._send_error(send, 422, "Idempotency-Key was already used for a different request")
+        elif result.state == "in_progress":
+            await self._send_error(send, 409, "A request with this Idempotency-Key is still being processed")
+        elif result.state == "completed":
+            await self._replay(send, result.response)
+        else:
+            await self._execute(scope, body, send, key, fingerprint)
+
+    def _replay_receive(self, body: bytes) -> Receive:
+        async def receive() -> Message:
+            return {"type": "http.request", "body": body, "more_body": False}
+        return receive
+
+    async def _execute(self, scope: Scope, body: bytes, send: Send, key: str, fingerprint: str) -> None:
+        status = 500
+        response_headers: List[Tuple[str, str]] = []
+        chunks: List[bytes] = []
+
+        async def capture_send(message: Message) -> None:
+            nonlocal status, response_headers
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                response_headers = [
+                    (name.decode("latin-1"), value.decode("latin-1"))
+                    for name, value in message.get("headers", [])
+                    if name.decode("latin-1").lower() in REPLAYED_HEADERS
+                ]
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+            await send(message)
+
+        stored = None
+        try:
+            await self.app(scope, self._replay_receive(body), capture_send)
+            response_body = b"".join(chunks)
+            if is_replayable(status) and len(response_body) <= settings.IDEMPOTENCY_MAX_BODY_BYTES:
+                stored = StoredResponse(status, response_headers, response_body)
+        finally:
+            try:
+                await self.store.finish(key, fingerprint, stored)
+            except Exception as e:
+                logger.error(f"Failed to record idempotent response: {e}")
+
+    async def _replay(self, send: Send, response: StoredResponse) -> None:
+        headers = [(name.encode("latin-1"), value.encode("latin-1")) for name, value in response.headers]
+        headers.append((b"content-length", str(len(response.body)).encode()))
+        headers.append((b"idempotent-replayed", b"true"))
+        await send({"type": "http.response.start", "status": response.status, "headers": headers})
+        await send({"type": "http.response.body", "body": response.body})
+
+    async def _read_body(self, headers: Headers, receive: Receive) -> bytes:
+        """Buffer the request body (it is hashed and replayed), up to the cap"""
+        limit = settings.IDEMPOTENCY_MAX_BODY_BYTES
+        content_length = headers.get("content-length", "")
+        if content_length.isdigit() and int(content_length) > limit:
+            raise RequestTooLarge()
+
+        chunks = []
+        size = 0
+        while True:
+            message = await receive()
+            chunk = message.get("body", b"")
+            size += len(chunk)
+            if size > limit:
+                raise RequestTooLarge()
+            chunks.append(chunk)
+            if not message.get("more_body", False):
+                return b"".join(chunks)
+
+    async def _send_error(self, send: Send, status: int, message: str) -> None:
+        body = json.dumps({"success": False, "message": message}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]
+        })
+        await send({"type": "http.response.body", "body": body})
+
+def setup_idempotency(app) -> None:
+    """Register the idempotency middleware from settings"""
+    if not settings.IDEMPOTENCY_ENABLED:
+        return
+
+    app.add_middleware(IdempotencyMiddleware, store=idempotency_store)
+    logger.info("Idempotency-Key support enabled")
+
+# Global idempotency store instance
+idempotency_store = IdempotencyStore()
@@ -0,0 +1,53 @@
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+_MISSING = object()
+
+class LocalCache:
+    """
+    Bounded per-process LRU with a TTL, for read-mostly query results
+
+    Each worker holds its own copy, so entries are dropped through the
+    change-stream consumer when another worker (or this one) writes the
+    underlying documents. The TTL bounds staleness while the consumer is
+    down or when it cannot see a change (deletes while polling).
+    """
+
+    def __init__(self, name: str, max_entries: int, ttl_seconds: float):
+        self.name = name
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Hashable, Tuple[Any, float]]" = OrderedDict()
+        self.metrics: Dict[str, Any] = {"hits": 0, "misses": 0, "invalidations": 0}
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._entries.get(key, _MISSING)
+        if entry is not _MISSING:
+            value, expires_at = entry
+            if expires_at > time.monotonic():
+                self._entries.move_to_end(key)
+                self.metrics["hits"] += 1
+                return value
+            del self._entries[key]
+        self.metrics["misses"] += 1
+        return default
+
+    def put(self, key: Hashable, value: Any) -> None:
+        if self.max_entries <= 0 or self.ttl_seconds <= 0:
+            return
+        self._entries[key] = (value, time.monotonic() + self.ttl_seconds)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, key: Optional[Hashable] = None) -> None:
+        """Drop one entry, or all of them when no key is given"""
+        if key is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(key, None)
+        self.metrics["invalidations"] += 1
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,60 @@
+from datetime import datetime, timedelta
+from uuid import uuid4
+import os
+import socket
+import logging
+from pymongo.errors import DuplicateKeyError
+from app.core.database import db
+
+logger = logging.getLogger(__name__)
+
+class LeaderLock:
+    """
+    Lease-based lock stored in the `locks` collection
+
+    Used so that only one worker runs a background job. The holder renews the
+    lease on every run; if it dies, another worker takes over once the lease
+    expires.
+    """
+
+    def __init__(self, name: str, lease_seconds: int):
+        self.name = name
+        self.lease_seconds = lease_seconds
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid4().hex[:8]}"
+        self.is_leader = False
+
+    async def acquire(self) -> bool:
+        """Acquire or renew the lease; returns whether this worker holds it"""
+        collection = db.get_collection("locks")
+        now = datetime.utcnow()
+
+        try:
+            await collection.find_one_and_update(
+                {
+                    "_id": self.name,
+                    "$or": [{"owner": self.owner}, {"lease_until": {"$lt": now}}]
+                },
+                {"$set": {
+                    "owner": self.owner,
+                    "lease_until": now + timedelta(seconds=self.lease_seconds),
+                    "renewed_at": now
+                }},
+                upsert=True
+            )
+            self.is_leader = True
+        except DuplicateKeyError:
+            # Another worker holds a live lease
+            self.is_leader = False
+
+        return self.is_leader
+
+    async def release(self) -> None:
+        """Give up the lease so another worker can take over immediately"""
+        if not self.is_leader:
+            return
+
+        try:
+            await db.get_collection("locks").delete_one({"_id": self.name, "owner": self.owner})
+        except Exception as e:
+            logger.warning(f"Failed to release lock {self.name}: {e}")
+        self.is_leader = False
@@ -0,0 +1,155 @@
+import hashlib
+import math
+import time
+import logging
+from collections import OrderedDict
+from typing import NamedTuple, Optional, Tuple
+from fastapi import Request
+from app.core.config import settings
+from app.core.exceptions import RateLimitException
+
+logger = logging.getLogger(__name__)
+
+class RateLimit(NamedTuple):
+    """Token bucket: `capacity` requests, refilled evenly over `period` seconds"""
+    capacity: int
+    period: float
+
+    @property
+    def refill_rate(self) -> float:
+        return self.capacity / self.period
+
+class InMemoryRateLimitBackend:
+    """Per-process token buckets with a bounded number of tracked keys"""
+
+    def __init__(self, max_keys: int = 100000):
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+
+    async def consume(self, key: str, limit: RateLimit, cost: int = 1) -> float:
+        """Take `cost` tokens; return 0 if allowed, else seconds until retry"""
+        now = time.monotonic()
+        tokens, updated_at = self._buckets.get(key, (float(limit.capacity), now))
+        tokens = min(limit.capacity, tokens + (now - updated_at) * limit.refill_rate)
+
+        retry_after = 0.0
+        if tokens >= cost:
+            tokens -= cost
+        else:
+            retry_after = (cost - tokens) / limit.refill_rate
+
+        self._buckets[key] = (tokens, now)
+        self._buckets.move_to_end(key)
+        while len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+
+        return retry_after
+
+class RedisRateLimitBackend:
+    """Token buckets shared across workers, updated atomically in a Lua script"""
+
+    SCRIPT = """
+    local capacity = tonumber(ARGV[1])
+    local rate = tonumber(ARGV[2])
+    local now = tonumber(ARGV[3])
+    local cost = tonumber(ARGV[4])
+    local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+    local tokens = tonumber(state[1]) or capacity
+    local ts = tonumber(state[2]) or now
+    tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+    local retry_after = 0
+    if tokens >= cost then
+        tokens = tokens - cost
+    else
+        retry_after = (cost - tokens) / rate
+    end
+    redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+    redis.call('PEXPIRE', KEYS[1], math.ceil(capacity / rate * 1000))
+    return tostring(retry_after)
+    """
+
+    def __init__(self, client):
+        self.client = client
+        self._script = client.register_script(self.SCRIPT)
+
+    async def consume(self, key: str, limit: RateLimit, cost: int = 1) -> float:
+        """Take `cost` tokens; return 0 if allowed, else seconds until retry"""
+        result = await self._script(
+            keys=[f"ratelimit:{key}"],
+            args=[limit.capacity, limit.refill_rate, time.time(), cost]
+        )
+        return float(result)
+
+class RateLimiter:
+    """Rate limiter with a swappable in-process or Redis backend"""
+
+    def __init__(self):
+        self.backend = InMemoryRateLimitBackend()
+
+    def configure(self, redis=None):
+        """Use Redis when available so limits hold across workers"""
+        if redis is not None:
+            self.backend = RedisRateLimitBackend(redis)
+            logger.info("Rate limiter using Redis backend")
+        else:
+            self.backend = InMemoryRateLimitBackend()
+            logger.info("Rate limiter using in-process backend")
+
+    async def hit(self, key: str, limit: RateLimit, cost: int = 1) -> None:
+        """Consume from a bucket, raising RateLimitException when empty"""
+        if not settings.RATE_LIMIT_ENABLED:
+            return
+
+        try:
+            retry_after = await self.backend.consume(key, limit, cost)
+        except Exception as e:
+            # Fail open: a broken limiter must not take auth down with it
+            logger.error(f"Rate limiter backend error: {e}")
+            return
+
+        if retry_after > 0:
+            raise RateLimitException(
+                "Too many attempts, please try again later",
+                retry_after=max(1, math.ceil(retry_after))
+            )
+
+def _client_ip(request: Request) -> str:
+    return request.client.host if request.client else "unknown"
+
+def _identifier_key(identifier: str) -> str:
+    # Hash so raw emails/phone numbers are not used as cache keys
+    normalized = identifier.strip().lower()
+    return hashlib.sha256(normalized.encode()).hexdigest()[:32]
+
+async def enforce_auth_rate_limit(action: str, request: Request, identifier: Optional[str] = None) -> None:
+    """
+    Throttle an auth action per client IP and, when given, per identifier
+
+    Runs before any user lookup or password hashing so that rejected
+    requests cost only a bucket update.
+    """
+    await rate_limiter.hit(
+        f"{action}:ip:{_client_ip(request)}",
+        RateLimit(settings.RATE_LIMIT_AUTH_PER_IP, 60)
+    )
+    if identifier:
+        await rate_limiter.hit(
+            f"{action}:id:{_identifier_key(identifier)}",
+            RateLimit(settings.RATE_LIMIT_AUTH_PER_IDENTIFIER, 60)
+        )
+
+async def enforce_password_reset_rate_limit(request: Request, identifier: str) -> None:
+    """
+    Throttle reset requests: the auth limits plus an hourly cap per identifier
+
+    Each accepted request sends an email, so the identifier bucket refills
+    over an hour rather than a minute.
+    """
+    await enforce_auth_rate_limit("forgot-password", request, identifier)
+    await rate_limiter.hit(
+        f"forgot-password:hour:{_identifier_key(identifier)}",
+        RateLimit(settings.RATE_LIMIT_PASSWORD_RESET_PER_HOUR, 3600)
+    )
+
+# Global rate limiter instance
+rate_limiter = RateLimiter()
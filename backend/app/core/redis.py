@@ -0,0 +1,53 @@
+from typing import Optional
+import logging
+from app.core.config import settings
+
+try:
+    from redis import asyncio as aioredis
+except ImportError:  # Optional dependency
+    aioredis = None
+
+logger = logging.getLogger(__name__)
+
+class RedisClient:
+    """Optional Redis connection manager
+
+    Redis-backed features fall back to in-process backends when REDIS_URL is
+    empty or the server is unreachable.
+    """
+
+    def __init__(self):
+        self.client = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.client is not None
+
+    async def connect(self):
+        """Connect to Redis if configured"""
+        if not settings.REDIS_URL or aioredis is None:
+            logger.info("Redis not configured, using in-process backends")
+            return
+
+        try:
+            client = aioredis.from_url(
+                settings.REDIS_URL,
+                decode_responses=True,
+                socket_connect_timeout=2
+            )
+            await client.ping()
+            self.client = client
+            logger.info("Successfully connected to Redis")
+        except Exception as e:
+            logger.warning(f"Redis unavailable, using in-process backends: {e}")
+            self.client = None
+
+    async def disconnect(self):
+        """Disconnect from Redis"""
+        if self.client:
+            await self.client.close()
+            self.client = None
+            logger.info("Disconnected from Redis")
+
+# Global Redis instance
+redis_client = RedisClient()
@@ -1,8 +1,10 @@
 from datetime import datetime, timedelta
+import hashlib
+import hmac
 from typing import Optional, Union, Dict, Any
-from jose import JWTError, jwt
 from passlib.context import CryptContext
 from app.core.config import settings
+from app.core.token_verifier import token_verifier, InvalidTokenError
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
@@ -24,7 +26,7 @@ def create_access_token(data: Dict[str, Any], expires_delta: Optional[timedelta]
         expire = datetime.utcnow() + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     
     to_encode.update({"exp": expire, "type": "access"})
-    encoded_jwt = jwt.encode(to_encode, settings.JWT_SECRET_KEY, algorithm=settings.JWT_ALGORITHM)
+    encoded_jwt = token_verifier.encode(to_encode)
     return encoded_jwt
 
 def create_refresh_token(data: Dict[str, Any]) -> str:
@@ -32,17 +34,21 @@ def create_refresh_token(data: Dict[str, Any]) -> str:
     to_encode = data.copy()
     expire = datetime.utcnow() + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
     to_encode.update({"exp": expire, "type": "refresh"})
-    encoded_jwt = jwt.encode(to_encode, settings.JWT_SECRET_KEY, algorithm=settings.JWT_ALGORITHM)
+    encoded_jwt = token_verifier.encode(to_encode)
     return encoded_jwt
 
 def decode_token(token: str) -> Optional[Dict[str, Any]]:
     """Decode a JWT token"""
     try:
-        payload = jwt.decode(token, settings.JWT_SECRET_KEY, algorithms=[settings.JWT_ALGORITHM])
+        payload = token_verifier.decode(token)
         return payload
-    except JWTError:
+    except InvalidTokenError:
         return None
 
+def is_token_current(payload: Dict[str, Any], user: Dict[str, Any]) -> bool:
+    """Check the token was issued after the user's last "revoke all" """
+    return payload.get("ver", 0) == user.get("token_version", 0)
+
 def generate_otp() -> str:
     """Generate OTP code"""
     if settings.USE_MOCK_SERVICES:
@@ -53,6 +59,12 @@ def generate_otp() -> str:
         import random
         return ''.join([str(random.randint(0, 9)) for _ in range(settings.OTP_LENGTH)])
 
+def hash_verification_token(token: str) -> str:
+    """Keyed hash for storing OTPs and other verification tokens"""
+    return hmac.new(
+        settings.VERIFICATION_TOKEN_KEY.encode(), token.encode(), hashlib.sha256
+    ).hexdigest()
+
 def is_strong_password(password: str) -> bool:
     """Check if password meets strength requirements"""
     if len(password) < 8:
@@ -0,0 +1,45 @@
+from datetime import datetime, date, time, timedelta
+from typing import Any, Dict, Optional, Tuple, Union
+import pytz
+from app.core.config import settings
+
+def clinic_timezone_name(doctor: Optional[Dict[str, Any]] = None) -> str:
+    """Timezone of a doctor's clinic, defaulting to CLINIC_TIMEZONE"""
+    if doctor and doctor.get("clinic_info") and doctor["clinic_info"].get("timezone"):
+        return doctor["clinic_info"]["timezone"]
+    return settings.CLINIC_TIMEZONE
+
+def local_to_utc(day: date, clock: Union[str, time], tz_name: str) -> datetime:
+    """Convert a clinic-local date and "HH:MM" time to a naive UTC datetime"""
+    if isinstance(clock, str):
+        clock = datetime.strptime(clock, "%H:%M").time()
+    local = pytz.timezone(tz_name).localize(datetime.combine(day, clock))
+    return local.astimezone(pytz.utc).replace(tzinfo=None)
+
+def to_utc(moment: datetime, tz_name: Optional[str] = None) -> datetime:
+    """Naive UTC for an aware datetime, or a naive one in clinic time"""
+    if moment.tzinfo is None:
+        moment = pytz.timezone(tz_name or settings.CLINIC_TIMEZONE).localize(moment)
+    return moment.astimezone(pytz.utc).replace(tzinfo=None)
+
+def utc_to_local(moment: datetime, tz_name: str) -> datetime:
+    """Convert a naive UTC datetime to an aware clinic-local datetime"""
+    return pytz.utc.localize(moment).astimezone(pytz.timezone(tz_name))
+
+def day_bounds_utc(start_day: date, end_day: Optional[date] = None,
+                   tz_name: Optional[str] = None) -> Tuple[datetime, datetime]:
+    """UTC [start, end) covering whole clinic-local days from start_day to end_day"""
+    tz_name = tz_name or settings.CLINIC_TIMEZONE
+    end_day = end_day or start_day
+    return (
+        local_to_utc(start_day, time.min, tz_name),
+        local_to_utc(end_day + timedelta(days=1), time.min, tz_name)
+    )
+
+def local_today(tz_name: Optional[str] = None) -> date:
+    """Current date in a clinic timezone"""
+    return datetime.now(pytz.timezone(tz_name or settings.CLINIC_TIMEZONE)).date()
+
+def date_to_datetime(day: date) -> datetime:
+    """Midnight datetime for a date (BSON has no bare date type)"""
+    return datetime.combine(day, time.min)
@@ -0,0 +1,127 @@
+import hashlib
+import time
+import logging
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+from jose import JWTError, jwt as jose_jwt
+from app.core.config import settings
+
+try:
+    import jwt as pyjwt
+except ImportError:  # Optional dependency
+    pyjwt = None
+
+logger = logging.getLogger(__name__)
+
+class InvalidTokenError(Exception):
+    """Token failed signature, expiry or key checks"""
+
+class JoseBackend:
+    """python-jose (pure Python)"""
+    name = "jose"
+
+    def encode(self, claims: Dict[str, Any], key: str, algorithm: str, headers: Optional[Dict[str, Any]]) -> str:
+        return jose_jwt.encode(claims, key, algorithm=algorithm, headers=headers)
+
+    def decode(self, token: str, key: str, algorithm: str) -> Dict[str, Any]:
+        try:
+            return jose_jwt.decode(token, key, algorithms=[algorithm])
+        except JWTError as e:
+            raise InvalidTokenError(str(e))
+
+    def get_unverified_header(self, token: str) -> Dict[str, Any]:
+        try:
+            return jose_jwt.get_unverified_header(token)
+        except JWTError as e:
+            raise InvalidTokenError(str(e))
+
+class PyJWTBackend:
+    """PyJWT, noticeably faster than python-jose for HMAC tokens"""
+    name = "pyjwt"
+
+    def encode(self, claims: Dict[str, Any], key: str, algorithm: str, headers: Optional[Dict[str, Any]]) -> str:
+        return pyjwt.encode(claims, key, algorithm=algorithm, headers=headers)
+
+    def decode(self, token: str, key: str, algorithm: str) -> Dict[str, Any]:
+        try:
+            return pyjwt.decode(token, key, algorithms=[algorithm])
+        except pyjwt.PyJWTError as e:
+            raise InvalidTokenError(str(e))
+
+    def get_unverified_header(self, token: str) -> Dict[str, Any]:
+        try:
+            return pyjwt.get_unverified_header(token)
+        except pyjwt.PyJWTError as e:
+            raise InvalidTokenError(str(e))
+
+def _select_backend():
+    if settings.JWT_BACKEND == "pyjwt":
+        if pyjwt is not None:
+            return PyJWTBackend()
+        logger.warning("JWT_BACKEND=pyjwt but PyJWT is not installed, falling back to python-jose")
+    return JoseBackend()
+
+class TokenVerifier:
+    """
+    JWT signing and verification
+
+    - Keys are looked up by the `kid` header, so JWT_KEYS can hold old and new
+      secrets during a rotation; tokens without `kid` use JWT_SECRET_KEY
+    - Verified claims are kept in a bounded LRU keyed by the token digest
+      until the token expires, so repeated requests skip signature checks
+    """
+
+    def __init__(self, max_entries: int = 10000):
+        self.backend = _select_backend()
+        self.max_entries = max_entries
+        self._cache: "OrderedDict[bytes, Tuple[Dict[str, Any], float]]" = OrderedDict()
+
+    def _signing_key(self) -> Tuple[Optional[str], str]:
+        kid = settings.JWT_ACTIVE_KID
+        if kid and kid in settings.JWT_KEYS:
+            return kid, settings.JWT_KEYS[kid]
+        return None, settings.JWT_SECRET_KEY
+
+    def _verification_key(self, token: str) -> str:
+        kid = self.backend.get_unverified_header(token).get("kid")
+        if kid is None:
+            return settings.JWT_SECRET_KEY
+        if kid not in settings.JWT_KEYS:
+            raise InvalidTokenError(f"Unknown key id: {kid}")
+        return settings.JWT_KEYS[kid]
+
+    def encode(self, claims: Dict[str, Any]) -> str:
+        """Sign claims with the active key"""
+        kid, key = self._signing_key()
+        headers = {"kid": kid} if kid else None
+        return self.backend.encode(claims, key, settings.JWT_ALGORITHM, headers)
+
+    def decode(self, token: str) -> Dict[str, Any]:
+        """Verify a token, serving repeat presentations from the cache"""
+        digest = hashlib.sha256(token.encode()).digest()
+        now = time.time()
+
+        cached = self._cache.get(digest)
+        if cached is not None:
+            claims, expires_at = cached
+            if expires_at > now:
+                self._cache.move_to_end(digest)
+                return dict(claims)
+            del self._cache[digest]
+
+        claims = self.backend.decode(token, self._verification_key(token), settings.JWT_ALGORITHM)
+
+        expires_at = claims.get("exp")
+        if isinstance(expires_at, (int, float)) and self.max_entries > 0:
+            self._cache[digest] = (claims, float(expires_at))
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+
+        return dict(claims)
+
+    def clear(self) -> None:
+        """Drop all cached claims (e.g. after removing a key from JWT_KEYS)"""
+        self._cache.clear()
+
+# Global token verifier instance
+token_verifier = TokenVerifier(max_entries=settings.JWT_CACHE_MAX_ENTRIES)
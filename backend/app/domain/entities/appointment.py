@@ -1,8 +1,10 @@
-from typing import Optional, List
+from typing import Optional, List, Dict, Set
 from datetime import datetime, date, time
 from enum import Enum
-from pydantic import BaseModel, Field, validator
-from bson import ObjectId
+from pydantic import BaseModel, Field, field_validator
+from pydantic.dataclasses import dataclass
+from app.domain.entities.base import MongoModel, PyObjectId, ObjectIdStr, StoredDate, ENTITY_CONFIG, READ_MODEL_CONFIG
+from app.domain.entities.user import UserSummary
 
 class AppointmentStatus(str, Enum):
     PENDING = "pending"
@@ -11,6 +13,30 @@ class AppointmentStatus(str, Enum):
     COMPLETED = "completed"
     NO_SHOW = "no_show"
 
+# Allowed status transitions (current status -> possible next statuses)
+APPOINTMENT_TRANSITIONS: Dict[AppointmentStatus, Set[AppointmentStatus]] = {
+    AppointmentStatus.PENDING: {
+        AppointmentStatus.CONFIRMED,
+        AppointmentStatus.CANCELLED,
+        AppointmentStatus.NO_SHOW,
+    },
+    AppointmentStatus.CONFIRMED: {
+        AppointmentStatus.COMPLETED,
+        AppointmentStatus.CANCELLED,
+        AppointmentStatus.NO_SHOW,
+    },
+    AppointmentStatus.CANCELLED: set(),
+    AppointmentStatus.COMPLETED: set(),
+    AppointmentStatus.NO_SHOW: set(),
+}
+
+def statuses_allowed_before(target: AppointmentStatus) -> List[AppointmentStatus]:
+    """Statuses from which an appointment may move to `target`"""
+    return [
+        current for current, targets in APPOINTMENT_TRANSITIONS.items()
+        if target in targets
+    ]
+
 class AppointmentType(str, Enum):
     CONSULTATION = "consultation"
     FOLLOW_UP = "follow_up"
@@ -22,7 +48,8 @@ class TimeSlot(BaseModel):
     start_time: str  # Format: "09:00"
     end_time: str    # Format: "09:30"
     
-    @validator('start_time', 'end_time')
+    @field_validator('start_time', 'end_time')
+    @classmethod
     def validate_time_format(cls, v):
         try:
             datetime.strptime(v, "%H:%M")
@@ -30,13 +57,19 @@ class TimeSlot(BaseModel):
         except ValueError:
             raise ValueError("Time must be in HH:MM format")
 
-class Appointment(BaseModel):
+class Appointment(MongoModel):
     """Appointment entity"""
-    id: Optional[ObjectId] = Field(alias="_id", default=None)
-    doctor_id: ObjectId
-    patient_id: ObjectId
-    appointment_date: date
+    id: Optional[PyObjectId] = Field(alias="_id", default=None)
+    doctor_id: PyObjectId
+    patient_id: PyObjectId
+    appointment_date: StoredDate
     time_slot: TimeSlot
+    
+    # Absolute slot times (naive UTC) and the clinic timezone they were resolved in
+    starts_at: Optional[datetime] = None
+    ends_at: Optional[datetime] = None
+    timezone: Optional[str] = None
+    
     status: AppointmentStatus = AppointmentStatus.PENDING
     appointment_type: AppointmentType = AppointmentType.CONSULTATION
     reason: Optional[str] = Field(None, max_length=500)
@@ -54,14 +87,11 @@ class Appointment(BaseModel):
     
     # Cancellation
     cancelled_at: Optional[datetime] = None
-    cancelled_by: Optional[ObjectId] = None  # User who cancelled
+    cancelled_by: Optional[PyObjectId] = None  # User who cancelled
     cancellation_reason: Optional[str] = None
     
-    class Config:
-        allow_population_by_field_name = True
-        arbitrary_types_allowed = True
-        json_encoders = {ObjectId: str}
-        schema_extra = {
+    model_config = ENTITY_CONFIG | {
+        "json_schema_extra": {
             "example": {
                 "doctor_id": "507f1f77bcf86cd799439011",
                 "patient_id": "507f1f77bcf86cd799439012",
@@ -73,4 +103,38 @@ class Appointment(BaseModel):
                 "appointment_type": "consultation",
                 "reason": "Regular checkup"
             }
-        }
\ No newline at end of file
+        }
+    }
+
+@dataclass(slots=True, config=READ_MODEL_CONFIG)
+class TimeSlotRead:
+    start_time: str
+    end_time: str
+
+@dataclass(slots=True, config=READ_MODEL_CONFIG)
+class AppointmentRead:
+    """Appointment as returned by the API, validated from the stored document"""
+    _id: ObjectIdStr
+    doctor_id: ObjectIdStr
+    patient_id: ObjectIdStr
+    appointment_date: StoredDate
+    time_slot: TimeSlotRead
+    status: AppointmentStatus = AppointmentStatus.PENDING
+    appointment_type: Optional[str] = None
+    starts_at: Optional[datetime] = None
+    ends_at: Optional[datetime] = None
+    timezone: Optional[str] = None
+    reason: Optional[str] = None
+    notes: Optional[str] = None
+    consultation_fee: Optional[float] = None
+    currency: str = "SYP"
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+    confirmed_at: Optional[datetime] = None
+    completed_at: Optional[datetime] = None
+    cancelled_at: Optional[datetime] = None
+    cancelled_by: Optional[ObjectIdStr] = None
+    cancellation_reason: Optional[str] = None
+    # Populated for the other party
+    doctor: Optional[UserSummary] = None
+    patient: Optional[UserSummary] = None
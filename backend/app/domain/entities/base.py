@@ -0,0 +1,94 @@
+from functools import lru_cache
+from typing import Annotated, Any, FrozenSet, Iterable, List, Optional, Type, TypeVar, get_type_hints
+from typing_extensions import TypedDict
+from datetime import datetime, date
+from pydantic import BaseModel, BeforeValidator, ConfigDict, PlainSerializer, PlainValidator, TypeAdapter, WithJsonSchema
+from bson import ObjectId
+
+T = TypeVar("T")
+
+def _validate_object_id(value: Any) -> ObjectId:
+    if isinstance(value, ObjectId):
+        return value
+    if isinstance(value, str) and ObjectId.is_valid(value):
+        return ObjectId(value)
+    raise ValueError("Invalid ObjectId")
+
+def _object_id_to_str(value: Any) -> Any:
+    return str(value) if isinstance(value, ObjectId) else value
+
+def _datetime_to_date(value: Any) -> Any:
+    # BSON has no date type: dates are stored as midnight datetimes
+    return value.date() if isinstance(value, datetime) else value
+
+# ObjectId in entities: accepts ObjectId or its hex string, serialized as a string in JSON
+PyObjectId = Annotated[
+    ObjectId,
+    PlainValidator(_validate_object_id),
+    PlainSerializer(str, return_type=str, when_used="json"),
+    WithJsonSchema({"type": "string"})
+]
+
+# ObjectId in read models: converted to its hex string while validating
+ObjectIdStr = Annotated[str, BeforeValidator(_object_id_to_str)]
+
+# Date stored as a midnight datetime
+StoredDate = Annotated[date, BeforeValidator(_datetime_to_date)]
+
+# Shared by entities stored in MongoDB (`id` is aliased to `_id`)
+ENTITY_CONFIG = ConfigDict(populate_by_name=True, from_attributes=True)
+
+# Read models are validated straight from BSON documents; fields they do
+# not declare are dropped
+READ_MODEL_CONFIG = ConfigDict(extra="ignore", from_attributes=True)
+
+class MongoModel(BaseModel):
+    """Base for entities stored in MongoDB"""
+    model_config = ENTITY_CONFIG
+
+    @classmethod
+    def from_document(cls: Type[T], document: Any) -> T:
+        """Validate a raw BSON document (or an object with matching attributes)"""
+        return cls.model_validate(document, from_attributes=not isinstance(document, dict))
+
+@lru_cache(maxsize=None)
+def type_adapter(tp: Any) -> TypeAdapter:
+    """
+    TypeAdapter for a type, built once
+
+    Building an adapter compiles its validator and serializer; doing that per
+    request costs far more than the validation itself.
+    """
+    return TypeAdapter(tp)
+
+def validate_document(model: Type[T], document: Any) -> T:
+    """Validate one raw document into `model` with its cached adapter"""
+    return type_adapter(model).validate_python(document)
+
+@lru_cache(maxsize=256)
+def partial_adapter(model: Any, fields: FrozenSet[str]) -> TypeAdapter:
+    """
+    Adapter validating documents into dicts of some fields of a read model
+
+    Used for sparse fieldsets: each field is converted as in the full model,
+    fields not selected are dropped and missing ones left out. Bounded, as
+    clients choose the combinations.
+    """
+    hints = get_type_hints(model, include_extras=True)
+    partial = TypedDict(f"{model.__name__}Fields", {name: hints[name] for name in hints if name in fields}, total=False)
+    return TypeAdapter(List[partial])
+
+def validate_documents(model: Type[T], documents: Iterable[Any], fields: Optional[FrozenSet[str]] = None) -> List[T]:
+    """
+    Validate many raw documents in one call with the cached List[model] adapter
+
+    With `fields`, returns dicts of only those fields instead (see partial_adapter).
+    """
+    documents = documents if isinstance(documents, list) else list(documents)
+    if fields is not None:
+        return partial_adapter(model, fields).validate_python(documents)
+    return type_adapter(List[model]).validate_python(documents)
+
+def dump_documents(model: Type[T], items: List[T]) -> List[dict]:
+    """JSON-compatible dicts of read models, with the cached adapter's serializer"""
+    return type_adapter(List[model]).dump_python(items, mode="json")
@@ -1,6 +1,7 @@
 from typing import Optional, List, Dict
 from datetime import datetime, time
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_validator
+from app.domain.entities.base import ENTITY_CONFIG
 from app.domain.entities.user import User, UserRole
 from enum import Enum
 
@@ -23,7 +24,8 @@ class TimeSlot(BaseModel):
     start_time: str  # Format: "09:00"
     end_time: str    # Format: "17:00"
     
-    @validator('start_time', 'end_time')
+    @field_validator('start_time', 'end_time')
+    @classmethod
     def validate_time_format(cls, v):
         try:
             datetime.strptime(v, "%H:%M")
@@ -97,8 +99,8 @@ class Doctor(User):
     documents_verified: bool = False
     documents_submitted_at: Optional[datetime] = None
     
-    class Config:
-        schema_extra = {
+    model_config = ENTITY_CONFIG | {
+        "json_schema_extra": {
             "example": {
                 "full_name": "Dr. Ahmad Hassan",
                 "email": "dr.ahmad@example.com",
@@ -110,6 +112,7 @@ class Doctor(User):
                 "years_of_experience": 10
             }
         }
+    }
     
     def is_available_for_appointments(self) -> bool:
         """Check if doctor is available for appointments"""
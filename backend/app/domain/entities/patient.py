@@ -1,6 +1,7 @@
 from typing import Optional, List
 from datetime import datetime, date
 from pydantic import BaseModel, Field
+from app.domain.entities.base import ENTITY_CONFIG, StoredDate
 from app.domain.entities.user import User, UserRole
 from enum import Enum
 
@@ -40,7 +41,7 @@ class Patient(User):
     role: UserRole = UserRole.PATIENT
     
     # Personal Information
-    date_of_birth: Optional[date] = None
+    date_of_birth: Optional[StoredDate] = None
     gender: Optional[Gender] = None
     blood_type: Optional[BloodType] = None
     
@@ -56,8 +57,8 @@ class Patient(User):
     total_prescriptions: int = 0
     last_visit: Optional[datetime] = None
     
-    class Config:
-        schema_extra = {
+    model_config = ENTITY_CONFIG | {
+        "json_schema_extra": {
             "example": {
                 "full_name": "Sara Ahmed",
                 "email": "sara@example.com",
@@ -67,6 +68,7 @@ class Patient(User):
                 "date_of_birth": "1990-01-01"
             }
         }
+    }
     
     @property
     def age(self) -> Optional[int]:
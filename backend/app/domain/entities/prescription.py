@@ -1,7 +1,9 @@
-from typing import Optional, List
+from typing import Optional, List, Dict, Any
 from datetime import datetime, date
 from pydantic import BaseModel, Field
-from bson import ObjectId
+from pydantic.dataclasses import dataclass
+from app.domain.entities.base import MongoModel, PyObjectId, ObjectIdStr, StoredDate, ENTITY_CONFIG, READ_MODEL_CONFIG
+from app.domain.entities.user import UserSummary
 
 class MedicineItem(BaseModel):
     """Individual medicine in prescription"""
@@ -13,12 +15,12 @@ class MedicineItem(BaseModel):
     instructions: Optional[str] = None
     instructions_ar: Optional[str] = None
 
-class Prescription(BaseModel):
+class Prescription(MongoModel):
     """Prescription entity"""
-    id: Optional[ObjectId] = Field(alias="_id", default=None)
-    doctor_id: ObjectId
-    patient_id: ObjectId
-    appointment_id: Optional[ObjectId] = None  # Link to appointment if created during visit
+    id: Optional[PyObjectId] = Field(alias="_id", default=None)
+    doctor_id: PyObjectId
+    patient_id: PyObjectId
+    appointment_id: Optional[PyObjectId] = None  # Link to appointment if created during visit
     
     # Medical Information
     diagnosis: Optional[str] = Field(None, max_length=1000)
@@ -29,17 +31,14 @@ class Prescription(BaseModel):
     
     # Prescription Details
     prescription_number: str  # Auto-generated
-    valid_until: Optional[date] = None
+    valid_until: Optional[StoredDate] = None
     
     # Timestamps
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
     
-    class Config:
-        allow_population_by_field_name = True
-        arbitrary_types_allowed = True
-        json_encoders = {ObjectId: str}
-        schema_extra = {
+    model_config = ENTITY_CONFIG | {
+        "json_schema_extra": {
             "example": {
                 "doctor_id": "507f1f77bcf86cd799439011",
                 "patient_id": "507f1f77bcf86cd799439012",
@@ -54,4 +53,26 @@ class Prescription(BaseModel):
                     }
                 ]
             }
-        }
\ No newline at end of file
+        }
+    }
+
+@dataclass(slots=True, config=READ_MODEL_CONFIG)
+class PrescriptionRead:
+    """Prescription as returned by the API, validated from the stored document"""
+    _id: ObjectIdStr
+    doctor_id: ObjectIdStr
+    patient_id: ObjectIdStr
+    appointment_id: Optional[ObjectIdStr] = None
+    prescription_number: Optional[str] = None
+    diagnosis: Optional[str] = None
+    diagnosis_ar: Optional[str] = None
+    # Kept as stored; validated on write by MedicineItem
+    medicines: List[Dict[str, Any]] = Field(default_factory=list)
+    general_instructions: Optional[str] = None
+    general_instructions_ar: Optional[str] = None
+    valid_until: Optional[StoredDate] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+    # Populated for the other party
+    doctor: Optional[UserSummary] = None
+    patient: Optional[UserSummary] = None
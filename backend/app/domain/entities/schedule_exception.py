@@ -0,0 +1,32 @@
+from typing import Optional
+from datetime import datetime, date
+from enum import Enum
+from pydantic import Field
+from app.domain.entities.base import MongoModel, PyObjectId, StoredDate, ENTITY_CONFIG
+
+class ScheduleExceptionType(str, Enum):
+    HOLIDAY = "holiday"
+    VACATION = "vacation"
+    BLOCKED = "blocked"
+
+class ScheduleException(MongoModel):
+    """Date-range override of a doctor's weekly schedule (time off)"""
+    id: Optional[PyObjectId] = Field(alias="_id", default=None)
+    doctor_id: PyObjectId
+    kind: ScheduleExceptionType = ScheduleExceptionType.BLOCKED
+    reason: Optional[str] = Field(None, max_length=500)
+
+    # Clinic-local range as entered; start_time/end_time unset means whole days
+    start_date: StoredDate
+    end_date: StoredDate
+    start_time: Optional[str] = None  # Format: "13:00"
+    end_time: Optional[str] = None    # Format: "17:00"
+
+    # Resolved half-open UTC interval used for lookups
+    starts_at: datetime
+    ends_at: datetime
+    timezone: str
+
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
+    model_config = ENTITY_CONFIG
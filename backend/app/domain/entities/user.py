@@ -1,23 +1,10 @@
-from typing import Optional, List
-from datetime import datetime
+from typing import Optional, List, Dict, Any
+from datetime import datetime, date
 from enum import Enum
-from pydantic import BaseModel, EmailStr, Field, validator
+from pydantic import EmailStr, Field, field_validator
+from pydantic.dataclasses import dataclass
 from bson import ObjectId
-
-class PyObjectId(ObjectId):
-    @classmethod
-    def __get_validators__(cls):
-        yield cls.validate
-
-    @classmethod
-    def validate(cls, v):
-        if not ObjectId.is_valid(v):
-            raise ValueError("Invalid ObjectId")
-        return ObjectId(v)
-
-    @classmethod
-    def __modify_schema__(cls, field_schema):
-        field_schema.update(type="string")
+from app.domain.entities.base import MongoModel, PyObjectId, ObjectIdStr, StoredDate, ENTITY_CONFIG, READ_MODEL_CONFIG
 
 class AuthMethod(str, Enum):
     EMAIL = "email"
@@ -35,9 +22,9 @@ class UserStatus(str, Enum):
     BLOCKED = "blocked"
     DEACTIVATED = "deactivated"
 
-class User(BaseModel):
+class User(MongoModel):
     """Base User entity"""
-    id: Optional[ObjectId] = Field(alias="_id", default=None)
+    id: Optional[PyObjectId] = Field(alias="_id", default=None)
     full_name: str = Field(..., min_length=2, max_length=100)
     email: Optional[EmailStr] = None
     phone_number: Optional[str] = None
@@ -57,11 +44,8 @@ class User(BaseModel):
     updated_at: datetime = Field(default_factory=datetime.utcnow)
     last_login: Optional[datetime] = None
     
-    class Config:
-        allow_population_by_field_name = True
-        arbitrary_types_allowed = True
-        json_encoders = {ObjectId: str}
-        schema_extra = {
+    model_config = ENTITY_CONFIG | {
+        "json_schema_extra": {
             "example": {
                 "full_name": "Dr. Ahmad Hassan",
                 "email": "ahmad@example.com",
@@ -69,9 +53,11 @@ class User(BaseModel):
                 "auth_method": "email"
             }
         }
+    }
     
-    @validator('phone_number')
-    def validate_phone_number(cls, v, values):
+    @field_validator('phone_number')
+    @classmethod
+    def validate_phone_number(cls, v):
         """Validate Syrian phone number format"""
         if v is None:
             return v
@@ -101,7 +87,30 @@ class User(BaseModel):
     
     def to_dict(self) -> dict:
         """Convert to dictionary for MongoDB"""
-        data = self.dict(by_alias=True, exclude_unset=True)
+        data = self.model_dump(by_alias=True, exclude_unset=True)
         if data.get("_id"):
             data["_id"] = ObjectId(data["_id"])
-        return data
\ No newline at end of file
+        return data
+
+# Fields of a user embedded in appointment/prescription responses
+USER_SUMMARY_FIELDS = (
+    "full_name", "email", "phone_number", "country_code", "role",
+    "specialties", "clinic_info", "gender", "date_of_birth"
+)
+USER_SUMMARY_PROJECTION = {field: 1 for field in USER_SUMMARY_FIELDS}
+
+@dataclass(slots=True, config=READ_MODEL_CONFIG)
+class UserSummary:
+    """Read model of the other party on an appointment or prescription"""
+    _id: ObjectIdStr
+    full_name: Optional[str] = None
+    email: Optional[str] = None
+    phone_number: Optional[str] = None
+    country_code: Optional[str] = None
+    role: Optional[str] = None
+    # Doctors
+    specialties: Optional[List[Dict[str, Any]]] = None
+    clinic_info: Optional[Dict[str, Any]] = None
+    # Patients
+    gender: Optional[str] = None
+    date_of_birth: Optional[StoredDate] = None
\ No newline at end of file
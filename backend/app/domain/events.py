@@ -0,0 +1,89 @@
+from dataclasses import dataclass, field, fields, asdict
+from typing import Any, Dict, Optional, Tuple, Type
+from datetime import datetime
+
+# Events carry ids as strings and times as naive UTC datetimes (dates as
+# midnight datetimes) so they can be stored in the outbox unchanged
+
+@dataclass(frozen=True, slots=True, kw_only=True)
+class DomainEvent:
+    """Something that happened to stored data; published after the write"""
+    occurred_at: datetime = field(default_factory=datetime.utcnow)
+
+@dataclass(frozen=True, slots=True)
+class AppointmentBooked(DomainEvent):
+    appointment_id: str
+    doctor_id: str
+    patient_id: str
+    appointment_date: datetime
+    starts_at: datetime
+
+@dataclass(frozen=True, slots=True)
+class AppointmentStatusChanged(DomainEvent):
+    """One or more appointments of a doctor moved to `status`"""
+    appointment_ids: Tuple[str, ...]
+    doctor_id: str
+    status: str
+    # Clinic-local days affected, None when not known (e.g. bulk updates)
+    appointment_dates: Optional[Tuple[datetime, ...]] = None
+
+@dataclass(frozen=True, slots=True)
+class DoctorProfileUpdated(DomainEvent):
+    doctor_id: str
+    fields: Tuple[str, ...]
+
+@dataclass(frozen=True, slots=True)
+class DoctorScheduleChanged(DomainEvent):
+    """Weekly schedule or schedule exceptions changed"""
+    doctor_id: str
+
+@dataclass(frozen=True, slots=True)
+class PrescriptionCreated(DomainEvent):
+    prescription_id: str
+    doctor_id: str
+    patient_id: str
+
+@dataclass(frozen=True, slots=True)
+class UserRegistered(DomainEvent):
+    user_id: str
+    role: str
+
+@dataclass(frozen=True, slots=True)
+class UserUpdated(DomainEvent):
+    user_id: str
+    fields: Tuple[str, ...]
+
+EVENT_TYPES: Dict[str, Type[DomainEvent]] = {
+    event_type.__name__: event_type
+    for event_type in (
+        AppointmentBooked, AppointmentStatusChanged, DoctorProfileUpdated,
+        DoctorScheduleChanged, PrescriptionCreated, UserRegistered, UserUpdated
+    )
+}
+
+# Fields naming the party an event is about, by preference: the event bus
+# delivers the events of one party in publish order
+ORDERING_KEY_FIELDS = ("doctor_id", "user_id")
+
+def ordering_key(event: DomainEvent) -> str:
+    """Key of the events that must be handled in order relative to this one"""
+    for name in ORDERING_KEY_FIELDS:
+        value = getattr(event, name, None)
+        if value is not None:
+            return value
+    return type(event).__name__
+
+def event_to_document(event: DomainEvent) -> Dict[str, Any]:
+    """Outbox representation of an event"""
+    return {"type": type(event).__name__, "payload": asdict(event)}
+
+def event_from_document(document: Dict[str, Any]) -> DomainEvent:
+    """Rebuild an event stored by event_to_document"""
+    event_type = EVENT_TYPES[document["type"]]
+    payload = {
+        # BSON arrays come back as lists
+        name: tuple(value) if isinstance(value, list) else value
+        for name, value in document["payload"].items()
+        if name in {f.name for f in fields(event_type)}
+    }
+    return event_type(**payload)
@@ -0,0 +1,48 @@
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, Iterable, Optional
+
+@dataclass(frozen=True, slots=True)
+class FieldSelection:
+    """
+    Sparse fieldset of a read (?fields=...&expand=...)
+
+    `fields` are the stored fields to return, None for all; `_id` is always
+    returned, and fields an expansion depends on may be too. `expand` names
+    the related data to populate; None leaves it to the read's default,
+    which is nothing once `fields` is given.
+    """
+    fields: Optional[FrozenSet[str]] = None
+    expand: Optional[FrozenSet[str]] = None
+
+    def expands(self, default: Iterable[str] = ()) -> FrozenSet[str]:
+        """Related data to populate, given the read's default"""
+        if self.expand is not None:
+            return self.expand
+        return frozenset(default) if self.fields is None else frozenset()
+
+    def includes(self, field: str) -> bool:
+        return self.fields is None or field in self.fields
+
+    def projection(self, *required: str) -> Optional[Dict[str, int]]:
+        """
+        Inclusion projection of the selected fields plus `required`; None for all
+
+        Paths under another selected path are dropped, as MongoDB rejects
+        overlapping projections.
+        """
+        if self.fields is None:
+            return None
+        paths = {*self.fields, *required}
+        return {
+            path: 1 for path in sorted(paths)
+            if not any(path.startswith(f"{other}.") for other in paths)
+        }
+
+    def response_fields(self, expand: Iterable[str] = ()) -> Optional[FrozenSet[str]]:
+        """Top-level fields of the response (selected, `_id` and expanded), None for all"""
+        if self.fields is None:
+            return None
+        return frozenset({"_id", *self.fields, *expand})
+
+# Whole documents with the read's default population
+ALL_FIELDS = FieldSelection()
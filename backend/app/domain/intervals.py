@@ -0,0 +1,68 @@
+from bisect import bisect_left, insort
+from datetime import datetime
+from typing import Iterable, List, Tuple
+
+# Half-open [start, end) interval
+Interval = Tuple[datetime, datetime]
+
+def overlaps(a: Interval, b: Interval) -> bool:
+    """Whether two half-open intervals share any time"""
+    return a[0] < b[1] and a[1] > b[0]
+
+class IntervalSet:
+    """
+    Sorted set of (possibly overlapping) half-open intervals
+
+    Built once per doctor/day for slot generation. Intervals are kept sorted
+    by start with a running maximum of ends, so "does [start, end) overlap
+    anything" is a single bisect: among the intervals starting before `end`,
+    the one reaching furthest decides.
+    """
+
+    def __init__(self, intervals: Iterable[Interval] = ()):
+        self._intervals: List[Interval] = sorted(intervals)
+        self._rebuild()
+
+    def _rebuild(self):
+        self._starts = [start for start, _ in self._intervals]
+        self._max_ends: List[datetime] = []
+        for _, end in self._intervals:
+            self._max_ends.append(max(end, self._max_ends[-1]) if self._max_ends else end)
+
+    def add(self, start: datetime, end: datetime) -> None:
+        """Insert an interval (O(n); the set is usually built in one go)"""
+        insort(self._intervals, (start, end))
+        self._rebuild()
+
+    def overlaps(self, start: datetime, end: datetime) -> bool:
+        """Whether [start, end) overlaps any interval in the set (O(log n))"""
+        i = bisect_left(self._starts, end)
+        return i > 0 and self._max_ends[i - 1] > start
+
+    def __len__(self) -> int:
+        return len(self._intervals)
+
+    def __iter__(self):
+        return iter(self._intervals)
+
+def subtract_intervals(windows: Iterable[Interval], blocks: Iterable[Interval]) -> List[Interval]:
+    """Parts of `windows` not covered by any of `blocks` (both half-open)"""
+    blocks = sorted(blocks)
+    result: List[Interval] = []
+
+    for start, end in sorted(windows):
+        cursor = start
+        for block_start, block_end in blocks:
+            if block_end <= cursor:
+                continue
+            if block_start >= end:
+                break
+            if block_start > cursor:
+                result.append((cursor, block_start))
+            cursor = max(cursor, block_end)
+            if cursor >= end:
+                break
+        if cursor < end:
+            result.append((cursor, end))
+
+    return result
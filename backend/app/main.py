@@ -6,12 +6,26 @@ from typing import AsyncGenerator
 
 from app.core.config import settings
 from app.core.database import db
+from app.core.redis import redis_client
+from app.core.rate_limit import rate_limiter
 from app.api.v1.endpoints.api import api_router
 from app.core.exceptions import setup_exception_handlers
+from app.core.compression import setup_compression
+from app.core.idempotency import setup_idempotency, idempotency_store
+from app.core.events import event_bus
+from app.core.change_streams import change_consumer
 from app.services.auth_service import auth_service
+from app.services.token_service import refresh_token_service
 from app.services.appointment_service import appointment_service
 from app.services.doctor_service import doctor_service
 from app.services.prescription_service import prescription_service
+from app.services.appointment_sweeper import appointment_sweeper
+from app.services.reminder_service import reminder_service
+from app.services.schedule_service import schedule_service
+from app.services.availability_service import availability_service
+from app.services.activity_service import activity_recorder
+from app.services.summary_service import summary_propagator
+from app.services.appointment_feed import appointment_feed
 
 # Configure logging
 logging.basicConfig(
@@ -28,14 +42,40 @@ async def lifespan(app: FastAPI) -> AsyncGenerator:
     # Connect to MongoDB
     await db.connect()
     logger.info("Connected to MongoDB")
+    
+    # Connect to Redis (optional)
+    await redis_client.connect()
+    rate_limiter.configure(redis_client.client)
+    idempotency_store.configure(redis_client.client)
+    appointment_feed.configure(redis_client.client)
 
-    # Initialize services
+    # Initialize services (they subscribe to domain events here)
+    await event_bus.init()
+    await change_consumer.init()
     await auth_service.init()
+    await refresh_token_service.init()
     await appointment_service.init()
     await doctor_service.init()
     await prescription_service.init()
+    await appointment_sweeper.init()
+    await reminder_service.init()
+    await schedule_service.init()
+    await availability_service.init()
+    await activity_recorder.init()
+    await summary_propagator.init()
+    await appointment_feed.init()
     logger.info("Services initialized")
     
+    # Start background jobs
+    event_bus.start()
+    change_consumer.start()
+    appointment_sweeper.start()
+    reminder_service.start()
+    availability_service.start()
+    activity_recorder.start()
+    summary_propagator.start()
+    appointment_feed.start()
+    
     # Show feature flags status
     logger.info(f"Feature Flags Status:")
     logger.info(f"  - Phone Verification: {'ENABLED' if settings.PHONE_VERIFICATION_ENABLED else 'DISABLED (Mock Mode)'}")
@@ -47,6 +87,18 @@ async def lifespan(app: FastAPI) -> AsyncGenerator:
     
     # Cleanup
     logger.info("Shutting down DOME Care Backend...")
+    # Producers first, so nothing new is published while the bus drains
+    await appointment_sweeper.stop()
+    await reminder_service.stop()
+    await summary_propagator.stop()
+    await availability_service.stop()
+    await change_consumer.stop()
+    await activity_recorder.stop()
+    await appointment_feed.stop()
+    # The bus last: queued events are delivered (the feed still relays
+    # through Redis) before Redis and the database go away
+    await event_bus.stop()
+    await redis_client.disconnect()
     await db.disconnect()
 
 app = FastAPI(
@@ -58,6 +110,9 @@ app = FastAPI(
     lifespan=lifespan
 )
 
+# Idempotency-Key replay (innermost, so stored bodies are uncompressed)
+setup_idempotency(app)
+
 # CORS configuration
 app.add_middleware(
     CORSMiddleware,
@@ -67,6 +122,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Response compression
+setup_compression(app)
+
 # Setup exception handlers
 setup_exception_handlers(app)
 
@@ -101,5 +159,15 @@ async def health_check():
             "appointments": "active",
             "prescriptions": "active", 
             "doctor_search": "active"
+        },
+        "jobs": {
+            "events": event_bus.metrics,
+            "change_stream": change_consumer.metrics,
+            "appointment_sweeper": appointment_sweeper.metrics,
+            "reminders": reminder_service.metrics,
+            "availability_index": availability_service.metrics,
+            "activity": activity_recorder.metrics,
+            "summary_propagation": summary_propagator.metrics,
+            "appointment_feed": appointment_feed.metrics
         }
     }
\ No newline at end of file
@@ -0,0 +1,139 @@
+"""
+Backfill starts_at / ends_at / timezone on existing appointments
+
+Appointments created before slot times were stored as UTC datetimes only
+carry appointment_date + time_slot. This walks them in _id order, in
+batches, resolving each slot in its doctor's clinic timezone, and writes
+the new fields with one unordered bulk_write per batch. Safe to re-run:
+only documents without starts_at are touched.
+
+    python -m app.migrations.backfill_appointment_times [--batch-size 1000] [--dry-run]
+"""
+import argparse
+import asyncio
+import time
+from datetime import datetime, date
+from typing import Any, Dict, Optional
+from pymongo import UpdateOne
+from app.core.database import db
+from app.core.timezones import clinic_timezone_name, local_to_utc, date_to_datetime
+import logging
+
+logger = logging.getLogger(__name__)
+
+def _as_date(value: Any) -> Optional[date]:
+    """appointment_date as stored by older versions (datetime, date or ISO string)"""
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    if isinstance(value, str):
+        try:
+            return datetime.strptime(value[:10], "%Y-%m-%d").date()
+        except ValueError:
+            return None
+    return None
+
+async def backfill(batch_size: int = 1000, dry_run: bool = False, pause_seconds: float = 0.0) -> Dict[str, int]:
+    """Run the backfill; returns counters"""
+    appointments = db.get_collection("appointments")
+    users = db.get_collection("users")
+
+    pending_filter = {"starts_at": {"$exists": False}}
+    total = await appointments.count_documents(pending_filter)
+    logger.info(f"Backfilling appointment times: {total} appointments to process")
+
+    counters = {"processed": 0, "updated": 0, "skipped": 0}
+    started = time.monotonic()
+    last_id = None
+
+    while True:
+        query = dict(pending_filter)
+        if last_id is not None:
+            query["_id"] = {"$gt": last_id}
+
+        batch = await appointments.find(
+            query, {"doctor_id": 1, "appointment_date": 1, "time_slot": 1}
+        ).sort("_id", 1).limit(batch_size).to_list(None)
+        if not batch:
+            break
+        last_id = batch[-1]["_id"]
+
+        # One lookup per batch for the doctors' timezones
+        doctor_ids = list({doc["doctor_id"] for doc in batch if doc.get("doctor_id")})
+        doctors = {
+            doctor["_id"]: doctor
+            for doctor in await users.find(
+                {"_id": {"$in": doctor_ids}}, {"clinic_info.timezone": 1}
+            ).to_list(None)
+        }
+
+        operations = []
+        for doc in batch:
+            day = _as_date(doc.get("appointment_date"))
+            slot = doc.get("time_slot") or {}
+            if not day or not slot.get("start_time") or not slot.get("end_time"):
+                logger.warning(f"Skipping appointment {doc['_id']}: missing date or time slot")
+                counters["skipped"] += 1
+                continue
+
+            tz_name = clinic_timezone_name(doctors.get(doc["doctor_id"]))
+            try:
+                starts_at = local_to_utc(day, slot["start_time"], tz_name)
+                ends_at = local_to_utc(day, slot["end_time"], tz_name)
+            except ValueError:
+                logger.warning(f"Skipping appointment {doc['_id']}: invalid time slot {slot}")
+                counters["skipped"] += 1
+                continue
+
+            operations.append(UpdateOne(
+                {"_id": doc["_id"], "starts_at": {"$exists": False}},
+                {"$set": {
+                    "starts_at": starts_at,
+                    "ends_at": ends_at,
+                    "timezone": tz_name,
+                    "appointment_date": date_to_datetime(day)
+                }}
+            ))
+
+        if operations and not dry_run:
+            result = await appointments.bulk_write(operations, ordered=False)
+            counters["updated"] += result.modified_count
+        elif dry_run:
+            counters["updated"] += len(operations)
+
+        counters["processed"] += len(batch)
+        elapsed = time.monotonic() - started
+        rate = counters["processed"] / elapsed if elapsed else 0.0
+        remaining = max(0, total - counters["processed"])
+        eta = f"{remaining / rate:.0f}s" if rate else "?"
+        logger.info(
+            f"Backfill progress: {counters['processed']}/{total} "
+            f"({counters['processed'] * 100 / max(total, 1):.1f}%), "
+            f"{counters['updated']} updated, {counters['skipped']} skipped, "
+            f"{rate:.0f}/s, ETA {eta}"
+        )
+
+        if pause_seconds:
+            # Leave headroom for live traffic on large collections
+            await asyncio.sleep(pause_seconds)
+
+    logger.info(f"Backfill finished{' (dry run)' if dry_run else ''}: {counters}")
+    return counters
+
+async def main():
+    parser = argparse.ArgumentParser(description="Backfill appointment starts_at/ends_at/timezone")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--pause", type=float, default=0.0, help="Seconds to sleep between batches")
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    await db.connect()
+    try:
+        await backfill(args.batch_size, args.dry_run, args.pause)
+    finally:
+        await db.disconnect()
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    asyncio.run(main())
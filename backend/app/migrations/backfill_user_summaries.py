@@ -0,0 +1,114 @@
+"""
+Backfill doctor_summary / patient_summary on appointments and prescriptions
+
+Documents created before snapshots were embedded are still served through a
+users lookup at read time. This walks each collection in _id order, in
+batches, loads the referenced users with one $in query per batch, and writes
+both snapshots with one unordered bulk_write per batch. Safe to re-run: only
+documents missing a snapshot are touched (use --all to refresh every one).
+
+    python -m app.migrations.backfill_user_summaries [--batch-size 1000] [--all] [--dry-run]
+"""
+import argparse
+import asyncio
+import time
+from datetime import datetime
+from typing import Dict
+from pymongo import UpdateOne
+from app.core.database import db
+from app.domain.entities.user import USER_SUMMARY_PROJECTION
+from app.services.summary_service import SUMMARY_TARGETS, build_user_summary
+import logging
+
+logger = logging.getLogger(__name__)
+
+async def backfill_collection(collection_name: str, batch_size: int = 1000, refresh_all: bool = False,
+                              dry_run: bool = False, pause_seconds: float = 0.0) -> Dict[str, int]:
+    """Backfill one collection; returns counters"""
+    collection = db.get_collection(collection_name)
+    users = db.get_collection("users")
+    id_fields = SUMMARY_TARGETS[collection_name]
+
+    pending_filter = {} if refresh_all else {"$or": [
+        {id_field.replace("_id", "_summary"): {"$exists": False}} for id_field in id_fields
+    ]}
+    total = await collection.count_documents(pending_filter)
+    logger.info(f"Backfilling user summaries on {collection_name}: {total} documents to process")
+
+    counters = {"processed": 0, "updated": 0, "missing_users": 0}
+    started = time.monotonic()
+    last_id = None
+
+    while True:
+        query = dict(pending_filter)
+        if last_id is not None:
+            query["_id"] = {"$gt": last_id}
+
+        batch = await collection.find(
+            query, {id_field: 1 for id_field in id_fields}
+        ).sort("_id", 1).limit(batch_size).to_list(None)
+        if not batch:
+            break
+        last_id = batch[-1]["_id"]
+
+        user_ids = list({doc[id_field] for doc in batch for id_field in id_fields if doc.get(id_field)})
+        now = datetime.utcnow()
+        summaries = {
+            user["_id"]: build_user_summary(user, now)
+            for user in await users.find({"_id": {"$in": user_ids}}, USER_SUMMARY_PROJECTION).to_list(None)
+        }
+
+        operations = []
+        for doc in batch:
+            update = {}
+            for id_field in id_fields:
+                summary = summaries.get(doc.get(id_field))
+                if summary is None:
+                    counters["missing_users"] += 1
+                    continue
+                update[id_field.replace("_id", "_summary")] = summary
+            if update:
+                operations.append(UpdateOne({"_id": doc["_id"]}, {"$set": update}))
+
+        if operations and not dry_run:
+            result = await collection.bulk_write(operations, ordered=False)
+            counters["updated"] += result.modified_count
+        elif dry_run:
+            counters["updated"] += len(operations)
+
+        counters["processed"] += len(batch)
+        elapsed = time.monotonic() - started
+        rate = counters["processed"] / elapsed if elapsed else 0.0
+        remaining = max(0, total - counters["processed"])
+        eta = f"{remaining / rate:.0f}s" if rate else "?"
+        logger.info(
+            f"{collection_name} progress: {counters['processed']}/{total} "
+            f"({counters['processed'] * 100 / max(total, 1):.1f}%), "
+            f"{counters['updated']} updated, {counters['missing_users']} missing users, "
+            f"{rate:.0f}/s, ETA {eta}"
+        )
+
+        if pause_seconds:
+            await asyncio.sleep(pause_seconds)
+
+    logger.info(f"Backfill of {collection_name} finished{' (dry run)' if dry_run else ''}: {counters}")
+    return counters
+
+async def main():
+    parser = argparse.ArgumentParser(description="Backfill embedded doctor/patient summaries")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--pause", type=float, default=0.0, help="Seconds to sleep between batches")
+    parser.add_argument("--all", action="store_true", help="Refresh existing snapshots too")
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    await db.connect()
+    try:
+        for collection_name in SUMMARY_TARGETS:
+            await backfill_collection(collection_name, args.batch_size, args.all, args.dry_run, args.pause)
+    finally:
+        await db.disconnect()
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    asyncio.run(main())
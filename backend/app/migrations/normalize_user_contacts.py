@@ -0,0 +1,126 @@
+"""
+Normalize emails and phone numbers on existing users
+
+Users are now matched on a lowercased email and a digits-only
+(country_code, phone_number) pair, both behind unique indexes. This walks
+users in _id order, in batches, rewrites contact fields that are not yet
+in canonical form with one unordered bulk_write per batch, and reports
+accounts that collide once normalized. Colliding accounts are left
+untouched and must be merged by hand before the unique indexes can be
+built. Safe to re-run.
+
+    python -m app.migrations.normalize_user_contacts [--batch-size 1000] [--dry-run]
+"""
+import argparse
+import asyncio
+import time
+from typing import Any, Dict, List, Tuple
+from pymongo import UpdateOne
+from app.core.database import db
+from app.services.auth_service import normalize_email, normalize_phone_number, normalize_country_code
+import logging
+
+logger = logging.getLogger(__name__)
+
+def _normalized_contacts(user: Dict[str, Any]) -> Dict[str, str]:
+    """Canonical values of the contact fields the user has"""
+    contacts = {}
+    if isinstance(user.get("email"), str) and user["email"]:
+        contacts["email"] = normalize_email(user["email"])
+    if isinstance(user.get("phone_number"), str) and user["phone_number"]:
+        contacts["phone_number"] = normalize_phone_number(user["phone_number"])
+    if isinstance(user.get("country_code"), str) and user["country_code"]:
+        contacts["country_code"] = normalize_country_code(user["country_code"])
+    return contacts
+
+async def normalize(batch_size: int = 1000, dry_run: bool = False, pause_seconds: float = 0.0) -> Dict[str, Any]:
+    """Run the migration; returns counters and the duplicate groups found"""
+    users = db.get_collection("users")
+
+    total = await users.count_documents({})
+    logger.info(f"Normalizing user contacts: {total} users to process")
+
+    counters = {"processed": 0, "updated": 0, "duplicates": 0}
+    # Normalized key -> first user id seen with it
+    seen_emails: Dict[str, Any] = {}
+    seen_phones: Dict[Tuple[str, str], Any] = {}
+    duplicates: List[Dict[str, Any]] = []
+    started = time.monotonic()
+    last_id = None
+
+    while True:
+        query = {"_id": {"$gt": last_id}} if last_id is not None else {}
+        batch = await users.find(
+            query, {"email": 1, "phone_number": 1, "country_code": 1}
+        ).sort("_id", 1).limit(batch_size).to_list(None)
+        if not batch:
+            break
+        last_id = batch[-1]["_id"]
+
+        operations = []
+        for user in batch:
+            contacts = _normalized_contacts(user)
+
+            collides = False
+            email = contacts.get("email")
+            if email is not None:
+                if email in seen_emails:
+                    duplicates.append({"email": email, "user_ids": [seen_emails[email], user["_id"]]})
+                    collides = True
+                else:
+                    seen_emails[email] = user["_id"]
+            if "phone_number" in contacts:
+                phone = (contacts.get("country_code", ""), contacts["phone_number"])
+                if phone in seen_phones:
+                    duplicates.append({"phone": "".join(phone), "user_ids": [seen_phones[phone], user["_id"]]})
+                    collides = True
+                else:
+                    seen_phones[phone] = user["_id"]
+
+            if collides:
+                counters["duplicates"] += 1
+                continue
+
+            changes = {field: value for field, value in contacts.items() if user.get(field) != value}
+            if changes:
+                operations.append(UpdateOne({"_id": user["_id"]}, {"$set": changes}))
+
+        if operations and not dry_run:
+            result = await users.bulk_write(operations, ordered=False)
+            counters["updated"] += result.modified_count
+        elif dry_run:
+            counters["updated"] += len(operations)
+
+        counters["processed"] += len(batch)
+        elapsed = time.monotonic() - started
+        rate = counters["processed"] / elapsed if elapsed else 0.0
+        logger.info(
+            f"Normalize progress: {counters['processed']}/{total} "
+            f"({counters['processed'] * 100 / max(total, 1):.1f}%), "
+            f"{counters['updated']} updated, {counters['duplicates']} duplicates, {rate:.0f}/s"
+        )
+
+        if pause_seconds:
+            await asyncio.sleep(pause_seconds)
+
+    for duplicate in duplicates:
+        logger.warning(f"Duplicate contact after normalization: {duplicate}")
+    logger.info(f"Normalization finished{' (dry run)' if dry_run else ''}: {counters}")
+    return {**counters, "duplicate_groups": duplicates}
+
+async def main():
+    parser = argparse.ArgumentParser(description="Normalize user emails and phone numbers")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--pause", type=float, default=0.0, help="Seconds to sleep between batches")
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    await db.connect()
+    try:
+        await normalize(args.batch_size, args.dry_run, args.pause)
+    finally:
+        await db.disconnect()
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    asyncio.run(main())
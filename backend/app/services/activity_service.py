@@ -0,0 +1,122 @@
+import asyncio
+from typing import Optional, Dict, Any
+from datetime import datetime
+from bson import ObjectId
+from pymongo import UpdateOne
+from app.core.config import settings
+from app.core.database import db
+import logging
+
+logger = logging.getLogger(__name__)
+
+class ActivityRecorder:
+    """
+    Write-behind buffer for low-value activity timestamps (last_login, last_seen)
+
+    Updates are coalesced per user in memory and flushed periodically with
+    one unordered bulk_write, so request handlers never wait on these writes.
+    `$max` keeps flushes from different workers from moving a timestamp
+    backwards, and `updated_at` is left alone (activity is not a profile
+    change). The buffer is bounded: reaching ACTIVITY_BUFFER_MAX_USERS
+    triggers an early flush and updates beyond twice that are dropped.
+    """
+
+    def __init__(self):
+        self.users_collection = None
+        self._pending: Dict[ObjectId, Dict[str, datetime]] = {}
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self.metrics: Dict[str, Any] = {
+            "pending_users": 0,
+            "last_flush_at": None,
+            "last_flush_size": 0,
+            "total_flushed": 0,
+            "dropped": 0,
+            "flush_errors": 0
+        }
+
+    async def init(self):
+        """Initialize collections"""
+        self.users_collection = db.get_collection("users")
+
+    def start(self):
+        """Start the periodic flush loop"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the flush loop and write out whatever is buffered"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    def record(self, user_id: Any, field: str, value: Optional[datetime] = None) -> None:
+        """Buffer `field = value` (default now) for a user; never blocks"""
+        user_id = ObjectId(user_id)
+        value = value or datetime.utcnow()
+
+        fields = self._pending.get(user_id)
+        if fields is None:
+            if len(self._pending) >= settings.ACTIVITY_BUFFER_MAX_USERS * 2:
+                self.metrics["dropped"] += 1
+                return
+            fields = self._pending[user_id] = {}
+        if field not in fields or fields[field] < value:
+            fields[field] = value
+
+        self.metrics["pending_users"] = len(self._pending)
+        if len(self._pending) >= settings.ACTIVITY_BUFFER_MAX_USERS:
+            self._wakeup.set()
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=settings.ACTIVITY_FLUSH_INTERVAL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    async def flush(self) -> int:
+        """Write buffered updates; returns the number of users written"""
+        if not self._pending or self.users_collection is None:
+            return 0
+
+        batch, self._pending = self._pending, {}
+        self.metrics["pending_users"] = 0
+
+        operations = [
+            UpdateOne({"_id": user_id}, {"$max": fields})
+            for user_id, fields in batch.items()
+        ]
+        try:
+            await self.users_collection.bulk_write(operations, ordered=False)
+        except asyncio.CancelledError:
+            # Stopped mid-write: keep the batch for the final flush in stop()
+            # ($max makes writing it twice harmless)
+            self._merge(batch)
+            raise
+        except Exception as e:
+            self.metrics["flush_errors"] += 1
+            logger.error(f"Activity flush failed for {len(operations)} users: {e}")
+            self._merge(batch)
+            return 0
+
+        self.metrics["last_flush_at"] = datetime.utcnow()
+        self.metrics["last_flush_size"] = len(operations)
+        self.metrics["total_flushed"] += len(operations)
+        return len(operations)
+
+    def _merge(self, batch: Dict[ObjectId, Dict[str, datetime]]) -> None:
+        """Put an unwritten batch back into the buffer; newer values win"""
+        for user_id, fields in batch.items():
+            for field, value in fields.items():
+                self.record(user_id, field, value)
+
+# Global recorder instance
+activity_recorder = ActivityRecorder()
@@ -0,0 +1,251 @@
+import asyncio
+import json
+from collections import OrderedDict, deque
+from datetime import date, datetime
+from typing import Any, AsyncIterator, Deque, Dict, List, Optional, Set, Tuple
+from bson import ObjectId
+from app.core.config import settings
+from app.core.events import event_bus
+from app.core.exceptions import ServiceUnavailableException
+from app.domain.events import AppointmentBooked, AppointmentStatusChanged
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Redis pub/sub channel carrying every feed message to every worker
+FEED_CHANNEL = "appointment_feed"
+
+# (event id, event name, JSON data) as sent to the client
+FeedMessage = Tuple[str, str, str]
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return str(value)
+
+def format_sse(event_id: Optional[str], event: str, data: str) -> bytes:
+    """One Server-Sent Events frame"""
+    head = f"id: {event_id}\n" if event_id else ""
+    return f"{head}event: {event}\ndata: {data}\n\n".encode()
+
+class AppointmentFeed:
+    """
+    Live appointment deltas for doctors, streamed over Server-Sent Events
+
+    Bookings and status changes (from the event bus, on the worker that
+    made the write) are turned into feed messages with an ObjectId event
+    id. With Redis they are published on FEED_CHANNEL and every worker
+    receives them; without it they are delivered in-process only.
+
+    Each worker keeps the last SSE_HISTORY_SIZE messages of every doctor
+    it has seen (bounded to SSE_HISTORY_DOCTORS doctors), so a client that
+    reconnects with Last-Event-ID, on any worker, gets what it missed. When
+    the id is no longer in the history the client is sent a `resync` event
+    and should refetch. A subscriber whose queue fills up (client not
+    reading) is disconnected and recovers the same way.
+    """
+
+    def __init__(self):
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = {}
+        self._history: "OrderedDict[str, Deque[FeedMessage]]" = OrderedDict()
+        self._redis = None
+        self._listener_task: Optional[asyncio.Task] = None
+        self.connections = 0
+        self.metrics: Dict[str, Any] = {
+            "connections": 0,
+            "published": 0,
+            "delivered": 0,
+            "rejected": 0,
+            "slow_disconnects": 0,
+            "resyncs": 0
+        }
+
+    async def init(self):
+        """Subscribe to appointment events"""
+        event_bus.subscribe(AppointmentBooked, self._on_appointment_booked)
+        event_bus.subscribe(AppointmentStatusChanged, self._on_appointment_status_changed)
+
+    def configure(self, redis=None):
+        """Fan out through Redis pub/sub when available, otherwise in-process"""
+        self._redis = redis
+        logger.info(f"Appointment feed using {'Redis pub/sub' if redis is not None else 'in-process'} fan-out")
+
+    def start(self):
+        """Start the Redis listener"""
+        if self._redis is not None and self._listener_task is None:
+            self._listener_task = asyncio.create_task(self._listen())
+
+    async def stop(self):
+        """Stop the listener and end open streams"""
+        if self._listener_task:
+            self._listener_task.cancel()
+            try:
+                await self._listener_task
+            except asyncio.CancelledError:
+                pass
+            self._listener_task = None
+
+        for queues in self._subscribers.values():
+            for queue in queues:
+                self._close(queue)
+        self._subscribers.clear()
+
+    async def _on_appointment_booked(self, event: AppointmentBooked) -> None:
+        await self.publish(event.doctor_id, "appointment.booked", {
+            "appointment_id": event.appointment_id,
+            "patient_id": event.patient_id,
+            "appointment_date": event.appointment_date.date(),
+            "starts_at": event.starts_at
+        })
+
+    async def _on_appointment_status_changed(self, event: AppointmentStatusChanged) -> None:
+        data = {"appointment_ids": list(event.appointment_ids), "status": event.status}
+        if event.appointment_dates:
+            data["appointment_dates"] = [day.date() for day in event.appointment_dates]
+        await self.publish(event.doctor_id, "appointment.status_changed", data)
+
+    async def publish(self, doctor_id: str, event: str, data: Dict[str, Any]) -> None:
+        """Send a message to the doctor's streams on every worker"""
+        message = {
+            "id": str(ObjectId()),
+            "doctor_id": str(doctor_id),
+            "event": event,
+            "data": json.dumps(data, default=_json_default)
+        }
+        self.metrics["published"] += 1
+
+        if self._redis is not None:
+            try:
+                await self._redis.publish(FEED_CHANNEL, json.dumps(message))
+                return
+            except Exception as e:
+                # Streams on this worker still get it
+                logger.error(f"Failed to publish appointment feed message: {e}")
+        self._deliver(message)
+
+    async def _listen(self):
+        while True:
+            pubsub = self._redis.pubsub()
+            try:
+                await pubsub.subscribe(FEED_CHANNEL)
+                async for message in pubsub.listen():
+                    if message["type"] == "message":
+                        self._deliver(json.loads(message["data"]))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Appointment feed listener failed: {e}")
+            finally:
+                try:
+                    await pubsub.aclose()
+                except Exception:
+                    pass
+            await asyncio.sleep(1)
+
+    def _deliver(self, message: Dict[str, Any]) -> None:
+        doctor_id = message["doctor_id"]
+        item: FeedMessage = (message["id"], message["event"], message["data"])
+
+        history = self._history.get(doctor_id)
+        if history is None:
+            history = self._history[doctor_id] = deque(maxlen=settings.SSE_HISTORY_SIZE)
+            while len(self._history) > settings.SSE_HISTORY_DOCTORS:
+                self._history.popitem(last=False)
+        else:
+            self._history.move_to_end(doctor_id)
+        history.append(item)
+
+        for queue in list(self._subscribers.get(doctor_id, ())):
+            try:
+                queue.put_nowait(item)
+                self.metrics["delivered"] += 1
+            except asyncio.QueueFull:
+                self.metrics["slow_disconnects"] += 1
+                self._unsubscribe(doctor_id, queue)
+                self._close(queue)
+
+    def check_capacity(self) -> None:
+        """Refuse new subscriptions beyond SSE_MAX_CONNECTIONS per worker"""
+        if self.connections >= settings.SSE_MAX_CONNECTIONS:
+            self.metrics["rejected"] += 1
+            raise ServiceUnavailableException("Too many live connections, retry shortly", retry_after=5)
+
+    def subscribe(self, doctor_id: str, last_event_id: Optional[str] = None) -> Tuple[asyncio.Queue, Optional[List[FeedMessage]]]:
+        """
+        Open a subscription, enforcing SSE_MAX_CONNECTIONS per worker
+
+        Returns the queue and the messages missed since `last_event_id`
+        (None when they are no longer known and the client must resync).
+        The caller must _unsubscribe; stream() does both.
+        """
+        self.check_capacity()
+
+        queue: asyncio.Queue = asyncio.Queue(maxsize=settings.SSE_SUBSCRIBER_QUEUE_SIZE)
+        self._subscribers.setdefault(doctor_id, set()).add(queue)
+        self.connections += 1
+        self.metrics["connections"] = self.connections
+
+        missed: Optional[List[FeedMessage]] = []
+        if last_event_id:
+            history = list(self._history.get(doctor_id, ()))
+            ids = [item[0] for item in history]
+            if last_event_id in ids:
+                missed = history[ids.index(last_event_id) + 1:]
+            else:
+                missed = None
+                self.metrics["resyncs"] += 1
+        return queue, missed
+
+    def _unsubscribe(self, doctor_id: str, queue: asyncio.Queue) -> None:
+        queues = self._subscribers.get(doctor_id)
+        if queues is None or queue not in queues:
+            return
+        queues.discard(queue)
+        if not queues:
+            del self._subscribers[doctor_id]
+        self.connections -= 1
+        self.metrics["connections"] = self.connections
+
+    def _close(self, queue: asyncio.Queue) -> None:
+        # Drop what is queued so the end-of-stream marker fits
+        while not queue.empty():
+            queue.get_nowait()
+        queue.put_nowait(None)
+
+    async def stream(self, doctor_id: str, last_event_id: Optional[str] = None) -> AsyncIterator[bytes]:
+        """
+        SSE frames for one subscription, with heartbeats while idle
+
+        The subscription is opened on the first iteration and closed when the
+        generator ends, so a response never iterated (client gone before the
+        first chunk) holds none. If the worker filled up since the caller's
+        check_capacity, the stream ends after the reconnect delay frame.
+        """
+        try:
+            queue, missed = self.subscribe(doctor_id, last_event_id)
+        except ServiceUnavailableException:
+            yield f"retry: {settings.SSE_RETRY_MS}\n\n".encode()
+            return
+
+        try:
+            yield f"retry: {settings.SSE_RETRY_MS}\n\n".encode()
+            if missed is None:
+                yield format_sse(None, "resync", "{}")
+            else:
+                for item in missed:
+                    yield format_sse(*item)
+
+            while True:
+                try:
+                    item = await asyncio.wait_for(queue.get(), timeout=settings.SSE_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield b": ping\n\n"
+                    continue
+                if item is None:
+                    return
+                yield format_sse(*item)
+        finally:
+            self._unsubscribe(doctor_id, queue)
+
+# Global feed instance
+appointment_feed = AppointmentFeed()
@@ -1,13 +1,55 @@
-from typing import List, Optional, Dict, Any
+import asyncio
+from dataclasses import fields
+from typing import List, Optional, Dict, Any, Tuple
 from datetime import datetime, date, timedelta
 from bson import ObjectId
+from pymongo import ReturnDocument, UpdateOne
+from app.core.config import settings
 from app.core.database import db
-from app.domain.entities.appointment import Appointment, AppointmentStatus, TimeSlot
-from app.core.exceptions import NotFoundException, ValidationException, ConflictException
+from app.core.events import event_bus
+from app.domain.events import AppointmentBooked, AppointmentStatusChanged
+from app.domain.entities.appointment import Appointment, AppointmentRead, AppointmentStatus, TimeSlot, statuses_allowed_before
+from app.domain.entities.base import validate_document, validate_documents
+from app.domain.field_selection import ALL_FIELDS, FieldSelection
+from app.services.summary_service import build_user_summary, attach_summaries, summary_projection
+from app.core.exceptions import NotFoundException, ValidationException, ConflictException, AuthorizationException
+from app.core.timezones import clinic_timezone_name, local_to_utc, utc_to_local, day_bounds_utc, date_to_datetime
+from app.domain.intervals import Interval, IntervalSet, subtract_intervals
+from app.services.reminder_service import reminder_service
+from app.services.schedule_service import schedule_service
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Fields returned after a status transition
+TRANSITION_PROJECTION = {
+    "status": 1,
+    "updated_at": 1,
+    "confirmed_at": 1,
+    "completed_at": 1,
+    "cancelled_at": 1,
+    "cancellation_reason": 1
+}
+
+# Stored fields of an appointment in list views; the other party is added
+# from its embedded snapshot
+APPOINTMENT_LIST_FIELDS = tuple(
+    field.name for field in fields(AppointmentRead) if field.name not in ("doctor", "patient")
+)
+
+# Longest bookable session; bounds the starts_at side of overlap queries
+MAX_APPOINTMENT_MINUTES = 240
+
+# Appointments in these statuses do not hold their slot
+NON_BLOCKING_STATUSES = [AppointmentStatus.CANCELLED, AppointmentStatus.NO_SHOW]
+
+def _to_local_interval(interval: Interval, tz_name: str) -> Interval:
+    """UTC interval as naive clinic-local wall time"""
+    return (
+        utc_to_local(interval[0], tz_name).replace(tzinfo=None),
+        utc_to_local(interval[1], tz_name).replace(tzinfo=None)
+    )
+
 class AppointmentService:
     """Service for managing appointments"""
     
@@ -42,11 +84,28 @@ class AppointmentService:
         if not patient:
             raise NotFoundException("Patient not found")
         
+        # Resolve the slot to absolute times in the clinic's timezone
+        tz_name = clinic_timezone_name(doctor)
+        appointment_date = appointment_data["appointment_date"]
+        appointment_data["timezone"] = tz_name
+        appointment_data["starts_at"] = local_to_utc(appointment_date, appointment_data["time_slot"]["start_time"], tz_name)
+        appointment_data["ends_at"] = local_to_utc(appointment_date, appointment_data["time_slot"]["end_time"], tz_name)
+        
+        duration = appointment_data["ends_at"] - appointment_data["starts_at"]
+        if duration <= timedelta(0) or duration > timedelta(minutes=MAX_APPOINTMENT_MINUTES):
+            raise ValidationException(f"Appointment must last between 1 and {MAX_APPOINTMENT_MINUTES} minutes")
+        
+        # Holidays, vacations and blocked ranges
+        if await schedule_service.is_blocked(
+            appointment_data["doctor_id"], appointment_data["starts_at"], appointment_data["ends_at"]
+        ):
+            raise ValidationException("Doctor is not available at the requested time")
+        
         # Check for conflicts
         await self._check_appointment_conflicts(
             appointment_data["doctor_id"],
-            appointment_data["appointment_date"],
-            appointment_data["time_slot"]
+            appointment_data["starts_at"],
+            appointment_data["ends_at"]
         )
         
         # Validate time slot is within doctor's schedule
@@ -57,10 +116,16 @@ class AppointmentService:
         )
         
         # Prepare appointment data
+        appointment_data["appointment_date"] = date_to_datetime(appointment_date)
+        appointment_data.setdefault("status", AppointmentStatus.PENDING)
         appointment_data["created_at"] = datetime.utcnow()
         appointment_data["updated_at"] = datetime.utcnow()
         appointment_data["doctor_id"] = ObjectId(appointment_data["doctor_id"])
         appointment_data["patient_id"] = ObjectId(appointment_data["patient_id"])
+        if settings.USER_SUMMARIES_ENABLED:
+            # Shown with the appointment; kept current by the summary propagator
+            appointment_data["doctor_summary"] = build_user_summary(doctor)
+            appointment_data["patient_summary"] = build_user_summary(patient)
         
         # Add consultation fee from doctor's profile
         if doctor.get("clinic_info") and doctor["clinic_info"].get("consultation_fee"):
@@ -71,185 +136,457 @@ class AppointmentService:
         result = await self.appointments_collection.insert_one(appointment_data)
         appointment_data["_id"] = result.inserted_id
         
+        # Schedule T-24h / T-2h reminders
+        await reminder_service.schedule_for_appointment(appointment_data, doctor, patient)
+        await event_bus.publish(AppointmentBooked(
+            appointment_id=str(result.inserted_id),
+            doctor_id=str(doctor["_id"]),
+            patient_id=str(appointment_data["patient_id"]),
+            appointment_date=appointment_data["appointment_date"],
+            starts_at=appointment_data["starts_at"]
+        ))
+        
         logger.info(f"Appointment created: {result.inserted_id}")
         return appointment_data
     
     async def get_appointments_by_doctor(self, doctor_id: str, 
                                        start_date: Optional[date] = None,
-                                       end_date: Optional[date] = None) -> List[Dict[str, Any]]:
-        """Get appointments for a doctor"""
+                                       end_date: Optional[date] = None,
+                                       tz_name: Optional[str] = None,
+                                       selection: FieldSelection = ALL_FIELDS) -> List[AppointmentRead]:
+        """
+        Get appointments for a doctor
+        
+        The patient is populated unless `selection` says otherwise; with sparse
+        fields the rows are dicts of those fields.
+        """
         query = {"doctor_id": ObjectId(doctor_id)}
         
         if start_date and end_date:
-            query["appointment_date"] = {
-                "$gte": start_date,
-                "$lte": end_date
-            }
-        
-        appointments = await self.appointments_collection.find(query).sort("appointment_date", 1).to_list(None)
-        
-        # Populate patient information
-        for appointment in appointments:
-            patient = await self.patients_collection.find_one(
-                {"_id": appointment["patient_id"]},
-                {"password_hash": 0}  # Exclude sensitive data
-            )
-            appointment["patient"] = patient
-            appointment["_id"] = str(appointment["_id"])
-            appointment["doctor_id"] = str(appointment["doctor_id"])
-            appointment["patient_id"] = str(appointment["patient_id"])
+            range_start, range_end = day_bounds_utc(start_date, end_date, tz_name)
+            query["starts_at"] = {"$gte": range_start, "$lt": range_end}
+        
+        expand = selection.expands(("patient",))
+        appointments = await self.appointments_collection.find(
+            query, summary_projection(selection, expand)
+        ).sort("starts_at", 1).to_list(None)
+        
+        # Doctor/patient information from the embedded snapshots
+        for role in expand:
+            await attach_summaries(appointments, role)
         
-        return appointments
+        return validate_documents(AppointmentRead, appointments, selection.response_fields(expand))
     
     async def get_appointments_by_patient(self, patient_id: str,
                                         start_date: Optional[date] = None,
-                                        end_date: Optional[date] = None) -> List[Dict[str, Any]]:
-        """Get appointments for a patient"""
+                                        end_date: Optional[date] = None,
+                                        tz_name: Optional[str] = None,
+                                        selection: FieldSelection = ALL_FIELDS) -> List[AppointmentRead]:
+        """
+        Get appointments for a patient
+        
+        The doctor is populated unless `selection` says otherwise; with sparse
+        fields the rows are dicts of those fields.
+        """
         query = {"patient_id": ObjectId(patient_id)}
         
         if start_date and end_date:
-            query["appointment_date"] = {
-                "$gte": start_date,
-                "$lte": end_date
-            }
+            range_start, range_end = day_bounds_utc(start_date, end_date, tz_name)
+            query["starts_at"] = {"$gte": range_start, "$lt": range_end}
         
-        appointments = await self.appointments_collection.find(query).sort("appointment_date", 1).to_list(None)
+        expand = selection.expands(("doctor",))
+        appointments = await self.appointments_collection.find(
+            query, summary_projection(selection, expand)
+        ).sort("starts_at", 1).to_list(None)
         
-        # Populate doctor information
-        for appointment in appointments:
-            doctor = await self.doctors_collection.find_one(
-                {"_id": appointment["doctor_id"]},
-                {"password_hash": 0}  # Exclude sensitive data
-            )
-            appointment["doctor"] = doctor
-            appointment["_id"] = str(appointment["_id"])
-            appointment["doctor_id"] = str(appointment["doctor_id"])
-            appointment["patient_id"] = str(appointment["patient_id"])
+        # Doctor/patient information from the embedded snapshots
+        for role in expand:
+            await attach_summaries(appointments, role)
         
-        return appointments
+        return validate_documents(AppointmentRead, appointments, selection.response_fields(expand))
     
-    async def get_appointment_by_id(self, appointment_id: str) -> Optional[Dict[str, Any]]:
+    async def get_appointments_by_ids(self, appointment_ids: List[str], user_id: str,
+                                      role: str) -> Tuple[List[AppointmentRead], List[str]]:
+        """
+        List views of many appointments of a doctor or patient in one $in query
+        
+        Only the user's own appointments are returned, with the other party
+        populated. Returns them in the order of `appointment_ids`, and the ids
+        that are invalid, unknown or not the user's.
+        """
+        own_field, other_role = ("doctor_id", "patient") if role == "doctor" else ("patient_id", "doctor")
+        object_ids = [ObjectId(appointment_id) for appointment_id in appointment_ids if ObjectId.is_valid(appointment_id)]
+        
+        appointments = []
+        if object_ids:
+            projection = {field: 1 for field in APPOINTMENT_LIST_FIELDS}
+            projection[f"{other_role}_summary"] = 1
+            appointments = await self.appointments_collection.find(
+                {"_id": {"$in": object_ids}, own_field: ObjectId(user_id)}, projection
+            ).to_list(None)
+            await attach_summaries(appointments, other_role)
+        
+        found = {appointment._id: appointment for appointment in validate_documents(AppointmentRead, appointments)}
+        ordered = [found[appointment_id] for appointment_id in appointment_ids if appointment_id in found]
+        missing = [appointment_id for appointment_id in appointment_ids if appointment_id not in found]
+        return ordered, missing
+    
+    async def get_appointment_by_id(self, appointment_id: str) -> Optional[AppointmentRead]:
         """Get appointment by ID with populated data"""
         appointment = await self.appointments_collection.find_one({"_id": ObjectId(appointment_id)})
         
         if not appointment:
             return None
         
-        # Populate doctor and patient information
-        doctor = await self.doctors_collection.find_one(
-            {"_id": appointment["doctor_id"]},
-            {"password_hash": 0}
-        )
-        patient = await self.patients_collection.find_one(
-            {"_id": appointment["patient_id"]},
-            {"password_hash": 0}
-        )
-        
-        appointment["doctor"] = doctor
-        appointment["patient"] = patient
-        appointment["_id"] = str(appointment["_id"])
-        appointment["doctor_id"] = str(appointment["doctor_id"])
-        appointment["patient_id"] = str(appointment["patient_id"])
+        # Doctor and patient information from the embedded snapshots
+        await attach_summaries([appointment], "doctor")
+        await attach_summaries([appointment], "patient")
         
-        return appointment
+        return validate_document(AppointmentRead, appointment)
     
-    async def update_appointment_status(self, appointment_id: str, 
-                                      new_status: AppointmentStatus,
-                                      user_id: str) -> bool:
-        """Update appointment status"""
+    def _transition_update(self, new_status: AppointmentStatus, user_id: str,
+                           reason: Optional[str] = None) -> Dict[str, Any]:
+        """Build the $set document for a status transition"""
+        now = datetime.utcnow()
         update_data = {
             "status": new_status,
-            "updated_at": datetime.utcnow()
+            "updated_at": now
         }
         
         if new_status == AppointmentStatus.CONFIRMED:
-            update_data["confirmed_at"] = datetime.utcnow()
+            update_data["confirmed_at"] = now
         elif new_status == AppointmentStatus.COMPLETED:
-            update_data["completed_at"] = datetime.utcnow()
+            update_data["completed_at"] = now
         elif new_status == AppointmentStatus.CANCELLED:
-            update_data["cancelled_at"] = datetime.utcnow()
+            update_data["cancelled_at"] = now
             update_data["cancelled_by"] = ObjectId(user_id)
+            if reason is not None:
+                update_data["cancellation_reason"] = reason
+        
+        return update_data
+    
+    async def transition_appointment(self, appointment_id: str,
+                                     new_status: AppointmentStatus,
+                                     user_id: str,
+                                     doctor_only: bool = True,
+                                     reason: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Apply a status transition in a single round trip
+        
+        Ownership and the allowed-from statuses are part of the update filter,
+        so concurrent transitions cannot both succeed. The follow-up read only
+        runs on failure, to report why.
+        """
+        owner_filter = (
+            {"doctor_id": ObjectId(user_id)} if doctor_only
+            else {"$or": [{"doctor_id": ObjectId(user_id)}, {"patient_id": ObjectId(user_id)}]}
+        )
         
-        result = await self.appointments_collection.update_one(
+        appointment = await self.appointments_collection.find_one_and_update(
+            {
+                "_id": ObjectId(appointment_id),
+                "status": {"$in": statuses_allowed_before(new_status)},
+                **owner_filter
+            },
+            {"$set": self._transition_update(new_status, user_id, reason)},
+            projection={**TRANSITION_PROJECTION, "doctor_id": 1, "appointment_date": 1},
+            return_document=ReturnDocument.AFTER
+        )
+        
+        if appointment:
+            appointment["_id"] = str(appointment["_id"])
+            doctor_id = appointment.pop("doctor_id")
+            appointment_date = appointment.pop("appointment_date")
+            if new_status == AppointmentStatus.CANCELLED:
+                await reminder_service.cancel_for_appointments([appointment_id])
+            await event_bus.publish(AppointmentStatusChanged(
+                appointment_ids=(appointment_id,),
+                doctor_id=str(doctor_id),
+                status=new_status.value,
+                appointment_dates=(appointment_date,)
+            ))
+            return appointment
+        
+        existing = await self.appointments_collection.find_one(
             {"_id": ObjectId(appointment_id)},
-            {"$set": update_data}
+            {"doctor_id": 1, "patient_id": 1, "status": 1}
         )
+        if not existing:
+            raise NotFoundException("Appointment not found")
         
-        return result.modified_count > 0
+        owners = [existing["doctor_id"]] if doctor_only else [existing["doctor_id"], existing["patient_id"]]
+        if ObjectId(user_id) not in owners:
+            raise AuthorizationException("Access denied")
+        
+        current = existing.get("status")
+        if isinstance(current, AppointmentStatus):
+            current = current.value
+        raise ConflictException(f"Cannot change appointment from {current or 'no status'} to {new_status.value}")
     
-    async def cancel_appointment(self, appointment_id: str, user_id: str, reason: str) -> bool:
-        """Cancel an appointment"""
-        update_data = {
-            "status": AppointmentStatus.CANCELLED,
-            "cancelled_at": datetime.utcnow(),
-            "cancelled_by": ObjectId(user_id),
-            "cancellation_reason": reason,
-            "updated_at": datetime.utcnow()
+    async def update_appointment_status(self, appointment_id: str, 
+                                      new_status: AppointmentStatus,
+                                      user_id: str) -> Dict[str, Any]:
+        """Update appointment status (as the appointment's doctor)"""
+        return await self.transition_appointment(appointment_id, new_status, user_id)
+    
+    async def cancel_appointment(self, appointment_id: str, user_id: str, reason: str) -> Dict[str, Any]:
+        """Cancel an appointment (as its doctor or patient)"""
+        return await self.transition_appointment(
+            appointment_id, AppointmentStatus.CANCELLED, user_id,
+            doctor_only=False, reason=reason
+        )
+    
+    async def bulk_update_status(self, doctor_id: str,
+                                 items: List[Tuple[str, AppointmentStatus]]) -> List[Dict[str, Any]]:
+        """
+        Apply many guarded status transitions for one doctor
+        
+        All updates go out in one unordered bulk_write; each is tagged with a
+        per-call marker so a single read-back can report per-item results.
+        Returns one result per input item, in order.
+        """
+        bulk_op_id = ObjectId()
+        results: List[Dict[str, Any]] = []
+        operations = []
+        seen = set()
+        
+        for appointment_id, new_status in items:
+            result = {"appointment_id": appointment_id, "status": new_status.value}
+            results.append(result)
+            
+            if not ObjectId.is_valid(appointment_id):
+                result["result"] = "invalid_id"
+                continue
+            if appointment_id in seen:
+                result["result"] = "duplicate"
+                continue
+            seen.add(appointment_id)
+            
+            update_data = self._transition_update(new_status, doctor_id)
+            update_data["last_bulk_op_id"] = bulk_op_id
+            operations.append(UpdateOne(
+                {
+                    "_id": ObjectId(appointment_id),
+                    "doctor_id": ObjectId(doctor_id),
+                    "status": {"$in": statuses_allowed_before(new_status)}
+                },
+                {"$set": update_data}
+            ))
+        
+        if not operations:
+            return results
+        
+        await self.appointments_collection.bulk_write(operations, ordered=False)
+        
+        # Read back once to classify every item
+        current = {
+            str(doc["_id"]): doc
+            for doc in await self.appointments_collection.find(
+                {"_id": {"$in": [ObjectId(i) for i in seen]}},
+                {"doctor_id": 1, "status": 1, "last_bulk_op_id": 1}
+            ).to_list(None)
         }
         
-        result = await self.appointments_collection.update_one(
-            {"_id": ObjectId(appointment_id)},
-            {"$set": update_data}
-        )
+        updated_by_status: Dict[str, List[str]] = {}
+        for result in results:
+            if "result" in result:
+                continue
+            doc = current.get(result["appointment_id"])
+            if not doc or doc["doctor_id"] != ObjectId(doctor_id):
+                result["result"] = "not_found"
+            elif doc.get("last_bulk_op_id") == bulk_op_id:
+                result["result"] = "updated"
+                updated_by_status.setdefault(doc["status"], []).append(result["appointment_id"])
+            else:
+                result["result"] = "invalid_transition"
+                result["current_status"] = doc["status"]
+        
+        await reminder_service.cancel_for_appointments(updated_by_status.get(AppointmentStatus.CANCELLED, []))
+        for status, appointment_ids in updated_by_status.items():
+            await event_bus.publish(AppointmentStatusChanged(
+                appointment_ids=tuple(appointment_ids),
+                doctor_id=doctor_id,
+                status=status
+            ))
+        
+        return results
+    
+    async def find_appointment_ids_for_bulk(self, doctor_id: str,
+                                            appointment_date: date,
+                                            target_status: AppointmentStatus,
+                                            current_statuses: Optional[List[AppointmentStatus]] = None,
+                                            before_time: Optional[str] = None,
+                                            tz_name: Optional[str] = None) -> List[str]:
+        """Resolve a bulk filter (e.g. "confirmed today before 14:00") to appointment ids"""
+        allowed = statuses_allowed_before(target_status)
+        if current_statuses:
+            allowed = [status for status in current_statuses if status in allowed]
+        
+        day_start, day_end = day_bounds_utc(appointment_date, tz_name=tz_name)
+        if before_time:
+            day_end = min(day_end, local_to_utc(appointment_date, before_time, tz_name or clinic_timezone_name()))
+        
+        # Served by (doctor_id, starts_at)
+        query = {
+            "doctor_id": ObjectId(doctor_id),
+            "starts_at": {"$gte": day_start, "$lt": day_end},
+            "status": {"$in": allowed}
+        }
         
-        return result.modified_count > 0
+        docs = await self.appointments_collection.find(query, {"_id": 1}).to_list(None)
+        return [str(doc["_id"]) for doc in docs]
+    
+    async def cancel_appointments_in_range(self, doctor: Dict[str, Any],
+                                           starts_at: datetime,
+                                           ends_at: datetime,
+                                           reason: str) -> int:
+        """
+        Cancel every open booking of a doctor overlapping a blocked range
+        
+        One update_many tagged with a per-call marker; the marker read-back
+        gives exactly the appointments this call cancelled, whose patients are
+        then notified through the reminder queue. Returns how many were cancelled.
+        """
+        doctor_id = str(doctor["_id"])
+        bulk_op_id = ObjectId()
+        update_data = self._transition_update(AppointmentStatus.CANCELLED, doctor_id, reason)
+        update_data["last_bulk_op_id"] = bulk_op_id
+        
+        query = self._overlap_query(doctor_id, starts_at, ends_at)
+        query["status"] = {"$in": statuses_allowed_before(AppointmentStatus.CANCELLED)}
+        
+        result = await self.appointments_collection.update_many(query, {"$set": update_data})
+        if not result.modified_count:
+            return 0
+        
+        cancelled = await self.appointments_collection.find(
+            {"doctor_id": ObjectId(doctor_id), "last_bulk_op_id": bulk_op_id},
+            {"patient_id": 1, "appointment_date": 1, "time_slot": 1}
+        ).to_list(None)
+        
+        await reminder_service.cancel_for_appointments([str(doc["_id"]) for doc in cancelled])
+        await reminder_service.enqueue_cancellation_notices(cancelled, doctor, reason)
+        await event_bus.publish(AppointmentStatusChanged(
+            appointment_ids=tuple(str(doc["_id"]) for doc in cancelled),
+            doctor_id=doctor_id,
+            status=AppointmentStatus.CANCELLED.value,
+            appointment_dates=tuple(sorted({doc["appointment_date"] for doc in cancelled}))
+        ))
+        
+        logger.info(f"Cancelled {len(cancelled)} appointments of doctor {doctor_id} in blocked range")
+        return len(cancelled)
     
     async def get_doctor_available_slots(self, doctor_id: str, date_str: str) -> List[TimeSlot]:
         """Get available time slots for a doctor on a specific date"""
         target_date = datetime.strptime(date_str, "%Y-%m-%d").date()
         
-        # Get doctor's schedule for the day
-        doctor = await self.doctors_collection.find_one({"_id": ObjectId(doctor_id)})
-        if not doctor or not doctor.get("clinic_info"):
-            return []
+        slots = await self.get_doctor_available_slots_range(doctor_id, target_date, target_date)
+        return (slots or {}).get(target_date, [])
+    
+    async def get_doctor_available_slots_range(self, doctor_id: str,
+                                               start_date: date,
+                                               end_date: date,
+                                               doctor: Optional[Dict[str, Any]] = None) -> Optional[Dict[date, List[TimeSlot]]]:
+        """
+        Available time slots per day over a date range
+        
+        Two round trips however long the range: the doctor's schedule, then
+        bookings and schedule exceptions for the whole range in parallel.
+        Time off is subtracted from the working windows and bookings of any
+        length are excluded by interval overlap. Returns None if the doctor
+        does not exist. Callers that already hold the doctor can pass it.
+        """
+        if doctor is None:
+            doctor = await self.doctors_collection.find_one(
+                {"_id": ObjectId(doctor_id), "role": "doctor"},
+                {"clinic_info": 1}
+            )
+        if not doctor:
+            return None
         
-        clinic_info = doctor["clinic_info"]
-        day_name = target_date.strftime("%A").lower()
+        clinic_info = doctor.get("clinic_info") or {}
+        schedule = clinic_info.get("schedule", {})
+        session = timedelta(minutes=clinic_info.get("session_duration", 30))
+        tz_name = clinic_timezone_name(doctor)
         
-        if day_name not in clinic_info.get("schedule", {}):
-            return []
+        range_start, range_end = day_bounds_utc(start_date, end_date, tz_name)
+        booked, blocked = await asyncio.gather(
+            self._get_booked_intervals(doctor_id, range_start, range_end),
+            schedule_service.get_exception_intervals(doctor_id, range_start, range_end)
+        )
         
-        day_schedule = clinic_info["schedule"][day_name]
-        if not day_schedule.get("is_working", False):
-            return []
+        # Slots are generated in clinic wall time; convert the stored UTC intervals once
+        booked = IntervalSet(_to_local_interval(interval, tz_name) for interval in booked)
+        blocked = sorted(_to_local_interval(interval, tz_name) for interval in blocked)
         
-        # Get session duration
-        session_duration = clinic_info.get("session_duration", 30)
+        available: Dict[date, List[TimeSlot]] = {}
+        day = start_date
+        while day <= end_date:
+            available[day] = self._generate_day_slots(day, schedule, session, booked, blocked)
+            day += timedelta(days=1)
         
-        # Generate available slots
-        available_slots = []
+        return available
+    
+    def _generate_day_slots(self, day: date,
+                            schedule: Dict[str, Any],
+                            session: timedelta,
+                            booked: IntervalSet,
+                            blocked: List[Interval]) -> List[TimeSlot]:
+        """Free slots of one day from the weekly template"""
+        day_schedule = schedule.get(day.strftime("%A").lower())
+        if not day_schedule or not day_schedule.get("is_working", False):
+            return []
+        
+        slots = []
         for time_slot in day_schedule.get("time_slots", []):
-            start_time = datetime.strptime(time_slot["start_time"], "%H:%M").time()
-            end_time = datetime.strptime(time_slot["end_time"], "%H:%M").time()
-            
-            # Generate slots within this time range
-            current_time = datetime.combine(target_date, start_time)
-            end_datetime = datetime.combine(target_date, end_time)
+            window_start = datetime.combine(day, datetime.strptime(time_slot["start_time"], "%H:%M").time())
+            window_end = datetime.combine(day, datetime.strptime(time_slot["end_time"], "%H:%M").time())
             
-            while current_time + timedelta(minutes=session_duration) <= end_datetime:
-                slot_end = current_time + timedelta(minutes=session_duration)
+            # Cut time off out of the working window; slots stay on the window's grid
+            for free_start, free_end in subtract_intervals([(window_start, window_end)], blocked):
+                current = window_start + -(-(free_start - window_start) // session) * session
                 
-                time_slot_obj = TimeSlot(
-                    start_time=current_time.strftime("%H:%M"),
-                    end_time=slot_end.strftime("%H:%M")
-                )
-                
-                # Check if slot is available (not booked)
-                if await self._is_slot_available(doctor_id, target_date, time_slot_obj):
-                    available_slots.append(time_slot_obj)
-                
-                current_time = slot_end
-        
-        return available_slots
+                while current + session <= free_end:
+                    slot_end = current + session
+                    if not booked.overlaps(current, slot_end):
+                        slots.append(TimeSlot(
+                            start_time=current.strftime("%H:%M"),
+                            end_time=slot_end.strftime("%H:%M")
+                        ))
+                    current = slot_end
+        
+        return slots
     
-    async def _check_appointment_conflicts(self, doctor_id: str, appointment_date: date, time_slot: Dict[str, str]):
-        """Check for appointment conflicts"""
-        existing = await self.appointments_collection.find_one({
+    def _overlap_query(self, doctor_id: str, starts_at: datetime, ends_at: datetime) -> Dict[str, Any]:
+        """
+        Bookings overlapping [starts_at, ends_at): start < ends_at and end > starts_at
+        
+        The extra lower bound on starts_at (no session is longer than
+        MAX_APPOINTMENT_MINUTES) keeps the scan on (doctor_id, starts_at) narrow.
+        """
+        return {
             "doctor_id": ObjectId(doctor_id),
-            "appointment_date": appointment_date,
-            "time_slot.start_time": time_slot["start_time"],
-            "status": {"$nin": [AppointmentStatus.CANCELLED, AppointmentStatus.NO_SHOW]}
-        })
+            "starts_at": {
+                "$gt": starts_at - timedelta(minutes=MAX_APPOINTMENT_MINUTES),
+                "$lt": ends_at
+            },
+            "ends_at": {"$gt": starts_at},
+            "status": {"$nin": NON_BLOCKING_STATUSES}
+        }
+    
+    async def _get_booked_intervals(self, doctor_id: str, range_start: datetime, range_end: datetime) -> IntervalSet:
+        """Booked intervals of a doctor overlapping a time range"""
+        docs = await self.appointments_collection.find(
+            self._overlap_query(doctor_id, range_start, range_end),
+            {"_id": 0, "starts_at": 1, "ends_at": 1}
+        ).to_list(None)
+        return IntervalSet((doc["starts_at"], doc["ends_at"]) for doc in docs)
+    
+    async def _check_appointment_conflicts(self, doctor_id: str, starts_at: datetime, ends_at: datetime):
+        """Check for appointment conflicts"""
+        existing = await self.appointments_collection.find_one(
+            self._overlap_query(doctor_id, starts_at, ends_at), {"_id": 1}
+        )
         
         if existing:
             raise ConflictException("Time slot already booked")
@@ -286,17 +623,6 @@ class AppointmentService:
         
         if not is_valid_time:
             raise ValidationException("Requested time is outside doctor's working hours")
-    
-    async def _is_slot_available(self, doctor_id: str, date: date, time_slot: TimeSlot) -> bool:
-        """Check if a time slot is available"""
-        existing = await self.appointments_collection.find_one({
-            "doctor_id": ObjectId(doctor_id),
-            "appointment_date": date,
-            "time_slot.start_time": time_slot.start_time,
-            "status": {"$nin": [AppointmentStatus.CANCELLED, AppointmentStatus.NO_SHOW]}
-        })
-        
-        return existing is None
 
 # Global service instance
 appointment_service = AppointmentService()
\ No newline at end of file
@@ -0,0 +1,186 @@
+import asyncio
+import random
+import time
+from typing import Optional, Dict, Any, List
+from datetime import datetime, timedelta
+from app.core.config import settings
+from app.core.database import db
+from app.core.events import event_bus
+from app.core.locks import LeaderLock
+from app.core.timezones import day_bounds_utc, utc_to_local
+from app.domain.entities.appointment import AppointmentStatus
+from app.domain.events import AppointmentStatusChanged
+import logging
+
+logger = logging.getLogger(__name__)
+
+EXPIRED_REASON = "Expired: not confirmed before the appointment time"
+
+# (current status, new status, extra fields) applied to appointments in the past
+SWEEP_RULES = [
+    (AppointmentStatus.CONFIRMED, AppointmentStatus.NO_SHOW, {}),
+    (AppointmentStatus.PENDING, AppointmentStatus.CANCELLED, {"cancellation_reason": EXPIRED_REASON}),
+]
+
+class AppointmentSweeper:
+    """
+    Background job that closes out stale appointments
+
+    Confirmed appointments of past days become no-shows and pending requests
+    that were never confirmed are expired (cancelled). A day is left alone
+    until it is over in the appointment's clinic timezone (plus
+    SWEEPER_GRACE_MINUTES), so doctors can close it out themselves, e.g.
+    with a bulk "completed" at the end of the day. Runs on an interval
+    with jitter, only on the worker holding the leader lock, in bounded
+    batches within a per-run time budget.
+    """
+
+    def __init__(self):
+        self.appointments_collection = None
+        self.lock = LeaderLock("appointment_sweeper", lease_seconds=settings.SWEEPER_INTERVAL_SECONDS * 2)
+        self._task: Optional[asyncio.Task] = None
+        self.metrics: Dict[str, Any] = {
+            "is_leader": False,
+            "last_run_at": None,
+            "last_run_duration_ms": None,
+            "last_run_transitioned": 0,
+            "total_transitioned": 0,
+            "backlog_oldest_due_at": None,
+            "lag_seconds": 0.0
+        }
+
+    async def init(self):
+        """Initialize collections"""
+        self.appointments_collection = db.get_collection("appointments")
+
+    def start(self):
+        """Start the sweep loop"""
+        if settings.SWEEPER_ENABLED and self._task is None:
+            self._task = asyncio.create_task(self._run())
+            logger.info("Appointment sweeper started")
+
+    async def stop(self):
+        """Stop the sweep loop and release the lock"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.lock.release()
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(
+                settings.SWEEPER_INTERVAL_SECONDS + random.uniform(0, settings.SWEEPER_JITTER_SECONDS)
+            )
+            try:
+                self.metrics["is_leader"] = await self.lock.acquire()
+                if self.metrics["is_leader"]:
+                    await self.sweep()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Appointment sweep failed: {e}", exc_info=True)
+
+    def _cutoff(self, tz_name: str, now: datetime) -> datetime:
+        """Start (UTC) of the newest clinic-local day that is not yet sweepable"""
+        local_day = utc_to_local(now - timedelta(minutes=settings.SWEEPER_GRACE_MINUTES), tz_name).date()
+        return day_bounds_utc(local_day, tz_name=tz_name)[0]
+
+    async def _due_filter(self, status: AppointmentStatus) -> Dict[str, Any]:
+        """
+        Appointments in `status` whose clinic-local day is over
+
+        Appointments store their clinic's timezone, and each timezone among
+        the ended ones gets its own cutoff (its local midnight); ones without
+        a timezone use CLINIC_TIMEZONE. Served by (status, ends_at).
+        """
+        now = datetime.utcnow()
+        ended = {"status": status, "ends_at": {"$lt": now}}
+        # Missing timezones are not listed by distinct
+        timezones = {None, *await self.appointments_collection.distinct("timezone", ended)}
+        return {"status": status, "$or": [
+            {"timezone": tz_name, "ends_at": {"$lt": self._cutoff(tz_name or settings.CLINIC_TIMEZONE, now)}}
+            for tz_name in sorted(timezones, key=str)
+        ]}
+
+    async def _publish_changes(self, batch: List[Dict[str, Any]], new_status: AppointmentStatus) -> None:
+        # One event per doctor; ids a concurrent transition won are included,
+        # which subscribers tolerate since they re-read what they derive
+        by_doctor: Dict[str, List[str]] = {}
+        for doc in batch:
+            by_doctor.setdefault(str(doc["doctor_id"]), []).append(str(doc["_id"]))
+        for doctor_id, appointment_ids in by_doctor.items():
+            await event_bus.publish(AppointmentStatusChanged(
+                appointment_ids=tuple(appointment_ids),
+                doctor_id=doctor_id,
+                status=new_status.value
+            ))
+
+    async def sweep(self) -> int:
+        """Run one sweep; returns the number of appointments transitioned"""
+        started = time.monotonic()
+        deadline = started + settings.SWEEPER_TIME_BUDGET_SECONDS
+        transitioned = 0
+
+        for current_status, new_status, extra in SWEEP_RULES:
+            due = await self._due_filter(current_status)
+            while time.monotonic() < deadline:
+                batch = await self.appointments_collection.find(
+                    due, {"_id": 1, "doctor_id": 1}
+                ).sort("ends_at", 1).limit(settings.SWEEPER_BATCH_SIZE).to_list(None)
+
+                if not batch:
+                    break
+
+                now = datetime.utcnow()
+                update_data = {"status": new_status, "updated_at": now, **extra}
+                if new_status == AppointmentStatus.CANCELLED:
+                    update_data["cancelled_at"] = now
+
+                # Re-check the status so concurrent user transitions win
+                result = await self.appointments_collection.update_many(
+                    {"_id": {"$in": [doc["_id"] for doc in batch]}, "status": current_status},
+                    {"$set": update_data}
+                )
+                transitioned += result.modified_count
+                if result.modified_count:
+                    await self._publish_changes(batch, new_status)
+
+                if len(batch) < settings.SWEEPER_BATCH_SIZE:
+                    break
+
+        await self._update_lag_metrics()
+
+        self.metrics["last_run_at"] = datetime.utcnow()
+        self.metrics["last_run_duration_ms"] = round((time.monotonic() - started) * 1000, 1)
+        self.metrics["last_run_transitioned"] = transitioned
+        self.metrics["total_transitioned"] += transitioned
+
+        if transitioned:
+            logger.info(f"Appointment sweeper transitioned {transitioned} appointments")
+        return transitioned
+
+    async def _update_lag_metrics(self):
+        """Record how far behind the sweeper is (age of the oldest due appointment)"""
+        due_at = None
+        for current_status, _, _ in SWEEP_RULES:
+            doc = await self.appointments_collection.find_one(
+                await self._due_filter(current_status), {"ends_at": 1, "timezone": 1}, sort=[("ends_at", 1)]
+            )
+            if doc:
+                # Due once the grace period after the end of its clinic-local day passes
+                tz_name = doc.get("timezone") or settings.CLINIC_TIMEZONE
+                local_day = utc_to_local(doc["ends_at"], tz_name).date()
+                doc_due_at = day_bounds_utc(local_day, tz_name=tz_name)[1] + timedelta(minutes=settings.SWEEPER_GRACE_MINUTES)
+                due_at = doc_due_at if due_at is None else min(due_at, doc_due_at)
+
+        self.metrics["backlog_oldest_due_at"] = due_at
+        self.metrics["lag_seconds"] = (
+            round(max(0.0, (datetime.utcnow() - due_at).total_seconds()), 1) if due_at else 0.0
+        )
+
+# Global sweeper instance
+appointment_sweeper = AppointmentSweeper()
@@ -1,12 +1,51 @@
+import asyncio
+import re
+import secrets
 from typing import Optional, Dict, Any
 from datetime import datetime, timedelta
 from bson import ObjectId
+from pymongo.errors import DuplicateKeyError
 from app.core.database import db
 from app.core.config import settings
+from app.core.events import event_bus
+from app.core.exceptions import ConflictException
+from app.core.security import hash_verification_token
+from app.domain.events import UserRegistered, UserUpdated
 import logging
 
 logger = logging.getLogger(__name__)
 
+def normalize_email(email: str) -> str:
+    """Canonical form stored and matched by the unique email index"""
+    return email.strip().lower()
+
+def normalize_phone_number(phone_number: str) -> str:
+    """Digits only, so "0933 123-456" and "0933123456" are the same account"""
+    return re.sub(r"\D", "", phone_number)
+
+def normalize_country_code(country_code: str) -> str:
+    return "+" + re.sub(r"\D", "", country_code)
+
+def phone_identifier_filter(identifier: str) -> Optional[Dict[str, Any]]:
+    """
+    Users filter on (country_code, phone_number) for a phone identifier
+
+    "+<country code><number>" is split at the country code; anything else is
+    a national number in DEFAULT_COUNTRY_CODE. Country codes are one to
+    three digits and prefix-free (E.164), so at most one of the candidate
+    splits names a real country. Each is an exact match on the unique index.
+    None if the identifier has no digits.
+    """
+    digits = normalize_phone_number(identifier)
+    if not digits:
+        return None
+    if not identifier.strip().startswith("+"):
+        return {"country_code": normalize_country_code(settings.DEFAULT_COUNTRY_CODE), "phone_number": digits}
+    return {"$or": [
+        {"country_code": f"+{digits[:length]}", "phone_number": digits[length:]}
+        for length in (1, 2, 3) if len(digits) > length
+    ]}
+
 class AuthService:
     """Authentication service"""
     
@@ -17,8 +56,15 @@ class AuthService:
         self.users_collection = db.get_collection("users")
         self.tokens_collection = db.get_collection("verification_tokens")
     
-    async def create_user(self, user_data: Dict[str, Any]) -> Dict[str, Any]:
-        """Create a new user"""
+    def _prepare_user(self, user_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Normalize contact fields and set defaults for a new user document"""
+        if user_data.get("email"):
+            user_data["email"] = normalize_email(user_data["email"])
+        if user_data.get("phone_number"):
+            user_data["phone_number"] = normalize_phone_number(user_data["phone_number"])
+        if user_data.get("country_code"):
+            user_data["country_code"] = normalize_country_code(user_data["country_code"])
+        
         user_data["created_at"] = datetime.utcnow()
         user_data["updated_at"] = datetime.utcnow()
         
@@ -27,19 +73,67 @@ class AuthService:
             "phone_verification_required": settings.PHONE_VERIFICATION_ENABLED,
             "document_verification_required": not settings.AUTO_APPROVE_DOCUMENTS
         }
+        return user_data
+    
+    async def create_user(self, user_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Create a new user"""
+        self._prepare_user(user_data)
         
-        result = await self.users_collection.insert_one(user_data)
+        try:
+            result = await self.users_collection.insert_one(user_data)
+        except DuplicateKeyError:
+            raise ConflictException("User already exists with this email/phone")
         user_data["_id"] = result.inserted_id
+        await event_bus.publish(UserRegistered(user_id=str(result.inserted_id), role=user_data.get("role")))
         return user_data
     
-    async def find_user_by_identifier(self, identifier: str) -> Optional[Dict[str, Any]]:
-        """Find user by email or phone number"""
+    async def register_user(self, user_data: Dict[str, Any], otp: str) -> Dict[str, Any]:
+        """
+        Create a user together with its first OTP
+        
+        No lookup first: the unique indexes on email and (country_code,
+        phone_number) reject duplicates, including concurrent ones. The id is
+        generated up front so the user and OTP writes go out together.
+        
+        Not a transaction: an OTP is only reachable through its user, so one
+        left by a rejected user insert is never matched (and is deleted, or
+        expires by TTL), and a user whose OTP failed to store can resend.
+        """
+        self._prepare_user(user_data)
+        user_data["_id"] = ObjectId()
+        
+        user_result, otp_result = await asyncio.gather(
+            self.users_collection.insert_one(user_data),
+            self.tokens_collection.insert_one(self._otp_document(user_data["_id"], otp)),
+            return_exceptions=True
+        )
+        
+        if isinstance(user_result, Exception):
+            if not isinstance(otp_result, Exception):
+                # Orphaned OTP of a rejected registration (TTL would also remove it)
+                await self.tokens_collection.delete_one({"user_id": user_data["_id"], "type": "otp"})
+            if isinstance(user_result, DuplicateKeyError):
+                raise ConflictException("User already exists with this email/phone")
+            raise user_result
+        if isinstance(otp_result, Exception):
+            # The account exists; the user can request a new code
+            logger.error(f"Failed to store OTP for new user {user_data['_id']}: {otp_result}")
+        
+        await event_bus.publish(UserRegistered(user_id=str(user_data["_id"]), role=user_data.get("role")))
+        return user_data
+    
+    async def find_user_by_identifier(self, identifier: str,
+                                      projection: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        """Find user by email or phone number (see phone_identifier_filter)"""
         if "@" in identifier:
             # Email lookup
-            return await self.users_collection.find_one({"email": identifier})
-        else:
-            # Phone lookup
-            return await self.users_collection.find_one({"phone_number": identifier})
+            return await self.users_collection.find_one({"email": normalize_email(identifier)}, projection)
+        
+        # Phone lookup, scoped to the country: national numbers repeat across countries
+        query = phone_identifier_filter(identifier)
+        if query is None:
+            return None
+        return await self.users_collection.find_one(query, projection)
     
     async def get_user_by_id(self, user_id: str) -> Optional[Dict[str, Any]]:
         """Get user by ID"""
@@ -55,43 +149,111 @@ class AuthService:
             {"_id": ObjectId(user_id)},
             {"$set": update_data}
         )
+        if result.modified_count:
+            await event_bus.publish(UserUpdated(user_id=user_id, fields=tuple(update_data)))
         return result.modified_count > 0
     
     async def store_otp(self, user_id: str, otp: str) -> None:
-        """Store OTP for verification"""
-        await self.tokens_collection.insert_one({
-            "user_id": ObjectId(user_id),
-            "token": otp,
+        """Store OTP for verification, replacing any previous one"""
+        # Only one live OTP per user, so verification is a single-document match
+        await self.tokens_collection.delete_many({"user_id": ObjectId(user_id), "type": "otp"})
+        await self.tokens_collection.insert_one(self._otp_document(ObjectId(user_id), otp))
+    
+    def _otp_document(self, user_id: ObjectId, otp: str) -> Dict[str, Any]:
+        now = datetime.utcnow()
+        return {
+            "user_id": user_id,
+            "token": hash_verification_token(otp),
             "type": "otp",
-            "created_at": datetime.utcnow(),
-            "expires_at": datetime.utcnow() + timedelta(minutes=settings.OTP_EXPIRY_MINUTES),
+            "created_at": now,
+            "expires_at": now + timedelta(minutes=settings.OTP_EXPIRY_MINUTES),
+            "used_at": None,
             "attempts": 0
-        })
+        }
     
     async def verify_otp(self, identifier: str, otp: str) -> bool:
         """Verify OTP (real implementation)"""
         # Find user first
-        user = await self.find_user_by_identifier(identifier)
+        user = await self.find_user_by_identifier(identifier, {"_id": 1})
         if not user:
             return False
         
-        # Find valid OTP token
-        token = await self.tokens_collection.find_one({
+        now = datetime.utcnow()
+        live_token = {
             "user_id": user["_id"],
-            "token": otp,
             "type": "otp",
-            "expires_at": {"$gt": datetime.utcnow()}
-        })
-        
-        if not token:
-            return False
+            "used_at": None,
+            "expires_at": {"$gt": now}
+        }
         
-        # Mark token as used
-        await self.tokens_collection.update_one(
-            {"_id": token["_id"]},
-            {"$set": {"used_at": datetime.utcnow()}}
+        # Consume the token in one operation on the (user_id, type, token)
+        # index; used, expired or exhausted tokens never match, so replays fail
+        token = await self.tokens_collection.find_one_and_update(
+            {
+                **live_token,
+                "token": hash_verification_token(otp),
+                "attempts": {"$lt": settings.MAX_OTP_ATTEMPTS}
+            },
+            {"$set": {"used_at": now}, "$inc": {"attempts": 1}},
+            projection={"_id": 1}
         )
         
-        return True
+        if token:
+            return True
+        
+        # Wrong code: count the failed attempt against the live token
+        await self.tokens_collection.update_one(live_token, {"$inc": {"attempts": 1}})
+        return False
+    
+    async def create_password_reset_token(self, user_id: str) -> str:
+        """
+        Issue a single-use reset token, replacing any previous one
+        
+        Only the keyed hash is stored; the raw token goes out in the email.
+        Expired tokens are removed by the TTL index on expires_at.
+        """
+        token = secrets.token_urlsafe(32)
+        now = datetime.utcnow()
+        
+        await self.tokens_collection.delete_many({"user_id": ObjectId(user_id), "type": "password_reset"})
+        await self.tokens_collection.insert_one({
+            "user_id": ObjectId(user_id),
+            "token": hash_verification_token(token),
+            "type": "password_reset",
+            "created_at": now,
+            "expires_at": now + timedelta(minutes=settings.PASSWORD_RESET_EXPIRY_MINUTES),
+            "used_at": None
+        })
+        return token
+    
+    async def consume_password_reset_token(self, token: str) -> Optional[ObjectId]:
+        """Mark a live reset token used; returns its user id, or None if invalid"""
+        now = datetime.utcnow()
+        
+        # One operation on the unique (type=password_reset, token) index, so
+        # two concurrent resets with the same token cannot both succeed
+        consumed = await self.tokens_collection.find_one_and_update(
+            {
+                "token": hash_verification_token(token),
+                "type": "password_reset",
+                "used_at": None,
+                "expires_at": {"$gt": now}
+            },
+            {"$set": {"used_at": now}},
+            projection={"user_id": 1}
+        )
+        return consumed["user_id"] if consumed else None
+    
+    async def reset_password(self, user_id: ObjectId, password_hash: str) -> bool:
+        """Set a new password and revoke every existing session"""
+        result = await self.users_collection.update_one(
+            {"_id": user_id},
+            {
+                "$set": {"password_hash": password_hash, "updated_at": datetime.utcnow()},
+                # Same as "revoke all": outstanding access/refresh tokens stop working
+                "$inc": {"token_version": 1}
+            }
+        )
+        return result.matched_count > 0
     
 auth_service = AuthService()
\ No newline at end of file
@@ -0,0 +1,295 @@
+import asyncio
+import time
+from typing import List, Optional, Dict, Any, Iterable, Set
+from datetime import datetime, date, timedelta
+from bson import ObjectId, Binary
+from pymongo import UpdateOne
+from app.core.config import settings
+from app.core.database import db
+from app.core.events import event_bus
+from app.core.locks import LeaderLock
+from app.core.timezones import clinic_timezone_name, local_to_utc, local_today, day_bounds_utc, date_to_datetime
+from app.domain.entities.appointment import AppointmentStatus
+from app.domain.events import AppointmentBooked, AppointmentStatusChanged, DoctorProfileUpdated, DoctorScheduleChanged
+import logging
+
+logger = logging.getLogger(__name__)
+
+# One bit per minute of the clinic-local day: bit m set = a free slot starts at minute m
+MINUTES_PER_DAY = 24 * 60
+BITMAP_BYTES = MINUTES_PER_DAY // 8
+
+def encode_bitmap(start_minutes: Iterable[int]) -> bytes:
+    """Pack slot start minutes into a 180-byte bitmap"""
+    bitmap = bytearray(BITMAP_BYTES)
+    for minute in start_minutes:
+        bitmap[minute >> 3] |= 1 << (minute & 7)
+    return bytes(bitmap)
+
+def decode_bitmap(bitmap: bytes) -> List[int]:
+    """Slot start minutes of a bitmap, in order"""
+    minutes = []
+    for index, byte in enumerate(bitmap):
+        if byte:
+            for bit in range(8):
+                if byte & (1 << bit):
+                    minutes.append(index * 8 + bit)
+    return minutes
+
+def _format_minute(minute: int) -> str:
+    return f"{minute // 60:02d}:{minute % 60:02d}"
+
+class AvailabilityService:
+    """
+    Precomputed free slots per doctor for the next AVAILABILITY_HORIZON_DAYS days
+
+    Each (doctor, day) has a document in `doctor_availability` holding a
+    per-minute bitmap of free slot starts. A summary is kept on the doctor's
+    user document (days with free slots, first free time per day, the next
+    upcoming slot starts) so cross-doctor availability search is a single
+    indexed query on users. Doctors are refreshed incrementally after
+    bookings, cancellations and schedule changes; a periodic rebuild (leader
+    only) rolls the horizon forward.
+    """
+
+    def __init__(self):
+        self.availability_collection = None
+        self.users_collection = None
+        self.lock = LeaderLock("availability_indexer", lease_seconds=settings.AVAILABILITY_REBUILD_INTERVAL_SECONDS * 2)
+        self._rebuild_task: Optional[asyncio.Task] = None
+        self._refresh_task: Optional[asyncio.Task] = None
+        # doctor_id -> days to refresh (None = whole horizon); coalesces bursts
+        self._dirty: Dict[str, Optional[Set[date]]] = {}
+        self._wakeup = asyncio.Event()
+        self.metrics: Dict[str, Any] = {
+            "is_leader": False,
+            "last_rebuild_at": None,
+            "last_rebuild_doctors": 0,
+            "last_rebuild_duration_ms": None,
+            "pending_refreshes": 0,
+            "total_refreshes": 0,
+            "dropped_refreshes": 0
+        }
+
+    async def init(self):
+        """Initialize collections"""
+        self.availability_collection = db.get_collection("doctor_availability")
+        self.users_collection = db.get_collection("users")
+        event_bus.subscribe(AppointmentBooked, self._on_appointment_booked)
+        event_bus.subscribe(AppointmentStatusChanged, self._on_appointment_status_changed)
+        event_bus.subscribe(DoctorScheduleChanged, self._on_schedule_changed)
+        event_bus.subscribe(DoctorProfileUpdated, self._on_profile_updated)
+
+    def _on_appointment_booked(self, event: AppointmentBooked) -> None:
+        self.mark_dirty(event.doctor_id, [event.appointment_date.date()])
+
+    def _on_appointment_status_changed(self, event: AppointmentStatusChanged) -> None:
+        # Only a cancellation frees the slot again
+        if event.status != AppointmentStatus.CANCELLED:
+            return
+        days = [day.date() for day in event.appointment_dates] if event.appointment_dates else None
+        self.mark_dirty(event.doctor_id, days)
+
+    def _on_schedule_changed(self, event: DoctorScheduleChanged) -> None:
+        self.mark_dirty(event.doctor_id)
+
+    def _on_profile_updated(self, event: DoctorProfileUpdated) -> None:
+        # Slots depend on the schedule, slot length and timezone under clinic_info
+        if any(field.split(".")[0] == "clinic_info" for field in event.fields):
+            self.mark_dirty(event.doctor_id)
+
+    def start(self):
+        """Start the refresh worker and the periodic rebuild"""
+        if not settings.AVAILABILITY_INDEX_ENABLED:
+            return
+        if self._refresh_task is None:
+            self._refresh_task = asyncio.create_task(self._run_refreshes())
+        if self._rebuild_task is None:
+            self._rebuild_task = asyncio.create_task(self._run_rebuilds())
+        logger.info("Availability indexer started")
+
+    async def stop(self):
+        """Stop background tasks and release the lock"""
+        for task in (self._refresh_task, self._rebuild_task):
+            if task:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._refresh_task = None
+        self._rebuild_task = None
+        await self.lock.release()
+
+    def mark_dirty(self, doctor_id: str, days: Optional[Iterable[date]] = None) -> None:
+        """
+        Queue a doctor for refresh (all horizon days unless `days` is given)
+
+        Non-blocking; callers on the request path only pay for a dict update.
+        When the queue is full the refresh is dropped and the next rebuild
+        repairs it.
+        """
+        if not settings.AVAILABILITY_INDEX_ENABLED:
+            return
+
+        doctor_id = str(doctor_id)
+        if doctor_id not in self._dirty and len(self._dirty) >= settings.AVAILABILITY_MAX_PENDING:
+            self.metrics["dropped_refreshes"] += 1
+            return
+
+        if days is None or self._dirty.get(doctor_id, set()) is None:
+            self._dirty[doctor_id] = None
+        else:
+            self._dirty.setdefault(doctor_id, set()).update(days)
+
+        self.metrics["pending_refreshes"] = len(self._dirty)
+        self._wakeup.set()
+
+    async def _run_refreshes(self):
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+
+            batch, self._dirty = self._dirty, {}
+            self.metrics["pending_refreshes"] = 0
+            try:
+                await self._refresh_many(batch)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Availability refresh failed: {e}", exc_info=True)
+
+    async def _run_rebuilds(self):
+        while True:
+            try:
+                self.metrics["is_leader"] = await self.lock.acquire()
+                if self.metrics["is_leader"]:
+                    await self.rebuild_all()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Availability rebuild failed: {e}", exc_info=True)
+
+            await asyncio.sleep(settings.AVAILABILITY_REBUILD_INTERVAL_SECONDS)
+
+    async def rebuild_all(self) -> int:
+        """Refresh every active doctor's whole horizon; returns the number of doctors"""
+        started = time.monotonic()
+        doctors = await self.users_collection.find(
+            {"role": "doctor", "status": "active"}, {"_id": 1}
+        ).to_list(None)
+
+        await self._refresh_many({str(doctor["_id"]): None for doctor in doctors})
+
+        self.metrics["last_rebuild_at"] = datetime.utcnow()
+        self.metrics["last_rebuild_doctors"] = len(doctors)
+        self.metrics["last_rebuild_duration_ms"] = round((time.monotonic() - started) * 1000, 1)
+        return len(doctors)
+
+    async def _refresh_many(self, batch: Dict[str, Optional[Set[date]]]) -> None:
+        semaphore = asyncio.Semaphore(settings.AVAILABILITY_REFRESH_CONCURRENCY)
+
+        async def refresh(doctor_id: str, days: Optional[Set[date]]):
+            async with semaphore:
+                try:
+                    await self.refresh_doctor(doctor_id, days)
+                except Exception as e:
+                    logger.error(f"Failed to refresh availability of doctor {doctor_id}: {e}")
+
+        await asyncio.gather(*(refresh(doctor_id, days) for doctor_id, days in batch.items()))
+
+    async def refresh_doctor(self, doctor_id: str, days: Optional[Iterable[date]] = None) -> None:
+        """Recompute bitmaps for some (default all) horizon days, then the doctor's summary"""
+        # Deferred: appointment_service marks doctors dirty through this module
+        from app.services.appointment_service import appointment_service
+
+        doctor = await self.users_collection.find_one(
+            {"_id": ObjectId(doctor_id)},
+            {"role": 1, "status": 1, "clinic_info": 1}
+        )
+        if not doctor or doctor.get("role") != "doctor" or doctor.get("status") != "active":
+            await self.availability_collection.delete_many({"doctor_id": ObjectId(doctor_id)})
+            await self.users_collection.update_one({"_id": ObjectId(doctor_id)}, {"$unset": {"availability": ""}})
+            return
+
+        tz_name = clinic_timezone_name(doctor)
+        today = local_today(tz_name)
+        horizon = [today + timedelta(days=offset) for offset in range(settings.AVAILABILITY_HORIZON_DAYS)]
+        targets = horizon if days is None else sorted(set(days) & set(horizon))
+        if not targets:
+            return
+
+        slots = await appointment_service.get_doctor_available_slots_range(
+            doctor_id, targets[0], targets[-1], doctor=doctor
+        ) or {}
+
+        now = datetime.utcnow()
+        operations = []
+        for day in targets:
+            minutes = [
+                int(slot.start_time[:2]) * 60 + int(slot.start_time[3:])
+                for slot in slots.get(day, [])
+            ]
+            if day == today:
+                # Slots that already started are not bookable
+                minutes = [m for m in minutes if local_to_utc(day, _format_minute(m), tz_name) > now]
+
+            _, day_end = day_bounds_utc(day, tz_name=tz_name)
+            operations.append(UpdateOne(
+                {"doctor_id": doctor["_id"], "date": date_to_datetime(day)},
+                {"$set": {
+                    "bitmap": Binary(encode_bitmap(minutes)),
+                    "free_count": len(minutes),
+                    "timezone": tz_name,
+                    "expires_at": day_end,
+                    "updated_at": now
+                }},
+                upsert=True
+            ))
+
+        await self.availability_collection.bulk_write(operations, ordered=False)
+        await self._update_summary(doctor["_id"], horizon, tz_name, now)
+        self.metrics["total_refreshes"] += 1
+
+    async def _update_summary(self, doctor_id: ObjectId, horizon: List[date], tz_name: str, now: datetime) -> None:
+        """Fold the horizon's bitmaps into the search fields on the user document"""
+        docs = await self.availability_collection.find(
+            {
+                "doctor_id": doctor_id,
+                "date": {"$gte": date_to_datetime(horizon[0]), "$lte": date_to_datetime(horizon[-1])},
+                "free_count": {"$gt": 0}
+            },
+            {"date": 1, "bitmap": 1}
+        ).sort("date", 1).to_list(None)
+
+        available_days = []
+        first_free = {}
+        upcoming = []
+        for doc in docs:
+            day = doc["date"].date()
+            minutes = decode_bitmap(doc["bitmap"])
+            if day == horizon[0]:
+                minutes = [m for m in minutes if local_to_utc(day, _format_minute(m), tz_name) > now]
+            if not minutes:
+                continue
+
+            available_days.append(day.isoformat())
+            first_free[day.isoformat()] = _format_minute(minutes[0])
+            for minute in minutes:
+                if len(upcoming) >= settings.AVAILABILITY_UPCOMING_SLOTS:
+                    break
+                upcoming.append(local_to_utc(day, _format_minute(minute), tz_name))
+
+        await self.users_collection.update_one(
+            {"_id": doctor_id},
+            {"$set": {"availability": {
+                "days": available_days,
+                "first_free": first_free,
+                "upcoming": upcoming,
+                "timezone": tz_name,
+                "updated_at": now
+            }}}
+        )
+
+# Global service instance
+availability_service = AvailabilityService()
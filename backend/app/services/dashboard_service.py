@@ -0,0 +1,56 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Iterable
+from app.core.timezones import clinic_timezone_name, local_today
+from app.services.appointment_service import appointment_service
+from app.services.doctor_service import doctor_service
+from app.services.prescription_service import prescription_service
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Sections of the doctor dashboard, in response order
+DOCTOR_DASHBOARD_SECTIONS = ("profile", "stats", "today", "recent_prescriptions")
+
+# Prescriptions listed under "recent_prescriptions"
+RECENT_PRESCRIPTIONS_LIMIT = 5
+
+class DashboardService:
+    """Composite views assembled from the other services in one request"""
+
+    async def get_doctor_dashboard(self, doctor: Dict[str, Any], sections: Iterable[str]) -> Dict[str, Any]:
+        """
+        Requested sections of the doctor dashboard, loaded concurrently
+
+        `doctor` is the already authenticated user document, so the profile
+        needs no query and every section shares the one principal lookup.
+        """
+        doctor_id = str(doctor["_id"])
+        tz_name = clinic_timezone_name(doctor)
+        today = local_today(tz_name)
+
+        loaders: Dict[str, Callable[[], Awaitable[Any]]] = {
+            "profile": lambda: self._doctor_profile(doctor),
+            "stats": lambda: self._doctor_stats(doctor_id, tz_name),
+            "today": lambda: appointment_service.get_appointments_by_doctor(doctor_id, today, today, tz_name),
+            "recent_prescriptions": lambda: prescription_service.get_recent_prescriptions_by_doctor(
+                doctor_id, RECENT_PRESCRIPTIONS_LIMIT
+            ),
+        }
+        selected = [section for section in DOCTOR_DASHBOARD_SECTIONS if section in sections]
+        results = await asyncio.gather(*(loaders[section]() for section in selected))
+        return dict(zip(selected, results))
+
+    async def _doctor_profile(self, doctor: Dict[str, Any]) -> Dict[str, Any]:
+        profile = {field: value for field, value in doctor.items() if field != "password_hash"}
+        profile["_id"] = str(profile["_id"])
+        return profile
+
+    async def _doctor_stats(self, doctor_id: str, tz_name: str) -> Dict[str, Any]:
+        appointment_stats, prescription_stats = await asyncio.gather(
+            doctor_service.get_doctor_stats(doctor_id, tz_name),
+            prescription_service.get_prescription_stats(doctor_id)
+        )
+        return {**appointment_stats, "prescriptions": prescription_stats}
+
+# Global service instance
+dashboard_service = DashboardService()
@@ -1,21 +1,77 @@
-from typing import List, Optional, Dict, Any
+import asyncio
+from collections import defaultdict
+from typing import List, Optional, Dict, Any, FrozenSet, Tuple
 from bson import ObjectId
+from app.core.change_streams import Change, change_consumer
+from app.core.config import settings
 from app.core.database import db
+from app.core.events import event_bus
+from app.core.local_cache import LocalCache
 from app.core.exceptions import NotFoundException
-from datetime import datetime
+from app.core.timezones import clinic_timezone_name, day_bounds_utc, local_today, utc_to_local
+from app.domain.entities.doctor import Doctor
+from app.domain.events import DoctorProfileUpdated, DoctorScheduleChanged
+from app.domain.field_selection import ALL_FIELDS, FieldSelection
+from datetime import datetime, date, timedelta
 import logging
 
 logger = logging.getLogger(__name__)
 
+# User fields the specialty and city facets are computed from
+FACET_FIELDS = ("role", "status", "specialties", "clinic_info")
+
+# Fields of a doctor shown in lists (cards, favourites, care team);
+# availability and clinic timezone are used to compute and then dropped
+DOCTOR_LIST_PROJECTION = {
+    "full_name": 1,
+    "gender": 1,
+    "specialties": 1,
+    "bio": 1,
+    "years_of_experience": 1,
+    "rating": 1,
+    "reviews_count": 1,
+    "documents_verified": 1,
+    "clinic_info.city": 1,
+    "clinic_info.area": 1,
+    "clinic_info.consultation_fee": 1,
+    "clinic_info.currency": 1,
+    "clinic_info.timezone": 1,
+    "availability": 1
+}
+
+# Stored doctor fields clients may select (?fields=), plus the computed slot
+DOCTOR_FIELDS = tuple(
+    field.alias or name for name, field in Doctor.model_fields.items() if name != "password_hash"
+)
+DOCTOR_SEARCH_FIELDS = DOCTOR_FIELDS + ("next_available_slot",)
+
+# Related data a doctor read can populate (?expand=)
+DOCTOR_EXPANSIONS = ("stats",)
+
+def _zero_stats() -> Dict[str, int]:
+    return {
+        "today_appointments": 0,
+        "week_appointments": 0,
+        "total_patients": 0,
+        "total_appointments": 0,
+        "total_prescriptions": 0
+    }
+
 class DoctorService:
     """Service for doctor-related operations"""
     
     def __init__(self):
         self.users_collection = None
+        self.facets_cache = LocalCache("doctor_facets", max_entries=2, ttl_seconds=settings.FACETS_CACHE_TTL_SECONDS)
     
     async def init(self):
         """Initialize collections"""
         self.users_collection = db.get_collection("users")
+        change_consumer.subscribe("users", self._on_user_change)
+    
+    def _on_user_change(self, change: Change) -> None:
+        if change.fields is None or any(field.split(".")[0] in FACET_FIELDS for field in change.fields):
+            self.facets_cache.invalidate()
     
     async def search_doctors(self, 
                            specialty: Optional[str] = None,
@@ -23,9 +79,19 @@ class DoctorService:
                            name: Optional[str] = None,
                            min_rating: Optional[float] = None,
                            max_fee: Optional[float] = None,
+                           available_on: Optional[date] = None,
+                           available_before: Optional[datetime] = None,
                            page: int = 1,
-                           limit: int = 20) -> Dict[str, Any]:
-        """Search for doctors with filters"""
+                           limit: int = 20,
+                           selection: FieldSelection = ALL_FIELDS) -> Dict[str, Any]:
+        """
+        Search for doctors with filters
+        
+        available_on / available_before (naive UTC) filter on the precomputed
+        availability summary, so they stay a single indexed query; each
+        doctor's next free slot comes from the same document. `selection`
+        limits the fields read and can add stats for the page.
+        """
         query = {
             "role": "doctor",
             "status": "active",
@@ -52,6 +118,13 @@ class DoctorService:
         if max_fee:
             query["clinic_info.consultation_fee"] = {"$lte": max_fee}
         
+        # Availability filters (multikey indexes on availability.days / availability.upcoming)
+        now = datetime.utcnow()
+        if available_on:
+            query["availability.days"] = available_on.isoformat()
+        if available_before:
+            query["availability.upcoming"] = {"$elemMatch": {"$gt": now, "$lt": available_before}}
+        
         # Calculate skip for pagination
         skip = (page - 1) * limit
         
@@ -59,14 +132,23 @@ class DoctorService:
         total = await self.users_collection.count_documents(query)
         
         # Get doctors with pagination
+        expand = selection.expands()
         doctors = await self.users_collection.find(
             query,
-            {"password_hash": 0}  # Exclude sensitive data
+            self._doctor_projection(selection, expand)
         ).skip(skip).limit(limit).sort("rating", -1).to_list(None)
         
         # Convert ObjectId to string
         for doctor in doctors:
             doctor["_id"] = str(doctor["_id"])
+            availability = doctor.pop("availability", None)
+            if selection.includes("next_available_slot"):
+                doctor["next_available_slot"] = self._next_available_slot(availability, available_on, now)
+        
+        if "stats" in expand:
+            stats = await self.get_doctors_stats(doctors)
+            for doctor in doctors:
+                doctor["stats"] = stats[doctor["_id"]]
         
         return {
             "doctors": doctors,
@@ -76,24 +158,162 @@ class DoctorService:
             "limit": limit
         }
     
-    async def get_doctor_by_id(self, doctor_id: str) -> Optional[Dict[str, Any]]:
-        """Get doctor details by ID"""
+    def _next_available_slot(self, availability: Optional[Dict[str, Any]],
+                             available_on: Optional[date],
+                             now: datetime) -> Optional[Dict[str, Any]]:
+        """Next free slot from the availability summary (on `available_on` if given)"""
+        if not availability:
+            return None
+        
+        if available_on:
+            start_time = availability.get("first_free", {}).get(available_on.isoformat())
+            return {"date": available_on.isoformat(), "start_time": start_time} if start_time else None
+        
+        for starts_at in availability.get("upcoming", []):
+            if starts_at > now:
+                local = utc_to_local(starts_at, availability["timezone"])
+                return {"date": local.date().isoformat(), "start_time": local.strftime("%H:%M"), "starts_at": starts_at}
+        return None
+    
+    def _doctor_projection(self, selection: FieldSelection, expand: FrozenSet[str]) -> Dict[str, Any]:
+        """The selected fields and what they are computed from, or all but sensitive data"""
+        if selection.fields is None:
+            return {"password_hash": 0}
+        
+        required = ["availability"] if "next_available_slot" in selection.fields else []
+        if "stats" in expand:
+            # Stats are counted in the clinic's timezone
+            required.append("clinic_info.timezone")
+        projection = selection.projection(*required)
+        projection.pop("next_available_slot", None)
+        return projection
+    
+    async def get_doctor_by_id(self, doctor_id: str,
+                               selection: FieldSelection = ALL_FIELDS) -> Optional[Dict[str, Any]]:
+        """Get doctor details by ID, with stats when `selection` expands them"""
+        expand = selection.expands()
         doctor = await self.users_collection.find_one(
             {
                 "_id": ObjectId(doctor_id),
                 "role": "doctor",
                 "status": "active"
             },
-            {"password_hash": 0}  # Exclude sensitive data
+            self._doctor_projection(selection, expand)
         )
         
         if doctor:
             doctor["_id"] = str(doctor["_id"])
+            if "stats" in expand:
+                doctor["stats"] = await self.get_doctor_stats(doctor["_id"], clinic_timezone_name(doctor))
         
         return doctor
     
+    async def get_doctors_by_ids(self, doctor_ids: List[str]) -> Tuple[List[Dict[str, Any]], List[str]]:
+        """
+        List views of many active doctors in one $in query
+        
+        Returns the doctors found, in the order of `doctor_ids`, and the ids
+        that are invalid or not an active doctor.
+        """
+        object_ids = [ObjectId(doctor_id) for doctor_id in doctor_ids if ObjectId.is_valid(doctor_id)]
+        doctors = await self.users_collection.find(
+            {"_id": {"$in": object_ids}, "role": "doctor", "status": "active"},
+            DOCTOR_LIST_PROJECTION
+        ).to_list(None) if object_ids else []
+        
+        now = datetime.utcnow()
+        found = {}
+        for doctor in doctors:
+            doctor["_id"] = str(doctor["_id"])
+            doctor["next_available_slot"] = self._next_available_slot(doctor.pop("availability", None), None, now)
+            found[doctor["_id"]] = doctor
+        
+        ordered = [found[doctor_id] for doctor_id in doctor_ids if doctor_id in found]
+        missing = [doctor_id for doctor_id in doctor_ids if doctor_id not in found]
+        return ordered, missing
+    
+    async def get_doctors_stats(self, doctors: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        """
+        get_doctor_stats for many doctors, keyed by doctor id
+        
+        One grouped aggregation over appointments and one over prescriptions,
+        run together, instead of five queries per doctor. Today and this week
+        are taken in each doctor's clinic timezone.
+        """
+        if not doctors:
+            return {}
+        
+        ids_by_tz: Dict[str, List[ObjectId]] = defaultdict(list)
+        for doctor in doctors:
+            ids_by_tz[clinic_timezone_name(doctor)].append(ObjectId(doctor["_id"]))
+        object_ids = [doctor_id for ids in ids_by_tz.values() for doctor_id in ids]
+        
+        # Per-timezone "starts_at in window" conditions; a single timezone
+        # (the usual case) needs no doctor_id test
+        today_conditions, week_conditions = [], []
+        for tz_name, ids in ids_by_tz.items():
+            today = local_today(tz_name)
+            today_start, today_end = day_bounds_utc(today, tz_name=tz_name)
+            week_start = today - timedelta(days=today.weekday())
+            week_range_start, week_range_end = day_bounds_utc(week_start, week_start + timedelta(days=6), tz_name)
+            
+            in_group = [{"$in": ["$doctor_id", ids]}] if len(ids_by_tz) > 1 else []
+            today_conditions.append({"$and": [
+                *in_group, {"$gte": ["$starts_at", today_start]}, {"$lt": ["$starts_at", today_end]}
+            ]})
+            week_conditions.append({"$and": [
+                *in_group, {"$gte": ["$starts_at", week_range_start]}, {"$lt": ["$starts_at", week_range_end]}
+            ]})
+        
+        def count_if(conditions: List[Dict[str, Any]]) -> Dict[str, Any]:
+            active = {"$and": [{"$ne": ["$status", "cancelled"]}, {"$or": conditions}]}
+            return {"$sum": {"$cond": [active, 1, 0]}}
+        
+        appointments_pipeline = [
+            {"$match": {"doctor_id": {"$in": object_ids}}},
+            {"$group": {
+                "_id": "$doctor_id",
+                "today_appointments": count_if(today_conditions),
+                "week_appointments": count_if(week_conditions),
+                "patients": {"$addToSet": "$patient_id"},
+                "total_appointments": {"$sum": 1}
+            }},
+            # Only the count leaves the server
+            {"$project": {
+                "today_appointments": 1,
+                "week_appointments": 1,
+                "total_patients": {"$size": "$patients"},
+                "total_appointments": 1
+            }}
+        ]
+        prescriptions_pipeline = [
+            {"$match": {"doctor_id": {"$in": object_ids}}},
+            {"$group": {"_id": "$doctor_id", "total_prescriptions": {"$sum": 1}}}
+        ]
+        
+        appointment_groups, prescription_groups = await asyncio.gather(
+            db.get_collection("appointments").aggregate(appointments_pipeline).to_list(None),
+            db.get_collection("prescriptions").aggregate(prescriptions_pipeline).to_list(None)
+        )
+        
+        stats = {str(doctor_id): _zero_stats() for doctor_id in object_ids}
+        for group in appointment_groups:
+            stats[str(group["_id"])].update({
+                "today_appointments": group["today_appointments"],
+                "week_appointments": group["week_appointments"],
+                "total_patients": group["total_patients"],
+                "total_appointments": group["total_appointments"]
+            })
+        for group in prescription_groups:
+            stats[str(group["_id"])]["total_prescriptions"] = group["total_prescriptions"]
+        return stats
+    
     async def get_doctor_specialties(self) -> List[str]:
         """Get list of all available specialties"""
+        specialties = self.facets_cache.get("specialties")
+        if specialties is not None:
+            return specialties
+        
         pipeline = [
             {"$match": {"role": "doctor", "status": "active"}},
             {"$unwind": "$specialties"},
@@ -102,10 +322,16 @@ class DoctorService:
         ]
         
         result = await self.users_collection.aggregate(pipeline).to_list(None)
-        return [item["_id"] for item in result if item["_id"]]
+        specialties = [item["_id"] for item in result if item["_id"]]
+        self.facets_cache.put("specialties", specialties)
+        return specialties
     
     async def get_cities_with_doctors(self) -> List[str]:
         """Get list of cities with available doctors"""
+        cities = self.facets_cache.get("cities")
+        if cities is not None:
+            return cities
+        
         pipeline = [
             {"$match": {"role": "doctor", "status": "active", "clinic_info.city": {"$exists": True}}},
             {"$group": {"_id": "$clinic_info.city"}},
@@ -113,7 +339,9 @@ class DoctorService:
         ]
         
         result = await self.users_collection.aggregate(pipeline).to_list(None)
-        return [item["_id"] for item in result if item["_id"]]
+        cities = [item["_id"] for item in result if item["_id"]]
+        self.facets_cache.put("cities", cities)
+        return cities
     
     async def update_doctor_profile(self, doctor_id: str, update_data: Dict[str, Any]) -> bool:
         """Update doctor profile"""
@@ -129,6 +357,8 @@ class DoctorService:
             {"$set": update_data}
         )
         
+        if result.modified_count:
+            await event_bus.publish(DoctorProfileUpdated(doctor_id=doctor_id, fields=tuple(update_data)))
         return result.modified_count > 0
     
     async def update_doctor_schedule(self, doctor_id: str, schedule_data: Dict[str, Any]) -> bool:
@@ -143,53 +373,47 @@ class DoctorService:
             {"$set": update_data}
         )
         
+        if result.modified_count:
+            await event_bus.publish(DoctorScheduleChanged(doctor_id=doctor_id))
         return result.modified_count > 0
     
-    async def get_doctor_stats(self, doctor_id: str) -> Dict[str, Any]:
+    async def get_doctor_stats(self, doctor_id: str, tz_name: Optional[str] = None) -> Dict[str, Any]:
         """Get doctor statistics"""
-        from datetime import datetime, timedelta
-        
         # Get appointment counts
         appointments_collection = db.get_collection("appointments")
         prescriptions_collection = db.get_collection("prescriptions")
         
-        # Today's appointments
-        today = datetime.now().date()
-        today_appointments = await appointments_collection.count_documents({
-            "doctor_id": ObjectId(doctor_id),
-            "appointment_date": today,
-            "status": {"$ne": "cancelled"}
-        })
+        # Today's appointments (range on the (doctor_id, starts_at) index)
+        today = local_today(tz_name)
+        today_start, today_end = day_bounds_utc(today, tz_name=tz_name)
         
         # This week's appointments
         week_start = today - timedelta(days=today.weekday())
         week_end = week_start + timedelta(days=6)
-        week_appointments = await appointments_collection.count_documents({
-            "doctor_id": ObjectId(doctor_id),
-            "appointment_date": {"$gte": week_start, "$lte": week_end},
-            "status": {"$ne": "cancelled"}
-        })
-        
-        # Total patients (unique)
-        total_patients = len(await appointments_collection.distinct(
-            "patient_id",
-            {"doctor_id": ObjectId(doctor_id)}
-        ))
-        
-        # Total appointments
-        total_appointments = await appointments_collection.count_documents({
-            "doctor_id": ObjectId(doctor_id)
-        })
-        
-        # Total prescriptions
-        total_prescriptions = await prescriptions_collection.count_documents({
-            "doctor_id": ObjectId(doctor_id)
-        })
+        week_range_start, week_range_end = day_bounds_utc(week_start, week_end, tz_name)
+        
+        # Independent counts, issued together
+        today_appointments, week_appointments, patient_ids, total_appointments, total_prescriptions = await asyncio.gather(
+            appointments_collection.count_documents({
+                "doctor_id": ObjectId(doctor_id),
+                "starts_at": {"$gte": today_start, "$lt": today_end},
+                "status": {"$ne": "cancelled"}
+            }),
+            appointments_collection.count_documents({
+                "doctor_id": ObjectId(doctor_id),
+                "starts_at": {"$gte": week_range_start, "$lt": week_range_end},
+                "status": {"$ne": "cancelled"}
+            }),
+            # Total patients (unique)
+            appointments_collection.distinct("patient_id", {"doctor_id": ObjectId(doctor_id)}),
+            appointments_collection.count_documents({"doctor_id": ObjectId(doctor_id)}),
+            prescriptions_collection.count_documents({"doctor_id": ObjectId(doctor_id)})
+        )
         
         return {
             "today_appointments": today_appointments,
             "week_appointments": week_appointments,
-            "total_patients": total_patients,
+            "total_patients": len(patient_ids),
             "total_appointments": total_appointments,
             "total_prescriptions": total_prescriptions
         }
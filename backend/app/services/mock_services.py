@@ -193,4 +193,23 @@ class MockEmailService:
         DOME Care Team
         """
         
+        return await self.send_email(email, subject, body)
+    
+    async def send_password_reset(self, email: str, full_name: str, reset_url: str) -> bool:
+        """Send password reset link email"""
+        subject = "Reset your password - DOME Care"
+        body = f"""
+        Dear {full_name},
+        
+        We received a request to reset your password. Use the link below
+        within {settings.PASSWORD_RESET_EXPIRY_MINUTES} minutes:
+        
+        {reset_url}
+        
+        If you did not request this, you can ignore this email.
+        
+        Best regards,
+        DOME Care Team
+        """
+        
         return await self.send_email(email, subject, body)
\ No newline at end of file
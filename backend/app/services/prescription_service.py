@@ -1,8 +1,18 @@
+import asyncio
+from dataclasses import fields
 from typing import List, Optional, Dict, Any
 from datetime import datetime, date, timedelta
 from bson import ObjectId
+from app.core.change_streams import Change, change_consumer
+from app.core.config import settings
 from app.core.database import db
-from app.domain.entities.prescription import Prescription, MedicineItem
+from app.core.local_cache import LocalCache
+from app.core.events import event_bus
+from app.domain.entities.prescription import Prescription, PrescriptionRead, MedicineItem
+from app.domain.entities.base import validate_document, validate_documents
+from app.domain.events import PrescriptionCreated
+from app.domain.field_selection import ALL_FIELDS, FieldSelection
+from app.services.summary_service import build_user_summary, attach_summaries, summary_projection
 from app.core.exceptions import NotFoundException, ValidationException
 import random
 import string
@@ -10,6 +20,12 @@ import logging
 
 logger = logging.getLogger(__name__)
 
+# Stored fields of a prescription in list views; the other party is added
+# from its embedded snapshot
+PRESCRIPTION_LIST_FIELDS = tuple(
+    field.name for field in fields(PrescriptionRead) if field.name not in ("doctor", "patient")
+)
+
 class PrescriptionService:
     """Service for managing prescriptions"""
     
@@ -17,12 +33,22 @@ class PrescriptionService:
         self.prescriptions_collection = None
         self.users_collection = None
         self.medicines_collection = None
+        self.medicine_search_cache = LocalCache(
+            "medicine_search",
+            max_entries=settings.MEDICINE_SEARCH_CACHE_MAX_ENTRIES,
+            ttl_seconds=settings.MEDICINE_SEARCH_CACHE_TTL_SECONDS
+        )
     
     async def init(self):
         """Initialize collections"""
         self.prescriptions_collection = db.get_collection("prescriptions")
         self.users_collection = db.get_collection("users")
         self.medicines_collection = db.get_collection("medicines")
+        change_consumer.subscribe("medicines", self._on_medicine_change)
+    
+    def _on_medicine_change(self, change: Change) -> None:
+        # Any medicine may now match (or stop matching) a cached search
+        self.medicine_search_cache.invalidate()
     
     async def create_prescription(self, prescription_data: Dict[str, Any]) -> Dict[str, Any]:
         """Create a new prescription"""
@@ -62,17 +88,33 @@ class PrescriptionService:
         if prescription_data.get("appointment_id"):
             prescription_data["appointment_id"] = ObjectId(prescription_data["appointment_id"])
         
+        if settings.USER_SUMMARIES_ENABLED:
+            # Shown with the prescription; kept current by the summary propagator
+            prescription_data["doctor_summary"] = build_user_summary(doctor)
+            prescription_data["patient_summary"] = build_user_summary(patient)
+        
         # Insert prescription
         result = await self.prescriptions_collection.insert_one(prescription_data)
         prescription_data["_id"] = result.inserted_id
+        await event_bus.publish(PrescriptionCreated(
+            prescription_id=str(result.inserted_id),
+            doctor_id=str(prescription_data["doctor_id"]),
+            patient_id=str(prescription_data["patient_id"])
+        ))
         
         logger.info(f"Prescription created: {result.inserted_id}")
         return prescription_data
     
     async def get_prescriptions_by_doctor(self, doctor_id: str, 
                                         page: int = 1, 
-                                        limit: int = 20) -> Dict[str, Any]:
-        """Get prescriptions for a doctor"""
+                                        limit: int = 20,
+                                        selection: FieldSelection = ALL_FIELDS) -> Dict[str, Any]:
+        """
+        Get prescriptions for a doctor
+        
+        The patient is populated unless `selection` says otherwise; with sparse
+        fields the rows are dicts of those fields.
+        """
         skip = (page - 1) * limit
         
         query = {"doctor_id": ObjectId(doctor_id)}
@@ -81,37 +123,44 @@ class PrescriptionService:
         total = await self.prescriptions_collection.count_documents(query)
         
         # Get prescriptions with pagination
-        prescriptions = await self.prescriptions_collection.find(query)\
+        expand = selection.expands(("patient",))
+        prescriptions = await self.prescriptions_collection.find(query, summary_projection(selection, expand))\
             .sort("created_at", -1)\
             .skip(skip)\
             .limit(limit)\
             .to_list(None)
         
-        # Populate patient information
-        for prescription in prescriptions:
-            patient = await self.users_collection.find_one(
-                {"_id": prescription["patient_id"]},
-                {"password_hash": 0}
-            )
-            prescription["patient"] = patient
-            prescription["_id"] = str(prescription["_id"])
-            prescription["doctor_id"] = str(prescription["doctor_id"])
-            prescription["patient_id"] = str(prescription["patient_id"])
-            if prescription.get("appointment_id"):
-                prescription["appointment_id"] = str(prescription["appointment_id"])
+        # Doctor/patient information from the embedded snapshots
+        for role in expand:
+            await attach_summaries(prescriptions, role)
         
         return {
-            "prescriptions": prescriptions,
+            "prescriptions": validate_documents(PrescriptionRead, prescriptions, selection.response_fields(expand)),
             "total": total,
             "page": page,
             "pages": (total + limit - 1) // limit,
             "limit": limit
         }
     
+    async def get_recent_prescriptions_by_doctor(self, doctor_id: str, limit: int = 5) -> List[PrescriptionRead]:
+        """Latest prescriptions of a doctor, without the paging count"""
+        prescriptions = await self.prescriptions_collection.find(
+            {"doctor_id": ObjectId(doctor_id)}, {"doctor_summary": 0}
+        ).sort("created_at", -1).limit(limit).to_list(None)
+        
+        await attach_summaries(prescriptions, "patient")
+        return validate_documents(PrescriptionRead, prescriptions)
+    
     async def get_prescriptions_by_patient(self, patient_id: str,
                                          page: int = 1,
-                                         limit: int = 20) -> Dict[str, Any]:
-        """Get prescriptions for a patient"""
+                                         limit: int = 20,
+                                         selection: FieldSelection = ALL_FIELDS) -> Dict[str, Any]:
+        """
+        Get prescriptions for a patient
+        
+        The doctor is populated unless `selection` says otherwise; with sparse
+        fields the rows are dicts of those fields.
+        """
         skip = (page - 1) * limit
         
         query = {"patient_id": ObjectId(patient_id)}
@@ -120,59 +169,37 @@ class PrescriptionService:
         total = await self.prescriptions_collection.count_documents(query)
         
         # Get prescriptions with pagination
-        prescriptions = await self.prescriptions_collection.find(query)\
+        expand = selection.expands(("doctor",))
+        prescriptions = await self.prescriptions_collection.find(query, summary_projection(selection, expand))\
             .sort("created_at", -1)\
             .skip(skip)\
             .limit(limit)\
             .to_list(None)
         
-        # Populate doctor information
-        for prescription in prescriptions:
-            doctor = await self.users_collection.find_one(
-                {"_id": prescription["doctor_id"]},
-                {"password_hash": 0}
-            )
-            prescription["doctor"] = doctor
-            prescription["_id"] = str(prescription["_id"])
-            prescription["doctor_id"] = str(prescription["doctor_id"])
-            prescription["patient_id"] = str(prescription["patient_id"])
-            if prescription.get("appointment_id"):
-                prescription["appointment_id"] = str(prescription["appointment_id"])
+        # Doctor/patient information from the embedded snapshots
+        for role in expand:
+            await attach_summaries(prescriptions, role)
         
         return {
-            "prescriptions": prescriptions,
+            "prescriptions": validate_documents(PrescriptionRead, prescriptions, selection.response_fields(expand)),
             "total": total,
             "page": page,
             "pages": (total + limit - 1) // limit,
             "limit": limit
         }
     
-    async def get_prescription_by_id(self, prescription_id: str) -> Optional[Dict[str, Any]]:
+    async def get_prescription_by_id(self, prescription_id: str) -> Optional[PrescriptionRead]:
         """Get prescription by ID with populated data"""
         prescription = await self.prescriptions_collection.find_one({"_id": ObjectId(prescription_id)})
         
         if not prescription:
             return None
         
-        # Populate doctor and patient information
-        doctor = await self.users_collection.find_one(
-            {"_id": prescription["doctor_id"]},
-            {"password_hash": 0}
-        )
-        patient = await self.users_collection.find_one(
-            {"_id": prescription["patient_id"]},
-            {"password_hash": 0}
-        )
+        # Doctor and patient information from the embedded snapshots
+        await attach_summaries([prescription], "doctor")
+        await attach_summaries([prescription], "patient")
         
-        prescription["doctor"] = doctor
-        prescription["patient"] = patient
-        prescription["_id"] = str(prescription["_id"])
-        prescription["doctor_id"] = str(prescription["doctor_id"])
-        prescription["patient_id"] = str(prescription["patient_id"])
-        if prescription.get("appointment_id"):
-            prescription["appointment_id"] = str(prescription["appointment_id"])
-        
-        return prescription
+        return validate_document(PrescriptionRead, prescription)
     
     async def update_prescription(self, prescription_id: str, update_data: Dict[str, Any]) -> bool:
         """Update prescription"""
@@ -194,6 +221,11 @@ class PrescriptionService:
     
     async def search_medicines(self, query: str, limit: int = 10) -> List[Dict[str, Any]]:
         """Search for medicines in the database"""
+        cache_key = (query.lower(), limit)
+        cached = self.medicine_search_cache.get(cache_key)
+        if cached is not None:
+            return cached
+        
         search_query = {
             "$or": [
                 {"name": {"$regex": query, "$options": "i"}},
@@ -208,6 +240,7 @@ class PrescriptionService:
         for medicine in medicines:
             medicine["_id"] = str(medicine["_id"])
         
+        self.medicine_search_cache.put(cache_key, medicines)
         return medicines
     
     async def get_prescription_stats(self, doctor_id: str) -> Dict[str, Any]:
@@ -217,35 +250,32 @@ class PrescriptionService:
         today_start = datetime.combine(today, datetime.min.time())
         today_end = datetime.combine(today, datetime.max.time())
         
-        today_prescriptions = await self.prescriptions_collection.count_documents({
-            "doctor_id": ObjectId(doctor_id),
-            "created_at": {"$gte": today_start, "$lte": today_end}
-        })
-        
         # This week's prescriptions
         week_start = today - timedelta(days=today.weekday())
         week_start_dt = datetime.combine(week_start, datetime.min.time())
         week_end = week_start + timedelta(days=6)
         week_end_dt = datetime.combine(week_end, datetime.max.time())
         
-        week_prescriptions = await self.prescriptions_collection.count_documents({
-            "doctor_id": ObjectId(doctor_id),
-            "created_at": {"$gte": week_start_dt, "$lte": week_end_dt}
-        })
-        
         # This month's prescriptions
         month_start = today.replace(day=1)
         month_start_dt = datetime.combine(month_start, datetime.min.time())
         
-        month_prescriptions = await self.prescriptions_collection.count_documents({
-            "doctor_id": ObjectId(doctor_id),
-            "created_at": {"$gte": month_start_dt}
-        })
-        
-        # Total prescriptions
-        total_prescriptions = await self.prescriptions_collection.count_documents({
-            "doctor_id": ObjectId(doctor_id)
-        })
+        # Ranges on the (doctor_id, created_at) index, issued together
+        today_prescriptions, week_prescriptions, month_prescriptions, total_prescriptions = await asyncio.gather(
+            self.prescriptions_collection.count_documents({
+                "doctor_id": ObjectId(doctor_id),
+                "created_at": {"$gte": today_start, "$lte": today_end}
+            }),
+            self.prescriptions_collection.count_documents({
+                "doctor_id": ObjectId(doctor_id),
+                "created_at": {"$gte": week_start_dt, "$lte": week_end_dt}
+            }),
+            self.prescriptions_collection.count_documents({
+                "doctor_id": ObjectId(doctor_id),
+                "created_at": {"$gte": month_start_dt}
+            }),
+            self.prescriptions_collection.count_documents({"doctor_id": ObjectId(doctor_id)})
+        )
         
         return {
             "today": today_prescriptions,
@@ -0,0 +1,320 @@
+import asyncio
+from typing import List, Optional, Dict, Any
+from datetime import datetime, timedelta
+from bson import ObjectId
+from pymongo import UpdateOne
+from app.core.config import settings
+from app.core.database import db
+from app.services.mock_services import MockEmailService, MockVerificationService
+import logging
+
+logger = logging.getLogger(__name__)
+
+# reminders_due kind for "appointment cancelled" notices (reminder kinds are "<offset>m")
+CANCELLATION_KIND = "cancelled"
+
+class ReminderService:
+    """
+    Appointment reminders driven by the indexed `reminders_due` collection
+
+    One document per (appointment, offset) is written at booking time, so the
+    dispatcher only scans due reminders via (status, due_at) instead of the
+    appointments collection. Workers claim batches with a lease; a reminder
+    whose lease expires (crashed worker) is picked up again. Failed sends are
+    retried with exponential backoff up to REMINDER_MAX_ATTEMPTS.
+    """
+
+    def __init__(self):
+        self.reminders_collection = None
+        self.email_service = MockEmailService()
+        self.messaging_service = MockVerificationService()
+        self._task: Optional[asyncio.Task] = None
+        self.metrics: Dict[str, Any] = {
+            "last_run_at": None,
+            "last_batch_size": 0,
+            "total_sent": 0,
+            "total_failed": 0,
+            "max_dispatch_lag_seconds": 0.0
+        }
+
+    async def init(self):
+        """Initialize collections"""
+        self.reminders_collection = db.get_collection("reminders_due")
+
+    def start(self):
+        """Start the dispatch loop"""
+        if settings.REMINDERS_ENABLED and self._task is None:
+            self._task = asyncio.create_task(self._run())
+            logger.info("Reminder dispatcher started")
+
+    async def stop(self):
+        """Stop the dispatch loop"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def schedule_for_appointment(self, appointment: Dict[str, Any],
+                                       doctor: Dict[str, Any],
+                                       patient: Dict[str, Any]) -> int:
+        """
+        Create (or move) the reminders of an appointment
+
+        Upserts on (appointment_id, kind), so calling it again after a
+        reschedule replaces the previous due times. Returns how many
+        reminders are pending.
+        """
+        starts_at = appointment["starts_at"]
+        now = datetime.utcnow()
+
+        payload = {
+            "patient_name": patient.get("full_name"),
+            "doctor_name": doctor.get("full_name"),
+            "email": patient.get("email"),
+            "phone": f"{patient.get('country_code', '')}{patient['phone_number']}" if patient.get("phone_number") else None,
+            "date": appointment["appointment_date"].strftime("%Y-%m-%d"),
+            "time": appointment["time_slot"]["start_time"]
+        }
+
+        operations = []
+        stale_kinds = []
+        for offset in settings.REMINDER_OFFSETS_MINUTES:
+            kind = f"{offset}m"
+            due_at = starts_at - timedelta(minutes=offset)
+            if due_at <= now:
+                stale_kinds.append(kind)
+                continue
+
+            operations.append(UpdateOne(
+                {"appointment_id": appointment["_id"], "kind": kind},
+                {
+                    "$set": {
+                        "due_at": due_at,
+                        "status": "pending",
+                        "claim_id": None,
+                        "lease_until": None,
+                        "attempts": 0,
+                        "next_attempt_at": None,
+                        "payload": payload,
+                        "updated_at": now
+                    },
+                    "$setOnInsert": {"created_at": now}
+                },
+                upsert=True
+            ))
+
+        if stale_kinds:
+            # Moved too close to the appointment: drop reminders that are no longer meaningful
+            await self.reminders_collection.delete_many({
+                "appointment_id": appointment["_id"],
+                "kind": {"$in": stale_kinds},
+                "status": "pending"
+            })
+
+        if operations:
+            await self.reminders_collection.bulk_write(operations, ordered=False)
+
+        return len(operations)
+
+    async def cancel_for_appointments(self, appointment_ids: List[str]) -> None:
+        """Drop unsent reminders of cancelled appointments"""
+        if not appointment_ids:
+            return
+
+        await self.reminders_collection.delete_many({
+            "appointment_id": {"$in": [ObjectId(i) for i in appointment_ids]},
+            "status": {"$in": ["pending", "claimed"]}
+        })
+
+    async def enqueue_cancellation_notices(self, appointments: List[Dict[str, Any]],
+                                           doctor: Dict[str, Any],
+                                           reason: Optional[str] = None) -> int:
+        """
+        Queue "appointment cancelled" notices, due immediately
+
+        They go through the same dispatcher (claim, retries, metrics) as
+        reminders. Patient contacts are loaded with a single $in query.
+        """
+        if not appointments:
+            return 0
+
+        patients = {
+            patient["_id"]: patient
+            for patient in await db.get_collection("users").find(
+                {"_id": {"$in": list({appointment["patient_id"] for appointment in appointments})}},
+                {"full_name": 1, "email": 1, "phone_number": 1, "country_code": 1}
+            ).to_list(None)
+        }
+
+        now = datetime.utcnow()
+        operations = []
+        for appointment in appointments:
+            patient = patients.get(appointment["patient_id"], {})
+            payload = {
+                "patient_name": patient.get("full_name"),
+                "doctor_name": doctor.get("full_name"),
+                "email": patient.get("email"),
+                "phone": f"{patient.get('country_code', '')}{patient['phone_number']}" if patient.get("phone_number") else None,
+                "date": appointment["appointment_date"].strftime("%Y-%m-%d"),
+                "time": appointment["time_slot"]["start_time"],
+                "reason": reason
+            }
+            operations.append(UpdateOne(
+                {"appointment_id": appointment["_id"], "kind": CANCELLATION_KIND},
+                {
+                    "$set": {
+                        "due_at": now,
+                        "status": "pending",
+                        "claim_id": None,
+                        "lease_until": None,
+                        "attempts": 0,
+                        "next_attempt_at": None,
+                        "payload": payload,
+                        "updated_at": now
+                    },
+                    "$setOnInsert": {"created_at": now}
+                },
+                upsert=True
+            ))
+
+        await self.reminders_collection.bulk_write(operations, ordered=False)
+        return len(operations)
+
+    async def _run(self):
+        while True:
+            try:
+                # Drain full batches back to back, then wait for the next poll
+                while await self.dispatch_due() >= settings.REMINDER_BATCH_SIZE:
+                    pass
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Reminder dispatch failed: {e}", exc_info=True)
+
+            await asyncio.sleep(settings.REMINDER_POLL_SECONDS)
+
+    async def dispatch_due(self) -> int:
+        """Claim one batch of due reminders and send them; returns the batch size"""
+        now = datetime.utcnow()
+        due_filter = {
+            "status": {"$in": ["pending", "claimed"]},
+            "due_at": {"$lte": now},
+            "$and": [
+                {"$or": [{"lease_until": None}, {"lease_until": {"$lt": now}}]},
+                # Failed sends back off until their next attempt
+                {"$or": [{"next_attempt_at": None}, {"next_attempt_at": {"$lte": now}}]}
+            ]
+        }
+
+        candidates = await self.reminders_collection.find(due_filter, {"_id": 1})\
+            .sort("due_at", 1)\
+            .limit(settings.REMINDER_BATCH_SIZE)\
+            .to_list(None)
+
+        self.metrics["last_run_at"] = now
+        self.metrics["last_batch_size"] = 0
+        if not candidates:
+            return 0
+
+        # Claim with a lease; the filter is re-applied so only one worker wins each reminder
+        claim_id = ObjectId()
+        await self.reminders_collection.update_many(
+            {"_id": {"$in": [doc["_id"] for doc in candidates]}, **due_filter},
+            {
+                "$set": {
+                    "status": "claimed",
+                    "claim_id": claim_id,
+                    "lease_until": now + timedelta(seconds=settings.REMINDER_LEASE_SECONDS)
+                },
+                "$inc": {"attempts": 1}
+            }
+        )
+
+        claimed = await self.reminders_collection.find({"claim_id": claim_id}).to_list(None)
+        self.metrics["last_batch_size"] = len(claimed)
+        if not claimed:
+            return len(candidates)
+
+        semaphore = asyncio.Semaphore(settings.REMINDER_SEND_CONCURRENCY)
+
+        async def send(reminder: Dict[str, Any]) -> bool:
+            async with semaphore:
+                try:
+                    return await self._send(reminder)
+                except Exception as e:
+                    logger.error(f"Failed to send reminder {reminder['_id']}: {e}")
+                    return False
+
+        results = await asyncio.gather(*(send(reminder) for reminder in claimed))
+
+        sent_at = datetime.utcnow()
+        operations = []
+        for reminder, ok in zip(claimed, results):
+            if ok:
+                update = {"status": "sent", "sent_at": sent_at, "lease_until": None}
+                self.metrics["total_sent"] += 1
+            elif reminder["attempts"] >= settings.REMINDER_MAX_ATTEMPTS:
+                update = {"status": "failed", "lease_until": None}
+                self.metrics["total_failed"] += 1
+            else:
+                # Retry with exponential backoff
+                update = {
+                    "status": "pending",
+                    "lease_until": None,
+                    "next_attempt_at": sent_at + timedelta(
+                        seconds=settings.REMINDER_RETRY_BASE_SECONDS * 2 ** reminder["attempts"]
+                    )
+                }
+            operations.append(UpdateOne({"_id": reminder["_id"], "claim_id": claim_id}, {"$set": update}))
+
+        await self.reminders_collection.bulk_write(operations, ordered=False)
+
+        self.metrics["max_dispatch_lag_seconds"] = round(
+            max((sent_at - reminder["due_at"]).total_seconds() for reminder in claimed), 1
+        )
+        return len(candidates)
+
+    async def _send(self, reminder: Dict[str, Any]) -> bool:
+        """Deliver a reminder through the configured channels"""
+        payload = reminder["payload"]
+        is_cancellation = reminder.get("kind") == CANCELLATION_KIND
+        if is_cancellation:
+            message = (
+                f"DOME Care: your appointment with {payload['doctor_name']} "
+                f"on {payload['date']} at {payload['time']} has been cancelled"
+                + (f" ({payload['reason']})" if payload.get("reason") else "")
+            )
+        else:
+            message = (
+                f"DOME Care reminder: appointment with {payload['doctor_name']} "
+                f"on {payload['date']} at {payload['time']}"
+            )
+
+        attempted = False
+        sent = False
+        if "email" in settings.REMINDER_CHANNELS and payload.get("email"):
+            attempted = True
+            if is_cancellation:
+                sent = await self.email_service.send_email(
+                    payload["email"], "Appointment Cancelled - DOME Care", message
+                ) or sent
+            else:
+                sent = await self.email_service.send_appointment_reminder(payload["email"], payload) or sent
+        if "sms" in settings.REMINDER_CHANNELS and payload.get("phone"):
+            attempted = True
+            sent = await self.messaging_service.send_sms(payload["phone"], message) or sent
+        if "whatsapp" in settings.REMINDER_CHANNELS and payload.get("phone"):
+            attempted = True
+            sent = await self.messaging_service.send_whatsapp(payload["phone"], message) or sent
+
+        if not attempted:
+            logger.warning(f"Reminder {reminder['_id']} has no reachable channel, skipping")
+            return True
+
+        return sent
+
+# Global service instance
+reminder_service = ReminderService()
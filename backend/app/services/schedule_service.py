@@ -0,0 +1,129 @@
+from typing import List, Optional, Dict, Any
+from datetime import datetime, date
+from bson import ObjectId
+from app.core.database import db
+from app.core.events import event_bus
+from app.core.exceptions import ValidationException
+from app.core.timezones import clinic_timezone_name, local_to_utc, day_bounds_utc, date_to_datetime
+from app.domain.entities.schedule_exception import ScheduleExceptionType
+from app.domain.events import DoctorScheduleChanged
+from app.domain.intervals import Interval
+import logging
+
+logger = logging.getLogger(__name__)
+
+class ScheduleService:
+    """Schedule exceptions (holidays, vacations, blocked ranges) on top of the weekly template"""
+
+    def __init__(self):
+        self.exceptions_collection = None
+
+    async def init(self):
+        """Initialize collections"""
+        self.exceptions_collection = db.get_collection("schedule_exceptions")
+
+    def _overlap_query(self, doctor_id: str, range_start: datetime, range_end: datetime) -> Dict[str, Any]:
+        # Served by (doctor_id, ends_at): only exceptions ending after the range start are scanned
+        return {
+            "doctor_id": ObjectId(doctor_id),
+            "ends_at": {"$gt": range_start},
+            "starts_at": {"$lt": range_end}
+        }
+
+    async def create_exception(self, doctor: Dict[str, Any],
+                               kind: ScheduleExceptionType,
+                               start_date: date,
+                               end_date: date,
+                               start_time: Optional[str] = None,
+                               end_time: Optional[str] = None,
+                               reason: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Block a clinic-local range
+
+        Without times the whole days from start_date to end_date are blocked;
+        with times the range runs from start_date start_time to end_date end_time.
+        """
+        if end_date < start_date:
+            raise ValidationException("end_date must not be before start_date")
+        if (start_time is None) != (end_time is None):
+            raise ValidationException("Provide both start_time and end_time, or neither")
+
+        tz_name = clinic_timezone_name(doctor)
+        if start_time is None:
+            starts_at, ends_at = day_bounds_utc(start_date, end_date, tz_name)
+        else:
+            starts_at = local_to_utc(start_date, start_time, tz_name)
+            ends_at = local_to_utc(end_date, end_time, tz_name)
+
+        if ends_at <= starts_at:
+            raise ValidationException("Exception must end after it starts")
+
+        exception_data = {
+            "doctor_id": doctor["_id"],
+            "kind": kind,
+            "reason": reason,
+            "start_date": date_to_datetime(start_date),
+            "end_date": date_to_datetime(end_date),
+            "start_time": start_time,
+            "end_time": end_time,
+            "starts_at": starts_at,
+            "ends_at": ends_at,
+            "timezone": tz_name,
+            "created_at": datetime.utcnow()
+        }
+
+        result = await self.exceptions_collection.insert_one(exception_data)
+        exception_data["_id"] = result.inserted_id
+        await event_bus.publish(DoctorScheduleChanged(doctor_id=str(doctor["_id"])))
+
+        logger.info(f"Schedule exception created for doctor {doctor['_id']}: {starts_at} - {ends_at}")
+        return self._serialize_exception(exception_data)
+
+    async def list_exceptions(self, doctor_id: str,
+                              range_start: Optional[datetime] = None,
+                              range_end: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        """Exceptions of a doctor, optionally only those overlapping a UTC range"""
+        if range_start and range_end:
+            query = self._overlap_query(doctor_id, range_start, range_end)
+        else:
+            query = {"doctor_id": ObjectId(doctor_id), "ends_at": {"$gt": datetime.utcnow()}}
+
+        exceptions = await self.exceptions_collection.find(query).sort("starts_at", 1).to_list(None)
+        return [self._serialize_exception(exception) for exception in exceptions]
+
+    async def delete_exception(self, doctor_id: str, exception_id: str) -> bool:
+        """Remove an exception (bookings cancelled by it stay cancelled)"""
+        result = await self.exceptions_collection.delete_one({
+            "_id": ObjectId(exception_id),
+            "doctor_id": ObjectId(doctor_id)
+        })
+        if result.deleted_count:
+            await event_bus.publish(DoctorScheduleChanged(doctor_id=doctor_id))
+        return result.deleted_count > 0
+
+    async def get_exception_intervals(self, doctor_id: str,
+                                      range_start: datetime,
+                                      range_end: datetime) -> List[Interval]:
+        """Blocked UTC intervals of a doctor overlapping a range"""
+        exceptions = await self.exceptions_collection.find(
+            self._overlap_query(doctor_id, range_start, range_end),
+            {"_id": 0, "starts_at": 1, "ends_at": 1}
+        ).to_list(None)
+        return [(exception["starts_at"], exception["ends_at"]) for exception in exceptions]
+
+    async def is_blocked(self, doctor_id: str, starts_at: datetime, ends_at: datetime) -> bool:
+        """Whether any exception overlaps [starts_at, ends_at)"""
+        existing = await self.exceptions_collection.find_one(
+            self._overlap_query(doctor_id, starts_at, ends_at), {"_id": 1}
+        )
+        return existing is not None
+
+    def _serialize_exception(self, exception: Dict[str, Any]) -> Dict[str, Any]:
+        exception["_id"] = str(exception["_id"])
+        exception["doctor_id"] = str(exception["doctor_id"])
+        exception["start_date"] = exception["start_date"].date()
+        exception["end_date"] = exception["end_date"].date()
+        return exception
+
+# Global service instance
+schedule_service = ScheduleService()
@@ -0,0 +1,241 @@
+import asyncio
+import time
+from typing import Iterable, List, Optional, Dict, Any
+from datetime import datetime
+from bson import ObjectId
+from app.core.config import settings
+from app.core.database import db
+from app.core.events import event_bus
+from app.domain.entities.user import USER_SUMMARY_PROJECTION
+from app.domain.events import DoctorProfileUpdated, UserUpdated
+from app.domain.field_selection import FieldSelection
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Collections embedding user snapshots, and the user-id field of each role
+SUMMARY_TARGETS = {
+    "appointments": ("doctor_id", "patient_id"),
+    "prescriptions": ("doctor_id", "patient_id"),
+}
+
+# Parties populated on appointments and prescriptions (?expand=)
+SUMMARY_ROLES = ("doctor", "patient")
+
+# Top-level user fields copied into snapshots
+SUMMARY_USER_FIELDS = ("full_name", "email", "phone_number", "country_code", "role", "gender", "date_of_birth")
+SUMMARY_SPECIALTY_FIELDS = ("main_specialty", "sub_specialty")
+SUMMARY_CLINIC_FIELDS = ("city", "area", "clinic_phone", "consultation_fee", "currency")
+
+def build_user_summary(user: Dict[str, Any], synced_at: Optional[datetime] = None) -> Dict[str, Any]:
+    """Snapshot of the user fields shown next to an appointment or prescription"""
+    summary = {"_id": user["_id"], "synced_at": synced_at or datetime.utcnow()}
+    for field in SUMMARY_USER_FIELDS:
+        if user.get(field) is not None:
+            summary[field] = user[field]
+
+    if user.get("specialties"):
+        summary["specialties"] = [
+            {field: specialty[field] for field in SUMMARY_SPECIALTY_FIELDS if specialty.get(field)}
+            for specialty in user["specialties"]
+        ]
+    clinic_info = {
+        field: value for field, value in (user.get("clinic_info") or {}).items()
+        if field in SUMMARY_CLINIC_FIELDS and value is not None
+    }
+    if clinic_info:
+        summary["clinic_info"] = clinic_info
+    return summary
+
+def touches_summary(update_data: Dict[str, Any]) -> bool:
+    """Whether a $set document changes a field that snapshots copy"""
+    for key in update_data:
+        root, _, rest = key.partition(".")
+        if root in SUMMARY_USER_FIELDS or root == "specialties":
+            return True
+        if root == "clinic_info" and (not rest or rest.split(".")[0] in SUMMARY_CLINIC_FIELDS):
+            return True
+    return False
+
+async def attach_summaries(documents: List[Dict[str, Any]], role: str) -> None:
+    """
+    Set `doctor`/`patient` on appointments or prescriptions from their snapshot
+
+    Documents without a snapshot (created before snapshots, or with
+    USER_SUMMARIES_ENABLED off) are filled from users in one $in query.
+    """
+    summary_field = f"{role}_summary"
+    id_field = f"{role}_id"
+    missing = []
+    for document in documents:
+        summary = document.pop(summary_field, None)
+        if summary is not None and settings.USER_SUMMARIES_ENABLED:
+            document[role] = summary
+        else:
+            missing.append(document)
+
+    if not missing:
+        return
+
+    user_ids = list({document[id_field] for document in missing})
+    users = {
+        user["_id"]: user
+        for user in await db.get_collection("users").find(
+            {"_id": {"$in": user_ids}}, USER_SUMMARY_PROJECTION
+        ).to_list(None)
+    }
+    for document in missing:
+        user = users.get(document[id_field])
+        document[role] = build_user_summary(user) if user else None
+
+def summary_projection(selection: FieldSelection, expand: Iterable[str]) -> Optional[Dict[str, Any]]:
+    """
+    Projection of appointments/prescriptions populating only `expand`
+
+    Snapshots of parties not populated are left on the server; with sparse
+    fields only those are read, plus the id and snapshot population needs.
+    """
+    if selection.fields is None:
+        return {f"{role}_summary": 0 for role in SUMMARY_ROLES if role not in expand} or None
+    return selection.projection(*(f"{role}{suffix}" for role in expand for suffix in ("_id", "_summary")))
+
+class SummaryPropagator:
+    """
+    Keeps the doctor/patient snapshots embedded in appointments and
+    prescriptions in line with the users they were copied from
+
+    Profile updates queue the user (coalesced in memory); a worker rebuilds
+    the snapshot and rewrites it in batches of SUMMARY_PROPAGATION_BATCH_SIZE
+    documents with update_many. Documents already synced after the change are
+    skipped, so re-running a user is cheap and a crash mid-way is repaired by
+    the next change or by the backfill script. The lag between a profile
+    update and the last batch written for it is exposed in `metrics`.
+    """
+
+    def __init__(self):
+        self.users_collection = None
+        # user_id -> monotonic time of the first unpropagated change
+        self._pending: Dict[ObjectId, float] = {}
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self.metrics: Dict[str, Any] = {
+            "pending_users": 0,
+            "total_users_propagated": 0,
+            "total_documents_updated": 0,
+            "last_propagated_at": None,
+            "last_lag_ms": None,
+            "max_lag_ms": None,
+            "dropped": 0,
+            "errors": 0
+        }
+
+    async def init(self):
+        """Initialize collections"""
+        self.users_collection = db.get_collection("users")
+        event_bus.subscribe(DoctorProfileUpdated, self._on_user_changed)
+        event_bus.subscribe(UserUpdated, self._on_user_changed)
+
+    def _on_user_changed(self, event) -> None:
+        user_id = getattr(event, "doctor_id", None) or event.user_id
+        if touches_summary(dict.fromkeys(event.fields)):
+            self.mark_changed(user_id)
+
+    def start(self):
+        """Start the propagation worker"""
+        if settings.USER_SUMMARIES_ENABLED and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the worker; queued users are left to the next change or the backfill"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def mark_changed(self, user_id: Any) -> None:
+        """Queue a user whose snapshot fields changed; never blocks"""
+        if not settings.USER_SUMMARIES_ENABLED:
+            return
+
+        user_id = ObjectId(user_id)
+        if user_id not in self._pending:
+            if len(self._pending) >= settings.SUMMARY_PROPAGATION_MAX_PENDING:
+                self.metrics["dropped"] += 1
+                return
+            self._pending[user_id] = time.monotonic()
+
+        self.metrics["pending_users"] = len(self._pending)
+        self._wakeup.set()
+
+    async def _run(self):
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+
+            batch, self._pending = self._pending, {}
+            self.metrics["pending_users"] = 0
+            for user_id, changed_at in batch.items():
+                try:
+                    await self.propagate(user_id)
+                    self._record_lag(changed_at)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    self.metrics["errors"] += 1
+                    logger.error(f"Summary propagation failed for user {user_id}: {e}")
+
+    def _record_lag(self, changed_at: float) -> None:
+        lag_ms = round((time.monotonic() - changed_at) * 1000, 1)
+        self.metrics["last_lag_ms"] = lag_ms
+        self.metrics["max_lag_ms"] = max(self.metrics["max_lag_ms"] or 0, lag_ms)
+        self.metrics["last_propagated_at"] = datetime.utcnow()
+        self.metrics["total_users_propagated"] += 1
+
+    async def propagate(self, user_id: ObjectId) -> int:
+        """Rewrite every snapshot of a user; returns the number of documents updated"""
+        user = await self.users_collection.find_one({"_id": user_id}, USER_SUMMARY_PROJECTION)
+        if not user:
+            return 0
+
+        # Millisecond precision, as stored: the stale filter compares against it
+        now = datetime.utcnow()
+        started = now.replace(microsecond=now.microsecond // 1000 * 1000)
+        summary = build_user_summary(user, started)
+        updated = 0
+        for collection_name, id_fields in SUMMARY_TARGETS.items():
+            collection = db.get_collection(collection_name)
+            for id_field in id_fields:
+                updated += await self._rewrite(collection, id_field, user_id, summary, started)
+
+        self.metrics["total_documents_updated"] += updated
+        return updated
+
+    async def _rewrite(self, collection, id_field: str, user_id: ObjectId,
+                       summary: Dict[str, Any], started: datetime) -> int:
+        summary_field = id_field.replace("_id", "_summary")
+        # Not yet synced by this run (older snapshot, or none at all)
+        stale = {id_field: user_id, f"{summary_field}.synced_at": {"$not": {"$gte": started}}}
+
+        updated = 0
+        while True:
+            ids = [
+                document["_id"]
+                for document in await collection.find(stale, {"_id": 1})
+                .limit(settings.SUMMARY_PROPAGATION_BATCH_SIZE).to_list(None)
+            ]
+            if not ids:
+                return updated
+
+            result = await collection.update_many(
+                {"_id": {"$in": ids}},
+                {"$set": {summary_field: summary}}
+            )
+            updated += result.modified_count
+            # Yield between batches so one busy profile does not starve the loop
+            await asyncio.sleep(0)
+
+# Global propagator instance
+summary_propagator = SummaryPropagator()
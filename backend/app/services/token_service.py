@@ -0,0 +1,88 @@
+from typing import Optional, Dict, Any, Tuple
+from datetime import datetime, timedelta
+from uuid import uuid4
+from bson import ObjectId
+from app.core.database import db
+from app.core.config import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+class RefreshTokenService:
+    """
+    Server-side refresh token families
+
+    Every refresh token has a document keyed by its `jti`. Rotating marks the
+    presented token used and issues a successor in the same family; presenting
+    an already-used token means it leaked, so the whole family is revoked.
+    "Revoke all" bumps the user's `token_version`, which every token carries.
+    """
+
+    def __init__(self):
+        self.tokens_collection = None
+        self.users_collection = None
+
+    async def init(self):
+        """Initialize collections"""
+        self.tokens_collection = db.get_collection("refresh_tokens")
+        self.users_collection = db.get_collection("users")
+
+    async def issue(self, user_id: str, family_id: Optional[str] = None) -> Tuple[str, str]:
+        """Register a new refresh token, returning its (jti, family_id)"""
+        jti = uuid4().hex
+        family_id = family_id or uuid4().hex
+        now = datetime.utcnow()
+
+        await self.tokens_collection.insert_one({
+            "_id": jti,
+            "family_id": family_id,
+            "user_id": ObjectId(user_id),
+            "created_at": now,
+            "expires_at": now + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS),
+            "used_at": None,
+            "revoked_at": None
+        })
+
+        return jti, family_id
+
+    async def rotate(self, jti: str) -> Optional[Dict[str, Any]]:
+        """Mark a refresh token used; returns it, or None if it is not redeemable"""
+        now = datetime.utcnow()
+
+        # Single lookup on _id for the common case
+        token = await self.tokens_collection.find_one_and_update(
+            {"_id": jti, "used_at": None, "revoked_at": None, "expires_at": {"$gt": now}},
+            {"$set": {"used_at": now}},
+            projection={"family_id": 1, "user_id": 1}
+        )
+
+        if token:
+            return token
+
+        # Reuse detection: a token that was already rotated is being replayed
+        stale = await self.tokens_collection.find_one(
+            {"_id": jti},
+            {"family_id": 1, "used_at": 1}
+        )
+        if stale and stale.get("used_at"):
+            logger.warning(f"Refresh token reuse detected, revoking family {stale['family_id']}")
+            await self.revoke_family(stale["family_id"])
+
+        return None
+
+    async def revoke_family(self, family_id: str) -> None:
+        """Revoke every token in a refresh token family (e.g. logout)"""
+        await self.tokens_collection.update_many(
+            {"family_id": family_id, "revoked_at": None},
+            {"$set": {"revoked_at": datetime.utcnow()}}
+        )
+
+    async def revoke_all(self, user_id: str) -> None:
+        """Invalidate all of a user's access and refresh tokens in O(1)"""
+        await self.users_collection.update_one(
+            {"_id": ObjectId(user_id)},
+            {"$inc": {"token_version": 1}, "$set": {"updated_at": datetime.utcnow()}}
+        )
+
+# Global service instance
+refresh_token_service = RefreshTokenService()
@@ -0,0 +1,62 @@
+"""
+Write-behind flush latency of activity timestamps
+
+Run from backend/ against a MongoDB (MONGODB_URL):
+    python -m benchmarks.activity_flush [users] [rounds]
+
+Seeds `users` users (default 20000). For buffer sizes up to twice
+ACTIVITY_BUFFER_MAX_USERS (the most the recorder holds), records a
+last_login for that many distinct users and times the flush, `rounds`
+times (default 50). Reports flush p50/p95/max, users written per second
+and the cost of record() on the request path.
+"""
+import asyncio
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from bson import ObjectId
+from app.core.config import settings
+from app.services.activity_service import ActivityRecorder
+from benchmarks.support import percentile, round_trips, scratch_database
+
+random.seed(7)
+
+async def main(users: int, rounds: int) -> None:
+    async with scratch_database("activity_flush") as database:
+        ids = [ObjectId() for _ in range(users)]
+        for start in range(0, users, 10000):
+            await database.users.insert_many([{"_id": user_id, "role": "patient"}
+                                              for user_id in ids[start:start + 10000]])
+        recorder = ActivityRecorder()
+        await recorder.init()
+
+        limit = settings.ACTIVITY_BUFFER_MAX_USERS
+        sizes = sorted({size for size in (100, 1000, limit, limit * 2) if size <= min(users, limit * 2)})
+        print(f"{users} users, {rounds} flushes per buffer size")
+        now = datetime.utcnow()
+        for size in sizes:
+            timings, recording, commands = [], 0.0, 0
+            for round_number in range(rounds):
+                value = now + timedelta(seconds=round_number)
+                sample = random.sample(ids, size)
+                started = time.perf_counter()
+                for user_id in sample:
+                    recorder.record(user_id, "last_login", value)
+                recording += time.perf_counter() - started
+
+                before = round_trips.count
+                started = time.perf_counter()
+                assert await recorder.flush() == size
+                timings.append((time.perf_counter() - started) * 1000)
+                commands += round_trips.count - before
+
+            print(f"{size:>6} users  flush p50 {percentile(timings, 0.5):>8.1f} ms  "
+                  f"p95 {percentile(timings, 0.95):>8.1f} ms  max {max(timings):>8.1f} ms  "
+                  f"{size * rounds / (sum(timings) / 1000):>8.0f} users/s  "
+                  f"record {recording * 1e6 / (size * rounds):>5.2f} us  "
+                  f"{commands / rounds:>4.1f} round trips per flush")
+
+if __name__ == "__main__":
+    args = [int(arg) for arg in sys.argv[1:3]]
+    asyncio.run(main(*(args + [20000, 50][len(args):])))
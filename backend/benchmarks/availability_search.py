@@ -0,0 +1,126 @@
+"""
+Cross-doctor availability search over the precomputed index
+
+Run from backend/ against a MongoDB (MONGODB_URL):
+    python -m benchmarks.availability_search [doctors] [searches]
+
+Seeds `doctors` active doctors (default 5000) working 09:00-17:00 in
+30-minute slots, spread over a few cities and specialties, with bookings
+filling about a third of the next AVAILABILITY_HORIZON_DAYS days. Then:
+- rebuild_all over the whole horizon (what the leader runs periodically)
+- "who can see me tomorrow in <city> for <specialty>", `searches` times
+  (default 200): search_doctors with available_on, against the previous
+  client flow of paging through the search and asking each doctor for
+  tomorrow's slots until a page of 20 doctors with free time is found
+- refresh_doctor for the booked day, as queued by a booking
+"""
+import asyncio
+import random
+import sys
+import time
+from datetime import timedelta
+from bson import ObjectId
+from app.core.config import settings
+from app.core.timezones import date_to_datetime, local_to_utc, local_today
+from app.domain.entities.appointment import AppointmentStatus
+from app.services.appointment_service import appointment_service
+from app.services.availability_service import availability_service
+from app.services.doctor_service import doctor_service
+from app.services.schedule_service import schedule_service
+from benchmarks.support import report, round_trips, scratch_database, timed
+
+random.seed(7)
+CITIES = ["Damascus", "Aleppo", "Homs", "Latakia", "Hama"]
+SPECIALTIES = ["cardiology", "dermatology", "pediatrics", "neurology", "orthopedics", "dentistry"]
+WORKING_DAY = {"is_working": True, "time_slots": [{"start_time": "09:00", "end_time": "17:00"}]}
+SLOT_STARTS = [f"{minute // 60:02d}:{minute % 60:02d}" for minute in range(9 * 60, 17 * 60, 30)]
+PAGE = 20
+
+async def seed(database, count: int) -> list:
+    schedule = {day: WORKING_DAY for day in
+                ("saturday", "sunday", "monday", "tuesday", "wednesday", "thursday", "friday")}
+    doctors = [{"_id": ObjectId(), "role": "doctor", "status": "active", "documents_verified": True,
+                "full_name": f"Dr. {i}", "rating": round(random.uniform(3, 5), 1),
+                "specialties": {"main_specialty": random.choice(SPECIALTIES)},
+                "clinic_info": {"city": random.choice(CITIES), "consultation_fee": 50000,
+                                "session_duration": 30, "schedule": schedule}}
+               for i in range(count)]
+    await database.users.insert_many(doctors)
+
+    today = local_today(settings.CLINIC_TIMEZONE)
+    appointments = []
+    for doctor in doctors:
+        for offset in range(settings.AVAILABILITY_HORIZON_DAYS):
+            day = today + timedelta(days=offset)
+            for start_time in random.sample(SLOT_STARTS, random.randint(0, len(SLOT_STARTS) * 2 // 3)):
+                starts_at = local_to_utc(day, start_time, settings.CLINIC_TIMEZONE)
+                appointments.append({"doctor_id": doctor["_id"], "patient_id": ObjectId(),
+                                     "status": AppointmentStatus.CONFIRMED, "starts_at": starts_at,
+                                     "ends_at": starts_at + timedelta(minutes=30),
+                                     "appointment_date": date_to_datetime(day)})
+        if len(appointments) >= 10000:
+            await database.appointments.insert_many(appointments)
+            appointments = []
+    if appointments:
+        await database.appointments.insert_many(appointments)
+    return doctors
+
+async def previous_search(city: str, specialty: str, day) -> list:
+    """Page through the search, asking every doctor for the day's slots"""
+    found, page = [], 1
+    while len(found) < PAGE:
+        result = await doctor_service.search_doctors(specialty=specialty, city=city, page=page, limit=PAGE)
+        for doctor in result["doctors"]:
+            if await appointment_service.get_doctor_available_slots(doctor["_id"], day.isoformat()):
+                found.append(doctor)
+                if len(found) == PAGE:
+                    break
+        if page >= result["pages"]:
+            break
+        page += 1
+    return found
+
+async def indexed_search(city: str, specialty: str, day) -> list:
+    result = await doctor_service.search_doctors(specialty=specialty, city=city, available_on=day, limit=PAGE)
+    return result["doctors"]
+
+async def main(count: int, searches: int) -> None:
+    async with scratch_database("availability_search") as database:
+        for service in (doctor_service, appointment_service, schedule_service, availability_service):
+            await service.init()
+        doctors = await seed(database, count)
+        booked = await database.appointments.count_documents({})
+        print(f"{count} doctors, {settings.AVAILABILITY_HORIZON_DAYS}-day horizon, {booked} bookings")
+
+        commands = round_trips.count
+        started = time.perf_counter()
+        await availability_service.rebuild_all()
+        elapsed = time.perf_counter() - started
+        stored = await database.doctor_availability.count_documents({})
+        print(f"rebuild_all                 {elapsed:>9.1f} s  {count / elapsed:>7.0f} doctors/s  "
+              f"{(round_trips.count - commands) / count:>5.1f} round trips per doctor  "
+              f"{stored} day documents")
+
+        tomorrow = local_today(settings.CLINIC_TIMEZONE) + timedelta(days=1)
+        queries = [(random.choice(CITIES), random.choice(SPECIALTIES)) for _ in range(searches)]
+        for name, search in [("previous (slots per doctor)", previous_search),
+                             ("available_on index", indexed_search)]:
+            latencies: list = []
+            commands = round_trips.count
+            started = time.perf_counter()
+            for city, specialty in queries:
+                await timed(lambda: search(city, specialty, tomorrow), latencies)
+            report(name, latencies, time.perf_counter() - started, round_trips.count - commands)
+
+        # What a booking triggers: tomorrow's bitmap and the summary of one doctor
+        sample = doctors[:min(count, 1000)]
+        latencies = []
+        commands = round_trips.count
+        started = time.perf_counter()
+        for doctor in sample:
+            await timed(lambda: availability_service.refresh_doctor(str(doctor["_id"]), [tomorrow]), latencies)
+        report("refresh_doctor (one day)", latencies, time.perf_counter() - started, round_trips.count - commands)
+
+if __name__ == "__main__":
+    args = [int(arg) for arg in sys.argv[1:3]]
+    asyncio.run(main(*(args + [5000, 200][len(args):])))
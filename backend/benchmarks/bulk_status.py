@@ -0,0 +1,63 @@
+"""
+End-of-day status updates: one bulk call against single calls
+
+Run from backend/ against a MongoDB (MONGODB_URL):
+    python -m benchmarks.bulk_status [appointments] [rounds]
+
+A doctor marks a day's confirmed appointments (default 200) completed,
+repeated over `rounds` fresh days (default 10):
+- one at a time through the previous path (populate, then update_one)
+- one at a time through transition_appointment
+- in one AppointmentService.bulk_update_status call
+Reports the time to update the whole day and round trips per update.
+HTTP overhead per request is not included, so single calls fare better
+here than from a client.
+"""
+import asyncio
+import sys
+import time
+from app.domain.entities.appointment import AppointmentStatus
+from app.services.appointment_service import AppointmentService
+from app.services.reminder_service import reminder_service
+from benchmarks.status_transition import PreviousAppointmentService, seed
+from benchmarks.support import percentile, round_trips, scratch_database
+
+async def one_by_one(service: AppointmentService, doctor_id: str, ids: list) -> None:
+    for appointment_id in ids:
+        await service.transition_appointment(appointment_id, AppointmentStatus.COMPLETED, doctor_id)
+
+async def in_bulk(service: AppointmentService, doctor_id: str, ids: list) -> None:
+    results = await service.bulk_update_status(doctor_id, [(i, AppointmentStatus.COMPLETED) for i in ids])
+    assert all(result["result"] == "updated" for result in results)
+
+async def main(count: int, rounds: int) -> None:
+    async with scratch_database("bulk_status") as database:
+        await reminder_service.init()
+        single, bulk = PreviousAppointmentService(), AppointmentService()
+        await single.init()
+        await bulk.init()
+        paths = [("previous, one at a time", single, one_by_one),
+                 ("transition, one at a time", bulk, one_by_one),
+                 ("bulk_update_status", bulk, in_bulk)]
+
+        print(f"{count} confirmed appointments -> completed, {rounds} rounds")
+        for name, service, run in paths:
+            timings, commands = [], 0
+            for _ in range(rounds):
+                await database.appointments.delete_many({})
+                await database.users.delete_many({})
+                doctor, _, ids = await seed(database, count)
+                await database.appointments.update_many({}, {"$set": {"status": AppointmentStatus.CONFIRMED}})
+
+                before = round_trips.count
+                started = time.perf_counter()
+                await run(service, str(doctor["_id"]), ids)
+                timings.append((time.perf_counter() - started) * 1000)
+                commands += round_trips.count - before
+
+            print(f"{name:<28}p50 {percentile(timings, 0.5):>8.1f} ms  max {max(timings):>8.1f} ms  "
+                  f"{commands / (rounds * count):>5.2f} round trips per update")
+
+if __name__ == "__main__":
+    args = [int(arg) for arg in sys.argv[1:3]]
+    asyncio.run(main(*(args + [200, 10][len(args):])))
@@ -0,0 +1,100 @@
+"""
+CPU cost against bytes saved for response compression
+
+Run from backend/:  python -m benchmarks.compression
+
+Payloads mirror the large JSON responses: a populated appointment list, a
+doctor search page and a prescription list with medicines. Each available
+encoder is timed at the dynamic and cacheable levels used by
+CompressionMiddleware.
+"""
+import json
+import random
+import time
+from datetime import datetime, timedelta
+from app.core.compression import CACHEABLE_LEVELS, DYNAMIC_LEVELS, available_encoders
+
+random.seed(7)
+NAMES = ["Ahmad", "Lina", "Omar", "Rama", "Yousef", "Nour", "Sami", "Hala"]
+CITIES = ["Damascus", "Aleppo", "Homs", "Latakia"]
+
+def _person(role: str) -> dict:
+    return {
+        "_id": f"{random.getrandbits(96):024x}",
+        "full_name": f"{random.choice(NAMES)} {random.choice(NAMES)}",
+        "phone_number": f"09{random.randint(10000000, 99999999)}",
+        "country_code": "+963",
+        "role": role,
+        "clinic_info": {"city": random.choice(CITIES), "consultation_fee": 50000, "currency": "SYP"} if role == "doctor" else None
+    }
+
+def appointments(count: int = 100) -> list:
+    start = datetime(2026, 1, 1, 9)
+    return [{
+        "_id": f"{random.getrandbits(96):024x}",
+        "appointment_date": (start + timedelta(days=i // 16)).date().isoformat(),
+        "time_slot": {"start_time": f"{9 + i % 8:02d}:00", "end_time": f"{9 + i % 8:02d}:30"},
+        "starts_at": (start + timedelta(minutes=30 * i)).isoformat(),
+        "status": random.choice(["pending", "confirmed", "completed"]),
+        "appointment_type": "consultation",
+        "reason": "Follow-up visit",
+        "consultation_fee": 50000,
+        "currency": "SYP",
+        "patient": _person("patient")
+    } for i in range(count)]
+
+def search_page(count: int = 20) -> dict:
+    doctors = []
+    for _ in range(count):
+        doctor = _person("doctor")
+        doctor.update({
+            "bio": "Specialist with long clinical experience in hospital and private practice.",
+            "specialties": [{"main_specialty": "Cardiology", "sub_specialty": "Interventional"}],
+            "rating": round(random.uniform(3, 5), 1),
+            "reviews_count": random.randint(0, 300),
+            "next_available_slot": {"date": "2026-01-02", "start_time": "10:30"}
+        })
+        doctors.append(doctor)
+    return {"doctors": doctors, "total": 240, "page": 1, "pages": 12, "limit": count}
+
+def prescriptions(count: int = 20) -> list:
+    return [{
+        "_id": f"{random.getrandbits(96):024x}",
+        "prescription_number": f"RX-2026-{i:05d}",
+        "diagnosis": "Seasonal allergic rhinitis",
+        "medicines": [{
+            "name": random.choice(["Amoxicillin", "Paracetamol", "Cetirizine", "Omeprazole"]),
+            "dosage": "500mg", "frequency": "3 times daily", "duration": "7 days",
+            "instructions": "Take after meals with a full glass of water"
+        } for _ in range(4)],
+        "doctor": _person("doctor")
+    } for i in range(count)]
+
+def measure(encoder, body: bytes, level: int, min_seconds: float = 0.2):
+    runs, started = 0, time.perf_counter()
+    while True:
+        compressed = encoder(body, level)
+        runs += 1
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_seconds:
+            return len(compressed), elapsed / runs * 1000
+
+def main():
+    payloads = {
+        "appointments x100": appointments(),
+        "search page x20": search_page(),
+        "prescriptions x20": prescriptions()
+    }
+    encoders = available_encoders()
+    print(f"{'payload':<20}{'encoding':<12}{'level':>6}{'bytes':>10}{'saved':>8}{'ms':>8}{'MB/s':>8}")
+    for name, payload in payloads.items():
+        body = json.dumps(payload).encode()
+        print(f"{name:<20}{'identity':<12}{'':>6}{len(body):>10}{'':>8}")
+        for encoding, encoder in encoders.items():
+            for levels in (DYNAMIC_LEVELS, CACHEABLE_LEVELS):
+                size, ms = measure(encoder, body, levels[encoding])
+                saved = 100 * (1 - size / len(body))
+                print(f"{'':<20}{encoding:<12}{levels[encoding]:>6}{size:>10}{saved:>7.1f}%{ms:>8.3f}{len(body) / ms / 1000:>8.1f}")
+
+if __name__ == "__main__":
+    main()
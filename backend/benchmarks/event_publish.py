@@ -0,0 +1,65 @@
+"""
+Per-publish overhead of the event bus
+
+Run from backend/:  python -m benchmarks.event_publish [events] [doctors]
+
+Publishes `events` DoctorScheduleChanged events (default 100000) spread
+over `doctors` doctors (default 1000), in-process with the outbox off, for
+1, 4 and 16 workers. Handlers are async no-ops, so the numbers are the
+bus's own cost. Reports:
+- publish: time per publish() call on the request path (picking the queue
+  by ordering key and enqueueing), p50/p99
+- delivered: events handled per second until the queues drained
+Also times ordering_key on its own.
+"""
+import asyncio
+import random
+import sys
+import time
+from app.core.config import settings
+from app.core.events import EventBus
+from app.domain.events import DoctorScheduleChanged, ordering_key
+from benchmarks.support import percentile
+
+random.seed(7)
+
+async def run(events, workers: int) -> None:
+    settings.EVENT_WORKERS = workers
+    # Nothing dropped: every queue could hold all the events
+    settings.EVENT_QUEUE_SIZE = len(events) * workers
+    bus = EventBus()
+
+    async def handler(event):
+        pass
+
+    bus.subscribe(DoctorScheduleChanged, handler)
+    bus.start()
+    latencies = []
+    started = time.perf_counter()
+    for event in events:
+        before = time.perf_counter()
+        await bus.publish(event)
+        latencies.append((time.perf_counter() - before) * 1e6)
+    await asyncio.gather(*(queue.join() for queue in bus._queues))
+    elapsed = time.perf_counter() - started
+    await bus.stop()
+    assert bus.metrics["delivered"] == len(events)
+    print(f"{workers:>3} workers  publish p50 {percentile(latencies, 0.5):>5.2f} us  "
+          f"p99 {percentile(latencies, 0.99):>6.2f} us  delivered {len(events) / elapsed:>9.0f}/s")
+
+async def main(count: int, doctors: int) -> None:
+    settings.EVENT_OUTBOX_ENABLED = False
+    doctor_ids = [f"{random.getrandbits(96):024x}" for _ in range(doctors)]
+    events = [DoctorScheduleChanged(doctor_id=random.choice(doctor_ids)) for _ in range(count)]
+    print(f"{count} events over {doctors} doctors")
+
+    started = time.perf_counter()
+    for event in events:
+        ordering_key(event)
+    print(f"ordering_key {(time.perf_counter() - started) * 1e6 / count:.2f} us per event")
+    for workers in (1, 4, 16):
+        await run(events, workers)
+
+if __name__ == "__main__":
+    args = [int(arg) for arg in sys.argv[1:3]]
+    asyncio.run(main(*(args + [100000, 1000][len(args):])))
@@ -0,0 +1,141 @@
+"""
+Payload size and latency of reads shaped by ?fields= and ?expand=
+
+Run from backend/ against a MongoDB (MONGODB_URL):
+    python -m benchmarks.field_selection [appointments] [requests]
+
+Seeds a doctor with `appointments` appointments (default 500) spread over
+50 patients, 100 prescriptions with medicines and 200 other doctors, then
+requests each read `requests` times (default 200) through the routers
+(authentication stubbed) in its default shape and in narrower ones:
+- /appointments/my for the doctor: default, a calendar view (fields), the
+  same with the patient expanded, and no expansion
+- /prescriptions/my for the doctor: default page and a list view
+- /doctors/{id}: default (with stats), a card view, no stats
+- /doctors/search: default page and a card view
+Reports response bytes, p50/p95 latency and round trips per request.
+Responses are measured before compression.
+"""
+import asyncio
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+import httpx
+from bson import ObjectId
+from fastapi import FastAPI
+from app.api.v1.endpoints import appointments, doctors, prescriptions
+from app.api.v1.endpoints.deps import get_current_user, get_current_user_optional
+from app.services.appointment_service import appointment_service
+from app.services.doctor_service import doctor_service
+from app.services.prescription_service import prescription_service
+from app.services.summary_service import build_user_summary
+from benchmarks.support import percentile, round_trips, scratch_database
+
+random.seed(7)
+NAMES = ["Ahmad", "Lina", "Omar", "Rama", "Yousef", "Nour", "Sami", "Hala"]
+CITIES = ["Damascus", "Aleppo", "Homs", "Latakia"]
+WEEK = ("monday", "tuesday", "wednesday", "thursday", "sunday")
+
+def doctor_document() -> dict:
+    return {
+        "_id": ObjectId(), "role": "doctor", "status": "active",
+        "full_name": f"Dr. {random.choice(NAMES)} {random.choice(NAMES)}",
+        "email": f"doctor{random.getrandbits(32)}@example.com", "phone_number": f"9{random.randint(10000000, 99999999)}",
+        "country_code": "+963", "gender": "female", "password_hash": "x" * 60,
+        "specialties": [{"main_specialty": "Cardiology", "sub_specialty": "Pediatric cardiology"}],
+        "bio": "Consultant cardiologist with fifteen years of clinical practice. " * 3,
+        "years_of_experience": 15, "rating": 4.7, "reviews_count": 120, "documents_verified": True,
+        "clinic_info": {
+            "clinic_name": "Heart Clinic", "address": "Mezzeh Highway, Building 12", "city": random.choice(CITIES),
+            "area": "Mezzeh", "clinic_phone": "112345678", "consultation_fee": 50000, "currency": "SYP",
+            "schedule": {day: {"is_working": True, "time_slots": [{"start_time": "09:00", "end_time": "17:00"}]}
+                         for day in WEEK}
+        },
+        "created_at": datetime.utcnow(), "updated_at": datetime.utcnow()
+    }
+
+async def seed(database, count: int) -> dict:
+    doctor = doctor_document()
+    others = [doctor_document() for _ in range(200)]
+    patients = [{"_id": ObjectId(), "role": "patient", "status": "active",
+                 "full_name": f"{random.choice(NAMES)} {random.choice(NAMES)}",
+                 "phone_number": f"9{random.randint(10000000, 99999999)}", "country_code": "+963",
+                 "gender": "male", "date_of_birth": datetime(1990, 4, 1)} for _ in range(50)]
+    await database.users.insert_many([doctor, *others, *patients])
+
+    start = datetime.utcnow().replace(hour=6, minute=0, second=0, microsecond=0) - timedelta(days=30)
+    rows = []
+    for i in range(count):
+        patient = random.choice(patients)
+        starts_at = start + timedelta(days=i // 16, minutes=30 * (i % 16))
+        rows.append({
+            "doctor_id": doctor["_id"], "patient_id": patient["_id"],
+            "appointment_date": datetime.combine(starts_at.date(), datetime.min.time()),
+            "time_slot": {"start_time": starts_at.strftime("%H:%M"),
+                          "end_time": (starts_at + timedelta(minutes=30)).strftime("%H:%M")},
+            "starts_at": starts_at, "ends_at": starts_at + timedelta(minutes=30), "timezone": "Asia/Damascus",
+            "status": random.choice(["pending", "confirmed", "completed"]), "appointment_type": "consultation",
+            "reason": "Follow-up visit after the last examination", "notes": "Bring previous test results",
+            "consultation_fee": 50000.0, "currency": "SYP", "created_at": starts_at, "updated_at": starts_at,
+            "doctor_summary": build_user_summary(doctor), "patient_summary": build_user_summary(patient)
+        })
+    await database.appointments.insert_many(rows)
+
+    await database.prescriptions.insert_many([{
+        "doctor_id": doctor["_id"], "patient_id": patient["_id"], "appointment_id": None,
+        "prescription_number": f"RX-2026-{i:06d}", "diagnosis": "Hypertension, stage 1",
+        "medicines": [{"name": "Amlodipine", "dosage": "5mg", "frequency": "Once daily", "duration": "30 days",
+                       "instructions": "Take in the morning"} for _ in range(3)],
+        "notes": "Review blood pressure in four weeks", "valid_until": start + timedelta(days=60),
+        "created_at": start + timedelta(hours=i), "updated_at": start + timedelta(hours=i),
+        "doctor_summary": build_user_summary(doctor), "patient_summary": build_user_summary(patient)
+    } for i, patient in enumerate(random.choice(patients) for _ in range(100))])
+    return doctor
+
+def reads(doctor_id: str) -> list:
+    calendar = "appointment_date,time_slot,status"
+    return [
+        ("/appointments/my", "default", {}),
+        ("/appointments/my", "calendar fields", {"fields": calendar}),
+        ("/appointments/my", "calendar + patient", {"fields": calendar, "expand": "patient"}),
+        ("/appointments/my", "no expansion", {"expand": ""}),
+        ("/prescriptions/my", "default", {}),
+        ("/prescriptions/my", "list fields", {"fields": "prescription_number,created_at", "expand": "patient"}),
+        (f"/doctors/{doctor_id}", "default (stats)", {}),
+        (f"/doctors/{doctor_id}", "card fields", {"fields": "full_name,specialties,clinic_info.city,rating"}),
+        (f"/doctors/{doctor_id}", "no stats", {"expand": ""}),
+        ("/doctors/search", "default", {}),
+        ("/doctors/search", "card fields", {"fields": "full_name,specialties,clinic_info.city,rating"}),
+    ]
+
+async def main(count: int, requests: int) -> None:
+    async with scratch_database("field_selection") as database:
+        doctor = await seed(database, count)
+        for service in (appointment_service, doctor_service, prescription_service):
+            await service.init()
+
+        app = FastAPI()
+        for module, prefix in ((appointments, "/appointments"), (prescriptions, "/prescriptions"), (doctors, "/doctors")):
+            app.include_router(module.router, prefix=prefix)
+        app.dependency_overrides[get_current_user] = lambda: doctor
+        app.dependency_overrides[get_current_user_optional] = lambda: None
+
+        print(f"{count} appointments, {requests} requests per read")
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+            for path, name, params in reads(str(doctor["_id"])):
+                latencies = []
+                commands = round_trips.count
+                for _ in range(requests):
+                    started = time.perf_counter()
+                    response = await client.get(path, params=params)
+                    latencies.append((time.perf_counter() - started) * 1000)
+                    assert response.status_code == 200, response.text
+                label = path if not path.startswith("/doctors/") or path == "/doctors/search" else "/doctors/{id}"
+                print(f"{label:<20}{name:<22}{len(response.content):>9} bytes  "
+                      f"p50 {percentile(latencies, 0.5):>7.2f} ms  p95 {percentile(latencies, 0.95):>7.2f} ms  "
+                      f"{(round_trips.count - commands) / requests:>4.1f} round trips")
+
+if __name__ == "__main__":
+    args = [int(arg) for arg in sys.argv[1:3]]
+    asyncio.run(main(*(args + [500, 200][len(args):])))
@@ -0,0 +1,103 @@
+"""
+OTP verification under concurrent attempts
+
+Run from backend/ against a MongoDB (MONGODB_URL):
+    python -m benchmarks.otp_verify [users] [concurrency]
+
+Every user (default 2000) has a live OTP and receives four verify requests
+at once: two wrong codes (within MAX_OTP_ATTEMPTS) and the right one twice,
+as from a typo and a double-tapped form. Compares the previous path (user lookup, token
+find_one, update_one setting used_at) with AuthService.verify_otp (one
+find_one_and_update on the (user_id, type, token) index), reporting
+throughput, latency, round trips per attempt and how many OTPs were
+accepted more than once.
+"""
+import asyncio
+import random
+import sys
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from bson import ObjectId
+from app.core.config import settings
+from app.services.auth_service import AuthService
+from benchmarks.support import report, round_trips, scratch_database, timed
+
+random.seed(7)
+OTP = "482913"
+WRONG = ["000000", "111111"]
+
+class PreviousAuthService(AuthService):
+    """verify_otp and store_otp before the single-operation consume"""
+
+    async def store_otp(self, user_id: str, otp: str) -> None:
+        await self.tokens_collection.insert_one({
+            "user_id": ObjectId(user_id),
+            "token": otp,
+            "type": "otp",
+            "created_at": datetime.utcnow(),
+            "expires_at": datetime.utcnow() + timedelta(minutes=settings.OTP_EXPIRY_MINUTES),
+            "attempts": 0
+        })
+
+    async def verify_otp(self, identifier: str, otp: str) -> bool:
+        user = await self.find_user_by_identifier(identifier)
+        if not user:
+            return False
+        token = await self.tokens_collection.find_one({
+            "user_id": user["_id"],
+            "token": otp,
+            "type": "otp",
+            "expires_at": {"$gt": datetime.utcnow()}
+        })
+        if not token:
+            return False
+        await self.tokens_collection.update_one(
+            {"_id": token["_id"]},
+            {"$set": {"used_at": datetime.utcnow()}}
+        )
+        return True
+
+async def seed_users(database, count: int) -> list:
+    users = [{"_id": ObjectId(), "email": f"user{i}@example.com", "full_name": f"User {i}", "role": "patient"}
+             for i in range(count)]
+    await database.users.insert_many(users)
+    return users
+
+async def run(name: str, service: AuthService, users: list, concurrency: int) -> None:
+    await service.tokens_collection.delete_many({})
+    for user in users:
+        await service.store_otp(str(user["_id"]), OTP)
+
+    attempts = [(user["email"], code) for user in users for code in [*WRONG, OTP, OTP]]
+    random.shuffle(attempts)
+    gate = asyncio.Semaphore(concurrency)
+    latencies: list = []
+    accepted: Counter = Counter()
+
+    async def attempt(email: str, code: str) -> None:
+        async with gate:
+            if await timed(lambda: service.verify_otp(email, code), latencies):
+                accepted[email] += 1
+
+    commands = round_trips.count
+    started = time.perf_counter()
+    await asyncio.gather(*(attempt(email, code) for email, code in attempts))
+    elapsed = time.perf_counter() - started
+
+    report(name, latencies, elapsed, round_trips.count - commands)
+    print(f"{'':<28}accepted {len(accepted)} of {len(users)} OTPs, "
+          f"{sum(1 for n in accepted.values() if n > 1)} more than once")
+
+async def main(users: int, concurrency: int) -> None:
+    async with scratch_database("otp_verify") as database:
+        seeded = await seed_users(database, users)
+        print(f"{users} users x 4 attempts, concurrency {concurrency}")
+        for name, service in [("previous (3 round trips)", PreviousAuthService()),
+                              ("find_one_and_update", AuthService())]:
+            await service.init()
+            await run(name, service, seeded, concurrency)
+
+if __name__ == "__main__":
+    args = [int(arg) for arg in sys.argv[1:3]]
+    asyncio.run(main(*(args + [2000, 64][len(args):])))
@@ -0,0 +1,89 @@
+"""
+Cost of list responses by read path
+
+Run from backend/:  python -m benchmarks.read_models
+
+10k stored appointments with a populated patient, from BSON documents to
+response bytes through FastAPI's response_model=dict handling, as the list
+endpoints return them:
+- raw dicts with ObjectIds and the stored date converted in place (the
+  list path before the read models)
+- AppointmentRead models validated by the cached List adapter (now)
+- the same models with a sparse fieldset (partial_adapter)
+"""
+import asyncio
+import gc
+import time
+from datetime import datetime, timedelta
+from bson import ObjectId
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+from app.domain.entities.appointment import AppointmentRead
+from app.domain.entities.base import validate_documents
+
+COUNT = 10000
+RESPONSE_FIELD = create_response_field(name="response", type_=dict)
+SPARSE_FIELDS = frozenset({"_id", "appointment_date", "time_slot", "status", "patient"})
+
+def documents():
+    start = datetime(2026, 1, 1, 7)
+    rows = []
+    for i in range(COUNT):
+        starts_at = start + timedelta(minutes=30 * i)
+        rows.append({
+            "_id": ObjectId(), "doctor_id": ObjectId(), "patient_id": ObjectId(),
+            "appointment_date": datetime.combine(starts_at.date(), datetime.min.time()),
+            "time_slot": {"start_time": "09:00", "end_time": "09:30"},
+            "status": "confirmed", "appointment_type": "consultation",
+            "starts_at": starts_at, "ends_at": starts_at + timedelta(minutes=30),
+            "timezone": "Asia/Damascus", "reason": "Regular checkup",
+            "consultation_fee": 50000.0, "currency": "SYP",
+            "created_at": starts_at, "updated_at": starts_at, "confirmed_at": starts_at,
+            "patient": {
+                "_id": ObjectId(), "full_name": "Rama Haddad", "email": "rama@example.com",
+                "phone_number": "933123456", "country_code": "+963", "role": "patient",
+                "gender": "female", "date_of_birth": datetime(1990, 4, 1)
+            }
+        })
+    return rows
+
+def previous(rows):
+    """Conversion done by the services before the read models"""
+    for row in rows:
+        row["_id"] = str(row["_id"])
+        row["doctor_id"] = str(row["doctor_id"])
+        row["patient_id"] = str(row["patient_id"])
+        row["appointment_date"] = row["appointment_date"].date()
+        row["patient"]["_id"] = str(row["patient"]["_id"])
+    return rows
+
+def through_fastapi(data) -> bytes:
+    content = asyncio.run(serialize_response(
+        field=RESPONSE_FIELD, response_content={"success": True, "data": data}, is_coroutine=True
+    ))
+    return JSONResponse(content).body
+
+PATHS = {
+    "previous dicts": previous,
+    "validated read models": lambda rows: validate_documents(AppointmentRead, rows),
+    "validated sparse fields": lambda rows: validate_documents(AppointmentRead, rows, SPARSE_FIELDS),
+}
+
+def main(runs: int = 9):
+    print(f"{COUNT} appointments, best of {runs}, validation / whole response")
+    for name, path in PATHS.items():
+        best_read = best_total = float("inf")
+        for _ in range(runs):
+            rows = documents()
+            gc.collect()
+            started = time.perf_counter()
+            data = path(rows)
+            read = time.perf_counter() - started
+            body = through_fastapi(data)
+            best_read = min(best_read, read)
+            best_total = min(best_total, time.perf_counter() - started)
+        print(f"{name:<28}{best_read * 1000:>8.1f} ms{best_total * 1000:>8.1f} ms{len(body):>10} bytes")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Registration and identifier lookup against the unique contact indexes
+
+Run from backend/ against a MongoDB (MONGODB_URL):
+    python -m benchmarks.registration [users] [concurrency]
+
+Registers `users` phone accounts (default 5000) with at most
+`concurrency` in flight (default 64) through the previous path (lookup by
+identifier, insert, then delete and insert the OTP) and through
+AuthService.register_user (user and OTP inserted together, duplicates
+rejected by the unique indexes). Password hashing is left out: it costs
+the same on both paths and would hide the database work. Then:
+- 200 phone numbers registered five times at once each; counts numbers
+  that ended up with more than one account
+- find_user_by_identifier for every account, by email typed in mixed
+  case and by phone number typed with separators
+Reports throughput, p50/p95/p99 latency and round trips per operation.
+"""
+import asyncio
+import random
+import sys
+import time
+from app.core.exceptions import ConflictException
+from app.services.auth_service import AuthService
+from benchmarks.support import report, round_trips, scratch_database, timed
+
+random.seed(7)
+OTP = "482913"
+RACES = 200
+
+class PreviousAuthService(AuthService):
+    """Registration before the unique indexes: look up, insert, then store the OTP"""
+
+    async def register_user(self, user_data, otp):
+        if await self.find_user_by_identifier(user_data["phone_number"]):
+            raise ConflictException("User already exists with this email/phone")
+        user = await self.create_user(user_data)
+        await self.store_otp(str(user["_id"]), otp)
+        return user
+
+def account(number: int) -> dict:
+    return {"full_name": f"User {number}", "email": f"User{number}@Example.com",
+            "phone_number": f"09{number:08d}", "country_code": "+963",
+            "password_hash": "x" * 60, "role": "patient", "auth_method": "phone", "status": "pending"}
+
+async def register_all(name: str, service: AuthService, first: int, count: int, concurrency: int) -> None:
+    gate = asyncio.Semaphore(concurrency)
+    latencies: list = []
+
+    async def register(number: int) -> None:
+        async with gate:
+            await timed(lambda: service.register_user(account(number), OTP), latencies)
+
+    commands = round_trips.count
+    started = time.perf_counter()
+    await asyncio.gather(*(register(number) for number in range(first, first + count)))
+    report(name, latencies, time.perf_counter() - started, round_trips.count - commands)
+
+async def race(service: AuthService, database, first: int) -> int:
+    """Register each number five times at once; returns numbers with several accounts"""
+    async def attempt(number: int) -> None:
+        try:
+            # Phone-only sign-ups: nothing but the phone number can collide
+            await service.register_user({**account(number), "email": None}, OTP)
+        except ConflictException:
+            pass
+
+    numbers = range(first, first + RACES)
+    await asyncio.gather(*(attempt(number) for number in numbers for _ in range(5)))
+    return sum([await database.users.count_documents({"phone_number": account(number)["phone_number"]}) > 1
+                for number in numbers])
+
+async def main(count: int, concurrency: int) -> None:
+    async with scratch_database("registration") as database:
+        print(f"{count} registrations per path, concurrency {concurrency}")
+        paths = [("previous (lookup + inserts)", PreviousAuthService()),
+                 ("register_user", AuthService())]
+        for index, (name, service) in enumerate(paths):
+            await service.init()
+            if isinstance(service, PreviousAuthService):
+                # The phone number only had a non-unique sparse index then
+                await database.users.drop_index("country_code_1_phone_number_1")
+            else:
+                await database.users.delete_many({})
+                await database.users.create_index(
+                    [("country_code", 1), ("phone_number", 1)], unique=True,
+                    partialFilterExpression={"phone_number": {"$type": "string"}}
+                )
+            first = index * (count + RACES) * 10
+            await register_all(name, service, first, count, concurrency)
+            duplicated = await race(service, database, first + count)
+            print(f"{'':<28}numbers registered more than once: {duplicated}/{RACES}")
+
+        service = paths[-1][1]
+        first = (count + RACES) * 10
+        for name, identifier in [("lookup by email", lambda n: f"  USER{n}@example.COM "),
+                                 ("lookup by phone", lambda n: f"09{n // 10000:04d}-{n % 10000:04d}")]:
+            latencies: list = []
+            commands = round_trips.count
+            started = time.perf_counter()
+            for number in range(first, first + count):
+                user = await timed(lambda: service.find_user_by_identifier(identifier(number)), latencies)
+                assert user is not None
+            report(name, latencies, time.perf_counter() - started, round_trips.count - commands)
+
+if __name__ == "__main__":
+    args = [int(arg) for arg in sys.argv[1:3]]
+    asyncio.run(main(*(args + [5000, 64][len(args):])))
@@ -0,0 +1,97 @@
+"""
+Dispatch lag of the reminder queue under a backlog
+
+Run from backend/ against a MongoDB (MONGODB_URL):
+    python -m benchmarks.reminder_dispatch [count] [workers]
+
+Inserts `count` (default 100k) reminders that all fall due within the last
+minute, then drains them with `workers` dispatchers (default 4) claiming
+concurrently, as replicas would. Sends take a few milliseconds and 1% of
+them fail, which exercises the retry backoff. Reports the drain time, the
+dispatch lag (sent_at - due_at) percentiles and how many reminders were
+claimed twice.
+"""
+import asyncio
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from bson import ObjectId
+from app.core.config import settings
+from app.services.reminder_service import ReminderService
+from benchmarks.support import percentile, scratch_database
+
+random.seed(7)
+SEND_SECONDS = 0.002
+FAILURE_RATE = 0.01
+
+async def seed(collection, count: int) -> None:
+    now = datetime.utcnow()
+    batch = []
+    for i in range(count):
+        batch.append({
+            "appointment_id": ObjectId(),
+            "kind": "120m",
+            "due_at": now - timedelta(seconds=random.uniform(0, 60)),
+            "status": "pending",
+            "claim_id": None,
+            "lease_until": None,
+            "attempts": 0,
+            "next_attempt_at": None,
+            "payload": {"doctor_name": "Dr. Lina", "date": "2026-01-02", "time": "10:00",
+                        "email": f"patient{i}@example.com", "phone": None},
+            "created_at": now
+        })
+        if len(batch) == 10000:
+            await collection.insert_many(batch, ordered=False)
+            batch = []
+    if batch:
+        await collection.insert_many(batch, ordered=False)
+
+def worker(claims: dict) -> ReminderService:
+    service = ReminderService()
+
+    async def send(reminder):
+        claims[reminder["_id"]] = claims.get(reminder["_id"], 0) + 1
+        await asyncio.sleep(SEND_SECONDS)
+        return random.random() >= FAILURE_RATE
+
+    service._send = send
+    return service
+
+async def drain(service: ReminderService) -> None:
+    while await service.dispatch_due():
+        pass
+
+async def main(count: int, workers: int) -> None:
+    async with scratch_database("reminder_dispatch") as database:
+        collection = database.reminders_due
+        print(f"seeding {count} reminders")
+        await seed(collection, count)
+
+        claims: dict = {}
+        services = [worker(claims) for _ in range(workers)]
+        for service in services:
+            await service.init()
+
+        started = time.perf_counter()
+        await asyncio.gather(*(drain(service) for service in services))
+        elapsed = time.perf_counter() - started
+
+        lags = sorted([
+            (doc["sent_at"] - doc["due_at"]).total_seconds()
+            async for doc in collection.find({"status": "sent"}, {"sent_at": 1, "due_at": 1})
+        ])
+        backing_off = await collection.count_documents({"status": "pending"})
+        print(f"workers {workers}, batch {settings.REMINDER_BATCH_SIZE}, "
+              f"send concurrency {settings.REMINDER_SEND_CONCURRENCY}")
+        print(f"drained {len(lags)} sent in {elapsed:.1f}s ({len(lags) / elapsed:.0f}/s), "
+              f"{backing_off} backing off for retry")
+        if lags:
+            print(f"dispatch lag p50 {percentile(lags, 0.5):.1f}s  p99 {percentile(lags, 0.99):.1f}s  "
+                  f"max {lags[-1]:.1f}s")
+        print(f"claimed more than once: {sum(1 for n in claims.values() if n > 1)}")
+
+if __name__ == "__main__":
+    args = [int(arg) for arg in sys.argv[1:3]]
+    asyncio.run(main(*(args + [100000, 4][len(args):])))
@@ -0,0 +1,119 @@
+"""
+Round trips and latency per appointment status transition
+
+Run from backend/ against a MongoDB (MONGODB_URL):
+    python -m benchmarks.status_transition [appointments] [concurrency]
+
+The previous path loaded the appointment with its doctor and patient
+populated to check ownership (three reads), then ran an unguarded
+update_one. AppointmentService.transition_appointment does one guarded
+find_one_and_update. Each path confirms `appointments` pending bookings
+(default 2000), then races the doctor completing each one against the
+patient cancelling it. Both are final states, so only one may apply;
+counts bookings where both writes went through.
+"""
+import asyncio
+import sys
+import time
+from datetime import datetime, timedelta
+from bson import ObjectId
+from app.domain.entities.appointment import AppointmentStatus
+from app.services.appointment_service import AppointmentService
+from app.services.reminder_service import reminder_service
+from benchmarks.support import report, round_trips, scratch_database, timed
+
+class PreviousAppointmentService(AppointmentService):
+    """The endpoint's ownership check and update before the transition engine"""
+
+    async def transition_appointment(self, appointment_id, new_status, user_id, doctor_only=True, reason=None):
+        appointment = await self.appointments_collection.find_one({"_id": ObjectId(appointment_id)})
+        if not appointment:
+            raise LookupError("Appointment not found")
+        appointment["doctor"] = await self.doctors_collection.find_one(
+            {"_id": appointment["doctor_id"]}, {"password_hash": 0})
+        appointment["patient"] = await self.patients_collection.find_one(
+            {"_id": appointment["patient_id"]}, {"password_hash": 0})
+        if ObjectId(user_id) not in (appointment["doctor_id"], appointment["patient_id"]):
+            raise PermissionError("Access denied")
+
+        result = await self.appointments_collection.update_one(
+            {"_id": ObjectId(appointment_id)},
+            {"$set": self._transition_update(new_status, user_id, reason)}
+        )
+        if not result.modified_count:
+            raise RuntimeError("Failed to update appointment status")
+        return {"_id": appointment_id, "status": new_status}
+
+async def seed(database, count: int):
+    doctor = {"_id": ObjectId(), "role": "doctor", "status": "active", "full_name": "Dr. Lina Khoury",
+              "specialties": ["cardiology"], "bio": "x" * 400,
+              "clinic_info": {"city": "Damascus", "consultation_fee": 50000, "schedule": {}}}
+    patient = {"_id": ObjectId(), "role": "patient", "status": "active", "full_name": "Rama Haddad",
+               "medical_history": ["asthma"] * 20}
+    await database.users.insert_many([doctor, patient])
+
+    start = datetime(2026, 11, 2, 6)
+    appointments = []
+    for i in range(count):
+        starts_at = start + timedelta(minutes=30 * i)
+        appointments.append({
+            "_id": ObjectId(), "doctor_id": doctor["_id"], "patient_id": patient["_id"],
+            "status": AppointmentStatus.PENDING, "starts_at": starts_at,
+            "ends_at": starts_at + timedelta(minutes=30),
+            "appointment_date": datetime.combine(starts_at.date(), datetime.min.time()),
+            "time_slot": {"start_time": "09:00", "end_time": "09:30"}, "created_at": starts_at
+        })
+    await database.appointments.insert_many(appointments)
+    return doctor, patient, [str(appointment["_id"]) for appointment in appointments]
+
+async def confirm_all(name: str, service: AppointmentService, doctor_id: str, ids: list, concurrency: int) -> None:
+    gate = asyncio.Semaphore(concurrency)
+    latencies: list = []
+
+    async def confirm(appointment_id: str) -> None:
+        async with gate:
+            await timed(lambda: service.transition_appointment(
+                appointment_id, AppointmentStatus.CONFIRMED, doctor_id), latencies)
+
+    commands = round_trips.count
+    started = time.perf_counter()
+    await asyncio.gather(*(confirm(appointment_id) for appointment_id in ids))
+    report(name, latencies, time.perf_counter() - started, round_trips.count - commands)
+
+async def race(service: AppointmentService, doctor_id: str, patient_id: str, ids: list) -> int:
+    """Complete and cancel each booking at once; returns how many took both"""
+    async def succeeds(call) -> bool:
+        try:
+            await call
+            return True
+        except Exception:
+            return False
+
+    both = 0
+    for appointment_id in ids:
+        completed, cancelled = await asyncio.gather(
+            succeeds(service.transition_appointment(appointment_id, AppointmentStatus.COMPLETED, doctor_id)),
+            succeeds(service.transition_appointment(appointment_id, AppointmentStatus.CANCELLED, patient_id,
+                                                    doctor_only=False, reason="Can't make it"))
+        )
+        both += completed and cancelled
+    return both
+
+async def main(count: int, concurrency: int) -> None:
+    async with scratch_database("status_transition") as database:
+        await reminder_service.init()
+        print(f"{count} transitions per path, concurrency {concurrency}")
+        for name, service in [("previous (populate + update)", PreviousAppointmentService()),
+                              ("find_one_and_update", AppointmentService())]:
+            await service.init()
+            await database.appointments.delete_many({})
+            await database.users.delete_many({})
+            doctor, patient, ids = await seed(database, count)
+            await confirm_all(name, service, str(doctor["_id"]), ids, concurrency)
+
+            both = await race(service, str(doctor["_id"]), str(patient["_id"]), ids)
+            print(f"{'':<28}complete/cancel races where both applied: {both}/{count}")
+
+if __name__ == "__main__":
+    args = [int(arg) for arg in sys.argv[1:3]]
+    asyncio.run(main(*(args + [2000, 64][len(args):])))
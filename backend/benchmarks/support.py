@@ -0,0 +1,62 @@
+"""
+Shared setup for the benchmarks that run against MongoDB
+
+Point MONGODB_URL at a scratch server: each run works in its own database,
+created with the application's indexes and dropped afterwards.
+"""
+import time
+from contextlib import asynccontextmanager
+from typing import Awaitable, Callable, List
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import monitoring
+from app.core.config import settings
+from app.core.database import db
+
+class RoundTrips(monitoring.CommandListener):
+    """Counts commands sent to the server"""
+
+    def __init__(self):
+        self.count = 0
+
+    def started(self, event):
+        self.count += 1
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+round_trips = RoundTrips()
+
+@asynccontextmanager
+async def scratch_database(name: str, indexes: bool = True):
+    """Point the global `db` at a fresh database for the benchmark"""
+    db.client = AsyncIOMotorClient(settings.MONGODB_URL, event_listeners=[round_trips])
+    db.database = db.client[f"{settings.MONGODB_DATABASE}_bench_{name}"]
+    await db.client.drop_database(db.database.name)
+    if indexes:
+        await db._create_indexes()
+    try:
+        yield db.database
+    finally:
+        await db.client.drop_database(db.database.name)
+        db.client.close()
+
+def percentile(values: List[float], fraction: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+async def timed(call: Callable[[], Awaitable], latencies: List[float]):
+    """Await `call()`, appending its latency in milliseconds"""
+    started = time.perf_counter()
+    result = await call()
+    latencies.append((time.perf_counter() - started) * 1000)
+    return result
+
+def report(name: str, latencies: List[float], elapsed: float, commands: int) -> None:
+    """One line: throughput, latency percentiles and round trips per operation"""
+    count = len(latencies)
+    print(f"{name:<28}{count / elapsed:>9.0f}/s  p50 {percentile(latencies, 0.5):>7.2f} ms  "
+          f"p95 {percentile(latencies, 0.95):>7.2f} ms  p99 {percentile(latencies, 0.99):>7.2f} ms  "
+          f"{commands / count:>5.1f} round trips")
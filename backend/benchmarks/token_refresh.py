@@ -0,0 +1,63 @@
+"""
+Refresh throughput under load
+
+Run from backend/ against a MongoDB (MONGODB_URL):
+    python -m benchmarks.token_refresh [users] [rotations] [concurrency]
+
+Every user (default 1000) signs in once, then rotates its refresh token
+`rotations` times in a row (default 10), all users at once with at most
+`concurrency` refreshes in flight. Each refresh goes through the
+/auth/refresh handler: decode, one find_one_and_update on _id, the user
+read and the successor insert. A final pass replays every user's first
+token, which must be refused and revoke its family. Reports throughput,
+latency and round trips per refresh.
+"""
+import asyncio
+import logging
+import sys
+import time
+from bson import ObjectId
+from app.api.v1.endpoints.auth import issue_token_pair, refresh_token
+from app.services.auth_service import auth_service
+from app.services.token_service import refresh_token_service
+from benchmarks.support import report, round_trips, scratch_database, timed
+
+async def main(users: int, rotations: int, concurrency: int) -> None:
+    async with scratch_database("token_refresh") as database:
+        accounts = [{"_id": ObjectId(), "full_name": f"User {i}", "email": f"user{i}@example.com",
+                     "role": "patient", "token_version": 0} for i in range(users)]
+        await database.users.insert_many(accounts)
+        await auth_service.init()
+        await refresh_token_service.init()
+        first_tokens = [(await issue_token_pair(account))[1] for account in accounts]
+
+        gate = asyncio.Semaphore(concurrency)
+        latencies: list = []
+
+        async def session(token: str) -> None:
+            for _ in range(rotations):
+                async with gate:
+                    response = await timed(lambda: refresh_token(refresh_token=token), latencies)
+                token = response.refresh_token
+
+        commands = round_trips.count
+        started = time.perf_counter()
+        await asyncio.gather(*(session(token) for token in first_tokens))
+        elapsed = time.perf_counter() - started
+        print(f"{users} users x {rotations} rotations, concurrency {concurrency}")
+        report("refresh", latencies, elapsed, round_trips.count - commands)
+
+        # Each replay logs a reuse warning
+        logging.getLogger("app.services.token_service").setLevel(logging.ERROR)
+        refused = 0
+        for token in first_tokens:
+            try:
+                await refresh_token(refresh_token=token)
+            except Exception:
+                refused += 1
+        live = await database.refresh_tokens.count_documents({"revoked_at": None, "used_at": None})
+        print(f"replayed first tokens refused: {refused}/{users}; unrevoked live tokens left: {live}")
+
+if __name__ == "__main__":
+    args = [int(arg) for arg in sys.argv[1:4]]
+    asyncio.run(main(*(args + [1000, 10, 64][len(args):])))
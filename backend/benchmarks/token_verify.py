@@ -0,0 +1,70 @@
+"""
+Access-token verifications per second
+
+Run from backend/:  python -m benchmarks.token_verify [tokens]
+
+A pool of live HS256 access tokens (default 1000, one per active user) is
+presented in random order, as authenticated requests are. Compares
+python-jose's jwt.decode (decode_token before TokenVerifier) with
+TokenVerifier on each JOSE backend, with the claims cache off and on, and
+with tokens signed under a rotated `kid` key.
+"""
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from jose import jwt as jose_jwt
+from app.core.config import settings
+from app.core.token_verifier import JoseBackend, PyJWTBackend, TokenVerifier
+
+random.seed(7)
+PRESENTATIONS = 20000
+
+def verifier(backend, max_entries: int) -> TokenVerifier:
+    instance = TokenVerifier(max_entries=max_entries)
+    instance.backend = backend
+    return instance
+
+def issue(count: int, signer: TokenVerifier) -> list:
+    expires = datetime.utcnow() + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+    return [signer.encode({"sub": f"user{i}", "ver": 0, "type": "access", "exp": expires}) for i in range(count)]
+
+def rate(decode, presented: list) -> float:
+    started = time.perf_counter()
+    for token in presented:
+        decode(token)
+    return len(presented) / (time.perf_counter() - started)
+
+def main(tokens: int) -> None:
+    plain = issue(tokens, verifier(JoseBackend(), 0))
+    presented = [random.choice(plain) for _ in range(PRESENTATIONS)]
+
+    cases = [
+        ("jose jwt.decode (previous)", lambda token: jose_jwt.decode(
+            token, settings.JWT_SECRET_KEY, algorithms=[settings.JWT_ALGORITHM])),
+        ("TokenVerifier jose, no cache", verifier(JoseBackend(), 0).decode),
+        ("TokenVerifier pyjwt, no cache", verifier(PyJWTBackend(), 0).decode),
+        ("TokenVerifier jose, cached", verifier(JoseBackend(), settings.JWT_CACHE_MAX_ENTRIES).decode),
+        ("TokenVerifier pyjwt, cached", verifier(PyJWTBackend(), settings.JWT_CACHE_MAX_ENTRIES).decode),
+    ]
+
+    print(f"{PRESENTATIONS} presentations of {tokens} tokens ({settings.JWT_ALGORITHM})")
+    baseline = None
+    for name, decode in cases:
+        per_second = rate(decode, presented)
+        baseline = baseline or per_second
+        print(f"{name:<32}{per_second:>10.0f}/s  ({per_second / baseline:.1f}x)")
+
+    # During a rotation: new tokens under the active kid, old ones without
+    original = (settings.JWT_KEYS, settings.JWT_ACTIVE_KID)
+    settings.JWT_KEYS, settings.JWT_ACTIVE_KID = {"2026-10": "rotated-secret"}, "2026-10"
+    try:
+        rotated = issue(tokens, verifier(PyJWTBackend(), 0))
+        mixed = [random.choice(random.choice((plain, rotated))) for _ in range(PRESENTATIONS)]
+        per_second = rate(verifier(PyJWTBackend(), settings.JWT_CACHE_MAX_ENTRIES).decode, mixed)
+        print(f"{'pyjwt, cached, mid-rotation':<32}{per_second:>10.0f}/s  ({per_second / baseline:.1f}x)")
+    finally:
+        settings.JWT_KEYS, settings.JWT_ACTIVE_KID = original
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000)
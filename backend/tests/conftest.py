@@ -0,0 +1,46 @@
+import os
+import sys
+from types import SimpleNamespace
+import pytest
+from dotenv import load_dotenv
+from mongomock_motor import AsyncMongoMockClient, AsyncMongoMockCollection
+from pymongo import DeleteMany, DeleteOne, InsertOne, UpdateMany, UpdateOne
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+# Settings are read at import: fill anything the environment (or a local
+# .env) does not set from the example file
+load_dotenv(os.path.join(BACKEND_DIR, ".env.example"))
+os.environ.setdefault("MONGODB_DATABASE", "domecare_test")
+
+from app.core.database import db  # noqa: E402
+
+async def _bulk_write(self, requests, ordered=True, **kwargs):
+    # mongomock's bulk_write predates the operation API of pymongo >= 4.9;
+    # apply the operations one by one instead
+    result = SimpleNamespace(inserted_count=0, matched_count=0, modified_count=0,
+                             deleted_count=0, upserted_count=0)
+    for op in requests:
+        if isinstance(op, InsertOne):
+            await self.insert_one(op._doc)
+            result.inserted_count += 1
+        elif isinstance(op, (UpdateOne, UpdateMany)):
+            update = self.update_one if isinstance(op, UpdateOne) else self.update_many
+            outcome = await update(op._filter, op._doc, upsert=op._upsert)
+            result.matched_count += outcome.matched_count
+            result.modified_count += outcome.modified_count
+            result.upserted_count += outcome.upserted_id is not None
+        elif isinstance(op, (DeleteOne, DeleteMany)):
+            delete = self.delete_one if isinstance(op, DeleteOne) else self.delete_many
+            result.deleted_count += (await delete(op._filter)).deleted_count
+    return result
+
+@pytest.fixture
+def mongo(monkeypatch):
+    """In-memory MongoDB behind the global `db`"""
+    monkeypatch.setattr(AsyncMongoMockCollection, "bulk_write", _bulk_write, raising=False)
+    client = AsyncMongoMockClient()
+    monkeypatch.setattr(db, "client", client)
+    monkeypatch.setattr(db, "database", client["domecare_test"])
+    return db.database
@@ -0,0 +1,89 @@
+import asyncio
+from datetime import datetime
+import pytest
+from bson import ObjectId
+from app.core.config import settings
+from app.services.activity_service import ActivityRecorder
+
+EARLY, LATE, LATER = datetime(2026, 3, 1, 8), datetime(2026, 3, 1, 9), datetime(2026, 3, 1, 10)
+
+class StallingCollection:
+    """The first bulk_write hangs until cancelled; later ones reach the database"""
+
+    def __init__(self, collection):
+        self.collection = collection
+        self.stalled = asyncio.Event()
+
+    async def bulk_write(self, operations, ordered=True):
+        if not self.stalled.is_set():
+            self.stalled.set()
+            await asyncio.Event().wait()
+        return await self.collection.bulk_write(operations, ordered=ordered)
+
+class FailingCollection:
+    async def bulk_write(self, operations, ordered=True):
+        raise ConnectionError("no primary")
+
+@pytest.fixture
+async def recorder(mongo):
+    recorder = ActivityRecorder()
+    await recorder.init()
+    return recorder
+
+async def add_user(mongo, **fields):
+    user = {"_id": ObjectId(), **fields}
+    await mongo.users.insert_one(user)
+    return user["_id"]
+
+async def test_updates_are_coalesced_and_never_move_backwards(mongo, recorder):
+    ahead = await add_user(mongo, last_login=LATER)
+    behind = await add_user(mongo, last_login=EARLY)
+    for value in (LATE, EARLY):
+        recorder.record(ahead, "last_login", value)
+        recorder.record(behind, "last_login", value)
+
+    assert recorder.metrics["pending_users"] == 2
+    assert await recorder.flush() == 2
+    assert (await mongo.users.find_one({"_id": ahead}))["last_login"] == LATER
+    assert (await mongo.users.find_one({"_id": behind}))["last_login"] == LATE
+    assert await recorder.flush() == 0
+
+async def test_failed_flush_keeps_the_batch(mongo, recorder):
+    user_id = await add_user(mongo)
+    recorder.users_collection = FailingCollection()
+    recorder.record(user_id, "last_login", LATE)
+
+    assert await recorder.flush() == 0
+    assert recorder.metrics["flush_errors"] == 1
+
+    recorder.users_collection = mongo.users
+    recorder.record(user_id, "last_login", EARLY)
+    assert await recorder.flush() == 1
+    assert (await mongo.users.find_one({"_id": user_id}))["last_login"] == LATE
+
+async def test_stop_during_a_flush_writes_the_batch(mongo, recorder, monkeypatch):
+    monkeypatch.setattr(settings, "ACTIVITY_FLUSH_INTERVAL_SECONDS", 0.01)
+    first, second = await add_user(mongo), await add_user(mongo)
+    stalling = recorder.users_collection = StallingCollection(mongo.users)
+    recorder.record(first, "last_login", EARLY)
+    recorder.record(second, "last_login", EARLY)
+    recorder.start()
+    await asyncio.wait_for(stalling.stalled.wait(), timeout=1)
+
+    # Recorded while the batch is in flight: the newer value must survive the merge
+    recorder.record(first, "last_login", LATER)
+    await recorder.stop()
+
+    assert (await mongo.users.find_one({"_id": first}))["last_login"] == LATER
+    assert (await mongo.users.find_one({"_id": second}))["last_login"] == EARLY
+    assert recorder.metrics["pending_users"] == 0
+    assert recorder.metrics["flush_errors"] == 0
+
+async def test_buffer_is_bounded(recorder, monkeypatch):
+    monkeypatch.setattr(settings, "ACTIVITY_BUFFER_MAX_USERS", 2)
+    for _ in range(5):
+        recorder.record(ObjectId(), "last_login")
+
+    assert recorder.metrics["pending_users"] == 4
+    assert recorder.metrics["dropped"] == 1
+    assert recorder._wakeup.is_set()
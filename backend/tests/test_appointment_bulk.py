@@ -0,0 +1,58 @@
+from datetime import date, datetime
+import bson
+from bson import ObjectId
+from app.domain.entities.appointment import AppointmentStatus
+from app.services.appointment_service import AppointmentService
+
+class RecordingCursor:
+    async def to_list(self, length):
+        return []
+
+class RecordingCollection:
+    def __init__(self):
+        self.queries = []
+
+    def find(self, query, projection=None):
+        self.queries.append(query)
+        return RecordingCursor()
+
+async def test_bulk_filter_query_is_bson_encodable():
+    service = AppointmentService()
+    service.appointments_collection = RecordingCollection()
+
+    await service.find_appointment_ids_for_bulk(
+        str(ObjectId()), date(2024, 12, 2), AppointmentStatus.CANCELLED,
+        current_statuses=[AppointmentStatus.CONFIRMED], before_time="14:00"
+    )
+
+    query, = service.appointments_collection.queries
+    # A bare datetime.date is rejected by the driver at encode time
+    bson.encode(query)
+    assert isinstance(query["starts_at"]["$gte"], datetime)
+    assert query["status"] == {"$in": [AppointmentStatus.CONFIRMED]}
+
+async def test_bulk_update_reports_each_item(mongo):
+    service = AppointmentService()
+    await service.init()
+    doctor_id, other_doctor_id = ObjectId(), ObjectId()
+    confirmed, completed, foreign = ObjectId(), ObjectId(), ObjectId()
+    await mongo.appointments.insert_many([
+        {"_id": confirmed, "doctor_id": doctor_id, "status": AppointmentStatus.CONFIRMED},
+        {"_id": completed, "doctor_id": doctor_id, "status": AppointmentStatus.COMPLETED},
+        {"_id": foreign, "doctor_id": other_doctor_id, "status": AppointmentStatus.CONFIRMED},
+    ])
+
+    results = await service.bulk_update_status(str(doctor_id), [
+        (str(confirmed), AppointmentStatus.COMPLETED),
+        (str(completed), AppointmentStatus.NO_SHOW),
+        (str(foreign), AppointmentStatus.COMPLETED),
+        ("not-an-id", AppointmentStatus.COMPLETED),
+        (str(confirmed), AppointmentStatus.NO_SHOW),
+    ])
+
+    assert [result["result"] for result in results] == [
+        "updated", "invalid_transition", "not_found", "invalid_id", "duplicate"
+    ]
+    assert results[1]["current_status"] == AppointmentStatus.COMPLETED
+    assert (await mongo.appointments.find_one({"_id": confirmed}))["status"] == AppointmentStatus.COMPLETED
+    assert (await mongo.appointments.find_one({"_id": foreign}))["status"] == AppointmentStatus.CONFIRMED
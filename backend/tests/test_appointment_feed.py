@@ -0,0 +1,73 @@
+import asyncio
+import gc
+import pytest
+from bson import ObjectId
+from fastapi import FastAPI
+from app.api.v1.endpoints import appointments
+from app.api.v1.endpoints.deps import get_current_user
+from app.core.config import settings
+from app.core.exceptions import ServiceUnavailableException
+from app.services.appointment_feed import appointment_feed
+
+SUBSCRIBERS = 2000
+
+@pytest.fixture(autouse=True)
+def capacity(monkeypatch):
+    monkeypatch.setattr(settings, "SSE_MAX_CONNECTIONS", SUBSCRIBERS)
+    yield
+    assert appointment_feed.connections == 0
+
+def build_app(doctor_id: ObjectId) -> FastAPI:
+    app = FastAPI()
+    app.include_router(appointments.router, prefix="/api/v1/appointments")
+    app.dependency_overrides[get_current_user] = lambda: {"_id": doctor_id, "role": "doctor"}
+    return app
+
+async def request_and_disconnect(app: FastAPI) -> None:
+    """One stream request whose connection is gone before the first chunk"""
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": "/api/v1/appointments/stream", "raw_path": b"/api/v1/appointments/stream",
+        "root_path": "", "query_string": b"", "headers": [], "client": ("test", 1), "server": ("test", 80)
+    }
+
+    async def receive():
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        raise ConnectionResetError()
+
+    with pytest.raises(ConnectionResetError):
+        await app(scope, receive, send)
+
+async def test_disconnect_before_first_chunk_leaves_no_subscription():
+    app = build_app(ObjectId())
+    await asyncio.gather(*(request_and_disconnect(app) for _ in range(SUBSCRIBERS)))
+    gc.collect()
+    await asyncio.sleep(0)
+
+    assert appointment_feed.connections == 0
+    assert not appointment_feed._subscribers
+
+async def test_every_subscriber_gets_deltas_and_is_released():
+    doctors = [str(ObjectId()) for _ in range(100)]
+    streams = [appointment_feed.stream(doctors[i % len(doctors)]) for i in range(SUBSCRIBERS)]
+    assert appointment_feed.connections == 0
+
+    try:
+        for stream in streams:
+            assert (await stream.__anext__()).startswith(b"retry:")
+        assert appointment_feed.connections == SUBSCRIBERS
+        with pytest.raises(ServiceUnavailableException):
+            appointment_feed.check_capacity()
+
+        for doctor_id in doctors:
+            appointment_feed._deliver({"id": str(ObjectId()), "doctor_id": doctor_id,
+                                       "event": "appointment.booked", "data": "{}"})
+        frames = await asyncio.gather(*(stream.__anext__() for stream in streams))
+        assert all(b"event: appointment.booked" in frame for frame in frames)
+    finally:
+        await asyncio.gather(*(stream.aclose() for stream in streams))
+
+    assert appointment_feed.connections == 0
+    assert not appointment_feed._subscribers
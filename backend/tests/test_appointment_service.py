@@ -0,0 +1,148 @@
+from datetime import date, datetime
+import pytest
+from bson import ObjectId
+from app.core.exceptions import ConflictException, ValidationException
+from app.domain.entities.appointment import AppointmentStatus
+from app.migrations.backfill_appointment_times import backfill
+from app.services.appointment_service import AppointmentService
+from app.services.reminder_service import reminder_service
+from app.services.schedule_service import schedule_service
+
+MONDAY = date(2026, 11, 2)
+WORKING_DAY = {"is_working": True, "time_slots": [{"start_time": "09:00", "end_time": "17:00"}]}
+
+@pytest.fixture
+async def service(mongo):
+    await schedule_service.init()
+    await reminder_service.init()
+    service = AppointmentService()
+    await service.init()
+    return service
+
+async def add_doctor(mongo, timezone=None):
+    clinic_info = {"consultation_fee": 50000, "schedule": {"monday": WORKING_DAY}}
+    if timezone:
+        clinic_info["timezone"] = timezone
+    doctor = {"_id": ObjectId(), "role": "doctor", "status": "active",
+              "full_name": "Dr. Lina Khoury", "clinic_info": clinic_info}
+    await mongo.users.insert_one(doctor)
+    return doctor
+
+@pytest.fixture
+async def patient(mongo):
+    patient = {"_id": ObjectId(), "role": "patient", "status": "active", "full_name": "Rama Haddad"}
+    await mongo.users.insert_one(patient)
+    return patient
+
+def booking(doctor, patient, start_time, end_time, day=MONDAY):
+    return {"doctor_id": str(doctor["_id"]), "patient_id": str(patient["_id"]),
+            "appointment_date": day, "time_slot": {"start_time": start_time, "end_time": end_time}}
+
+async def test_slot_is_stored_as_utc_in_the_clinic_timezone(mongo, service, patient):
+    doctor = await add_doctor(mongo, timezone="America/New_York")
+
+    created = await service.create_appointment(booking(doctor, patient, "09:00", "09:45"))
+
+    stored = await mongo.appointments.find_one({"_id": created["_id"]})
+    # EST (UTC-5) on November 2
+    assert stored["starts_at"] == datetime(2026, 11, 2, 14, 0)
+    assert stored["ends_at"] == datetime(2026, 11, 2, 14, 45)
+    assert stored["timezone"] == "America/New_York"
+    assert stored["appointment_date"] == datetime(2026, 11, 2)
+    assert stored["status"] == AppointmentStatus.PENDING
+
+async def test_doctor_without_timezone_uses_the_clinic_default(mongo, service, patient):
+    doctor = await add_doctor(mongo)
+
+    created = await service.create_appointment(booking(doctor, patient, "09:00", "09:30"))
+
+    assert created["timezone"] == "Asia/Damascus"
+    assert created["starts_at"] == datetime(2026, 11, 2, 6, 0)
+
+async def test_overlapping_bookings_of_different_lengths_conflict(mongo, service, patient):
+    doctor = await add_doctor(mongo)
+    await service.create_appointment(booking(doctor, patient, "10:00", "11:00"))
+
+    for start_time, end_time in [("10:30", "10:45"), ("09:45", "10:15"), ("10:50", "11:20"), ("09:00", "12:00")]:
+        with pytest.raises(ConflictException):
+            await service.create_appointment(booking(doctor, patient, start_time, end_time))
+
+    # Back to back on either side is fine
+    await service.create_appointment(booking(doctor, patient, "09:30", "10:00"))
+    await service.create_appointment(booking(doctor, patient, "11:00", "11:15"))
+
+async def test_cancelled_booking_frees_the_slot(mongo, service, patient):
+    doctor = await add_doctor(mongo)
+    first = await service.create_appointment(booking(doctor, patient, "10:00", "10:30"))
+    await mongo.appointments.update_one({"_id": first["_id"]}, {"$set": {"status": AppointmentStatus.CANCELLED}})
+
+    await service.create_appointment(booking(doctor, patient, "10:00", "10:30"))
+
+async def test_other_doctors_bookings_do_not_conflict(mongo, service, patient):
+    first, second = await add_doctor(mongo), await add_doctor(mongo)
+    await service.create_appointment(booking(first, patient, "10:00", "10:30"))
+
+    await service.create_appointment(booking(second, patient, "10:00", "10:30"))
+
+async def test_slot_must_fit_the_working_hours(mongo, service, patient):
+    doctor = await add_doctor(mongo)
+
+    with pytest.raises(ValidationException):
+        await service.create_appointment(booking(doctor, patient, "16:30", "17:30"))
+    with pytest.raises(ValidationException):
+        await service.create_appointment(booking(doctor, patient, "10:00", "10:30", day=date(2026, 11, 3)))
+    assert await mongo.appointments.count_documents({}) == 0
+
+async def legacy_appointments(mongo, doctor):
+    appointments = [
+        {"_id": ObjectId(), "doctor_id": doctor["_id"], "appointment_date": datetime(2026, 11, 2),
+         "time_slot": {"start_time": "09:00", "end_time": "09:30"}},
+        {"_id": ObjectId(), "doctor_id": doctor["_id"], "appointment_date": "2026-11-02T00:00:00",
+         "time_slot": {"start_time": "10:00", "end_time": "10:45"}},
+        {"_id": ObjectId(), "doctor_id": doctor["_id"], "appointment_date": datetime(2026, 11, 2),
+         "time_slot": {"start_time": "9am", "end_time": "10am"}},
+        {"_id": ObjectId(), "doctor_id": doctor["_id"], "time_slot": {"start_time": "11:00", "end_time": "11:30"}},
+        {"_id": ObjectId(), "doctor_id": ObjectId(), "appointment_date": datetime(2026, 11, 2),
+         "time_slot": {"start_time": "12:00", "end_time": "12:30"}},
+    ]
+    await mongo.appointments.insert_many(appointments)
+    return [appointment["_id"] for appointment in appointments]
+
+async def test_backfill_resolves_legacy_slots_in_batches(mongo):
+    doctor = await add_doctor(mongo, timezone="America/New_York")
+    datetime_date, string_date, bad_time, no_date, unknown_doctor = await legacy_appointments(mongo, doctor)
+
+    counters = await backfill(batch_size=2)
+
+    assert counters == {"processed": 5, "updated": 3, "skipped": 2}
+    first = await mongo.appointments.find_one({"_id": datetime_date})
+    assert (first["starts_at"], first["ends_at"]) == (datetime(2026, 11, 2, 14, 0), datetime(2026, 11, 2, 14, 30))
+    assert first["timezone"] == "America/New_York"
+    second = await mongo.appointments.find_one({"_id": string_date})
+    assert second["appointment_date"] == datetime(2026, 11, 2)
+    assert second["ends_at"] == datetime(2026, 11, 2, 15, 45)
+    # A doctor that no longer exists falls back to the clinic default
+    orphan = await mongo.appointments.find_one({"_id": unknown_doctor})
+    assert (orphan["starts_at"], orphan["timezone"]) == (datetime(2026, 11, 2, 9, 0), "Asia/Damascus")
+    for skipped in (bad_time, no_date):
+        assert "starts_at" not in await mongo.appointments.find_one({"_id": skipped})
+
+async def test_backfill_rerun_only_revisits_skipped_appointments(mongo):
+    doctor = await add_doctor(mongo)
+    await legacy_appointments(mongo, doctor)
+    await backfill()
+    before = await mongo.appointments.find({}).sort("_id", 1).to_list(None)
+
+    counters = await backfill()
+
+    assert counters == {"processed": 2, "updated": 0, "skipped": 2}
+    assert await mongo.appointments.find({}).sort("_id", 1).to_list(None) == before
+
+async def test_backfill_dry_run_writes_nothing(mongo):
+    doctor = await add_doctor(mongo)
+    await legacy_appointments(mongo, doctor)
+
+    counters = await backfill(batch_size=2, dry_run=True)
+
+    assert counters == {"processed": 5, "updated": 3, "skipped": 2}
+    assert await mongo.appointments.count_documents({"starts_at": {"$exists": True}}) == 0
@@ -0,0 +1,87 @@
+from datetime import datetime, timedelta
+import pytest
+from bson import ObjectId
+from app.core.config import settings
+from app.domain.entities.appointment import AppointmentStatus
+from app.services import appointment_sweeper as sweeper_module
+from app.services.appointment_service import AppointmentService
+from app.services.appointment_sweeper import AppointmentSweeper
+
+# 18:00 in Damascus (UTC+3), 11:00 in New York (UTC-4)
+NOW = datetime(2026, 3, 10, 15, 0)
+
+def freeze(monkeypatch, moment: datetime) -> None:
+    class Frozen(datetime):
+        @classmethod
+        def utcnow(cls):
+            return moment
+    monkeypatch.setattr(sweeper_module, "datetime", Frozen)
+
+@pytest.fixture
+async def sweeper(mongo, monkeypatch):
+    freeze(monkeypatch, NOW)
+    sweeper = AppointmentSweeper()
+    await sweeper.init()
+    return sweeper
+
+async def book(mongo, doctor_id, starts_at, status=AppointmentStatus.CONFIRMED, timezone="Asia/Damascus"):
+    appointment = {"_id": ObjectId(), "doctor_id": doctor_id, "status": status,
+                   "starts_at": starts_at, "ends_at": starts_at + timedelta(minutes=30)}
+    if timezone:
+        appointment["timezone"] = timezone
+    await mongo.appointments.insert_one(appointment)
+    return appointment["_id"]
+
+async def status_of(mongo, appointment_id):
+    return (await mongo.appointments.find_one({"_id": appointment_id}))["status"]
+
+async def test_visits_of_the_current_clinic_day_are_left_for_the_doctor(mongo, sweeper):
+    doctor_id = ObjectId()
+    # 09:00 and 14:00 Damascus time, both over by 18:00
+    morning = await book(mongo, doctor_id, datetime(2026, 3, 10, 6, 0))
+    afternoon = await book(mongo, doctor_id, datetime(2026, 3, 10, 11, 0))
+    yesterday = await book(mongo, doctor_id, datetime(2026, 3, 9, 11, 0))
+
+    assert await sweeper.sweep() == 1
+    assert await status_of(mongo, yesterday) == AppointmentStatus.NO_SHOW
+
+    # End-of-day close-out after the sweep still applies to today's visits
+    service = AppointmentService()
+    await service.init()
+    results = await service.bulk_update_status(
+        str(doctor_id), [(str(morning), AppointmentStatus.COMPLETED), (str(afternoon), AppointmentStatus.COMPLETED)]
+    )
+    assert [result["result"] for result in results] == ["updated", "updated"]
+
+async def test_each_appointment_uses_its_clinic_timezone(mongo, sweeper):
+    doctor_id = ObjectId()
+    # 01:00 on March 10 in Damascus: today there, not due
+    damascus = await book(mongo, doctor_id, datetime(2026, 3, 9, 22, 0))
+    # 20:00 on March 9 in New York: yesterday there, due although it ended later
+    new_york = await book(mongo, doctor_id, datetime(2026, 3, 10, 0, 0), timezone="America/New_York")
+    # No stored timezone: CLINIC_TIMEZONE (Damascus), 23:00 on March 9
+    legacy = await book(mongo, doctor_id, datetime(2026, 3, 9, 20, 0), status=AppointmentStatus.PENDING, timezone=None)
+
+    assert await sweeper.sweep() == 2
+    assert await status_of(mongo, damascus) == AppointmentStatus.CONFIRMED
+    assert await status_of(mongo, new_york) == AppointmentStatus.NO_SHOW
+    assert await status_of(mongo, legacy) == AppointmentStatus.CANCELLED
+
+async def test_grace_period_after_clinic_midnight(mongo, sweeper, monkeypatch):
+    # 00:30 on March 11 in Damascus: the 10th is over, but not by an hour yet
+    freeze(monkeypatch, datetime(2026, 3, 10, 21, 30))
+    appointment = await book(mongo, ObjectId(), datetime(2026, 3, 10, 11, 0))
+
+    assert await sweeper.sweep() == 0
+    assert sweeper.metrics["lag_seconds"] == 0.0
+    assert await status_of(mongo, appointment) == AppointmentStatus.CONFIRMED
+
+async def test_lag_counts_from_the_end_of_the_clinic_day(mongo, sweeper, monkeypatch):
+    # No time to sweep: the appointment stays in the backlog
+    monkeypatch.setattr(settings, "SWEEPER_TIME_BUDGET_SECONDS", 0.0)
+    await book(mongo, ObjectId(), datetime(2026, 3, 9, 11, 0))
+
+    await sweeper.sweep()
+    # Due at 01:00 Damascus time on the 10th (22:00 UTC on the 9th)
+    assert sweeper.metrics["backlog_oldest_due_at"] == datetime(2026, 3, 9, 22, 0)
+    assert sweeper.metrics["lag_seconds"] == 17 * 3600
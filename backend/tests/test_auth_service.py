@@ -0,0 +1,63 @@
+import asyncio
+import pytest
+from bson import ObjectId
+from app.core.config import settings
+from app.services.auth_service import AuthService, phone_identifier_filter
+
+@pytest.fixture
+async def service(mongo):
+    service = AuthService()
+    await service.init()
+    # The same national number registered in Syria and Lebanon
+    await service.users_collection.insert_many([
+        {"_id": ObjectId(), "country_code": "+963", "phone_number": "933123456", "full_name": "Syria"},
+        {"_id": ObjectId(), "country_code": "+961", "phone_number": "933123456", "full_name": "Lebanon"},
+        {"_id": ObjectId(), "country_code": "+1", "phone_number": "2025550123", "full_name": "US"},
+    ])
+    return service
+
+@pytest.mark.parametrize("identifier, expected", [
+    ("+963 933 123 456", "Syria"),
+    ("+961933123456", "Lebanon"),
+    ("933-123-456", "Syria"),
+    ("+1 (202) 555-0123", "US"),
+    ("+44933123456", None),
+    ("+", None),
+])
+async def test_phone_identifiers_resolve_within_their_country(service, identifier, expected):
+    user = await service.find_user_by_identifier(identifier, {"full_name": 1})
+    assert (user or {}).get("full_name") == expected
+
+def test_international_identifier_tries_each_country_code_length():
+    assert phone_identifier_filter("+963933123456") == {"$or": [
+        {"country_code": "+9", "phone_number": "63933123456"},
+        {"country_code": "+96", "phone_number": "3933123456"},
+        {"country_code": "+963", "phone_number": "933123456"},
+    ]}
+
+@pytest.fixture
+async def user_with_otp(service):
+    user_id = ObjectId()
+    await service.users_collection.insert_one({"_id": user_id, "email": "rama@example.com", "full_name": "Rama"})
+    await service.store_otp(str(user_id), "482913")
+    return user_id
+
+async def test_concurrent_verifies_consume_the_otp_once(service, user_with_otp):
+    results = await asyncio.gather(*(service.verify_otp("rama@example.com", "482913") for _ in range(20)))
+
+    assert results.count(True) == 1
+    assert not await service.verify_otp("rama@example.com", "482913")
+
+async def test_otp_is_stored_hashed_and_replaced(service, user_with_otp):
+    await service.store_otp(str(user_with_otp), "111111")
+
+    token, = await service.tokens_collection.find({"user_id": user_with_otp}).to_list(None)
+    assert token["token"] != "111111"
+    assert not await service.verify_otp("rama@example.com", "482913")
+    assert await service.verify_otp("rama@example.com", "111111")
+
+async def test_wrong_codes_exhaust_the_otp(service, user_with_otp):
+    for _ in range(settings.MAX_OTP_ATTEMPTS):
+        assert not await service.verify_otp("rama@example.com", "000000")
+
+    assert not await service.verify_otp("rama@example.com", "482913")
@@ -0,0 +1,154 @@
+from datetime import datetime, timedelta
+import httpx
+import pytest
+from bson import ObjectId
+from fastapi import FastAPI
+from app.api.v1.endpoints import appointments, doctors
+from app.api.v1.endpoints.deps import get_current_user
+from app.core.timezones import day_bounds_utc, local_today
+from app.services.appointment_service import appointment_service
+from app.services.doctor_service import doctor_service
+from app.services.summary_service import build_user_summary
+
+@pytest.fixture
+async def staff(mongo):
+    await doctor_service.init()
+    await appointment_service.init()
+    staff = {
+        "damascus": {"_id": ObjectId(), "role": "doctor", "status": "active", "full_name": "Dr. Lina Khoury",
+                     "password_hash": "x" * 60, "phone_number": "933123456",
+                     "clinic_info": {"city": "Damascus", "address": "Street 1", "consultation_fee": 50000}},
+        "new_york": {"_id": ObjectId(), "role": "doctor", "status": "active", "full_name": "Dr. Sami Nasr",
+                     "clinic_info": {"city": "New York", "timezone": "America/New_York"}},
+        "suspended": {"_id": ObjectId(), "role": "doctor", "status": "suspended", "full_name": "Dr. Hadi"},
+        "patient": {"_id": ObjectId(), "role": "patient", "status": "active", "full_name": "Rama Haddad"},
+        "other_patient": {"_id": ObjectId(), "role": "patient", "status": "active", "full_name": "Omar Aziz"},
+    }
+    await mongo.users.insert_many(list(staff.values()))
+    return staff
+
+async def add_appointment(mongo, doctor, patient, starts_at, status="confirmed"):
+    appointment = {
+        "_id": ObjectId(), "doctor_id": doctor["_id"], "patient_id": patient["_id"],
+        "appointment_date": datetime.combine(starts_at.date(), datetime.min.time()),
+        "time_slot": {"start_time": "09:00", "end_time": "09:30"}, "status": status,
+        "starts_at": starts_at, "ends_at": starts_at + timedelta(minutes=30),
+        "notes": "internal", "doctor_summary": build_user_summary(doctor),
+        "patient_summary": build_user_summary(patient)
+    }
+    await mongo.appointments.insert_one(appointment)
+    return appointment
+
+def ids(*users) -> list:
+    return [str(user["_id"]) for user in users]
+
+async def test_doctors_come_back_in_order_with_the_rest_missing(staff):
+    unknown = str(ObjectId())
+    asked = [*ids(staff["new_york"]), "not-an-id", unknown, *ids(staff["patient"], staff["suspended"], staff["damascus"])]
+
+    found, missing = await doctor_service.get_doctors_by_ids(asked)
+
+    assert [doctor["_id"] for doctor in found] == ids(staff["new_york"], staff["damascus"])
+    assert missing == ["not-an-id", unknown, *ids(staff["patient"], staff["suspended"])]
+
+async def test_doctors_are_list_views(staff):
+    (doctor,), _ = await doctor_service.get_doctors_by_ids(ids(staff["damascus"]))
+
+    assert doctor["clinic_info"] == {"city": "Damascus", "consultation_fee": 50000}
+    assert "next_available_slot" in doctor
+    assert not {"password_hash", "phone_number", "availability"} & set(doctor)
+
+async def test_grouped_stats_match_the_per_doctor_stats(mongo, staff):
+    for key, tz_name in (("damascus", None), ("new_york", "America/New_York")):
+        doctor = staff[key]
+        today_start, _ = day_bounds_utc(local_today(tz_name), tz_name=tz_name)
+        await add_appointment(mongo, doctor, staff["patient"], today_start + timedelta(hours=10))
+        await add_appointment(mongo, doctor, staff["other_patient"], today_start + timedelta(hours=11))
+        await add_appointment(mongo, doctor, staff["patient"], today_start + timedelta(hours=12), status="cancelled")
+        await add_appointment(mongo, doctor, staff["patient"], today_start - timedelta(days=30))
+        await mongo.prescriptions.insert_one({"_id": ObjectId(), "doctor_id": doctor["_id"],
+                                              "patient_id": staff["patient"]["_id"]})
+
+    found, _ = await doctor_service.get_doctors_by_ids(ids(staff["damascus"], staff["new_york"]))
+    stats = await doctor_service.get_doctors_stats(found)
+
+    for doctor in found:
+        expected = await doctor_service.get_doctor_stats(
+            doctor["_id"], doctor["clinic_info"].get("timezone") or None
+        )
+        assert stats[doctor["_id"]] == expected
+    assert stats[str(staff["damascus"]["_id"])]["today_appointments"] == 2
+    assert stats[str(staff["damascus"]["_id"])]["total_patients"] == 2
+
+async def test_doctors_without_appointments_get_zero_stats(staff):
+    found, _ = await doctor_service.get_doctors_by_ids(ids(staff["damascus"]))
+    stats = await doctor_service.get_doctors_stats(found)
+
+    assert set(stats[found[0]["_id"]].values()) == {0}
+    assert await doctor_service.get_doctors_stats([]) == {}
+
+async def test_appointments_are_the_users_own_with_the_other_party(mongo, staff):
+    start = datetime(2026, 11, 2, 7)
+    own = [await add_appointment(mongo, staff["damascus"], patient, start + timedelta(hours=hour))
+           for hour, patient in enumerate((staff["patient"], staff["other_patient"]))]
+    someone_elses = await add_appointment(mongo, staff["new_york"], staff["patient"], start)
+    asked = [*ids(own[1], someone_elses), "not-an-id", *ids(own[0])]
+
+    found, missing = await appointment_service.get_appointments_by_ids(asked, ids(staff["damascus"])[0], "doctor")
+
+    assert [appointment._id for appointment in found] == ids(own[1], own[0])
+    assert missing == [*ids(someone_elses), "not-an-id"]
+    assert [appointment.patient.full_name for appointment in found] == ["Omar Aziz", "Rama Haddad"]
+    assert all(appointment.doctor is None for appointment in found)
+
+    found, missing = await appointment_service.get_appointments_by_ids(asked, ids(staff["patient"])[0], "patient")
+    assert [appointment._id for appointment in found] == ids(someone_elses, own[0])
+    assert found[0].doctor.full_name == "Dr. Sami Nasr"
+
+@pytest.fixture
+async def client(staff):
+    app = FastAPI()
+    app.include_router(doctors.router, prefix="/doctors")
+    app.include_router(appointments.router, prefix="/appointments")
+    user = {"value": staff["patient"]}
+    app.dependency_overrides[get_current_user] = lambda: user["value"]
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        client.user = user
+        yield client
+
+async def test_doctors_batch_endpoint(client, staff):
+    asked = ids(staff["damascus"], staff["suspended"], staff["damascus"])
+    response = await client.get("/doctors/batch", params={"ids": ",".join(asked), "include_stats": "true"})
+
+    assert response.status_code == 200
+    body = response.json()
+    assert [doctor["_id"] for doctor in body["data"]] == ids(staff["damascus"])
+    assert body["data"][0]["stats"]["total_appointments"] == 0
+    assert body["missing"] == ids(staff["suspended"])
+    assert "public" in response.headers["Cache-Control"]
+
+@pytest.mark.parametrize("path, cap", [("/doctors/batch", doctors.MAX_BATCH_IDS),
+                                       ("/appointments/batch", appointments.MAX_BATCH_IDS)])
+async def test_batch_endpoints_cap_the_ids(client, path, cap):
+    response = await client.get(path, params={"ids": ",".join(str(ObjectId()) for _ in range(cap + 1))})
+    assert response.status_code == 400
+
+    response = await client.get(path, params={"ids": " , "})
+    assert response.status_code == 400
+
+async def test_appointments_batch_endpoint(client, mongo, staff):
+    appointment = await add_appointment(mongo, staff["damascus"], staff["patient"], datetime(2026, 11, 2, 7))
+    unknown = str(ObjectId())
+
+    response = await client.get("/appointments/batch", params={"ids": f"{appointment['_id']},{unknown}"})
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["data"][0]["_id"] == str(appointment["_id"])
+    assert body["data"][0]["appointment_date"] == "2026-11-02"
+    assert body["data"][0]["doctor"]["full_name"] == "Dr. Lina Khoury"
+    assert body["missing"] == [unknown]
+
+    client.user["value"] = {**staff["patient"], "role": "admin"}
+    response = await client.get("/appointments/batch", params={"ids": str(appointment["_id"])})
+    assert response.status_code == 403
@@ -0,0 +1,151 @@
+import asyncio
+import os
+from datetime import datetime
+import pytest
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo.errors import OperationFailure
+from app.core.change_streams import Change, ChangeStreamConsumer
+from app.core.config import settings
+from app.core.database import db
+from app.services.doctor_service import DoctorService
+
+# Change streams need a replica set, which mongomock is not; point this at
+# one (e.g. a single-node `mongod --replSet rs0`) to run the stream tests
+REPLICA_SET_URL = os.environ.get("TEST_MONGODB_REPLICA_SET_URL")
+replica_set = pytest.mark.skipif(not REPLICA_SET_URL, reason="TEST_MONGODB_REPLICA_SET_URL not set")
+
+async def wait_for(condition, timeout: float = 5.0) -> None:
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not condition():
+        assert asyncio.get_running_loop().time() < deadline, "timed out"
+        await asyncio.sleep(0.01)
+
+def cached_facets() -> DoctorService:
+    """A worker's doctor service with the facets cached"""
+    service = DoctorService()
+    service.facets_cache.put("cities", ["Damascus"])
+    return service
+
+@pytest.fixture
+async def replica(monkeypatch):
+    """Scratch database on the replica set behind the global `db`"""
+    client = AsyncIOMotorClient(REPLICA_SET_URL)
+    database = client[f"domecare_test_change_streams_{ObjectId()}"]
+    monkeypatch.setattr(db, "client", client)
+    monkeypatch.setattr(db, "database", database)
+    monkeypatch.setattr(settings, "CHANGE_STREAM_CHECKPOINT_SECONDS", 0.1)
+    # The watched database must exist before the stream opens
+    await database.users.insert_one({"_id": "seed"})
+    yield database
+    await client.drop_database(database.name)
+    client.close()
+
+async def started(service: DoctorService, changes: list) -> ChangeStreamConsumer:
+    consumer = ChangeStreamConsumer()
+    await consumer.init()
+    consumer.subscribe("users", service._on_user_change)
+    consumer.subscribe("users", changes.append)
+    consumer.start()
+    return consumer
+
+async def opened(consumer: ChangeStreamConsumer, database, changes: list) -> None:
+    """Write until the stream reports a write, so later ones are not missed"""
+    async def seen():
+        for _ in range(500):
+            await database.users.update_one({"_id": "seed"}, {"$inc": {"probe": 1}})
+            await asyncio.sleep(0.01)
+            if changes:
+                return
+        raise AssertionError("change stream did not open")
+    await seen()
+    await wait_for(lambda: consumer.resume_token is not None)
+    changes.clear()
+
+@replica_set
+async def test_writes_from_another_worker_invalidate_only_what_they_touch(replica):
+    service, changes = cached_facets(), []
+    consumer = await started(service, changes)
+    await opened(consumer, replica, changes)
+    doctor_id = ObjectId()
+    await replica.users.insert_one({"_id": doctor_id, "role": "doctor", "clinic_info": {"city": "Damascus"}})
+    await wait_for(lambda: changes)
+    service.facets_cache.put("cities", ["Damascus"])
+
+    # Written through another client: another worker
+    other = AsyncIOMotorClient(REPLICA_SET_URL)[replica.name]
+    await other.users.update_one({"_id": doctor_id}, {"$set": {"last_login": datetime.utcnow()}})
+    await wait_for(lambda: len(changes) == 2)
+    assert changes[-1] == Change("users", "update", doctor_id, ("last_login",))
+    assert service.facets_cache.get("cities") == ["Damascus"]
+
+    await other.users.update_one({"_id": doctor_id}, {"$set": {"clinic_info.city": "Aleppo"}})
+    await wait_for(lambda: len(changes) == 3)
+    assert changes[-1].fields == ("clinic_info.city",)
+    assert service.facets_cache.get("cities") is None
+    # Write time (cluster wallTime) to invalidation
+    assert consumer.metrics["mode"] == "change_stream"
+    assert 0 <= consumer.metrics["last_lag_ms"] < 1000
+    await consumer.stop()
+
+@replica_set
+async def test_restarted_consumer_resumes_after_writes_made_while_down(replica):
+    service, changes = cached_facets(), []
+    consumer = await started(service, changes)
+    await opened(consumer, replica, changes)
+    await consumer.stop()
+
+    doctor_id = ObjectId()
+    await replica.users.insert_one({"_id": doctor_id, "role": "doctor"})
+    restarted = await started(service, changes)
+    await wait_for(lambda: any(change.document_id == doctor_id for change in changes))
+    assert changes[0] == Change("users", "insert", doctor_id)
+    await restarted.stop()
+
+async def test_polls_where_change_streams_are_unavailable(mongo, monkeypatch):
+    monkeypatch.setattr(settings, "CHANGE_POLL_INTERVAL_SECONDS", 0.05)
+
+    async def unsupported(self):
+        raise OperationFailure("The $changeStream stage is only supported on replica sets", 40573)
+
+    monkeypatch.setattr(ChangeStreamConsumer, "_watch", unsupported)
+    doctor_id = ObjectId()
+    await mongo.users.insert_one({"_id": doctor_id, "role": "doctor", "updated_at": datetime(2026, 1, 1)})
+    service, changes = cached_facets(), []
+    consumer = await started(service, changes)
+    await wait_for(lambda: consumer.metrics["mode"] == "polling")
+    await asyncio.sleep(0.1)
+    assert changes == []
+
+    await mongo.users.update_one({"_id": doctor_id}, {"$set": {"updated_at": datetime.utcnow()}})
+    await wait_for(lambda: changes, timeout=1)
+    assert changes == [Change("users", "update", doctor_id)]
+    assert service.facets_cache.get("cities") is None
+    assert consumer.metrics["last_lag_ms"] < 500
+
+    # The overlapping window sees the document again, without a new change
+    await asyncio.sleep(0.15)
+    assert len(changes) == 1
+    await consumer.stop()
+
+async def test_lost_resume_token_drops_everything(mongo, monkeypatch):
+    monkeypatch.setattr(settings, "CHANGE_STREAM_RETRY_SECONDS", 0.01)
+    calls = []
+
+    async def watch(self):
+        calls.append(self.resume_token)
+        if len(calls) == 1:
+            raise OperationFailure("resume point may no longer be in the oplog", 286)
+        await asyncio.Event().wait()
+
+    monkeypatch.setattr(ChangeStreamConsumer, "_watch", watch)
+    await mongo.change_stream_state.insert_one({"_id": "change_stream:api", "resume_token": {"_data": "stale"}})
+    service, changes = cached_facets(), []
+    consumer = await started(service, changes)
+    await wait_for(lambda: len(calls) == 2)
+
+    assert calls == [{"_data": "stale"}, None]
+    assert changes == [Change("users", "resume_lost")]
+    assert service.facets_cache.get("cities") is None
+    assert consumer.metrics["resume_lost"] == 1
+    await consumer.stop()
@@ -0,0 +1,81 @@
+import gzip
+import httpx
+import pytest
+from fastapi import FastAPI, Response
+from fastapi.responses import StreamingResponse
+from app.core.compression import CompressionMiddleware, negotiate_encoding, no_compression
+
+LARGE = {"items": [{"id": i, "name": f"Appointment {i}", "status": "confirmed"} for i in range(200)]}
+
+def build_app() -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/large")
+    async def large():
+        return LARGE
+
+    @app.get("/small")
+    async def small(response: Response):
+        response.headers["Cache-Control"] = "public, max-age=60"
+        return {"ok": True}
+
+    @app.get("/opt-out")
+    @no_compression
+    async def opt_out():
+        return LARGE
+
+    @app.get("/events")
+    async def events():
+        async def stream():
+            yield b"data: " + b"x" * 4096 + b"\n\n"
+        return StreamingResponse(stream(), media_type="text/event-stream")
+
+    app.add_middleware(CompressionMiddleware, minimum_size=1024, encodings=["gzip"])
+    return app
+
+@pytest.fixture
+async def client():
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=build_app()), base_url="http://test") as client:
+        yield client
+
+def test_negotiate_encoding_prefers_server_order_and_honours_q():
+    assert negotiate_encoding("gzip, br", ["br", "gzip"]) == "br"
+    assert negotiate_encoding("br;q=0, gzip", ["br", "gzip"]) == "gzip"
+    assert negotiate_encoding("identity", ["br", "gzip"]) is None
+    assert negotiate_encoding("*", ["gzip"]) == "gzip"
+
+async def test_large_json_is_compressed(client):
+    response = await client.get("/large", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["vary"]
+    assert response.json() == LARGE
+
+async def test_uncompressed_negotiable_responses_still_vary(client):
+    # Below the size threshold
+    response = await client.get("/small", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in response.headers
+    assert "Accept-Encoding" in response.headers["vary"]
+
+    # Client without Accept-Encoding: a shared cache must not serve this to others
+    response = await client.get("/large", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in response.headers
+    assert "Accept-Encoding" in response.headers["vary"]
+
+async def test_opt_out_and_event_streams_are_left_alone(client):
+    response = await client.get("/opt-out", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in response.headers
+    assert "vary" not in response.headers
+
+    response = await client.get("/events", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in response.headers
+    assert response.content.startswith(b"data: ")
+
+async def test_public_responses_are_compressed_once():
+    app = build_app()
+    middleware = CompressionMiddleware(app, minimum_size=10, encodings=["gzip"])
+    body = b'{"cities": ["Damascus", "Aleppo", "Homs"]}' * 10
+    first = await middleware.compress(body, "gzip", cacheable=True)
+    second = await middleware.compress(body, "gzip", cacheable=True)
+    assert first is second
+    assert gzip.decompress(first) == body
+    assert len(middleware.cache) == 1
@@ -0,0 +1,135 @@
+from datetime import datetime, timedelta
+import httpx
+import pytest
+from bson import ObjectId
+from fastapi import FastAPI
+from app.api.v1.endpoints import dashboard
+from app.api.v1.endpoints.deps import get_current_user
+from app.core.timezones import day_bounds_utc, local_today
+from app.services.appointment_service import appointment_service
+from app.services.dashboard_service import DOCTOR_DASHBOARD_SECTIONS, RECENT_PRESCRIPTIONS_LIMIT, dashboard_service
+from app.services.doctor_service import doctor_service
+from app.services.prescription_service import prescription_service
+from app.services.summary_service import build_user_summary
+
+TIMEZONE = "America/New_York"
+
+@pytest.fixture
+async def doctor(mongo):
+    for service in (appointment_service, doctor_service, prescription_service):
+        await service.init()
+    doctor = {"_id": ObjectId(), "role": "doctor", "status": "active", "full_name": "Dr. Lina Khoury",
+              "password_hash": "x" * 60, "clinic_info": {"timezone": TIMEZONE, "city": "Damascus"}}
+    await mongo.users.insert_one(doctor)
+    return doctor
+
+@pytest.fixture
+async def patients(mongo):
+    patients = [{"_id": ObjectId(), "role": "patient", "full_name": name} for name in ("Rama Haddad", "Omar Aziz")]
+    await mongo.users.insert_many(patients)
+    return patients
+
+async def add_appointment(mongo, doctor, patient, starts_at, status="confirmed", snapshot=True):
+    appointment = {
+        "_id": ObjectId(), "doctor_id": doctor["_id"], "patient_id": patient["_id"],
+        "appointment_date": datetime.combine(local_today(TIMEZONE), datetime.min.time()),
+        "time_slot": {"start_time": "09:00", "end_time": "09:30"}, "status": status,
+        "starts_at": starts_at, "ends_at": starts_at + timedelta(minutes=30),
+        "doctor_summary": build_user_summary(doctor)
+    }
+    if snapshot:
+        appointment["patient_summary"] = build_user_summary(patient)
+    await mongo.appointments.insert_one(appointment)
+    return appointment
+
+@pytest.fixture
+async def agenda(mongo, doctor, patients):
+    today_start, _ = day_bounds_utc(local_today(TIMEZONE), tz_name=TIMEZONE)
+    later = await add_appointment(mongo, doctor, patients[0], today_start + timedelta(hours=15))
+    # Booked before snapshots: the patient comes from users
+    earlier = await add_appointment(mongo, doctor, patients[1], today_start + timedelta(hours=9), snapshot=False)
+    cancelled = await add_appointment(mongo, doctor, patients[0], today_start + timedelta(hours=10), status="cancelled")
+    await add_appointment(mongo, doctor, patients[0], today_start - timedelta(hours=12))
+    return [earlier, cancelled, later]
+
+@pytest.fixture
+async def prescriptions(mongo, doctor, patients):
+    created = datetime.utcnow() - timedelta(days=1)
+    documents = [
+        {"_id": ObjectId(), "doctor_id": doctor["_id"], "patient_id": patients[0]["_id"],
+         "prescription_number": f"RX-2026-{number:05d}", "medicines": [{"name": "Amoxicillin"}],
+         "created_at": created + timedelta(minutes=number),
+         "doctor_summary": build_user_summary(doctor), "patient_summary": build_user_summary(patients[0])}
+        for number in range(RECENT_PRESCRIPTIONS_LIMIT + 2)
+    ]
+    await mongo.prescriptions.insert_many(documents)
+    return sorted(documents, key=lambda document: document["created_at"], reverse=True)
+
+async def test_dashboard_assembles_every_section(doctor, patients, agenda, prescriptions):
+    result = await dashboard_service.get_doctor_dashboard(doctor, DOCTOR_DASHBOARD_SECTIONS)
+
+    assert list(result) == list(DOCTOR_DASHBOARD_SECTIONS)
+    assert result["profile"]["_id"] == str(doctor["_id"])
+    assert "password_hash" not in result["profile"]
+
+    assert result["stats"]["today_appointments"] == 2
+    assert result["stats"]["total_appointments"] == 4
+    assert result["stats"]["total_patients"] == 2
+    assert result["stats"]["prescriptions"]["total"] == len(prescriptions)
+
+    # Today in the clinic's timezone, by start time, with the patient populated
+    assert [appointment._id for appointment in result["today"]] == [str(document["_id"]) for document in agenda]
+    assert [appointment.patient.full_name for appointment in result["today"]] == [
+        "Omar Aziz", "Rama Haddad", "Rama Haddad"
+    ]
+    assert all(appointment.doctor is None for appointment in result["today"])
+
+    recent = result["recent_prescriptions"]
+    assert [prescription._id for prescription in recent] == [
+        str(document["_id"]) for document in prescriptions[:RECENT_PRESCRIPTIONS_LIMIT]
+    ]
+    assert recent[0].patient.full_name == "Rama Haddad" and recent[0].doctor is None
+
+async def test_only_the_requested_sections_are_loaded(doctor, monkeypatch):
+    async def unexpected(*args, **kwargs):
+        raise AssertionError("section not requested")
+
+    monkeypatch.setattr(appointment_service, "get_appointments_by_doctor", unexpected)
+    monkeypatch.setattr(prescription_service, "get_recent_prescriptions_by_doctor", unexpected)
+
+    result = await dashboard_service.get_doctor_dashboard(doctor, {"stats", "profile"})
+
+    assert list(result) == ["profile", "stats"]
+
+@pytest.fixture
+async def client(doctor):
+    app = FastAPI()
+    app.include_router(dashboard.router, prefix="/dashboard")
+    user = {"value": doctor}
+    app.dependency_overrides[get_current_user] = lambda: user["value"]
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        client.user = user
+        yield client
+
+async def test_endpoint_serializes_the_read_models(client, doctor, agenda, prescriptions):
+    response = await client.get("/dashboard/doctor")
+
+    assert response.status_code == 200
+    data = response.json()["data"]
+    assert data["today"][0]["_id"] == str(agenda[0]["_id"])
+    assert data["today"][0]["patient_id"] == str(agenda[0]["patient_id"])
+    assert data["today"][0]["appointment_date"] == local_today(TIMEZONE).isoformat()
+    assert data["recent_prescriptions"][0]["prescription_number"] == prescriptions[0]["prescription_number"]
+
+async def test_endpoint_fields_selector(client):
+    response = await client.get("/dashboard/doctor", params={"fields": "stats, today"})
+    assert response.status_code == 200
+    assert list(response.json()["data"]) == ["stats", "today"]
+
+    response = await client.get("/dashboard/doctor", params={"fields": "stats,agenda"})
+    assert response.status_code == 400
+
+async def test_endpoint_is_for_doctors_only(client, patients):
+    client.user["value"] = patients[0]
+    response = await client.get("/dashboard/doctor")
+    assert response.status_code == 403
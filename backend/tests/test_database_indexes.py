@@ -0,0 +1,66 @@
+from pymongo.errors import DuplicateKeyError, OperationFailure
+from app.core.database import MongoDB
+
+LEGACY_EMAIL = {"key": [("email", 1)], "unique": True}
+PARTIAL_EMAIL = {"key": [("email", 1)], "unique": True, "partialFilterExpression": {"email": {"$type": "string"}}}
+
+class Users:
+    """Records index operations; optionally fails them like the server would"""
+
+    def __init__(self, indexes, duplicate_emails=False, dropped_elsewhere=False):
+        self.indexes = {"_id_": {"key": [("_id", 1)]}, **indexes}
+        self.duplicate_emails = duplicate_emails
+        self.dropped_elsewhere = dropped_elsewhere
+        self.calls = []
+
+    async def index_information(self):
+        return dict(self.indexes)
+
+    async def create_index(self, keys, **options):
+        name = options.get("name") or ("email_1" if keys == "email" else "country_code_1_phone_number_1")
+        self.calls.append(("create", name))
+        if keys == "email" and self.duplicate_emails:
+            raise DuplicateKeyError("E11000 duplicate key error", 11000)
+        self.indexes[name] = options
+
+    async def drop_index(self, name):
+        self.calls.append(("drop", name))
+        if self.dropped_elsewhere:
+            raise OperationFailure("index not found with name [email_1]", 27)
+        del self.indexes[name]
+
+async def test_fresh_collection_gets_both_partial_indexes():
+    users = Users({})
+    await MongoDB()._create_unique_user_indexes(users)
+
+    assert users.calls == [("create", "email_unique"), ("create", "country_code_1_phone_number_1")]
+
+async def test_legacy_email_index_is_dropped_after_its_replacement_exists():
+    users = Users({"email_1": LEGACY_EMAIL})
+    await MongoDB()._create_unique_user_indexes(users)
+
+    assert users.calls[:2] == [("create", "email_unique"), ("drop", "email_1")]
+    assert "email_1" not in users.indexes
+    assert users.indexes["email_unique"]["partialFilterExpression"] == {"email": {"$type": "string"}}
+
+async def test_legacy_email_index_stays_when_the_replacement_cannot_build():
+    users = Users({"email_1": LEGACY_EMAIL}, duplicate_emails=True)
+    await MongoDB()._create_unique_user_indexes(users)
+
+    assert ("drop", "email_1") not in users.calls
+    assert "email_1" in users.indexes
+    # The phone index does not depend on the email one
+    assert users.calls[-1] == ("create", "country_code_1_phone_number_1")
+
+async def test_concurrent_startup_tolerates_the_drop_losing_the_race():
+    users = Users({"email_1": LEGACY_EMAIL}, dropped_elsewhere=True)
+    await MongoDB()._create_unique_user_indexes(users)
+
+    assert users.calls == [("create", "email_unique"), ("drop", "email_1"),
+                           ("create", "country_code_1_phone_number_1")]
+
+async def test_partial_index_from_an_earlier_deploy_is_kept():
+    users = Users({"email_1": PARTIAL_EMAIL})
+    await MongoDB()._create_unique_user_indexes(users)
+
+    assert users.calls == [("create", "country_code_1_phone_number_1")]
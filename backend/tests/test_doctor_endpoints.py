@@ -0,0 +1,19 @@
+import pytest
+from fastapi import FastAPI
+from app.api.v1.endpoints import doctors
+
+PUBLIC_ROUTES = ["/doctors/specialties", "/doctors/cities", "/doctors/batch", "/doctors/{doctor_id}"]
+
+@pytest.fixture(scope="module")
+def openapi() -> dict:
+    app = FastAPI()
+    app.include_router(doctors.router, prefix="/doctors")
+    return app.openapi()
+
+@pytest.mark.parametrize("path", PUBLIC_ROUTES)
+def test_shared_cacheable_routes_read_no_credentials(openapi, path):
+    # Cache-Control: public lets a shared cache serve one caller's response to
+    # everyone; that is only sound when the response cannot depend on the caller
+    operation = openapi["paths"][path]["get"]
+    assert "security" not in operation
+    assert all(parameter["name"].lower() != "authorization" for parameter in operation.get("parameters", []))
@@ -0,0 +1,93 @@
+import asyncio
+import random
+from collections import defaultdict
+import pytest
+from bson import ObjectId
+from app.core.config import settings
+from app.core.events import EventBus
+from app.domain.events import DoctorProfileUpdated, DoctorScheduleChanged, UserUpdated, ordering_key
+
+@pytest.fixture
+async def bus(monkeypatch):
+    monkeypatch.setattr(settings, "EVENT_OUTBOX_ENABLED", False)
+    monkeypatch.setattr(settings, "EVENT_WORKERS", 4)
+    bus = EventBus()
+    yield bus
+    await bus.stop()
+
+def test_ordering_key_is_the_party_the_event_is_about():
+    doctor_id = str(ObjectId())
+    assert ordering_key(DoctorScheduleChanged(doctor_id=doctor_id)) == doctor_id
+    # A doctor's user and profile updates share a key
+    assert ordering_key(UserUpdated(user_id=doctor_id, fields=("full_name",))) == doctor_id
+
+async def test_events_of_one_party_are_handled_in_publish_order(bus):
+    random.seed(3)
+    handled = defaultdict(list)
+    running = set()
+    overlapped = []
+
+    async def handler(event):
+        if event.doctor_id in running:
+            overlapped.append(event.doctor_id)
+        running.add(event.doctor_id)
+        await asyncio.sleep(random.random() / 1000)
+        running.discard(event.doctor_id)
+        handled[event.doctor_id].append(event.fields[0])
+
+    bus.subscribe(DoctorProfileUpdated, handler)
+    bus.start()
+    doctors = [str(ObjectId()) for _ in range(8)]
+    for sequence in range(20):
+        for doctor_id in doctors:
+            await bus.publish(DoctorProfileUpdated(doctor_id=doctor_id, fields=(str(sequence),)))
+    await bus.stop()
+
+    assert {doctor_id: handled[doctor_id] for doctor_id in doctors} == {
+        doctor_id: [str(sequence) for sequence in range(20)] for doctor_id in doctors
+    }
+    assert overlapped == []
+    assert bus.metrics["delivered"] == 160 and bus.metrics["queue_depth"] == 0
+
+async def test_parties_are_handled_in_parallel(bus):
+    release = asyncio.Event()
+    started = []
+
+    async def handler(event):
+        started.append(event.doctor_id)
+        await release.wait()
+
+    bus.subscribe(DoctorScheduleChanged, handler)
+    bus.start()
+    doctors = [str(ObjectId()) for _ in range(40)]
+    for doctor_id in doctors:
+        await bus.publish(DoctorScheduleChanged(doctor_id=doctor_id))
+    await asyncio.sleep(0.01)
+
+    # One event per worker in flight, each from a different queue
+    assert len(started) == settings.EVENT_WORKERS
+    release.set()
+
+async def test_a_burst_for_one_party_fills_only_its_queue(bus, monkeypatch):
+    monkeypatch.setattr(settings, "EVENT_QUEUE_SIZE", 8)
+    release = asyncio.Event()
+
+    async def handler(event):
+        await release.wait()
+
+    bus.subscribe(DoctorScheduleChanged, handler)
+    bus.start()
+    busy = str(ObjectId())
+    await bus.publish(DoctorScheduleChanged(doctor_id=busy))
+    await asyncio.sleep(0)
+    for _ in range(9):
+        await bus.publish(DoctorScheduleChanged(doctor_id=busy))
+    # One in flight, two queued (8 split over 4 queues), the rest dropped
+    assert bus.metrics["dropped"] == 7
+
+    busy_queue = bus._queues[hash(busy) % len(bus._queues)]
+    other = next(doctor_id for doctor_id in (str(ObjectId()) for _ in range(100))
+                 if bus._queues[hash(doctor_id) % len(bus._queues)] is not busy_queue)
+    await bus.publish(DoctorScheduleChanged(doctor_id=other))
+    assert bus.metrics["dropped"] == 7
+    release.set()
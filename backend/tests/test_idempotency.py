@@ -0,0 +1,86 @@
+import asyncio
+import json
+import httpx
+import pytest
+from bson import ObjectId
+from fastapi import FastAPI, HTTPException, Request
+from app.core.config import settings
+from app.core.idempotency import IdempotencyMiddleware, IdempotencyStore
+from app.core.security import create_access_token
+
+PATH = "/api/v1/appointments/"
+
+def build_app(database, outcome=None) -> FastAPI:
+    app = FastAPI()
+
+    @app.post(PATH)
+    async def create(request: Request):
+        payload = await request.json()
+        # Long enough for every duplicate to arrive while the first runs
+        await asyncio.sleep(0.05)
+        if outcome is not None:
+            raise HTTPException(status_code=outcome, detail="Time slot already booked")
+        result = await database.appointments.insert_one(payload)
+        return {"success": True, "data": {"appointment_id": str(result.inserted_id)}}
+
+    app.add_middleware(IdempotencyMiddleware, store=IdempotencyStore())
+    return app
+
+@pytest.fixture
+async def user(mongo):
+    user_id = ObjectId()
+    await mongo.users.insert_one({"_id": user_id, "role": "patient", "token_version": 0})
+    return user_id
+
+def headers(user_id, key="booking-1", version=0) -> dict:
+    token = create_access_token({"sub": str(user_id), "ver": version})
+    return {"Authorization": f"Bearer {token}", "Idempotency-Key": key}
+
+async def post_many(app, count: int, **request):
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        return await asyncio.gather(*(client.post(PATH, **request) for _ in range(count)))
+
+async def test_parallel_retries_insert_once(mongo, user):
+    count = 20
+    responses = await post_many(build_app(mongo), count, json={"doctor_id": "d1"}, headers=headers(user))
+
+    assert await mongo.appointments.count_documents({}) == 1
+    assert all(response.status_code == 200 for response in responses)
+    replayed = [response for response in responses if response.headers.get("idempotent-replayed") == "true"]
+    assert len(replayed) == count - 1
+    assert len({response.content for response in responses}) == 1
+
+async def test_conflicts_are_not_replayed(mongo, user):
+    app = build_app(mongo, outcome=409)
+    first, = await post_many(app, 1, json={"doctor_id": "d1"}, headers=headers(user))
+    retry, = await post_many(app, 1, json={"doctor_id": "d1"}, headers=headers(user))
+
+    assert first.status_code == retry.status_code == 409
+    assert "idempotent-replayed" not in retry.headers
+
+async def test_validation_errors_are_replayed(mongo, user):
+    app = build_app(mongo, outcome=400)
+    await post_many(app, 1, json={"doctor_id": "d1"}, headers=headers(user))
+    retry, = await post_many(app, 1, json={"doctor_id": "d1"}, headers=headers(user))
+
+    assert retry.status_code == 400
+    assert retry.headers["idempotent-replayed"] == "true"
+
+async def test_revoked_token_does_not_replay(mongo, user):
+    app = build_app(mongo)
+    await post_many(app, 1, json={"doctor_id": "d1"}, headers=headers(user))
+    await mongo.users.update_one({"_id": user}, {"$inc": {"token_version": 1}})
+    retry, = await post_many(app, 1, json={"doctor_id": "d1"}, headers=headers(user))
+
+    # Passed through to the endpoint, which does its own authentication
+    assert "idempotent-replayed" not in retry.headers
+
+async def test_oversized_body_is_rejected(mongo, user, monkeypatch):
+    monkeypatch.setattr(settings, "IDEMPOTENCY_MAX_BODY_BYTES", 64)
+    response, = await post_many(
+        build_app(mongo), 1, content=json.dumps({"reason": "x" * 100}),
+        headers={**headers(user), "Content-Type": "application/json"}
+    )
+
+    assert response.status_code == 413
+    assert await mongo.appointments.count_documents({}) == 0
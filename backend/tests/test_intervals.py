@@ -0,0 +1,76 @@
+"""
+Property tests of the interval helpers against brute-force oracles
+
+Random cases are drawn from a seeded generator on a minute grid, so any
+failure is reproducible; the seed and case are in the assertion message.
+"""
+import random
+from datetime import datetime, timedelta
+import pytest
+from app.domain.intervals import IntervalSet, overlaps, subtract_intervals
+
+ORIGIN = datetime(2026, 1, 5)
+HORIZON = 24 * 60
+CASES = 300
+
+def at(minute: int) -> datetime:
+    return ORIGIN + timedelta(minutes=minute)
+
+def random_intervals(rng: random.Random, count: int, max_length: int = 180) -> list:
+    intervals = []
+    for _ in range(count):
+        start = rng.randrange(HORIZON)
+        intervals.append((at(start), at(min(HORIZON, start + rng.randrange(max_length + 1)))))
+    return intervals
+
+def covers(intervals, minute: int) -> bool:
+    """Whether the minute [minute, minute + 1) lies inside any interval"""
+    point = at(minute)
+    return any(start <= point < end for start, end in intervals)
+
+@pytest.mark.parametrize("seed", range(CASES))
+def test_interval_set_overlaps_matches_linear_scan(seed):
+    rng = random.Random(seed)
+    intervals = random_intervals(rng, rng.randrange(40))
+    built = IntervalSet(intervals)
+    grown = IntervalSet()
+    for interval in intervals:
+        grown.add(*interval)
+
+    assert list(built) == sorted(intervals) == list(grown)
+    for query in random_intervals(rng, 50, max_length=120):
+        expected = any(overlaps(query, interval) for interval in intervals)
+        assert built.overlaps(*query) == expected, (seed, query)
+        assert grown.overlaps(*query) == expected, (seed, query)
+
+@pytest.mark.parametrize("seed", range(CASES))
+def test_subtract_intervals_matches_minute_grid(seed):
+    rng = random.Random(seed)
+    windows = random_intervals(rng, rng.randrange(1, 4), max_length=600)
+    blocks = random_intervals(rng, rng.randrange(30))
+    result = subtract_intervals(windows, blocks)
+
+    for start, end in result:
+        assert start < end, (seed, start, end)
+        assert not any(overlaps((start, end), block) for block in blocks), (seed, start, end)
+    for minute in range(HORIZON):
+        expected = covers(windows, minute) and not covers(blocks, minute)
+        assert covers(result, minute) == expected, (seed, minute)
+
+@pytest.mark.parametrize("seed", range(CASES))
+def test_subtract_intervals_of_disjoint_windows_is_sorted_and_disjoint(seed):
+    rng = random.Random(seed)
+    cuts = sorted(rng.sample(range(HORIZON), 6))
+    windows = [(at(cuts[i]), at(cuts[i + 1])) for i in range(0, 6, 2)]
+    result = subtract_intervals(windows, random_intervals(rng, rng.randrange(30)))
+
+    for previous, current in zip(result, result[1:]):
+        assert previous[1] <= current[0], (seed, previous, current)
+
+def test_edges_are_half_open():
+    window = (at(0), at(60))
+    assert subtract_intervals([window], [(at(60), at(90))]) == [window]
+    assert subtract_intervals([window], [(at(-30), at(0))]) == [window]
+    assert subtract_intervals([window], [(at(0), at(60))]) == []
+    assert not IntervalSet([(at(0), at(30))]).overlaps(at(30), at(60))
+    assert IntervalSet([(at(0), at(30))]).overlaps(at(29), at(60))
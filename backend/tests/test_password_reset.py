@@ -0,0 +1,102 @@
+import asyncio
+from datetime import datetime, timedelta
+import httpx
+import pytest
+from bson import ObjectId
+from fastapi import FastAPI
+from pydantic import ValidationError
+from app.api.v1.endpoints import auth
+from app.core.config import settings
+from app.core.security import is_token_current
+from app.services.auth_service import AuthService, auth_service
+
+@pytest.fixture
+async def service(mongo):
+    service = AuthService()
+    await service.init()
+    return service
+
+@pytest.fixture
+async def user(mongo):
+    user = {"_id": ObjectId(), "full_name": "Rama Haddad", "email": "rama@example.com", "role": "patient",
+            "status": "active", "password_hash": "old-hash", "token_version": 0}
+    await mongo.users.insert_one(user)
+    return user
+
+async def test_token_is_stored_hashed_and_replaced(service, user):
+    first = await service.create_password_reset_token(str(user["_id"]))
+    second = await service.create_password_reset_token(str(user["_id"]))
+
+    stored, = await service.tokens_collection.find({"type": "password_reset"}).to_list(None)
+    assert stored["token"] not in (first, second)
+    assert await service.consume_password_reset_token(first) is None
+    assert await service.consume_password_reset_token(second) == user["_id"]
+
+async def test_token_is_single_use_under_concurrency(service, user):
+    token = await service.create_password_reset_token(str(user["_id"]))
+
+    results = await asyncio.gather(*(service.consume_password_reset_token(token) for _ in range(10)))
+
+    assert results.count(user["_id"]) == 1
+    assert results.count(None) == 9
+
+async def test_expired_token_is_refused(service, user):
+    token = await service.create_password_reset_token(str(user["_id"]))
+    await service.tokens_collection.update_many(
+        {"type": "password_reset"}, {"$set": {"expires_at": datetime.utcnow() - timedelta(seconds=1)}})
+
+    assert await service.consume_password_reset_token(token) is None
+
+async def test_reset_sets_the_password_and_outdates_sessions(service, user):
+    assert await service.reset_password(user["_id"], "new-hash")
+    assert not await service.reset_password(ObjectId(), "new-hash")
+
+    stored = await service.users_collection.find_one({"_id": user["_id"]})
+    assert stored["password_hash"] == "new-hash"
+    assert not is_token_current({"ver": 0}, stored)
+
+def test_reset_request_requires_a_strong_password():
+    with pytest.raises(ValidationError):
+        auth.ResetPasswordRequest(token="t" * 43, password="alllowercase1")
+
+    assert auth.ResetPasswordRequest(token="t" * 43, password="NewPassw0rd").password == "NewPassw0rd"
+
+@pytest.fixture
+async def client(mongo, monkeypatch):
+    monkeypatch.setattr(settings, "RATE_LIMIT_ENABLED", False)
+    monkeypatch.setattr(settings, "USE_MOCK_SERVICES", True)
+    # bcrypt is slow and not what these tests are about
+    monkeypatch.setattr(auth, "get_password_hash", lambda password: f"hash:{password}")
+    await auth_service.init()
+    app = FastAPI()
+    app.include_router(auth.router, prefix="/auth")
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        yield client
+
+async def forgot(client, identifier: str) -> httpx.Response:
+    return await client.post("/auth/forgot-password", json={"identifier": identifier})
+
+async def test_reset_flow_through_the_endpoints(client, user, mongo):
+    response = await forgot(client, "Rama@Example.com")
+    assert response.status_code == 200
+    token = response.json()["data"]["reset_token"]
+
+    response = await client.post("/auth/reset-password", json={"token": token, "password": "NewPassw0rd"})
+    assert response.status_code == 200
+    stored = await mongo.users.find_one({"_id": user["_id"]})
+    assert stored["password_hash"] == "hash:NewPassw0rd"
+    assert stored["token_version"] == 1
+
+    # The link works once
+    response = await client.post("/auth/reset-password", json={"token": token, "password": "OtherPassw0rd"})
+    assert response.status_code == 422
+
+async def test_forgot_password_does_not_reveal_accounts(client, user, mongo):
+    await mongo.users.insert_one({"_id": ObjectId(), "email": "blocked@example.com", "status": "blocked"})
+
+    known, unknown, blocked = [await forgot(client, identifier) for identifier in
+                               ("rama@example.com", "nobody@example.com", "blocked@example.com")]
+
+    assert {response.json()["message"] for response in (known, unknown, blocked)} == {known.json()["message"]}
+    assert unknown.json()["data"] is None and blocked.json()["data"] is None
+    assert await mongo.verification_tokens.count_documents({"type": "password_reset"}) == 1
@@ -0,0 +1,113 @@
+import pytest
+from fakeredis import aioredis
+from app.core import rate_limit
+from app.core.config import settings
+from app.core.exceptions import RateLimitException
+from app.core.rate_limit import InMemoryRateLimitBackend, RateLimit, RateLimiter, RedisRateLimitBackend
+
+LIMIT = RateLimit(capacity=5, period=60)  # one token every 12 s
+
+class Clock:
+    """Stands in for the `time` module; both clocks advance together"""
+
+    def __init__(self):
+        self.now = 1_700_000_000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def time(self) -> float:
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(rate_limit, "time", clock)
+    return clock
+
+@pytest.fixture
+def redis():
+    return aioredis.FakeRedis()
+
+@pytest.fixture(params=["memory", "redis"])
+def backend(request, redis):
+    if request.param == "memory":
+        return InMemoryRateLimitBackend()
+    return RedisRateLimitBackend(redis)
+
+async def test_burst_up_to_capacity_then_rejected(backend, clock):
+    for _ in range(LIMIT.capacity):
+        assert await backend.consume("login:ip:1", LIMIT) == 0
+
+    assert await backend.consume("login:ip:1", LIMIT) == pytest.approx(12)
+    # Other keys have their own bucket
+    assert await backend.consume("login:ip:2", LIMIT) == 0
+
+async def test_refills_evenly_and_caps_at_capacity(backend, clock):
+    for _ in range(LIMIT.capacity):
+        await backend.consume("key", LIMIT)
+
+    clock.now += 6
+    assert await backend.consume("key", LIMIT) == pytest.approx(6)
+    clock.now += 6
+    assert await backend.consume("key", LIMIT) == 0
+
+    # A long idle period refills to capacity, not beyond
+    clock.now += 3600
+    for _ in range(LIMIT.capacity):
+        assert await backend.consume("key", LIMIT) == 0
+    assert await backend.consume("key", LIMIT) > 0
+
+async def test_cost_above_remaining_tokens_is_rejected(backend, clock):
+    await backend.consume("key", LIMIT, cost=4)
+    assert await backend.consume("key", LIMIT, cost=2) == pytest.approx(12)
+    assert await backend.consume("key", LIMIT, cost=1) == 0
+
+async def test_in_memory_backend_evicts_least_recently_used(clock):
+    backend = InMemoryRateLimitBackend(max_keys=2)
+    for _ in range(LIMIT.capacity):
+        await backend.consume("a", LIMIT)
+    await backend.consume("b", LIMIT)
+    await backend.consume("c", LIMIT)
+
+    # "a" was evicted, so it starts over with a full bucket
+    assert list(backend._buckets) == ["b", "c"]
+    assert await backend.consume("a", LIMIT) == 0
+
+async def test_redis_buckets_are_shared_and_expire(redis, clock):
+    worker_a, worker_b = RedisRateLimitBackend(redis), RedisRateLimitBackend(redis)
+    for _ in range(LIMIT.capacity):
+        assert await worker_a.consume("key", LIMIT) == 0
+
+    assert await worker_b.consume("key", LIMIT) > 0
+    # Kept only as long as a bucket takes to refill
+    assert 0 < await redis.pttl("ratelimit:key") <= 60_000
+
+class BrokenBackend:
+    async def consume(self, key, limit, cost=1):
+        raise ConnectionError("redis is down")
+
+async def test_limiter_raises_with_whole_second_retry_after(clock):
+    limiter = RateLimiter()
+    for _ in range(LIMIT.capacity):
+        await limiter.hit("key", LIMIT)
+
+    clock.now += 11.5
+    with pytest.raises(RateLimitException) as raised:
+        await limiter.hit("key", LIMIT)
+    assert raised.value.status_code == 429
+    assert raised.value.retry_after == 1
+
+async def test_limiter_fails_open_when_the_backend_errors(clock):
+    limiter = RateLimiter()
+    limiter.backend = BrokenBackend()
+
+    for _ in range(LIMIT.capacity * 2):
+        await limiter.hit("key", LIMIT)
+
+async def test_limiter_disabled_by_setting(clock, monkeypatch):
+    monkeypatch.setattr(settings, "RATE_LIMIT_ENABLED", False)
+    limiter = RateLimiter()
+
+    for _ in range(LIMIT.capacity * 2):
+        await limiter.hit("key", LIMIT)
@@ -0,0 +1,65 @@
+from datetime import date, datetime
+import pytest
+from bson import ObjectId
+from pydantic import ValidationError
+from app.domain.entities.appointment import AppointmentRead
+from app.domain.entities.base import dump_documents, validate_documents
+from app.domain.entities.prescription import PrescriptionRead
+from app.domain.entities.user import UserSummary
+
+def appointment() -> dict:
+    return {
+        "_id": ObjectId(), "doctor_id": ObjectId(), "patient_id": ObjectId(),
+        "appointment_date": datetime(2026, 1, 5),
+        "time_slot": {"start_time": "09:00", "end_time": "09:30"},
+        "status": "confirmed",
+        "starts_at": datetime(2026, 1, 5, 7), "ends_at": datetime(2026, 1, 5, 7, 30),
+        "consultation_fee": 50000,
+        "last_bulk_op_id": ObjectId(),
+        "patient": {"_id": ObjectId(), "full_name": "Rama", "date_of_birth": datetime(1990, 4, 1), "role": "patient"}
+    }
+
+def prescription() -> dict:
+    return {
+        "_id": ObjectId(), "doctor_id": ObjectId(), "patient_id": ObjectId(), "appointment_id": None,
+        "prescription_number": "RX-2026-00001",
+        "medicines": [{"name": "Amoxicillin", "dosage": "500mg"}],
+        "valid_until": datetime(2026, 2, 1),
+        "created_at": datetime(2026, 1, 5, 8),
+        "doctor": {"_id": ObjectId(), "full_name": "Dr. Lina", "specialties": [{"main_specialty": "Cardiology"}]}
+    }
+
+def test_documents_validate_into_slotted_read_models():
+    document = appointment()
+    read, = validate_documents(AppointmentRead, [document])
+
+    assert isinstance(read, AppointmentRead) and isinstance(read.patient, UserSummary)
+    assert not hasattr(read, "__dict__")
+    assert read._id == str(document["_id"])
+    assert read.appointment_date == date(2026, 1, 5)
+    assert read.patient.date_of_birth == date(1990, 4, 1)
+    assert read.consultation_fee == 50000.0
+    # Stored fields the read model does not declare are dropped
+    assert not hasattr(read, "last_bulk_op_id")
+
+@pytest.mark.parametrize("model, document", [(AppointmentRead, appointment), (PrescriptionRead, prescription)])
+def test_dump_is_json_compatible(model, document):
+    stored = document()
+    dumped, = dump_documents(model, validate_documents(model, [stored]))
+
+    assert dumped["_id"] == str(stored["_id"])
+    assert dumped["doctor_id"] == str(stored["doctor_id"])
+    assert all(not isinstance(value, (ObjectId, datetime, date)) for value in dumped.values())
+
+def test_invalid_documents_are_rejected():
+    document = appointment()
+    del document["time_slot"]
+
+    with pytest.raises(ValidationError):
+        validate_documents(AppointmentRead, [document])
+
+def test_sparse_fields_are_validated_and_keep_only_present_selected_fields():
+    document = appointment()
+    rows = validate_documents(AppointmentRead, [document], frozenset({"_id", "appointment_date", "notes"}))
+
+    assert rows == [{"_id": str(document["_id"]), "appointment_date": date(2026, 1, 5)}]
@@ -0,0 +1,82 @@
+from datetime import datetime, timedelta
+import pytest
+from bson import ObjectId
+from app.core.config import settings
+from app.services.reminder_service import ReminderService
+
+def reminder(due_at: datetime, **fields) -> dict:
+    return {
+        "appointment_id": ObjectId(),
+        "kind": "120m",
+        "due_at": due_at,
+        "status": "pending",
+        "claim_id": None,
+        "lease_until": None,
+        "attempts": 0,
+        "payload": {"doctor_name": "Dr. Lina", "date": "2026-01-02", "time": "10:00",
+                    "email": "patient@example.com", "phone": None},
+        **fields
+    }
+
+@pytest.fixture
+async def service(mongo):
+    service = ReminderService()
+    await service.init()
+    return service
+
+def fail_sends(service: ReminderService, monkeypatch):
+    async def send(reminder):
+        return False
+    monkeypatch.setattr(service, "_send", send)
+
+async def test_failed_send_backs_off_exponentially(service, monkeypatch):
+    fail_sends(service, monkeypatch)
+    await service.reminders_collection.insert_one(reminder(datetime.utcnow() - timedelta(minutes=1)))
+
+    assert await service.dispatch_due() == 1
+    stored = await service.reminders_collection.find_one()
+    assert stored["status"] == "pending"
+    assert stored["attempts"] == 1
+    wait = (stored["next_attempt_at"] - datetime.utcnow()).total_seconds()
+    assert settings.REMINDER_RETRY_BASE_SECONDS * 2 - 5 < wait <= settings.REMINDER_RETRY_BASE_SECONDS * 2
+
+    # Not due again until the backoff passes
+    assert await service.dispatch_due() == 0
+
+    await service.reminders_collection.update_one(
+        {"_id": stored["_id"]}, {"$set": {"next_attempt_at": datetime.utcnow() - timedelta(seconds=1)}}
+    )
+    assert await service.dispatch_due() == 1
+    stored = await service.reminders_collection.find_one()
+    assert stored["attempts"] == 2
+    wait = (stored["next_attempt_at"] - datetime.utcnow()).total_seconds()
+    assert wait > settings.REMINDER_RETRY_BASE_SECONDS * 4 - 5
+
+async def test_last_attempt_marks_failed(service, monkeypatch):
+    fail_sends(service, monkeypatch)
+    await service.reminders_collection.insert_one(
+        reminder(datetime.utcnow() - timedelta(minutes=1), attempts=settings.REMINDER_MAX_ATTEMPTS - 1)
+    )
+
+    await service.dispatch_due()
+    stored = await service.reminders_collection.find_one()
+    assert stored["status"] == "failed"
+    assert service.metrics["total_failed"] == 1
+
+async def test_rescheduling_clears_backoff(service, monkeypatch):
+    fail_sends(service, monkeypatch)
+    appointment = {
+        "_id": ObjectId(),
+        "starts_at": datetime.utcnow() + timedelta(days=3),
+        "appointment_date": datetime.utcnow() + timedelta(days=3),
+        "time_slot": {"start_time": "10:00", "end_time": "10:30"}
+    }
+    await service.reminders_collection.insert_one(reminder(
+        datetime.utcnow(), appointment_id=appointment["_id"], attempts=1,
+        next_attempt_at=datetime.utcnow() + timedelta(hours=1)
+    ))
+
+    await service.schedule_for_appointment(appointment, {"full_name": "Dr. Lina"}, {"full_name": "Rama"})
+    stored = await service.reminders_collection.find_one({"kind": "120m"})
+    assert stored["attempts"] == 0
+    assert stored["next_attempt_at"] is None
@@ -0,0 +1,138 @@
+from datetime import date, datetime, timedelta
+import pytest
+from bson import ObjectId
+from pydantic import ValidationError
+from app.api.v1.endpoints.doctors import CreateScheduleExceptionRequest
+from app.core.exceptions import ValidationException
+from app.domain.entities.appointment import AppointmentStatus
+from app.domain.entities.schedule_exception import ScheduleExceptionType
+from app.services.appointment_service import AppointmentService
+from app.services.reminder_service import reminder_service
+from app.services.schedule_service import schedule_service
+
+MONDAY = date(2026, 11, 2)
+
+@pytest.fixture
+async def doctor(mongo):
+    await schedule_service.init()
+    await reminder_service.init()
+    doctor = {"_id": ObjectId(), "role": "doctor", "status": "active", "full_name": "Dr. Lina Khoury",
+              "clinic_info": {"timezone": "Asia/Damascus", "session_duration": 30, "schedule": {
+                  "monday": {"is_working": True, "time_slots": [{"start_time": "09:00", "end_time": "13:00"}]},
+                  "tuesday": {"is_working": True, "time_slots": [{"start_time": "09:00", "end_time": "13:00"}]}}}}
+    await mongo.users.insert_one(doctor)
+    return doctor
+
+@pytest.fixture
+async def service(mongo):
+    service = AppointmentService()
+    await service.init()
+    return service
+
+def starts(slots):
+    return [slot.start_time for slot in slots]
+
+async def test_whole_days_are_blocked_in_clinic_time(doctor):
+    exception = await schedule_service.create_exception(
+        doctor, ScheduleExceptionType.VACATION, MONDAY, MONDAY + timedelta(days=1))
+
+    # Midnight to midnight in Damascus (UTC+3)
+    assert exception["starts_at"] == datetime(2026, 11, 1, 21, 0)
+    assert exception["ends_at"] == datetime(2026, 11, 3, 21, 0)
+    assert exception["timezone"] == "Asia/Damascus"
+    assert (exception["start_date"], exception["end_date"]) == (MONDAY, MONDAY + timedelta(days=1))
+    assert exception["doctor_id"] == str(doctor["_id"])
+
+async def test_timed_range_runs_from_start_to_end(doctor):
+    exception = await schedule_service.create_exception(
+        doctor, ScheduleExceptionType.BLOCKED, MONDAY, MONDAY + timedelta(days=1), "12:00", "10:00")
+
+    assert exception["starts_at"] == datetime(2026, 11, 2, 9, 0)
+    assert exception["ends_at"] == datetime(2026, 11, 3, 7, 0)
+
+@pytest.mark.parametrize("end_date, start_time, end_time", [
+    (MONDAY - timedelta(days=1), None, None),
+    (MONDAY, "10:00", None),
+    (MONDAY, "10:00", "10:00"),
+])
+async def test_invalid_ranges_are_rejected(mongo, doctor, end_date, start_time, end_time):
+    with pytest.raises(ValidationException):
+        await schedule_service.create_exception(
+            doctor, ScheduleExceptionType.BLOCKED, MONDAY, end_date, start_time, end_time)
+    assert await mongo.schedule_exceptions.count_documents({}) == 0
+
+def test_request_rejects_malformed_times():
+    with pytest.raises(ValidationError):
+        CreateScheduleExceptionRequest(start_date=MONDAY, end_date=MONDAY, start_time="25:00", end_time="26:00")
+
+    request = CreateScheduleExceptionRequest(start_date=MONDAY, end_date=MONDAY, start_time="10:00", end_time="11:00")
+    assert request.kind == ScheduleExceptionType.BLOCKED
+
+async def test_is_blocked_uses_half_open_ranges(doctor):
+    await schedule_service.create_exception(
+        doctor, ScheduleExceptionType.BLOCKED, MONDAY, MONDAY, "10:00", "11:00")
+    doctor_id = str(doctor["_id"])
+
+    # 10:00-11:00 Damascus time is 07:00-08:00 UTC
+    assert await schedule_service.is_blocked(doctor_id, datetime(2026, 11, 2, 7, 30), datetime(2026, 11, 2, 7, 45))
+    assert await schedule_service.is_blocked(doctor_id, datetime(2026, 11, 2, 6, 30), datetime(2026, 11, 2, 7, 15))
+    assert not await schedule_service.is_blocked(doctor_id, datetime(2026, 11, 2, 6, 30), datetime(2026, 11, 2, 7, 0))
+    assert not await schedule_service.is_blocked(doctor_id, datetime(2026, 11, 2, 8, 0), datetime(2026, 11, 2, 8, 30))
+    assert not await schedule_service.is_blocked(str(ObjectId()), datetime(2026, 11, 2, 7, 0), datetime(2026, 11, 2, 8, 0))
+
+async def test_time_off_is_cut_out_of_the_available_slots(doctor, service):
+    await schedule_service.create_exception(
+        doctor, ScheduleExceptionType.BLOCKED, MONDAY, MONDAY, "10:15", "11:00")
+    await schedule_service.create_exception(
+        doctor, ScheduleExceptionType.HOLIDAY, MONDAY + timedelta(days=1), MONDAY + timedelta(days=1))
+
+    slots = await service.get_doctor_available_slots_range(str(doctor["_id"]), MONDAY, MONDAY + timedelta(days=1))
+
+    # Slots stay on the half-hour grid: 10:00 and 10:30 both touch the block
+    assert starts(slots[MONDAY]) == ["09:00", "09:30", "11:00", "11:30", "12:00", "12:30"]
+    assert slots[MONDAY + timedelta(days=1)] == []
+
+async def test_deleting_an_exception_frees_its_slots(doctor, service):
+    exception = await schedule_service.create_exception(
+        doctor, ScheduleExceptionType.BLOCKED, MONDAY, MONDAY, "09:00", "12:00")
+    doctor_id = str(doctor["_id"])
+
+    assert await schedule_service.delete_exception(doctor_id, exception["_id"])
+    assert not await schedule_service.delete_exception(doctor_id, exception["_id"])
+    slots = await service.get_doctor_available_slots_range(doctor_id, MONDAY, MONDAY)
+    assert len(slots[MONDAY]) == 8
+
+async def test_cancel_appointments_in_range(mongo, doctor, service):
+    patient = {"_id": ObjectId(), "role": "patient", "status": "active",
+               "full_name": "Rama Haddad", "email": "rama@example.com"}
+    await mongo.users.insert_one(patient)
+
+    def appointment(hour, status):
+        starts_at = datetime(2026, 11, 2, hour, 0)
+        return {"_id": ObjectId(), "doctor_id": doctor["_id"], "patient_id": patient["_id"], "status": status,
+                "starts_at": starts_at, "ends_at": starts_at + timedelta(minutes=30),
+                "appointment_date": datetime(2026, 11, 2),
+                "time_slot": {"start_time": f"{hour + 3:02d}:00", "end_time": f"{hour + 3:02d}:30"}}
+
+    pending, confirmed, completed, outside = (appointment(6, AppointmentStatus.PENDING),
+                                              appointment(7, AppointmentStatus.CONFIRMED),
+                                              appointment(8, AppointmentStatus.COMPLETED),
+                                              appointment(9, AppointmentStatus.CONFIRMED))
+    await mongo.appointments.insert_many([pending, confirmed, completed, outside])
+    await mongo.reminders_due.insert_one({"appointment_id": confirmed["_id"], "kind": "t-2h", "status": "pending"})
+
+    cancelled = await service.cancel_appointments_in_range(
+        doctor, datetime(2026, 11, 2, 6, 0), datetime(2026, 11, 2, 9, 0), "Clinic closed")
+
+    assert cancelled == 2
+    statuses = {doc["_id"]: doc["status"] for doc in await mongo.appointments.find({}).to_list(None)}
+    assert statuses == {pending["_id"]: AppointmentStatus.CANCELLED, confirmed["_id"]: AppointmentStatus.CANCELLED,
+                        completed["_id"]: AppointmentStatus.COMPLETED, outside["_id"]: AppointmentStatus.CONFIRMED}
+    # The old reminder is dropped and the patient is told, once per cancelled booking
+    reminders = await mongo.reminders_due.find({}).to_list(None)
+    assert all(reminder["kind"] != "t-2h" for reminder in reminders)
+    assert {reminder["appointment_id"] for reminder in reminders} == {pending["_id"], confirmed["_id"]}
+
+    # Nothing left to cancel in the range
+    assert await service.cancel_appointments_in_range(
+        doctor, datetime(2026, 11, 2, 6, 0), datetime(2026, 11, 2, 9, 0), "Clinic closed") == 0
@@ -0,0 +1,154 @@
+import asyncio
+from datetime import datetime, timedelta
+import pytest
+from bson import ObjectId
+from app.core.config import settings
+from app.domain.events import DoctorProfileUpdated, UserUpdated
+from app.services.summary_service import (
+    SummaryPropagator, attach_summaries, build_user_summary, summary_projection, touches_summary
+)
+from app.domain.field_selection import FieldSelection
+
+SYNCED = datetime(2026, 1, 5, 8)
+
+def doctor(**fields) -> dict:
+    return {
+        "_id": ObjectId(), "full_name": "Dr. Lina Khoury", "email": "lina@example.com", "role": "doctor",
+        "phone_number": None, "password_hash": "x" * 60,
+        "specialties": [{"main_specialty": "Cardiology", "sub_specialty": None, "certificate": "c.pdf"}],
+        "clinic_info": {"city": "Damascus", "area": "Mezzeh", "address": "Street 1", "consultation_fee": 50000},
+        **fields
+    }
+
+@pytest.fixture
+async def propagator(mongo):
+    propagator = SummaryPropagator()
+    # Not init(): handlers would stay subscribed on the global bus
+    propagator.users_collection = mongo.users
+    yield propagator
+    await propagator.stop()
+
+def test_summary_keeps_only_the_displayed_fields():
+    user = doctor()
+    summary = build_user_summary(user, SYNCED)
+
+    assert summary == {
+        "_id": user["_id"], "synced_at": SYNCED, "full_name": "Dr. Lina Khoury", "email": "lina@example.com",
+        "role": "doctor", "specialties": [{"main_specialty": "Cardiology"}],
+        "clinic_info": {"city": "Damascus", "area": "Mezzeh", "consultation_fee": 50000}
+    }
+
+def test_summary_of_a_patient_has_no_doctor_sections():
+    patient = {"_id": ObjectId(), "full_name": "Rama", "role": "patient", "clinic_info": None, "specialties": []}
+    assert set(build_user_summary(patient)) == {"_id", "synced_at", "full_name", "role"}
+
+@pytest.mark.parametrize("update, expected", [
+    ({"full_name": "x"}, True),
+    ({"specialties": []}, True),
+    ({"clinic_info.city": "Aleppo"}, True),
+    ({"clinic_info": {}}, True),
+    ({"clinic_info.address": "Street 2"}, False),
+    ({"password_hash": "x", "updated_at": SYNCED}, False),
+])
+def test_touches_summary(update, expected):
+    assert touches_summary(update) is expected
+
+async def test_snapshots_are_attached_without_a_user_query(mongo):
+    user = doctor()
+    documents = [{"_id": ObjectId(), "doctor_id": user["_id"], "doctor_summary": build_user_summary(user, SYNCED)}]
+
+    await attach_summaries(documents, "doctor")
+
+    assert documents[0]["doctor"]["full_name"] == "Dr. Lina Khoury"
+    assert "doctor_summary" not in documents[0]
+
+async def test_documents_without_a_snapshot_are_filled_from_users(mongo):
+    user, gone = doctor(), ObjectId()
+    await mongo.users.insert_one(user)
+    documents = [{"_id": ObjectId(), "doctor_id": user["_id"]} for _ in range(2)]
+    documents.append({"_id": ObjectId(), "doctor_id": gone})
+
+    await attach_summaries(documents, "doctor")
+
+    assert [document["doctor"]["full_name"] for document in documents[:2]] == ["Dr. Lina Khoury"] * 2
+    assert "password_hash" not in documents[0]["doctor"]
+    assert documents[2]["doctor"] is None
+
+async def test_snapshots_are_ignored_when_disabled(mongo, monkeypatch):
+    monkeypatch.setattr(settings, "USER_SUMMARIES_ENABLED", False)
+    user = doctor()
+    await mongo.users.insert_one(user)
+    stale = build_user_summary({**user, "full_name": "Old name"}, SYNCED)
+    documents = [{"_id": ObjectId(), "doctor_id": user["_id"], "doctor_summary": stale}]
+
+    await attach_summaries(documents, "doctor")
+
+    assert documents[0]["doctor"]["full_name"] == "Dr. Lina Khoury"
+
+def test_projection_leaves_unexpanded_snapshots_on_the_server():
+    assert summary_projection(FieldSelection(), ("patient",)) == {"doctor_summary": 0}
+    assert summary_projection(FieldSelection(), ("doctor", "patient")) is None
+    assert summary_projection(FieldSelection(fields=frozenset({"status"})), ("doctor",)) == {
+        "doctor_id": 1, "doctor_summary": 1, "status": 1
+    }
+
+async def test_propagate_rewrites_every_snapshot_of_the_user(mongo, propagator, monkeypatch):
+    monkeypatch.setattr(settings, "SUMMARY_PROPAGATION_BATCH_SIZE", 2)
+    user, other = doctor(full_name="New name"), doctor()
+    await mongo.users.insert_many([user, other])
+    old = build_user_summary({**user, "full_name": "Old name"}, SYNCED)
+    await mongo.appointments.insert_many(
+        [{"_id": ObjectId(), "doctor_id": user["_id"], "doctor_summary": old} for _ in range(5)]
+        + [{"_id": ObjectId(), "doctor_id": user["_id"]}]
+        + [{"_id": ObjectId(), "doctor_id": other["_id"], "doctor_summary": build_user_summary(other, SYNCED)}]
+    )
+    await mongo.prescriptions.insert_one({"_id": ObjectId(), "doctor_id": user["_id"], "doctor_summary": old})
+
+    assert await propagator.propagate(user["_id"]) == 7
+
+    names = {document["doctor_summary"]["full_name"]
+             async for document in mongo.appointments.find({"doctor_id": user["_id"]})}
+    assert names == {"New name"}
+    assert (await mongo.prescriptions.find_one())["doctor_summary"]["full_name"] == "New name"
+    assert (await mongo.appointments.find_one({"doctor_id": other["_id"]}))["doctor_summary"]["synced_at"] == SYNCED
+    assert propagator.metrics["total_documents_updated"] == 7
+
+async def test_propagate_skips_unknown_users(mongo, propagator):
+    assert await propagator.propagate(ObjectId()) == 0
+
+def test_relevant_profile_changes_are_queued(propagator):
+    user_id = str(ObjectId())
+    propagator._on_user_changed(UserUpdated(user_id=user_id, fields=("password_hash",)))
+    assert propagator.metrics["pending_users"] == 0
+
+    propagator._on_user_changed(DoctorProfileUpdated(doctor_id=user_id, fields=("clinic_info.city",)))
+    propagator._on_user_changed(UserUpdated(user_id=user_id, fields=("full_name",)))
+    assert list(propagator._pending) == [ObjectId(user_id)]
+
+def test_pending_users_are_bounded(propagator, monkeypatch):
+    monkeypatch.setattr(settings, "SUMMARY_PROPAGATION_MAX_PENDING", 2)
+    for _ in range(3):
+        propagator.mark_changed(ObjectId())
+
+    assert propagator.metrics["pending_users"] == 2
+    assert propagator.metrics["dropped"] == 1
+
+async def test_worker_propagates_and_records_the_lag(mongo, propagator):
+    user = doctor(full_name="New name")
+    await mongo.users.insert_one(user)
+    await mongo.appointments.insert_one({
+        "_id": ObjectId(), "doctor_id": user["_id"],
+        "doctor_summary": build_user_summary(user, SYNCED - timedelta(days=1))
+    })
+
+    propagator.start()
+    propagator.mark_changed(user["_id"])
+    for _ in range(100):
+        if propagator.metrics["total_users_propagated"]:
+            break
+        await asyncio.sleep(0.01)
+
+    assert propagator.metrics["total_users_propagated"] == 1
+    assert propagator.metrics["last_lag_ms"] is not None
+    assert propagator.metrics["max_lag_ms"] >= propagator.metrics["last_lag_ms"]
+    assert (await mongo.appointments.find_one())["doctor_summary"]["synced_at"] > SYNCED
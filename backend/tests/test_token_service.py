@@ -0,0 +1,81 @@
+import asyncio
+import httpx
+import pytest
+from bson import ObjectId
+from fastapi import FastAPI
+from app.api.v1.endpoints import auth
+from app.core.security import decode_token, is_token_current
+from app.services.auth_service import auth_service
+from app.services.token_service import RefreshTokenService, refresh_token_service
+
+@pytest.fixture
+async def service(mongo):
+    service = RefreshTokenService()
+    await service.init()
+    return service
+
+@pytest.fixture
+async def user(mongo):
+    user = {"_id": ObjectId(), "full_name": "Rama Haddad", "email": "rama@example.com",
+            "role": "patient", "token_version": 0}
+    await mongo.users.insert_one(user)
+    return user
+
+async def test_rotated_token_cannot_be_redeemed_again(service, user):
+    jti, family_id = await service.issue(str(user["_id"]))
+
+    assert (await service.rotate(jti))["family_id"] == family_id
+    assert await service.rotate(jti) is None
+
+async def test_reuse_revokes_the_whole_family(service, user):
+    jti, family_id = await service.issue(str(user["_id"]))
+    await service.rotate(jti)
+    successor, _ = await service.issue(str(user["_id"]), family_id)
+    other_session, _ = await service.issue(str(user["_id"]))
+
+    # The first token is replayed (it leaked): the successor dies with it
+    assert await service.rotate(jti) is None
+    assert await service.rotate(successor) is None
+    assert await service.rotate(other_session) is not None
+
+async def test_concurrent_rotations_redeem_once(service, user):
+    jti, _ = await service.issue(str(user["_id"]))
+
+    results = await asyncio.gather(*(service.rotate(jti) for _ in range(10)))
+    assert sum(result is not None for result in results) == 1
+
+async def test_revoke_all_outdates_every_token(service, user):
+    await service.revoke_all(str(user["_id"]))
+
+    stored = await service.users_collection.find_one({"_id": user["_id"]})
+    assert not is_token_current({"ver": 0}, stored)
+    assert is_token_current({"ver": 1}, stored)
+
+@pytest.fixture
+async def client(mongo):
+    await auth_service.init()
+    await refresh_token_service.init()
+    app = FastAPI()
+    app.include_router(auth.router, prefix="/auth")
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        yield client
+
+async def refresh(client, token: str) -> httpx.Response:
+    return await client.post("/auth/refresh", json={"refresh_token": token})
+
+async def test_refresh_endpoint_rotates_and_detects_reuse(client, user):
+    _, first = await auth.issue_token_pair(user)
+
+    response = await refresh(client, first)
+    assert response.status_code == 200
+    second = response.json()["refresh_token"]
+    assert decode_token(second)["fam"] == decode_token(first)["fam"]
+
+    assert (await refresh(client, first)).status_code == 401
+    assert (await refresh(client, second)).status_code == 401
+
+async def test_refresh_endpoint_rejects_tokens_issued_before_revoke_all(client, user):
+    _, token = await auth.issue_token_pair(user)
+    await refresh_token_service.revoke_all(str(user["_id"]))
+
+    assert (await refresh(client, token)).status_code == 401
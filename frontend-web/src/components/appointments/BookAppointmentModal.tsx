@@ -6,6 +6,7 @@ import Button from '@/components/common/Button'
 import Input from '@/components/common/Input'
 import Select from '@/components/common/Select'
 import toast from 'react-hot-toast'
+import { useIdempotencyKey } from '@/utils/idempotency'
 
 interface Doctor {
   _id: string
@@ -40,6 +41,7 @@ const BookAppointmentModal: React.FC<BookAppointmentModalProps> = ({
   const [appointmentType, setAppointmentType] = useState('consultation')
   const [reason, setReason] = useState('')
   const [isBooking, setIsBooking] = useState(false)
+  const idempotency = useIdempotencyKey()
 
   // Get tomorrow's date as minimum selectable date
   const tomorrow = new Date()
@@ -75,14 +77,16 @@ const BookAppointmentModal: React.FC<BookAppointmentModalProps> = ({
 
     setIsBooking(true)
     try {
-      await appointmentService.createAppointment({
+      const appointmentData = {
         doctor_id: doctor._id,
         appointment_date: selectedDate,
         time_slot: selectedSlot,
         appointment_type: appointmentType as any,
         reason
-      })
+      }
 
+      await appointmentService.createAppointment(appointmentData, idempotency.keyFor(appointmentData))
+      idempotency.reset()
       toast.success('Appointment booked successfully!')
       onClose()
     } catch (error: any) {
@@ -6,6 +6,7 @@ import Button from '@/components/common/Button'
 import Input from '@/components/common/Input'
 import Select from '@/components/common/Select'
 import toast from 'react-hot-toast'
+import { useIdempotencyKey } from '@/utils/idempotency'
 
 interface Medicine {
   name: string
@@ -48,6 +49,7 @@ const CreatePrescriptionModal: React.FC<CreatePrescriptionModalProps> = ({
   const [patientSearch, setPatientSearch] = useState('')
   const [medicineSearch, setMedicineSearch] = useState('')
   const [searchResults, setSearchResults] = useState<any[]>([])
+  const idempotency = useIdempotencyKey()
 
   // Get default valid until date (30 days from now)
   useEffect(() => {
@@ -130,7 +132,8 @@ const CreatePrescriptionModal: React.FC<CreatePrescriptionModalProps> = ({
         valid_until: validUntil
       }
 
-      await prescriptionService.createPrescription(prescriptionData)
+      await prescriptionService.createPrescription(prescriptionData, idempotency.keyFor(prescriptionData))
+      idempotency.reset()
       toast.success('Prescription created successfully!')
       onSuccess()
     } catch (error: any) {
@@ -85,7 +85,7 @@ export const AuthProvider: React.FC<AuthProviderProps> = ({ children }) => {
       // Navigate to OTP verification
       navigate('/verify', { 
         state: { 
-          identifier: data.email || data.phone_number,
+          identifier: data.email || `${data.country_code}${data.phone_number}`,
           isEmail: !!data.email 
         } 
       })
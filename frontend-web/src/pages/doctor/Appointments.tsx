@@ -1,6 +1,6 @@
-import React, { useState } from 'react'
+import React, { useEffect, useState } from 'react'
 import { Calendar, Clock, User, Phone, CheckCircle, XCircle, AlertCircle } from 'lucide-react'
-import { useQuery } from 'react-query'
+import { useQuery, useQueryClient } from 'react-query'
 import { appointmentService } from '@/services'
 import Button from '@/components/common/Button'
 import Card from '@/components/common/Card'
@@ -36,6 +36,18 @@ const DoctorAppointments: React.FC = () => {
     ['today-appointments'],
     () => appointmentService.getTodayAppointments()
   )
+
+  // Refetch when a booking or status change is pushed, instead of polling
+  const queryClient = useQueryClient()
+  useEffect(() => {
+    const controller = new AbortController()
+    appointmentService.streamAppointments(() => {
+      queryClient.invalidateQueries('doctor-appointments')
+      queryClient.invalidateQueries('today-appointments')
+    }, controller.signal)
+    return () => controller.abort()
+  }, [queryClient])
+
   const appointments: DoctorAppointment[] = appointmentsData?.data || []
   const todayAppointments: DoctorAppointment[] = todayData?.data || []
 
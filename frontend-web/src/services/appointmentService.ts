@@ -14,15 +14,23 @@ export interface UpdateAppointmentStatusData {
 }
 
 class AppointmentService {
-  async createAppointment(data: CreateAppointmentData) {
-    const response = await api.post('/appointments/', data)
+  // The caller keeps one key per form submission (useIdempotencyKey) and sends
+  // it again on retries, so the booking is created once
+  async createAppointment(data: CreateAppointmentData, idempotencyKey: string) {
+    const response = await api.post('/appointments/', data, {
+      headers: { 'Idempotency-Key': idempotencyKey },
+    })
     return response.data
   }
 
-  async getMyAppointments(startDate?: string, endDate?: string) {
+  // `fields` returns only those fields (e.g. '_id,appointment_date,status'),
+  // without the other party unless `expand` names it
+  async getMyAppointments(startDate?: string, endDate?: string, fields?: string, expand?: string) {
     const params = new URLSearchParams()
     if (startDate) params.append('start_date', startDate)
     if (endDate) params.append('end_date', endDate)
+    if (fields) params.append('fields', fields)
+    if (expand !== undefined) params.append('expand', expand)
     
     const response = await api.get(`/appointments/my?${params}`)
     return response.data
@@ -38,6 +46,12 @@ class AppointmentService {
     return response.data
   }
 
+  // Many appointments in one request; ids that were not found come back in `missing`
+  async getAppointmentsBatch(appointmentIds: string[]) {
+    const response = await api.get(`/appointments/batch?ids=${appointmentIds.join(',')}`)
+    return response.data
+  }
+
   async updateAppointmentStatus(appointmentId: string, data: UpdateAppointmentStatusData) {
     const response = await api.put(`/appointments/${appointmentId}/status`, data)
     return response.data
@@ -48,6 +62,54 @@ class AppointmentService {
     return response.data
   }
 
+  // Live booking/status updates for the signed-in doctor. EventSource cannot
+  // send the bearer token, so the stream is read with fetch; reconnects resume
+  // from the last event id. Resolves once `signal` is aborted.
+  async streamAppointments(onEvent: (event: string, data: any) => void, signal: AbortSignal) {
+    let lastEventId = ''
+    while (!signal.aborted) {
+      try {
+        const response = await fetch(`${api.defaults.baseURL}/appointments/stream`, {
+          headers: {
+            Authorization: `Bearer ${localStorage.getItem('access_token')}`,
+            Accept: 'text/event-stream',
+            ...(lastEventId ? { 'Last-Event-ID': lastEventId } : {}),
+          },
+          signal,
+        })
+        if (!response.ok || !response.body) throw new Error(`Stream failed: ${response.status}`)
+
+        const reader = response.body.pipeThrough(new TextDecoderStream()).getReader()
+        let buffer = ''
+        while (true) {
+          const { value, done } = await reader.read()
+          if (done) break
+          buffer += value
+          let boundary
+          while ((boundary = buffer.indexOf('\n\n')) >= 0) {
+            const frame = buffer.slice(0, boundary)
+            buffer = buffer.slice(boundary + 2)
+            let id = ''
+            let event = 'message'
+            let data = ''
+            for (const line of frame.split('\n')) {
+              if (line.startsWith('id: ')) id = line.slice(4)
+              else if (line.startsWith('event: ')) event = line.slice(7)
+              else if (line.startsWith('data: ')) data += line.slice(6)
+            }
+            // Heartbeats and the retry hint carry no data
+            if (!data) continue
+            if (id) lastEventId = id
+            onEvent(event, JSON.parse(data))
+          }
+        }
+      } catch (error) {
+        if (signal.aborted) return
+      }
+      await new Promise((resolve) => setTimeout(resolve, 3000))
+    }
+  }
+
   async getAvailableSlots(doctorId: string, date: string) {
     const response = await api.get(`/appointments/doctors/${doctorId}/slots?date=${date}`)
     return response.data
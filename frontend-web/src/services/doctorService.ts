@@ -8,6 +8,10 @@ export interface DoctorSearchParams {
   max_fee?: string
   page?: number
   limit?: number
+  // Comma-separated fields to return (e.g. '_id,full_name,clinic_info.city')
+  fields?: string
+  // Related data to include ('stats')
+  expand?: string
 }
 
 export interface UpdateDoctorProfileData {
@@ -52,6 +56,14 @@ class DoctorService {
     return response.data
   }
 
+  // Many doctors in one request; ids that were not found come back in `missing`
+  async getDoctorsBatch(doctorIds: string[], includeStats = false) {
+    const params = new URLSearchParams({ ids: doctorIds.join(',') })
+    if (includeStats) params.append('include_stats', 'true')
+    const response = await api.get(`/doctors/batch?${params}`)
+    return response.data
+  }
+
   async getSpecialties() {
     const response = await api.get('/doctors/specialties')
     return response.data
@@ -81,6 +93,14 @@ class DoctorService {
     const response = await api.get('/doctors/profile/stats')
     return response.data
   }
+
+  // Profile, stats, today's agenda and recent prescriptions in one request;
+  // `fields` limits it to some sections (e.g. ['stats', 'today'])
+  async getDashboard(fields?: Array<'profile' | 'stats' | 'today' | 'recent_prescriptions'>) {
+    const params = fields?.length ? `?fields=${fields.join(',')}` : ''
+    const response = await api.get(`/dashboard/doctor${params}`)
+    return response.data
+  }
 }
 
 export default new DoctorService()
\ No newline at end of file
@@ -31,8 +31,12 @@ export interface UpdatePrescriptionData {
 }
 
 class PrescriptionService {
-  async createPrescription(data: CreatePrescriptionData) {
-    const response = await api.post('/prescriptions/', data)
+  // The caller keeps one key per form submission (useIdempotencyKey) and sends
+  // it again on retries, so the prescription is created once
+  async createPrescription(data: CreatePrescriptionData, idempotencyKey: string) {
+    const response = await api.post('/prescriptions/', data, {
+      headers: { 'Idempotency-Key': idempotencyKey },
+    })
     return response.data
   }
 
@@ -0,0 +1,23 @@
+import { useRef } from 'react'
+
+// One Idempotency-Key per form submission. Submitting the same payload again
+// after a failure (a retry) reuses the key, so the server creates the record
+// at most once; a changed payload is a new submission and gets a new key.
+export function useIdempotencyKey() {
+  const current = useRef<{ key: string; payload: string } | null>(null)
+
+  const keyFor = (data: unknown) => {
+    const payload = JSON.stringify(data)
+    if (current.current?.payload !== payload) {
+      current.current = { key: crypto.randomUUID(), payload }
+    }
+    return current.current.key
+  }
+
+  // Call once the submission succeeded; the next one starts fresh
+  const reset = () => {
+    current.current = null
+  }
+
+  return { keyFor, reset }
+}